@@ -1,3 +1,4 @@
+import json
 import logging
 import re
 import uuid
@@ -86,7 +87,7 @@ from django.utils.html import format_html
 from util.urls import build_staff_developer_chat_path_for_agent
 from django.utils import timezone
 from django.utils.text import get_valid_filename
-from django.http import HttpResponse, HttpResponseRedirect, FileResponse, StreamingHttpResponse
+from django.http import HttpResponse, HttpResponseRedirect, FileResponse
 from django.template.response import TemplateResponse
 from django.core.exceptions import PermissionDenied, ValidationError
 from django.core.files.storage import default_storage
@@ -94,6 +95,7 @@ from django.db.models import Sum
 from .tasks import sync_ip_block, backfill_missing_proxy_records, proxy_health_check_single, garbage_collect_timed_out_tasks
 from .tasks.sms_tasks import sync_twilio_numbers, send_test_sms
 from .services.sms_number_inventory import SmsNumberReleaseCandidate, find_sms_number_release_candidates, release_sms_number, retire_sms_number
+from .services.prompt_archives import load_prompt_archive_payload
 from .services.global_skill_json import import_global_skill_from_payload, parse_global_skill_json_bytes, serialize_global_skill_to_json_bytes
 from .services.user_flags import filter_users_by_flag, get_selected_user_flag_choice_option, get_enabled_user_flag_slugs, set_user_flag_choice, set_user_flag
 from constants.plans import PlanNamesChoices
@@ -5186,7 +5188,7 @@ class PersistentAgentPromptArchiveAdmin(admin.ModelAdmin):
         if not archive:
             self.message_user(request, "Prompt archive not found.", level=messages.ERROR)
             return HttpResponseRedirect(changelist_url)
-        if not default_storage.exists(archive.storage_key):
+        if not archive.storage_key or not default_storage.exists(archive.storage_key):
             self.message_user(
                 request,
                 "Archived prompt payload is missing from storage.",
@@ -5195,24 +5197,23 @@ class PersistentAgentPromptArchiveAdmin(admin.ModelAdmin):
             return HttpResponseRedirect(changelist_url)
 
         filename = archive.storage_key.rsplit("/", 1)[-1] or f"{archive.pk}.json.zst"
-        if filename.endswith(".zst"):
+        if filename.endswith(".blocks.json.zst"):
+            download_name = filename[: -len(".blocks.json.zst")] + ".json"
+        elif filename.endswith(".zst"):
             download_name = filename[:-4]
         else:
             download_name = filename
         if "." not in download_name:
             download_name += ".json"
 
-        def content_stream():
-            with default_storage.open(archive.storage_key, "rb") as stored:
-                dctx = zstd.ZstdDecompressor()
-                with dctx.stream_reader(stored) as reader:
-                    while True:
-                        chunk = reader.read(65536)
-                        if not chunk:
-                            break
-                        yield chunk
-
-        response = StreamingHttpResponse(content_stream(), content_type="application/json")
+        try:
+            payload = load_prompt_archive_payload(archive.storage_key)
+        except (OSError, ValueError, zstd.ZstdError):
+            logging.exception("Failed to read prompt archive %s", archive.pk)
+            self.message_user(request, "Archived prompt payload could not be read.", level=messages.ERROR)
+            return HttpResponseRedirect(changelist_url)
+
+        response = HttpResponse(json.dumps(payload), content_type="application/json")
         response["Content-Disposition"] = f'attachment; filename="{download_name}"'
         return response
 
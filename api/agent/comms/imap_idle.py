@@ -0,0 +1,262 @@
+"""Minimal asyncio IMAP client for long-lived IDLE sessions.
+
+Only the commands the IDLE runner needs are implemented: authentication,
+SELECT, IDLE/DONE and the UID SEARCH/FETCH/STORE calls used to pull new mail
+over the same session that received the notification. Everything runs on
+asyncio streams so one process can hold thousands of sessions.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import re
+import ssl
+from dataclasses import dataclass, field
+from typing import Optional
+
+_LITERAL_RE = re.compile(rb"\{(\d+)\+?\}\r\n$")
+_UID_RE = re.compile(rb"\bUID (\d+)", re.IGNORECASE)
+_RESP_CODE_RE = re.compile(rb"\[([A-Z-]+) ([^\]]*)\]", re.IGNORECASE)
+# asyncio's default 64 KiB line limit is too small for UID SEARCH replies on large mailboxes.
+_STREAM_LIMIT = 8 * 1024 * 1024
+
+
+class ImapIdleError(Exception):
+    """Raised when the server rejects a command or the session breaks."""
+
+
+@dataclass
+class ImapResponse:
+    """One server response line, with any literals it carried."""
+
+    tag: str
+    status: str
+    text: bytes
+    literals: list[bytes] = field(default_factory=list)
+
+    @property
+    def is_new_mail(self) -> bool:
+        # Untagged "* <n> EXISTS" / "* <n> RECENT" announce new messages.
+        return self.tag == "*" and self.text.strip().upper() in (b"EXISTS", b"RECENT")
+
+
+def _quote(value: str) -> str:
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+class AsyncImapSession:
+    """A single authenticated IMAP connection driven by asyncio streams."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, *, timeout: float) -> None:
+        self._reader = reader
+        self._writer = writer
+        self._timeout = timeout
+        self._tag_counter = 0
+        self._idle_tag: Optional[str] = None
+        self.capabilities: set[str] = set()
+        self.select_codes: dict[str, str] = {}
+        # Set whenever an EXISTS/RECENT update arrives, including mid-command.
+        self.new_mail_seen = False
+
+    @classmethod
+    async def connect(
+        cls,
+        host: str,
+        port: int,
+        *,
+        use_ssl: bool,
+        starttls: bool = False,
+        timeout: float = 60,
+        ssl_context: Optional[ssl.SSLContext] = None,
+    ) -> "AsyncImapSession":
+        context = ssl_context or ssl.create_default_context()
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port, ssl=context if use_ssl else None, limit=_STREAM_LIMIT),
+            timeout=timeout,
+        )
+        session = cls(reader, writer, timeout=timeout)
+        greeting = await session._read_response()
+        if greeting.tag != "*" or greeting.status not in ("OK", "PREAUTH"):
+            session.close()
+            raise ImapIdleError(f"Unexpected IMAP greeting: {greeting.status} {greeting.text!r}")
+        if starttls:
+            await session.command("STARTTLS")
+            await writer.start_tls(context, server_hostname=host)
+        await session.refresh_capabilities()
+        return session
+
+    # ------------------------------------------------------------------ wire
+    async def _readline(self, timeout: float) -> bytes:
+        try:
+            line = await asyncio.wait_for(self._reader.readuntil(b"\r\n"), timeout=timeout)
+        except asyncio.IncompleteReadError as exc:
+            raise ImapIdleError("IMAP connection closed") from exc
+        except asyncio.LimitOverrunError as exc:
+            # The oversized line is still buffered, so the stream cannot be resynchronised.
+            raise ImapIdleError(f"IMAP response line exceeds {_STREAM_LIMIT} bytes") from exc
+        return line
+
+    async def _read_response(self, timeout: Optional[float] = None) -> ImapResponse:
+        timeout = self._timeout if timeout is None else timeout
+        line = await self._readline(timeout)
+        literals: list[bytes] = []
+        while True:
+            match = _LITERAL_RE.search(line)
+            if not match:
+                break
+            size = int(match.group(1))
+            try:
+                literal = await asyncio.wait_for(self._reader.readexactly(size), timeout=self._timeout)
+            except asyncio.IncompleteReadError as exc:
+                raise ImapIdleError("IMAP connection closed mid-literal") from exc
+            literals.append(literal)
+            line = line[: match.start()] + b"{}" + await self._readline(self._timeout)
+        line = line.rstrip(b"\r\n")
+        tag, _, rest = line.partition(b" ")
+        if tag == b"+":
+            return ImapResponse(tag="+", status="", text=rest, literals=literals)
+        first, _, remainder = rest.partition(b" ")
+        if tag == b"*" and first.isdigit():
+            # "* 12 EXISTS": keep the number in status, the keyword in text.
+            return ImapResponse(tag="*", status=first.decode(), text=remainder, literals=literals)
+        return ImapResponse(tag=tag.decode(errors="replace"), status=first.decode(errors="replace").upper(), text=remainder, literals=literals)
+
+    async def _send(self, data: bytes) -> None:
+        self._writer.write(data)
+        await asyncio.wait_for(self._writer.drain(), timeout=self._timeout)
+
+    def _next_tag(self) -> str:
+        self._tag_counter += 1
+        return f"G{self._tag_counter:05d}"
+
+    async def command(self, line: str, *, continuation: Optional[bytes] = None) -> list[ImapResponse]:
+        """Send one tagged command and return its untagged responses; raise unless it ends OK."""
+        tag = self._next_tag()
+        await self._send(f"{tag} {line}\r\n".encode("utf-8"))
+        untagged: list[ImapResponse] = []
+        continued = False
+        while True:
+            response = await self._read_response()
+            if response.tag == "+":
+                if continuation is None or continued:
+                    # SASL failures arrive as a challenge; an empty reply lets the server finish with NO.
+                    await self._send(b"\r\n")
+                else:
+                    continued = True
+                    await self._send(continuation + b"\r\n")
+                continue
+            if response.tag == tag:
+                if response.status != "OK":
+                    raise ImapIdleError(f"{line.split(' ', 1)[0]} failed: {response.status} {response.text!r}")
+                return untagged
+            self.new_mail_seen = self.new_mail_seen or response.is_new_mail
+            untagged.append(response)
+
+    # -------------------------------------------------------------- commands
+    async def refresh_capabilities(self) -> set[str]:
+        responses = await self.command("CAPABILITY")
+        caps: set[str] = set()
+        for response in responses:
+            if response.status == "CAPABILITY":
+                caps.update(part.upper() for part in response.text.decode(errors="replace").split())
+        self.capabilities = caps
+        return caps
+
+    async def login(self, username: str, password: str) -> None:
+        await self.command(f"LOGIN {_quote(username)} {_quote(password)}")
+        await self.refresh_capabilities()
+
+    async def authenticate(self, mechanism: str, auth_string: str) -> None:
+        payload = base64.b64encode(auth_string.encode("utf-8"))
+        await self.command(f"AUTHENTICATE {mechanism}", continuation=payload)
+        await self.refresh_capabilities()
+
+    async def select(self, folder: str, *, readonly: bool = False) -> dict[str, str]:
+        responses = await self.command(f"{'EXAMINE' if readonly else 'SELECT'} {_quote(folder)}")
+        codes: dict[str, str] = {}
+        for response in responses:
+            for name, value in _RESP_CODE_RE.findall(response.text):
+                codes[name.decode().upper()] = value.decode(errors="replace").strip()
+        self.select_codes = codes
+        return codes
+
+    async def uid_search(self, criteria: str) -> list[int]:
+        uids: list[int] = []
+        for response in await self.command(f"UID SEARCH {criteria}"):
+            if response.status == "SEARCH":
+                uids.extend(int(part) for part in response.text.split() if part.isdigit())
+        return sorted(set(uids))
+
+    async def uid_fetch(self, uid: int, item: str = "BODY.PEEK[]") -> Optional[bytes]:
+        """Return the largest literal the server sent for ``uid``, or None."""
+        best: Optional[bytes] = None
+        for response in await self.command(f"UID FETCH {uid} ({item})"):
+            if not response.literals:
+                continue
+            match = _UID_RE.search(response.text)
+            if match and int(match.group(1)) != uid:
+                continue
+            for literal in response.literals:
+                if best is None or len(literal) > len(best):
+                    best = literal
+        return best
+
+    async def uid_store_seen(self, uid: int) -> None:
+        await self.command(f"UID STORE {uid} +FLAGS.SILENT (\\Seen)")
+
+    async def idle_start(self) -> None:
+        tag = self._next_tag()
+        await self._send(f"{tag} IDLE\r\n".encode("ascii"))
+        while True:
+            response = await self._read_response()
+            if response.tag == "+":
+                self._idle_tag = tag
+                return
+            if response.tag == tag:
+                raise ImapIdleError(f"IDLE failed: {response.status} {response.text!r}")
+
+    async def idle_wait(self, timeout: float) -> list[ImapResponse]:
+        """Wait up to ``timeout`` seconds for untagged updates while idling."""
+        try:
+            first = await self._read_response(timeout=timeout)
+        except asyncio.TimeoutError:
+            return []
+        responses = [first]
+        # Servers often send EXISTS and RECENT back to back; drain what already arrived.
+        while True:
+            try:
+                responses.append(await self._read_response(timeout=0.05))
+            except asyncio.TimeoutError:
+                break
+        self.new_mail_seen = self.new_mail_seen or any(response.is_new_mail for response in responses)
+        return responses
+
+    async def idle_done(self) -> list[ImapResponse]:
+        tag, self._idle_tag = self._idle_tag, None
+        if tag is None:
+            return []
+        await self._send(b"DONE\r\n")
+        untagged: list[ImapResponse] = []
+        while True:
+            response = await self._read_response()
+            if response.tag == tag:
+                return untagged
+            self.new_mail_seen = self.new_mail_seen or response.is_new_mail
+            untagged.append(response)
+
+    async def logout(self) -> None:
+        try:
+            if self._idle_tag is not None:
+                await self.idle_done()
+            await self.command("LOGOUT")
+        except Exception:
+            pass
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        try:
+            self._writer.close()
+        except Exception:
+            pass
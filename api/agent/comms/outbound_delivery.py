@@ -1,8 +1,10 @@
 import logging
 import os
 import re
+from contextlib import ExitStack
 from email.message import MIMEPart
 from email.utils import formataddr, make_msgid
+from typing import Iterable
 from urllib.parse import unquote
 
 from django.core.mail import get_connection
@@ -1454,6 +1456,29 @@ def deliver_agent_email(message: PersistentAgentMessage):
         message.save(update_fields=["latest_status", "latest_error_message"])
 
 
+def deliver_agent_emails(messages: Iterable[PersistentAgentMessage]) -> None:
+    """Deliver a batch of outbound emails, reusing one SMTP session per sending account.
+
+    Each message still goes through ``deliver_agent_email``, so claiming,
+    review checks and status bookkeeping are unchanged.
+    """
+    by_endpoint: dict[object, list[PersistentAgentMessage]] = {}
+    for message in messages:
+        by_endpoint.setdefault(message.from_endpoint_id, []).append(message)
+
+    for endpoint_id, endpoint_messages in by_endpoint.items():
+        acct = (
+            AgentEmailAccount.objects.select_related("endpoint")
+            .filter(endpoint_id=endpoint_id, is_outbound_enabled=True)
+            .first()
+        )
+        with ExitStack() as stack:
+            if acct is not None and not uses_gmail_api(acct):
+                stack.enter_context(SmtpTransport.session(acct))
+            for message in endpoint_messages:
+                deliver_agent_email(message)
+
+
 @tracer.start_as_current_span("AGENT - Deliver Agent SMS")
 def deliver_agent_sms(message: PersistentAgentMessage):
     """Send an SMS and record the delivery attempt."""
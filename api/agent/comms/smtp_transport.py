@@ -1,8 +1,14 @@
+import hashlib
+import os
 import smtplib
-from dataclasses import dataclass
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 from email.message import EmailMessage, MIMEPart
 from email.utils import make_msgid, parseaddr
-from typing import Any, Sequence
+from typing import Any, Iterator, Sequence
+from django.conf import settings
 from opentelemetry import trace
 import logging
 
@@ -138,14 +144,272 @@ def build_email_message(
     return msg
 
 
+# Errors that mean a reused session went stale before the message was accepted.
+_STALE_CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError)
+
+
+def _open_smtp_client(account: AgentEmailAccount, timeout: int) -> smtplib.SMTP:
+    """Connect, negotiate TLS and authenticate a client for ``account``."""
+    if account.smtp_security == AgentEmailAccount.SmtpSecurity.SSL:
+        client: smtplib.SMTP | smtplib.SMTP_SSL = smtplib.SMTP_SSL(
+            account.smtp_host, int(account.smtp_port or 465), timeout=timeout
+        )
+    else:
+        client = smtplib.SMTP(
+            account.smtp_host, int(account.smtp_port or 587), timeout=timeout
+        )
+    try:
+        client.ehlo()
+        if account.smtp_security == AgentEmailAccount.SmtpSecurity.STARTTLS:
+            client.starttls()
+            client.ehlo()
+
+        # Auth
+        if account.smtp_auth == AgentEmailAccount.AuthMode.OAUTH2:
+            identity, access_token, _credential = resolve_oauth_identity_and_token(account, "smtp")
+            auth_string = build_xoauth2_string(identity, access_token)
+            client.auth("XOAUTH2", lambda _=None: auth_string)
+        elif account.smtp_auth != AgentEmailAccount.AuthMode.NONE:
+            client.login(account.smtp_username or "", account.get_smtp_password() or "")
+    except Exception:
+        _close_smtp_client(client)
+        raise
+    return client
+
+
+def _session_alive(client: smtplib.SMTP) -> bool:
+    """NOOP a reused session; False when the server has dropped it."""
+    try:
+        code, _message = client.noop()
+    except (*_STALE_CONNECTION_ERRORS, OSError, smtplib.SMTPException):
+        return False
+    return code == 250
+
+
+def _close_smtp_client(client: smtplib.SMTP) -> None:
+    try:
+        client.quit()
+    except Exception:
+        try:
+            client.close()
+        except Exception:
+            pass
+
+
+def _connection_key(account: AgentEmailAccount) -> tuple:
+    """Identify sessions that are interchangeable for ``account``.
+
+    Credentials are part of the key so a password or mode change never
+    reuses a session authenticated with the old settings.
+    """
+    secret = ""
+    if account.smtp_auth not in (AgentEmailAccount.AuthMode.NONE, AgentEmailAccount.AuthMode.OAUTH2):
+        secret = hashlib.sha256((account.get_smtp_password() or "").encode("utf-8")).hexdigest()
+    return (
+        account.pk,
+        account.smtp_host,
+        int(account.smtp_port or 0),
+        account.smtp_security,
+        account.smtp_auth,
+        account.smtp_username or "",
+        secret,
+    )
+
+
+@dataclass
+class SmtpConnection:
+    key: tuple
+    client: smtplib.SMTP
+    reused: bool = False
+    messages_sent: int = 0
+    last_used_at: float = field(default_factory=time.monotonic)
+
+
+class SmtpConnectionPool:
+    """Per-process pool of authenticated SMTP sessions, keyed by account settings.
+
+    Idle sessions are closed after ``idle_timeout`` seconds and a session is
+    retired after ``max_messages`` sends so long-lived connections never run
+    into server-side per-session limits.
+    """
+
+    def __init__(self, *, idle_timeout: float, max_messages: int, max_idle_per_key: int) -> None:
+        self.idle_timeout = idle_timeout
+        self.max_messages = max(1, max_messages)
+        self.max_idle_per_key = max(0, max_idle_per_key)
+        self._lock = threading.Lock()
+        self._idle: dict[tuple, list[SmtpConnection]] = {}
+        self._owner_pid = os.getpid()
+
+    def _check_owner(self) -> None:
+        # Sockets inherited across fork belong to the parent; forget them without QUIT.
+        if self._owner_pid != os.getpid():
+            self._idle = {}
+            self._owner_pid = os.getpid()
+
+    def _take_idle(self, key: tuple) -> tuple[SmtpConnection | None, list[SmtpConnection]]:
+        now = time.monotonic()
+        expired: list[SmtpConnection] = []
+        with self._lock:
+            self._check_owner()
+            for idle_key in list(self._idle):
+                fresh = []
+                for conn in self._idle[idle_key]:
+                    if now - conn.last_used_at > self.idle_timeout:
+                        expired.append(conn)
+                    else:
+                        fresh.append(conn)
+                if fresh:
+                    self._idle[idle_key] = fresh
+                else:
+                    del self._idle[idle_key]
+            candidates = self._idle.get(key)
+            conn = candidates.pop() if candidates else None
+        return conn, expired
+
+    def acquire(self, account: AgentEmailAccount, timeout: int) -> SmtpConnection:
+        key = _connection_key(account)
+        conn, expired = self._take_idle(key)
+        for stale in expired:
+            _close_smtp_client(stale.client)
+        if conn is not None:
+            conn.reused = True
+            return conn
+        return SmtpConnection(key=key, client=_open_smtp_client(account, timeout))
+
+    def release(self, conn: SmtpConnection) -> None:
+        conn.last_used_at = time.monotonic()
+        if conn.messages_sent < self.max_messages:
+            with self._lock:
+                self._check_owner()
+                idle = self._idle.setdefault(conn.key, [])
+                if len(idle) < self.max_idle_per_key:
+                    idle.append(conn)
+                    return
+        _close_smtp_client(conn.client)
+
+    def discard(self, conn: SmtpConnection) -> None:
+        _close_smtp_client(conn.client)
+
+    def close_all(self) -> None:
+        with self._lock:
+            self._check_owner()
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                _close_smtp_client(conn.client)
+
+
+_pool: SmtpConnectionPool | None = None
+_pool_lock = threading.Lock()
+_pinned = threading.local()
+
+
+def get_smtp_connection_pool() -> SmtpConnectionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = SmtpConnectionPool(
+                    idle_timeout=float(getattr(settings, "SMTP_POOL_IDLE_TIMEOUT_SEC", 60)),
+                    max_messages=int(getattr(settings, "SMTP_POOL_MAX_MESSAGES_PER_CONNECTION", 100)),
+                    max_idle_per_key=int(getattr(settings, "SMTP_POOL_MAX_IDLE_PER_ACCOUNT", 2)),
+                )
+    return _pool
+
+
+def _pool_enabled() -> bool:
+    return bool(getattr(settings, "SMTP_POOL_ENABLED", True))
+
+
+def _pinned_sessions() -> dict[tuple, SmtpConnection | None]:
+    sessions = getattr(_pinned, "sessions", None)
+    if sessions is None:
+        sessions = _pinned.sessions = {}
+    return sessions
+
+
 class SmtpTransport:
-    """Simple SMTP transport for per-agent SMTP accounts.
+    """SMTP transport for per-agent SMTP accounts.
 
-    One connection per send; no pooling.
+    Sessions come from the process-wide pool when ``SMTP_POOL_ENABLED`` is on;
+    ``session()`` pins one session for a batch of sends to the same account.
     """
 
     DEFAULT_TIMEOUT = 30
 
+    @classmethod
+    @contextmanager
+    def session(cls, account: AgentEmailAccount) -> Iterator[None]:
+        """Reuse one SMTP session for every send to ``account`` inside the block."""
+        key = _connection_key(account)
+        sessions = _pinned_sessions()
+        if key in sessions:
+            yield
+            return
+        # Opened lazily on the first send so an empty batch never connects.
+        sessions[key] = None
+        try:
+            yield
+        finally:
+            conn = sessions.pop(key, None)
+            if conn is not None:
+                if _pool_enabled():
+                    get_smtp_connection_pool().release(conn)
+                else:
+                    _close_smtp_client(conn.client)
+
+    @classmethod
+    def _acquire(cls, account: AgentEmailAccount, key: tuple) -> SmtpConnection:
+        if _pool_enabled():
+            return get_smtp_connection_pool().acquire(account, cls.DEFAULT_TIMEOUT)
+        return SmtpConnection(key=key, client=_open_smtp_client(account, cls.DEFAULT_TIMEOUT))
+
+    @classmethod
+    def _deliver(
+        cls,
+        account: AgentEmailAccount,
+        msg: EmailMessage,
+        envelope_sender: str,
+        recipient_list: Sequence[str],
+    ) -> None:
+        key = _connection_key(account)
+        sessions = _pinned_sessions()
+        pinned = key in sessions
+        if not pinned and not _pool_enabled():
+            client = _open_smtp_client(account, cls.DEFAULT_TIMEOUT)
+            try:
+                client.send_message(msg, from_addr=envelope_sender, to_addrs=recipient_list)
+            finally:
+                _close_smtp_client(client)
+            return
+
+        conn = sessions.get(key) if pinned else None
+        if conn is None:
+            conn = cls._acquire(account, key)
+        try:
+            if conn.reused and not _session_alive(conn.client):
+                # Probe before sending: once DATA may have gone out, a retry could deliver twice.
+                logger.info("Reconnecting stale SMTP session for account %s", account.pk)
+                _close_smtp_client(conn.client)
+                conn = SmtpConnection(key=key, client=_open_smtp_client(account, cls.DEFAULT_TIMEOUT))
+            conn.client.send_message(msg, from_addr=envelope_sender, to_addrs=recipient_list)
+        except Exception:
+            _close_smtp_client(conn.client)
+            if pinned:
+                sessions[key] = None
+            raise
+
+        conn.messages_sent += 1
+        conn.reused = True
+        if not pinned:
+            get_smtp_connection_pool().release(conn)
+        elif conn.messages_sent >= get_smtp_connection_pool().max_messages:
+            _close_smtp_client(conn.client)
+            sessions[key] = None
+        else:
+            sessions[key] = conn
+
     @classmethod
     @tracer.start_as_current_span("email.smtp.send")
     def send(
@@ -206,37 +470,6 @@ class SmtpTransport:
             attachments=attachments,
         )
 
-        # Connect and send
-        if account.smtp_security == AgentEmailAccount.SmtpSecurity.SSL:
-            client: smtplib.SMTP | smtplib.SMTP_SSL = smtplib.SMTP_SSL(
-                account.smtp_host, int(account.smtp_port or 465), timeout=cls.DEFAULT_TIMEOUT
-            )
-        else:
-            client = smtplib.SMTP(
-                account.smtp_host, int(account.smtp_port or 587), timeout=cls.DEFAULT_TIMEOUT
-            )
-        try:
-            client.ehlo()
-            if account.smtp_security == AgentEmailAccount.SmtpSecurity.STARTTLS:
-                client.starttls()
-                client.ehlo()
-
-            # Auth
-            if account.smtp_auth == AgentEmailAccount.AuthMode.OAUTH2:
-                identity, access_token, _credential = resolve_oauth_identity_and_token(account, "smtp")
-                auth_string = build_xoauth2_string(identity, access_token)
-                client.auth("XOAUTH2", lambda _=None: auth_string)
-            elif account.smtp_auth != AgentEmailAccount.AuthMode.NONE:
-                client.login(account.smtp_username or "", account.get_smtp_password() or "")
-
-            # Envelope sender should match From/header address typically
-            client.send_message(msg, from_addr=envelope_sender, to_addrs=recipient_list)
-            return ""
-        finally:
-            try:
-                client.quit()
-            except Exception:
-                try:
-                    client.close()
-                except Exception:
-                    pass
+        # Envelope sender should match From/header address typically
+        cls._deliver(account, msg, envelope_sender, recipient_list)
+        return ""
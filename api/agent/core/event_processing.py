@@ -13,11 +13,11 @@ import os
 import logging
 import re
 import time
-from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
-from contextvars import copy_context
+from concurrent.futures import FIRST_COMPLETED, wait
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from decimal import Decimal
+from functools import partial
 from typing import Callable, List, Tuple, Union, Optional, Dict, Any, Literal
 from urllib.parse import unquote_plus
 from uuid import UUID
@@ -61,6 +61,15 @@ from .processing_flags import (
     processing_lock_storage_keys,
     set_processing_heartbeat,
 )
+from .llm_provider_health import (
+    HedgedRequest,
+    hedge_delay_seconds,
+    hedged_requests_enabled,
+    order_failover_configs,
+    record_completion_failure,
+    record_completion_success,
+    record_discarded_hedge_usage,
+)
 from .llm_utils import EmptyLiteLLMResponseError, StreamIdleTimeout, raise_if_empty_litellm_response, raise_if_invalid_litellm_response, run_completion
 from .multimodal_context import collect_fresh_read_file_image_attachments, prepare_multimodal_read_file_request
 from .llm_streaming import StreamAccumulator
@@ -104,6 +113,7 @@ from .daily_limit_mode import (
 from .period_events import DAILY_HARD_LIMIT_BLOCKED_EVENT, DAILY_HARD_LIMIT_EXCEEDED_EVENT, DAILY_SOFT_LIMIT_EXCEEDED_EVENT, should_emit_daily_agent_event
 from .agent_judge import maybe_run_agent_judge
 from .prompt_context import _ConfigAuthorityResolver, build_prompt_context, get_agent_daily_credit_state, get_agent_tools
+from .prompt_cache_layout import PromptCacheBreakpoints, apply_prompt_cache_breakpoints, supports_cache_breakpoints
 from .prompt_run_cache import (
     PromptRunCache,
     bind_prompt_run_cache,
@@ -116,6 +126,7 @@ from .link_references import (
     resolve_link_reference_params,
     rewrite_prompt_urls,
 )
+from .tool_executor import ToolClassSlots, get_tool_batch_executor, tool_concurrency_class
 from ..tools.apply_patch import execute_apply_patch
 from ..tools.charter_updater import execute_update_charter
 from ..tools.email_sender import execute_send_email
@@ -193,6 +204,7 @@ from api.services.agent_error_logging import (
     log_tool_persistence_error,
 )
 from api.services.billing_snapshot import get_billing_snapshot_for_owner
+from api.services.credit_usage_ledger import record_credit_usage
 from api.services.owner_execution_pause import EXECUTION_PAUSE_MESSAGE, EXECUTION_PAUSE_NOTE, get_owner_execution_pause_state, resolve_agent_owner
 from api.services.signup_preview import can_bypass_task_credit_for_signup_preview, is_signup_preview_processing_paused
 from api.services.web_sessions import has_deliverable_web_session
@@ -2316,6 +2328,8 @@ def _finalize_pending_tool_call_step(
 def _clear_refunded_step_charge(step: "PersistentAgentStep") -> None:
     completion_id = getattr(step, "completion_id", None)
 
+    if step.credits_cost is not None:
+        record_credit_usage(_agent_from_step(step), -step.credits_cost, at=step.created_at)
     PersistentAgentStep.objects.filter(id=step.id).update(
         credits_cost=None,
         task_credit=None,
@@ -4364,92 +4378,89 @@ def _execute_prepared_tool_batch_inner(
         )
 
     if run_parallel_batch:
-        max_workers = min(len(prepared_batch.prepared_calls), max(1, get_max_parallel_tool_calls()))
+        max_in_flight = min(len(prepared_batch.prepared_calls), max(1, get_max_parallel_tool_calls()))
         logger.info(
-            "Agent %s: executing %d safe tool calls with max_workers=%d.",
+            "Agent %s: executing %d safe tool calls with max_in_flight=%d.",
             agent.id,
             len(prepared_batch.prepared_calls),
-            max_workers,
+            max_in_flight,
         )
         base_variables = get_all_variables()
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures: dict[Any, _PreparedToolExecution] = {}
-            pending_calls = list(prepared_batch.prepared_calls)
-
-            def submit_available_calls() -> None:
-                nonlocal abort_after_execution, execution_aborted, stale_cancellation
-                pending_index = 0
-                while (
-                    not execution_aborted
-                    and len(futures) < max_workers
-                    and pending_index < len(pending_calls)
+        executor = get_tool_batch_executor()
+        slots = ToolClassSlots(max_in_flight=max_in_flight)
+        futures: dict[Any, _PreparedToolExecution] = {}
+        pending_calls = list(prepared_batch.prepared_calls)
+
+        def submit_available_calls() -> None:
+            nonlocal abort_after_execution, execution_aborted, stale_cancellation
+            pending_index = 0
+            while (
+                not execution_aborted
+                and slots.has_capacity()
+                and pending_index < len(pending_calls)
+            ):
+                prepared = pending_calls[pending_index]
+                tool_class = tool_concurrency_class(prepared.tool_name)
+                if not slots.available(tool_class):
+                    pending_index += 1
+                    continue
+                pending_calls.pop(pending_index)
+                if (
+                    non_retryable_restriction_active
+                    and prepared.tool_name not in _tool_definition_names_for_completion(available_tools)
                 ):
-                    prepared = pending_calls[pending_index]
-                    if (
-                        is_source_bearing_tool(prepared.tool_name)
-                        and any(
-                            is_source_bearing_tool(in_flight.tool_name)
-                            for in_flight in futures.values()
-                        )
-                    ):
-                        pending_index += 1
-                        continue
-                    pending_calls.pop(pending_index)
-                    if (
-                        non_retryable_restriction_active
-                        and prepared.tool_name not in _tool_definition_names_for_completion(available_tools)
-                    ):
-                        _cancel_unstarted_tool_calls(
-                            agent,
-                            [prepared],
-                            reason=NON_RETRYABLE_BATCH_SKIP_REASON,
-                            retryable=False,
+                    _cancel_unstarted_tool_calls(
+                        agent,
+                        [prepared],
+                        reason=NON_RETRYABLE_BATCH_SKIP_REASON,
+                        retryable=False,
+                    )
+                    continue
+                with tracer.start_as_current_span("Execute Tool") as tool_span:
+                    if stale_prompt_checker and stale_prompt_checker():
+                        logger.info(
+                            "Agent %s: cancelling stale tool batch before executing %s because newer human input arrived.",
+                            agent.id,
+                            prepared.tool_name,
                         )
-                        continue
-                    with tracer.start_as_current_span("Execute Tool") as tool_span:
-                        if stale_prompt_checker and stale_prompt_checker():
-                            logger.info(
-                                "Agent %s: cancelling stale tool batch before executing %s because newer human input arrived.",
-                                agent.id,
-                                prepared.tool_name,
-                            )
-                            tool_span.add_event("Tool call cancelled - newer human input")
-                            abort_after_execution = True
-                            execution_aborted = True
-                            stale_cancellation = True
-                            return
-                        if _should_abort_processing(
-                            agent,
-                            budget_ctx=budget_ctx,
-                            heartbeat=heartbeat,
-                            span=tool_span,
-                            check_context="tool_batch_execute",
-                        ):
-                            abort_after_execution = True
-                            execution_aborted = True
-                            return
-                        if lock_extender:
-                            lock_extender.maybe_extend()
-                        tool_span.set_attribute("persistent_agent.id", str(agent.id))
-                        tool_span.set_attribute("tool.name", prepared.tool_name)
-                        _mark_prepared_tool_started(agent, prepared)
-                    context = copy_context()
-                    future = executor.submit(
-                        context.run,
-                        _execute_prepared_tool_call,
+                        tool_span.add_event("Tool call cancelled - newer human input")
+                        abort_after_execution = True
+                        execution_aborted = True
+                        stale_cancellation = True
+                        return
+                    if _should_abort_processing(
                         agent,
-                        prepared,
                         budget_ctx=budget_ctx,
-                        eval_run_id=eval_run_id,
-                        parallel_safe=True,
-                    )
-                    futures[future] = prepared
+                        heartbeat=heartbeat,
+                        span=tool_span,
+                        check_context="tool_batch_execute",
+                    ):
+                        abort_after_execution = True
+                        execution_aborted = True
+                        return
+                    if lock_extender:
+                        lock_extender.maybe_extend()
+                    tool_span.set_attribute("persistent_agent.id", str(agent.id))
+                    tool_span.set_attribute("tool.name", prepared.tool_name)
+                    _mark_prepared_tool_started(agent, prepared)
+                slots.acquire(tool_class)
+                future = executor.submit(
+                    _execute_prepared_tool_call,
+                    agent,
+                    prepared,
+                    budget_ctx=budget_ctx,
+                    eval_run_id=eval_run_id,
+                    parallel_safe=True,
+                )
+                futures[future] = prepared
 
+        try:
             submit_available_calls()
             while futures:
                 completed_futures, _ = wait(futures.keys(), return_when=FIRST_COMPLETED)
                 for future in completed_futures:
-                    futures.pop(future)
+                    completed = futures.pop(future)
+                    slots.release(tool_concurrency_class(completed.tool_name))
                     outcome = _refresh_skills_for_tool_outcome(agent, future.result())
                     _persist_tool_execution_outcome(agent, outcome)
                     execution_outcomes.append(outcome)
@@ -4461,6 +4472,10 @@ def _execute_prepared_tool_batch_inner(
                         )
                         non_retryable_restriction_active = True
                 submit_available_calls()
+        finally:
+            if futures:
+                # The pool is shared, so nothing else waits for calls that are still running.
+                wait(futures.keys())
 
         ordered_outcomes = sorted(execution_outcomes, key=lambda item: item.prepared.idx)
         for outcome in ordered_outcomes:
@@ -5245,6 +5260,44 @@ def _preferred_config_for_error_context(preferred_config: Optional[Tuple[str, st
     return {"raw": str(preferred_config)}
 
 
+def _prepare_completion_request(
+    provider: str,
+    model: str,
+    params_with_hints: Optional[dict],
+    *,
+    base_messages: List[dict],
+    base_tools: List[dict],
+    safety_identifier: Optional[str],
+    cache_breakpoints: Optional[PromptCacheBreakpoints],
+) -> Tuple[dict, List[dict], Optional[List[dict]]]:
+    """Return the params, messages and tools payload to send to one failover endpoint."""
+    params = dict(params_with_hints or {})
+    request_messages = base_messages
+    if cache_breakpoints is not None and supports_cache_breakpoints(provider, model):
+        request_messages = apply_prompt_cache_breakpoints(base_messages, cache_breakpoints)
+    request_tools_payload: Optional[List[dict]] = list(base_tools) if base_tools else None
+
+    # If OpenAI family, add safety_identifier hint when available
+    if (provider.startswith("openai") or provider == "openai") and safety_identifier:
+        params["safety_identifier"] = str(safety_identifier)
+    return params, request_messages, request_tools_payload
+
+
+def _next_hedge_position(
+    ordered_configs: List[Tuple[str, str, dict]],
+    position: int,
+    consumed_positions: set[int],
+) -> Optional[int]:
+    provider, model, _params = ordered_configs[position]
+    for candidate in range(position + 1, len(ordered_configs)):
+        if candidate in consumed_positions:
+            continue
+        candidate_provider, candidate_model, _candidate_params = ordered_configs[candidate]
+        if (candidate_provider, candidate_model) != (provider, model):
+            return candidate
+    return None
+
+
 def _completion_with_failover(
     messages: List[dict],
     tools: List[dict],
@@ -5256,6 +5309,7 @@ def _completion_with_failover(
     allow_streamed_content: bool = True,
     stale_prompt_checker: Callable[[], bool] | None = None,
     defer_stream_finish: bool = False,
+    cache_breakpoints: Optional[PromptCacheBreakpoints] = None,
 ) -> Tuple[dict, Optional[dict]]:
     """
     Execute LLM completion with a pre-determined, tiered failover configuration.
@@ -5270,6 +5324,8 @@ def _completion_with_failover(
         stream_broadcaster: Optional broadcaster for streaming deltas to web UI
         allow_streamed_content: Whether assistant message text is allowed to stream to the UI
         defer_stream_finish: Leave the stream open until the caller accepts the response
+        cache_breakpoints: Stable prompt prefix to mark for providers that need
+            explicit prompt-cache breakpoints
 
     Returns:
         Tuple of (LiteLLM completion response or streaming aggregate, token usage dict)
@@ -5313,9 +5369,15 @@ def _completion_with_failover(
                 agent_id or "unknown",
             )
 
-    for provider, model, params_with_hints in ordered_configs:
+    ordered_configs = order_failover_configs(ordered_configs)
+    consumed_positions: set[int] = set()
+
+    for position, (provider, model, params_with_hints) in enumerate(ordered_configs):
+        if position in consumed_positions:
+            continue
         if stale_prompt_checker and stale_prompt_checker():
             raise OrchestratorPromptStale("Prompt became stale before completion request was sent.")
+        health_recorded = False
         logger.info(
             "Attempting provider %s for agent %s",
             provider,
@@ -5329,7 +5391,17 @@ def _completion_with_failover(
                 llm_span.set_attribute("llm.model", model)
                 llm_span.set_attribute("llm.provider", provider)
                 params_base = dict(params_with_hints or {})
-                params = dict(params_base)
+                params, request_messages, request_tools_payload = _prepare_completion_request(
+                    provider,
+                    model,
+                    params_base,
+                    base_messages=base_messages,
+                    base_tools=base_tools,
+                    safety_identifier=safety_identifier,
+                    cache_breakpoints=cache_breakpoints,
+                )
+                if request_messages is not base_messages:
+                    llm_span.set_attribute("llm.cache_breakpoints", True)
 
                 # Extra diagnostics for OpenAI-compatible / custom bases
                 api_base = getattr(params, 'get', lambda *_: None)("api_base") if isinstance(params, dict) else None
@@ -5345,13 +5417,6 @@ def _completion_with_failover(
                     "<redacted>" if api_key_present else "<none>",
                 )
 
-                # If OpenAI family, add safety_identifier hint when available
-                request_messages = base_messages
-                request_tools_payload: Optional[List[dict]] = list(base_tools) if base_tools else None
-
-                if (provider.startswith("openai") or provider == "openai") and safety_identifier:
-                    params["safety_identifier"] = str(safety_identifier)
-
                 if active_stream_broadcaster:
                     stream_content = allow_streamed_content and bool(
                         params_base.get("allow_implied_send", True)
@@ -5395,13 +5460,91 @@ def _completion_with_failover(
                             drop_params=True,
                         )
                 else:
-                    response = run_completion(
-                        model=model,
-                        messages=request_messages,
-                        params=params,
-                        tools=request_tools_payload,
-                        drop_params=True,
+                    hedge_position = (
+                        _next_hedge_position(ordered_configs, position, consumed_positions)
+                        if hedged_requests_enabled()
+                        else None
                     )
+                    if hedge_position is None:
+                        response = run_completion(
+                            model=model,
+                            messages=request_messages,
+                            params=params,
+                            tools=request_tools_payload,
+                            drop_params=True,
+                        )
+                    else:
+                        hedge_provider, hedge_model, hedge_params_with_hints = ordered_configs[hedge_position]
+                        hedge_params, hedge_messages, hedge_tools_payload = _prepare_completion_request(
+                            hedge_provider,
+                            hedge_model,
+                            hedge_params_with_hints,
+                            base_messages=base_messages,
+                            base_tools=base_tools,
+                            safety_identifier=safety_identifier,
+                            cache_breakpoints=cache_breakpoints,
+                        )
+                        endpoints = [(provider, model), (hedge_provider, hedge_model)]
+
+                        pricing_models = [
+                            params_base.get("pricing_model"),
+                            (hedge_params_with_hints or {}).get("pricing_model"),
+                        ]
+
+                        def _record_hedged_result(index, result, error, endpoints=endpoints):
+                            if error is None:
+                                record_completion_success(*endpoints[index], result)
+                            else:
+                                record_completion_failure(*endpoints[index], error)
+
+                        def _meter_discarded_hedge(index, result, endpoints=endpoints, pricing_models=pricing_models):
+                            discarded_usage, _usage = extract_token_usage(
+                                result,
+                                model=endpoints[index][1],
+                                provider=endpoints[index][0],
+                                pricing_model=pricing_models[index],
+                            )
+                            record_discarded_hedge_usage(discarded_usage)
+
+                        hedged_request = HedgedRequest(
+                            [
+                                partial(
+                                    run_completion,
+                                    model=model,
+                                    messages=request_messages,
+                                    params=params,
+                                    tools=request_tools_payload,
+                                    drop_params=True,
+                                ),
+                                partial(
+                                    run_completion,
+                                    model=hedge_model,
+                                    messages=hedge_messages,
+                                    params=hedge_params,
+                                    tools=hedge_tools_payload,
+                                    drop_params=True,
+                                ),
+                            ],
+                            delay_seconds=hedge_delay_seconds(provider, model),
+                            on_result=_record_hedged_result,
+                            on_discard=_meter_discarded_hedge,
+                            attributes={"provider": provider},
+                        )
+                        health_recorded = True
+                        try:
+                            response = hedged_request.run()
+                        finally:
+                            if hedged_request.fired:
+                                consumed_positions.add(hedge_position)
+                                llm_span.set_attribute("llm.hedged", True)
+                        if hedged_request.winner == 1:
+                            provider, model = hedge_provider, hedge_model
+                            params_base = dict(hedge_params_with_hints or {})
+                            llm_span.set_attribute("llm.hedge_winner.provider", provider)
+                            llm_span.set_attribute("llm.hedge_winner.model", model)
+                if not health_recorded:
+                    record_completion_success(provider, model, response)
+                    health_recorded = True
                 if stale_prompt_checker and stale_prompt_checker():
                     raise OrchestratorPromptStale("Prompt became stale before completion response was accepted.")
 
@@ -5431,6 +5574,8 @@ def _completion_with_failover(
             raise
         except Exception as exc:
             last_exc = exc
+            if not health_recorded:
+                record_completion_failure(provider, model, exc)
             current_span = trace.get_current_span()
             mark_span_failed_with_exception(current_span, exc, f"LLM completion failed with {provider}")
             try:
@@ -7884,6 +8029,7 @@ def _run_agent_loop(
                         allow_streamed_content=prompt_allows_implied_send and not source_reconciliation_directive,
                         stale_prompt_checker=_is_orchestrator_prompt_stale,
                         defer_stream_finish=True,
+                        cache_breakpoints=prompt_metadata.get("prompt_cache_breakpoints"),
                     )
                     recovered = protect_current_sqlite_state(phase="after_llm_completion")
                     if _record_sqlite_recovery(recovered, iter_span, heartbeat, "after_llm"):
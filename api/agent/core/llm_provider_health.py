@@ -0,0 +1,477 @@
+"""
+Shared health scores for LLM provider endpoints.
+
+``_completion_with_failover`` walked its failover list strictly in order, so
+while a provider was degraded every agent run sat through a full request
+timeout on it before moving on. Each (provider, model) pair now keeps a small
+Redis hash shared by all workers: EWMA latency and time to first token with
+their mean deviations, an EWMA error rate, and a circuit breaker that opens
+after consecutive provider-side failures. Failover ordering moves open circuits
+and degraded endpoints behind healthy ones, and an optional hedging mode starts
+the next provider when the first has not answered within its estimated p95
+latency.
+"""
+
+import logging
+import queue
+import threading
+import time
+from contextvars import copy_context
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Optional, Sequence
+
+import litellm
+from django.conf import settings
+from opentelemetry import metrics
+
+from config.redis_client import get_redis_client
+
+from .llm_utils import LiteLLMResponseError
+
+logger = logging.getLogger(__name__)
+
+_meter = metrics.get_meter("gobii.llm_health")
+llm_circuit_transitions = _meter.create_counter(
+    "gobii.llm.circuit_transitions",
+    description="LLM provider circuit-breaker transitions by state",
+)
+llm_hedged_requests = _meter.create_counter(
+    "gobii.llm.hedged_requests",
+    description="Hedged LLM completions by outcome (fired, hedge_won, primary_won)",
+)
+llm_hedge_discarded_tokens = _meter.create_counter(
+    "gobii.llm.hedge_discarded_tokens",
+    description="Tokens billed for losing hedged LLM completions, by token type",
+)
+llm_hedge_discarded_cost = _meter.create_counter(
+    "gobii.llm.hedge_discarded_cost",
+    unit="USD",
+    description="Provider cost of losing hedged LLM completions",
+)
+
+HEALTH_KEY_PREFIX = "llm-health:v1"
+HEALTH_TTL_SECONDS = 24 * 3600
+EWMA_ALPHA = 0.2
+DEVIATION_ALPHA = 0.25
+# Mean plus two mean deviations, as in TCP retransmit timers, approximates p95.
+P95_DEVIATIONS = 2.0
+# Error rates are only trusted once an endpoint has this many recorded outcomes.
+MIN_SAMPLES_FOR_SCORING = 10
+
+# Outcomes update the health hash inside Redis so concurrent workers never
+# overwrite each other's samples. A first sample seeds its EWMA with half of
+# itself as the deviation.
+_RECORD_SUCCESS_SCRIPT = """
+-- gobii_llm_health_success_v1
+local key = KEYS[1]
+local alpha = tonumber(ARGV[1])
+local dev_alpha = tonumber(ARGV[2])
+local function ewma(field, dev_field, sample)
+    if not sample then
+        return
+    end
+    local current = tonumber(redis.call('HGET', key, field))
+    local deviation = tonumber(redis.call('HGET', key, dev_field)) or 0
+    if current then
+        deviation = deviation + dev_alpha * (math.abs(sample - current) - deviation)
+        current = current + alpha * (sample - current)
+    else
+        current, deviation = sample, sample / 2
+    end
+    redis.call('HSET', key, field, tostring(current), dev_field, tostring(deviation))
+end
+local opened_until = redis.call('HGET', key, 'opened_until') or '0'
+local error_rate = tonumber(redis.call('HGET', key, 'error_rate')) or 0
+redis.call('HINCRBY', key, 'samples', 1)
+redis.call(
+    'HSET', key,
+    'error_rate', tostring(error_rate * (1 - alpha)),
+    'consecutive_failures', 0,
+    'opened_until', 0
+)
+ewma('latency_ms', 'latency_dev_ms', tonumber(ARGV[3]))
+ewma('ttft_ms', 'ttft_dev_ms', tonumber(ARGV[4]))
+redis.call('EXPIRE', key, ARGV[5])
+return opened_until
+"""
+
+_RECORD_FAILURE_SCRIPT = """
+-- gobii_llm_health_failure_v1
+local key = KEYS[1]
+local alpha = tonumber(ARGV[1])
+local now = tonumber(ARGV[3])
+local failures = redis.call('HINCRBY', key, 'consecutive_failures', 1)
+local error_rate = tonumber(redis.call('HGET', key, 'error_rate')) or 0
+redis.call('HINCRBY', key, 'samples', 1)
+redis.call('HSET', key, 'error_rate', tostring(error_rate + alpha * (1 - error_rate)))
+local opened = 0
+local opened_until = tonumber(redis.call('HGET', key, 'opened_until')) or 0
+if failures >= tonumber(ARGV[2]) and now >= opened_until then
+    redis.call('HSET', key, 'opened_until', tostring(now + tonumber(ARGV[4])))
+    opened = 1
+end
+redis.call('EXPIRE', key, ARGV[5])
+return {failures, opened}
+"""
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+# Failures that say something about the endpoint rather than about the request.
+_PROVIDER_FAULTS = (
+    litellm.Timeout,
+    litellm.APIConnectionError,
+    litellm.ServiceUnavailableError,
+    litellm.RateLimitError,
+    litellm.InternalServerError,
+    LiteLLMResponseError,
+)
+
+
+def provider_health_enabled() -> bool:
+    return bool(getattr(settings, "LLM_PROVIDER_HEALTH_ENABLED", False))
+
+
+def hedged_requests_enabled() -> bool:
+    return bool(getattr(settings, "LLM_HEDGED_REQUESTS_ENABLED", False))
+
+
+def is_provider_fault(exc: BaseException) -> bool:
+    return isinstance(exc, _PROVIDER_FAULTS)
+
+
+def _float(value: Any, default: Optional[float] = None) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+@dataclass(frozen=True)
+class ProviderHealth:
+    """Snapshot of one endpoint's shared health hash."""
+
+    provider: str
+    model: str
+    samples: int = 0
+    latency_ms: Optional[float] = None
+    latency_dev_ms: float = 0.0
+    ttft_ms: Optional[float] = None
+    ttft_dev_ms: float = 0.0
+    error_rate: float = 0.0
+    consecutive_failures: int = 0
+    opened_until: float = 0.0
+
+    @classmethod
+    def from_hash(cls, provider: str, model: str, raw: Optional[dict]) -> "ProviderHealth":
+        raw = raw or {}
+        return cls(
+            provider=provider,
+            model=model,
+            samples=int(_float(raw.get("samples"), 0) or 0),
+            latency_ms=_float(raw.get("latency_ms")),
+            latency_dev_ms=_float(raw.get("latency_dev_ms"), 0.0) or 0.0,
+            ttft_ms=_float(raw.get("ttft_ms")),
+            ttft_dev_ms=_float(raw.get("ttft_dev_ms"), 0.0) or 0.0,
+            error_rate=_float(raw.get("error_rate"), 0.0) or 0.0,
+            consecutive_failures=int(_float(raw.get("consecutive_failures"), 0) or 0),
+            opened_until=_float(raw.get("opened_until"), 0.0) or 0.0,
+        )
+
+    def state(self, now: float) -> str:
+        if not self.opened_until:
+            return STATE_CLOSED
+        return STATE_OPEN if now < self.opened_until else STATE_HALF_OPEN
+
+    def is_degraded(self, threshold: float) -> bool:
+        return self.samples >= MIN_SAMPLES_FOR_SCORING and self.error_rate >= threshold
+
+    def p95_latency_ms(self) -> Optional[float]:
+        if self.latency_ms is None:
+            return None
+        return self.latency_ms + P95_DEVIATIONS * self.latency_dev_ms
+
+
+class ProviderHealthTracker:
+    """Reads and updates per-(provider, model) health hashes in Redis."""
+
+    def __init__(self, redis_factory: Optional[Callable[[], Any]] = None) -> None:
+        self._redis_factory = redis_factory or get_redis_client
+
+    # ---------------------------------------------------------------- public
+    def get(self, provider: str, model: str) -> ProviderHealth:
+        return self.get_many([(provider, model)])[0]
+
+    def get_many(self, endpoints: Sequence[tuple[str, str]]) -> list[ProviderHealth]:
+        if not endpoints:
+            return []
+        pipe = self._redis().pipeline(transaction=False)
+        for provider, model in endpoints:
+            pipe.hgetall(self._key(provider, model))
+        raw_hashes = pipe.execute()
+        return [
+            ProviderHealth.from_hash(provider, model, raw)
+            for (provider, model), raw in zip(endpoints, raw_hashes)
+        ]
+
+    def record_success(
+        self,
+        provider: str,
+        model: str,
+        *,
+        latency_ms: Optional[float] = None,
+        ttft_ms: Optional[float] = None,
+    ) -> None:
+        previously_opened = self._redis().eval(
+            _RECORD_SUCCESS_SCRIPT,
+            1,
+            self._key(provider, model),
+            EWMA_ALPHA,
+            DEVIATION_ALPHA,
+            "" if latency_ms is None or latency_ms < 0 else float(latency_ms),
+            "" if ttft_ms is None or ttft_ms < 0 else float(ttft_ms),
+            HEALTH_TTL_SECONDS,
+        )
+        if _float(previously_opened, 0.0):
+            llm_circuit_transitions.add(1, {"provider": provider, "state": STATE_CLOSED})
+            logger.info("LLM circuit closed for %s/%s", provider, model)
+
+    def record_failure(self, provider: str, model: str) -> None:
+        threshold = int(getattr(settings, "LLM_PROVIDER_CIRCUIT_FAILURE_THRESHOLD", 3))
+        cooldown = float(getattr(settings, "LLM_PROVIDER_CIRCUIT_COOLDOWN_SECONDS", 60))
+        failures, opened = self._redis().eval(
+            _RECORD_FAILURE_SCRIPT,
+            1,
+            self._key(provider, model),
+            EWMA_ALPHA,
+            threshold,
+            time.time(),
+            cooldown,
+            HEALTH_TTL_SECONDS,
+        )
+        if int(opened):
+            llm_circuit_transitions.add(1, {"provider": provider, "state": STATE_OPEN})
+            logger.warning(
+                "LLM circuit opened for %s/%s after %s consecutive failures; cooling down for %ss",
+                provider,
+                model,
+                failures,
+                cooldown,
+            )
+
+    def claim_probe(self, health: ProviderHealth) -> bool:
+        """Let exactly one caller try a half-open endpoint per cooldown period."""
+        cooldown = int(getattr(settings, "LLM_PROVIDER_CIRCUIT_COOLDOWN_SECONDS", 60))
+        probe_key = f"{self._key(health.provider, health.model)}:probe:{int(health.opened_until)}"
+        return bool(self._redis().set(probe_key, "1", ex=max(1, cooldown), nx=True))
+
+    def order(self, configs: Sequence[tuple]) -> list[tuple]:
+        """Stable-sort failover configs into healthy, degraded and open-circuit groups.
+
+        Nothing is dropped: open circuits stay at the end as a last resort.
+        """
+        configs = list(configs)
+        if len(configs) < 2:
+            return configs
+        healths = self.get_many([(str(provider), str(model)) for provider, model, _params in configs])
+        threshold = float(getattr(settings, "LLM_PROVIDER_DEGRADED_ERROR_RATE", 0.5))
+        now = time.time()
+        healthy: list[tuple] = []
+        degraded: list[tuple] = []
+        unavailable: list[tuple] = []
+        for config, health in zip(configs, healths):
+            state = health.state(now)
+            if state == STATE_OPEN or (state == STATE_HALF_OPEN and not self.claim_probe(health)):
+                unavailable.append(config)
+            elif health.is_degraded(threshold):
+                degraded.append(config)
+            else:
+                healthy.append(config)
+        ordered = healthy + degraded + unavailable
+        if ordered != configs:
+            logger.info(
+                "Reordered LLM failover by provider health: %s",
+                ", ".join(f"{provider}/{model}" for provider, model, _params in ordered),
+            )
+        return ordered
+
+    # -------------------------------------------------------------- internal
+    def _redis(self):
+        return self._redis_factory()
+
+    @staticmethod
+    def _key(provider: str, model: str) -> str:
+        return f"{HEALTH_KEY_PREFIX}:{provider}:{model}"
+
+_tracker = ProviderHealthTracker()
+
+
+def get_provider_health_tracker() -> ProviderHealthTracker:
+    return _tracker
+
+
+def order_failover_configs(configs: Iterable[tuple]) -> list[tuple]:
+    """Return ``configs`` ordered by shared provider health, unchanged if health is off or unreadable."""
+    configs = list(configs)
+    if not provider_health_enabled():
+        return configs
+    try:
+        return _tracker.order(configs)
+    except Exception:
+        logger.debug("Failed to order LLM failover by provider health", exc_info=True)
+        return configs
+
+
+def record_completion_success(provider: str, model: str, response: Any) -> None:
+    if not provider_health_enabled():
+        return
+    try:
+        _tracker.record_success(
+            provider,
+            model,
+            latency_ms=_float(getattr(response, "request_duration_ms", None)),
+            ttft_ms=_float(getattr(response, "time_to_first_token_ms", None)),
+        )
+    except Exception:
+        logger.debug("Failed to record LLM provider success", exc_info=True)
+
+
+def record_completion_failure(provider: str, model: str, exc: BaseException) -> None:
+    if not provider_health_enabled() or not is_provider_fault(exc):
+        return
+    try:
+        _tracker.record_failure(provider, model)
+    except Exception:
+        logger.debug("Failed to record LLM provider failure", exc_info=True)
+
+
+def record_discarded_hedge_usage(token_usage: Optional[dict]) -> None:
+    """Meter the tokens and cost of a hedged completion whose result was thrown away.
+
+    The losing call is still billed by its provider, but no agent step records it.
+    """
+    if not token_usage:
+        return
+    attributes = {"provider": str(token_usage.get("provider") or ""), "model": str(token_usage.get("model") or "")}
+    for token_type in ("prompt", "completion", "cached"):
+        count = token_usage.get(f"{token_type}_tokens")
+        if count:
+            llm_hedge_discarded_tokens.add(int(count), {**attributes, "token_type": token_type})
+    cost = _float(token_usage.get("total_cost"))
+    if cost:
+        llm_hedge_discarded_cost.add(cost, attributes)
+    logger.info(
+        "Discarded losing hedged completion from %s/%s: prompt_tokens=%s completion_tokens=%s total_cost=%s",
+        attributes["provider"],
+        attributes["model"],
+        token_usage.get("prompt_tokens"),
+        token_usage.get("completion_tokens"),
+        token_usage.get("total_cost"),
+    )
+
+
+def hedge_delay_seconds(provider: str, model: str) -> float:
+    """How long to wait on ``provider``/``model`` before starting a hedge request."""
+    minimum = float(getattr(settings, "LLM_HEDGE_MIN_DELAY_SECONDS", 2.0))
+    maximum = float(getattr(settings, "LLM_HEDGE_MAX_DELAY_SECONDS", 60.0))
+    delay = float(getattr(settings, "LLM_HEDGE_DEFAULT_DELAY_SECONDS", 15.0))
+    try:
+        health = _tracker.get(provider, model)
+    except Exception:
+        logger.debug("Failed to read LLM provider health for hedging", exc_info=True)
+        health = None
+    if health is not None and health.samples >= MIN_SAMPLES_FOR_SCORING:
+        p95_ms = health.p95_latency_ms()
+        if p95_ms is not None:
+            delay = p95_ms / 1000
+    return min(maximum, max(minimum, delay))
+
+
+class HedgedRequest:
+    """Run ``calls[0]`` and start ``calls[1]`` if the first has not returned within ``delay_seconds``.
+
+    The first successful result wins. A loser cannot be cancelled and runs to
+    completion in its own daemon thread; ``on_result`` is still called for it so
+    its outcome reaches the health tracker, and ``on_discard`` receives its
+    result if it succeeded after the winner.
+    """
+
+    def __init__(
+        self,
+        calls: Sequence[Callable[[], Any]],
+        *,
+        delay_seconds: float,
+        on_result: Optional[Callable[[int, Any, Optional[BaseException]], None]] = None,
+        on_discard: Optional[Callable[[int, Any], None]] = None,
+        attributes: Optional[dict] = None,
+    ) -> None:
+        if len(calls) != 2:
+            raise ValueError("HedgedRequest takes a primary and one hedge call")
+        self._calls = list(calls)
+        self._delay_seconds = max(0.0, delay_seconds)
+        self._on_result = on_result
+        self._on_discard = on_discard
+        self._attributes = dict(attributes or {})
+        self._results: queue.Queue = queue.Queue()
+        # The first success claims the win; ``run`` returns it because it is queued first.
+        self._claim_lock = threading.Lock()
+        self._claimed: Optional[int] = None
+        self.fired = False
+        self.winner: Optional[int] = None
+
+    def run(self) -> Any:
+        self._start(0)
+        try:
+            index, value, exc = self._results.get(timeout=self._delay_seconds)
+        except queue.Empty:
+            pass
+        else:
+            if exc is not None:
+                raise exc
+            self.winner = index
+            return value
+
+        self.fired = True
+        llm_hedged_requests.add(1, {**self._attributes, "outcome": "fired"})
+        self._start(1)
+        errors: list[BaseException] = []
+        for _ in range(len(self._calls)):
+            index, value, exc = self._results.get()
+            if exc is None:
+                self.winner = index
+                outcome = "hedge_won" if index else "primary_won"
+                llm_hedged_requests.add(1, {**self._attributes, "outcome": outcome})
+                return value
+            errors.append(exc)
+        raise errors[0]
+
+    def _start(self, index: int) -> None:
+        context = copy_context()
+        call = self._calls[index]
+
+        def _invoke() -> None:
+            value, error = None, None
+            try:
+                value = context.run(call)
+            except Exception as exc:
+                error = exc
+            if self._on_result is not None:
+                try:
+                    self._on_result(index, value, error)
+                except Exception:
+                    logger.debug("Hedged request result callback failed", exc_info=True)
+            discarded = False
+            with self._claim_lock:
+                if error is None:
+                    discarded = self._claimed is not None
+                    if not discarded:
+                        self._claimed = index
+                self._results.put((index, value, error))
+            if discarded and self._on_discard is not None:
+                try:
+                    self._on_discard(index, value)
+                except Exception:
+                    logger.debug("Hedged request discard callback failed", exc_info=True)
+
+        threading.Thread(target=_invoke, name=f"llm-hedge-{index}", daemon=True).start()
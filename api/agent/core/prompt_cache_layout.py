@@ -0,0 +1,138 @@
+"""
+Provider prompt-cache breakpoints for rendered agent prompts.
+
+The prompt builder orders sections by volatility, so the system prompt core
+and the session-stable head of the user prompt form a prefix that rarely
+changes between iterations. This module records where that prefix ends, marks
+it with ``cache_control`` breakpoints for providers that need explicit markers,
+and tracks per agent how often the prefix survives from one render to the next.
+"""
+
+import hashlib
+import logging
+from dataclasses import dataclass
+from typing import Any, List, Optional
+
+import redis
+
+from config.redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+PREFIX_STABILITY_KEY_PREFIX = "prompt:prefix_renders"
+PREFIX_STABILITY_TTL_SECONDS = 7 * 24 * 60 * 60
+PREFIX_STABILITY_WINDOW = 100
+_PREFIX_STABILITY_HASH_CHARS = 16
+_CACHE_CONTROL = {"type": "ephemeral"}
+_MESSAGE_ROLES = ("system", "user")
+
+
+@dataclass(frozen=True)
+class PromptCacheBreakpoints:
+    """Stable prefix lengths of the system and user messages of one render."""
+
+    system_chars: int
+    system_sha256: str
+    user_chars: int
+    user_sha256: str
+
+    @property
+    def prefix_hash(self) -> str:
+        return hashlib.sha256(f"{self.system_sha256}:{self.user_sha256}".encode("ascii")).hexdigest()
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+def build_prompt_cache_breakpoints(
+    system_prompt: str,
+    user_content: str,
+    *,
+    system_stable_chars: int,
+    user_stable_prefix: str,
+) -> PromptCacheBreakpoints:
+    system_chars = max(0, min(system_stable_chars, len(system_prompt)))
+    user_chars = len(user_stable_prefix) if user_content.startswith(user_stable_prefix) else 0
+    return PromptCacheBreakpoints(
+        system_chars=system_chars,
+        system_sha256=_sha256(system_prompt[:system_chars]),
+        user_chars=user_chars,
+        user_sha256=_sha256(user_content[:user_chars]),
+    )
+
+
+def supports_cache_breakpoints(provider: str | None, model: str | None) -> bool:
+    """Whether the endpoint needs explicit ``cache_control`` markers to cache a prefix.
+
+    OpenAI-style and Gemini endpoints cache prefixes automatically; Anthropic
+    models (direct, Bedrock or Vertex) only cache up to marked blocks.
+    """
+    provider_name = (provider or "").lower()
+    model_name = (model or "").lower()
+    return provider_name.startswith("anthropic") or "claude" in model_name
+
+
+def apply_prompt_cache_breakpoints(
+    messages: List[dict],
+    breakpoints: Optional[PromptCacheBreakpoints],
+) -> List[dict]:
+    """Split the leading system/user messages into cached and uncached text blocks.
+
+    Messages whose text no longer matches the recorded prefix (for example after
+    a focused-request rewrite) are passed through unchanged.
+    """
+    if breakpoints is None:
+        return messages
+    marked = list(messages)
+    prefixes = {
+        "system": (breakpoints.system_chars, breakpoints.system_sha256),
+        "user": (breakpoints.user_chars, breakpoints.user_sha256),
+    }
+    for index, role in enumerate(_MESSAGE_ROLES):
+        if index >= len(marked):
+            break
+        message = marked[index]
+        content = message.get("content") if isinstance(message, dict) else None
+        if message.get("role") != role or not isinstance(content, str):
+            continue
+        chars, digest = prefixes[role]
+        if chars <= 0 or _sha256(content[:chars]) != digest:
+            continue
+        blocks: List[dict[str, Any]] = [
+            {"type": "text", "text": content[:chars], "cache_control": dict(_CACHE_CONTROL)}
+        ]
+        if content[chars:]:
+            blocks.append({"type": "text", "text": content[chars:]})
+        marked[index] = {**message, "content": blocks}
+    return marked
+
+
+def record_prefix_stability(agent_id: str, breakpoints: PromptCacheBreakpoints) -> tuple[Optional[bool], float]:
+    """Compare this render's prefix with the agent's previous one.
+
+    The agent's last ``PREFIX_STABILITY_WINDOW`` prefix hashes are kept in one
+    Redis list, appended and read back in a single pipeline round trip.
+
+    Returns ``(stable, stable_ratio)``; ``stable`` is None for the first render
+    seen for the agent (or when Redis is unavailable). The ratio is the share of
+    renders in the window whose prefix matched the render before it.
+    """
+    key = f"{PREFIX_STABILITY_KEY_PREFIX}:{agent_id}"
+    prefix_hash = breakpoints.prefix_hash[:_PREFIX_STABILITY_HASH_CHARS]
+    try:
+        pipe = get_redis_client().pipeline()
+        pipe.rpush(key, prefix_hash)
+        pipe.ltrim(key, -PREFIX_STABILITY_WINDOW, -1)
+        pipe.expire(key, PREFIX_STABILITY_TTL_SECONDS)
+        pipe.lrange(key, 0, -1)
+        hashes = pipe.execute()[-1]
+    except redis.exceptions.RedisError:
+        logger.debug("Failed to record prompt prefix stability for agent %s", agent_id, exc_info=True)
+        return None, 0.0
+    hashes = [value.decode("utf-8") if isinstance(value, bytes) else value for value in hashes or []]
+    if not hashes:
+        return None, 0.0
+    stable_renders = sum(1 for previous, current in zip(hashes, hashes[1:]) if previous == current)
+    stable = hashes[-2] == hashes[-1] if len(hashes) > 1 else None
+    return stable, stable_renders / len(hashes)
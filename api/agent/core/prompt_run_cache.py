@@ -2,7 +2,10 @@ from collections import OrderedDict
 from contextvars import ContextVar, Token
 from dataclasses import dataclass, field
 from threading import RLock
-from typing import Any, Callable
+from typing import Any, Callable, Sequence
+
+from .promptree import PromptRenderCache
+from .token_estimation import token_text_digest
 
 
 CONTACTS_SNAPSHOT = "contacts"
@@ -12,39 +15,45 @@ SNAPSHOT_DOMAINS = frozenset({CONTACTS_SNAPSHOT, FILES_SNAPSHOT, MESSAGES_SNAPSH
 
 
 class BoundedTokenCountCache:
-    """Exact-text LRU bounded by entry count and retained source characters."""
+    """Per-run LRU of token counts keyed by model and a digest of the text."""
 
-    def __init__(self, *, max_entries: int = 2048, max_chars: int = 8_000_000):
+    def __init__(self, *, max_entries: int = 8192):
         self.max_entries = max(1, max_entries)
-        self.max_chars = max(1, max_chars)
         self._entries: OrderedDict[tuple[str, str], int] = OrderedDict()
-        self._retained_chars = 0
         self.hits = 0
         self.misses = 0
 
     def count(self, model: str, text: str, compute: Callable[[str], int]) -> int:
-        key = (model, text)
-        cached = self._entries.pop(key, None)
-        if cached is not None:
-            self._entries[key] = cached
-            self.hits += 1
-            return cached
-
-        self.misses += 1
-        value = compute(text)
-        text_chars = len(text)
-        if text_chars <= self.max_chars:
-            self._entries[key] = value
-            self._retained_chars += text_chars
-            self._evict_to_limits()
-        return value
-
-    def _evict_to_limits(self) -> None:
-        while self._entries and (
-            len(self._entries) > self.max_entries or self._retained_chars > self.max_chars
-        ):
-            evicted_key, _ = self._entries.popitem(last=False)
-            self._retained_chars -= len(evicted_key[1])
+        return self.count_many(model, [text], lambda texts: [compute(text) for text in texts])[0]
+
+    def count_many(
+        self,
+        model: str,
+        texts: Sequence[str],
+        compute_many: Callable[[list[str]], list[int]],
+    ) -> list[int]:
+        results: list[int | None] = [None] * len(texts)
+        missing: dict[str, list[int]] = {}
+        for index, text in enumerate(texts):
+            key = (model, token_text_digest(text))
+            cached = self._entries.pop(key, None)
+            if cached is not None:
+                self._entries[key] = cached
+                self.hits += 1
+                results[index] = cached
+            else:
+                missing.setdefault(key[1], []).append(index)
+
+        if missing:
+            self.misses += len(missing)
+            counts = compute_many([texts[indexes[0]] for indexes in missing.values()])
+            for (digest, indexes), value in zip(missing.items(), counts):
+                self._entries[(model, digest)] = value
+                for index in indexes:
+                    results[index] = value
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return results
 
 
 @dataclass
@@ -52,6 +61,7 @@ class PromptRunCache:
     agent_id: str
     snapshot_reuse_enabled: bool = True
     token_counts: BoundedTokenCountCache = field(default_factory=BoundedTokenCountCache)
+    prompt_sections: PromptRenderCache = field(default_factory=PromptRenderCache)
     _snapshots: dict[str, Any] = field(default_factory=dict)
     _dirty: set[str] = field(default_factory=lambda: set(SNAPSHOT_DOMAINS))
     _human_generation: int | None = None
@@ -1,8 +1,18 @@
 from __future__ import annotations
 
+import hashlib
 import heapq
+from collections import OrderedDict
 from dataclasses import dataclass, field
-from typing import Any, Callable, Dict, List, Optional
+from threading import RLock
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+# Volatility tiers used to order sections so provider prompt caches see a
+# long, unchanged prefix: static text first, per-iteration data last.
+VOLATILITY_STATIC = 0
+VOLATILITY_SESSION = 1
+VOLATILITY_ITERATION = 2
 
 
 # ── helpers ────────────────────────────────────────────────────────────────
@@ -48,6 +58,151 @@ def hmt(txt: str, k: float) -> str:
     return " ".join(parts)
 
 
+def _text_digest(txt: str) -> bytes:
+    return hashlib.blake2b(txt.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+
+# ── cross-render cache ─────────────────────────────────────────────────────
+class PromptRenderCache:
+    """
+    Section-level memo shared by successive renders of the same prompt layout.
+
+    Sections are keyed by a digest of their rendered text, so a section whose
+    content did not change between loop iterations reuses its token counts and
+    any shrunk variant produced for the same budget. Whole renders are reused
+    when every section and the budget match. Keys carry a namespace (the model)
+    because token counts are estimator-specific.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_entries: int = 4096,
+        max_chars: int = 4_000_000,
+        max_renders: int = 4,
+    ):
+        self.max_entries = max(1, max_entries)
+        self.max_chars = max(1, max_chars)
+        self.max_renders = max(1, max_renders)
+        self._tokens: OrderedDict[tuple, int] = OrderedDict()
+        self._fits: OrderedDict[tuple, Tuple[str, int]] = OrderedDict()
+        self._allocations: OrderedDict[tuple, List[int]] = OrderedDict()
+        self._renders: OrderedDict[tuple, "_RenderSnapshot"] = OrderedDict()
+        self._fit_chars = 0
+        self._lock = RLock()
+        self.renders = 0
+        self.fast_path_renders = 0
+        self.render_hits = 0
+        self.section_hits = 0
+        self.section_misses = 0
+        self.fit_hits = 0
+        self.fit_misses = 0
+
+    def lookup_tokens(self, key: tuple) -> Optional[int]:
+        with self._lock:
+            cached = self._tokens.pop(key, None)
+            if cached is not None:
+                self._tokens[key] = cached
+                self.section_hits += 1
+            else:
+                self.section_misses += 1
+            return cached
+
+    def store_tokens(self, key: tuple, value: int) -> None:
+        with self._lock:
+            self._tokens[key] = value
+            while len(self._tokens) > self.max_entries:
+                self._tokens.popitem(last=False)
+
+    def token_count(self, key: tuple, compute: Callable[[], int]) -> int:
+        cached = self.lookup_tokens(key)
+        if cached is not None:
+            return cached
+        value = compute()
+        self.store_tokens(key, value)
+        return value
+
+    def fit(self, key: tuple, compute: Callable[[], Tuple[str, int]]) -> Tuple[str, int]:
+        with self._lock:
+            cached = self._fits.pop(key, None)
+            if cached is not None:
+                self._fits[key] = cached
+                self.fit_hits += 1
+                return cached
+            self.fit_misses += 1
+        value = compute()
+        text_chars = len(value[0])
+        with self._lock:
+            if text_chars <= self.max_chars:
+                self._fits[key] = value
+                self._fit_chars += text_chars
+                while self._fits and (
+                    len(self._fits) > self.max_entries or self._fit_chars > self.max_chars
+                ):
+                    _, evicted = self._fits.popitem(last=False)
+                    self._fit_chars -= len(evicted[0])
+        return value
+
+    def allocation(self, key: tuple, compute: Callable[[], List[int]]) -> List[int]:
+        with self._lock:
+            cached = self._allocations.pop(key, None)
+            if cached is not None:
+                self._allocations[key] = cached
+                return list(cached)
+        value = compute()
+        with self._lock:
+            self._allocations[key] = list(value)
+            while len(self._allocations) > self.max_renders:
+                self._allocations.popitem(last=False)
+        return value
+
+    def get_render(self, key: tuple) -> Optional["_RenderSnapshot"]:
+        with self._lock:
+            snapshot = self._renders.pop(key, None)
+            if snapshot is not None:
+                self._renders[key] = snapshot
+            return snapshot
+
+    def store_render(self, key: tuple, snapshot: "_RenderSnapshot") -> None:
+        with self._lock:
+            self._renders[key] = snapshot
+            while len(self._renders) > self.max_renders:
+                self._renders.popitem(last=False)
+
+    def record_render(self, *, fast_path: bool, render_hit: bool) -> None:
+        with self._lock:
+            self.renders += 1
+            if fast_path:
+                self.fast_path_renders += 1
+            if render_hit:
+                self.render_hits += 1
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            section_lookups = self.section_hits + self.section_misses
+            fit_lookups = self.fit_hits + self.fit_misses
+            return {
+                "renders": self.renders,
+                "fast_path_ratio": self.fast_path_renders / self.renders if self.renders else 0.0,
+                "render_hit_ratio": self.render_hits / self.renders if self.renders else 0.0,
+                "section_hit_ratio": self.section_hits / section_lookups if section_lookups else 0.0,
+                "fit_hit_ratio": self.fit_hits / fit_lookups if fit_lookups else 0.0,
+            }
+
+
+@dataclass(frozen=True)
+class _RenderSnapshot:
+    output: str
+    tokens_before: int
+    tokens_after: int
+    fast_path: bool
+    leaves: Tuple[Tuple[str, int, bool], ...]
+
+
+def _node_volatility(n: "_Node") -> int:
+    return VOLATILITY_ITERATION if n.volatility is None else n.volatility
+
+
 # ── data model ─────────────────────────────────────────────────────────────
 @dataclass
 class _Node:
@@ -61,11 +216,18 @@ class _Node:
     tokens: int = 0
     shrunk: bool = False
     non_shrinkable: bool = False
+    digest: bytes = b""
+    volatility: Optional[int] = None  # Inherited from the parent group when unset
     _prompt: Optional["Prompt"] = None  # Reference to parent prompt for accessing shrinkers
     
-    def group(self, name: str, *, weight: int = 1) -> "_Node":
+    def group(self, name: str, *, weight: int = 1, volatility: Optional[int] = None) -> "_Node":
         """Create a sub-group within this node."""
-        child = _Node(name, weight, _prompt=self._prompt)
+        child = _Node(
+            name,
+            weight,
+            volatility=self.volatility if volatility is None else volatility,
+            _prompt=self._prompt,
+        )
         self.children.append(child)
         return child
     
@@ -78,10 +240,20 @@ class _Node:
         shrinker: str | Callable[[str, float], str] | None = "hmt",
         use_jinja2: bool = False,
         non_shrinkable: bool = False,
+        volatility: Optional[int] = None,
     ) -> None:
         """Add a section to this group."""
         self.children.append(
-            _Node(name, weight, renderer, shrinker, use_jinja2, non_shrinkable=non_shrinkable, _prompt=self._prompt)
+            _Node(
+                name,
+                weight,
+                renderer,
+                shrinker,
+                use_jinja2,
+                non_shrinkable=non_shrinkable,
+                volatility=self.volatility if volatility is None else volatility,
+                _prompt=self._prompt,
+            )
         )
 
     def section_text(
@@ -93,10 +265,17 @@ class _Node:
         shrinker: str | Callable[[str, float], str] | None = "hmt",
         use_jinja2: bool = False,
         non_shrinkable: bool = False,
+        volatility: Optional[int] = None,
     ) -> None:
         """Add a text section to this group."""
         self.section(
-            name, txt, weight=weight, shrinker=shrinker, use_jinja2=use_jinja2, non_shrinkable=non_shrinkable
+            name,
+            txt,
+            weight=weight,
+            shrinker=shrinker,
+            use_jinja2=use_jinja2,
+            non_shrinkable=non_shrinkable,
+            volatility=volatility,
         )
 
 
@@ -104,7 +283,10 @@ class _Node:
 class Prompt:
     """
     Tree‑structured prompt builder that globally allocates the token budget.
-    Client usage remains unchanged.
+    Client usage remains unchanged. Pass a shared ``render_cache`` to reuse
+    section token counts and fitting results across successive prompts, and
+    ``order_by_volatility`` to stably sort siblings by their volatility tier so
+    ``stable_prefix()`` covers as much of the output as possible.
     """
 
     # ------------------------------------------------------------------ #
@@ -114,8 +296,14 @@ class Prompt:
         extra_shrinkers: Optional[
             Dict[str, Callable[[str, float], str]]
         ] = None,
+        render_cache: Optional[PromptRenderCache] = None,
+        cache_namespace: str = "",
+        order_by_volatility: bool = False,
     ):
         self.token_estimator = token_estimator
+        self.render_cache = render_cache
+        self.cache_namespace = cache_namespace
+        self.order_by_volatility = order_by_volatility
         self.shrinkers: Dict[str, Callable[[str, float], str]] = {
             "hmt": hmt,
         }
@@ -127,10 +315,12 @@ class Prompt:
         self._tokens_before_fitting: int = 0
         self._tokens_after_fitting: int = 0
         self._used_fast_path: bool = False
+        self._used_render_cache: bool = False
+        self._stable_prefix: str = ""
 
     # builder shortcuts ---------------------------------------------------
-    def group(self, name: str, *, weight: int = 1) -> _Node:
-        child = _Node(name, weight, _prompt=self)
+    def group(self, name: str, *, weight: int = 1, volatility: Optional[int] = None) -> _Node:
+        child = _Node(name, weight, volatility=volatility, _prompt=self)
         self.root.children.append(child)
         return child
 
@@ -143,9 +333,19 @@ class Prompt:
         shrinker: str | Callable[[str, float], str] | None = "hmt",
         use_jinja2: bool = False,
         non_shrinkable: bool = False,
+        volatility: Optional[int] = None,
     ) -> None:
         self.root.children.append(
-            _Node(name, weight, renderer, shrinker, use_jinja2, non_shrinkable=non_shrinkable, _prompt=self)
+            _Node(
+                name,
+                weight,
+                renderer,
+                shrinker,
+                use_jinja2,
+                non_shrinkable=non_shrinkable,
+                volatility=volatility,
+                _prompt=self,
+            )
         )
 
     def section_text(
@@ -157,9 +357,16 @@ class Prompt:
         shrinker: str | Callable[[str, float], str] | None = "hmt",
         use_jinja2: bool = False,
         non_shrinkable: bool = False,
+        volatility: Optional[int] = None,
     ) -> None:
         self.section(
-            name, txt, weight=weight, shrinker=shrinker, use_jinja2=use_jinja2, non_shrinkable=non_shrinkable
+            name,
+            txt,
+            weight=weight,
+            shrinker=shrinker,
+            use_jinja2=use_jinja2,
+            non_shrinkable=non_shrinkable,
+            volatility=volatility,
         )
 
     # plug‑in API ---------------------------------------------------------
@@ -172,10 +379,37 @@ class Prompt:
     # public --------------------------------------------------------------
     def render(self, max_tokens: int, **ctx) -> str:
         self._used_fast_path = False
-        # Pass 1: render everything in full
+        self._used_render_cache = False
+        if self.order_by_volatility:
+            self._order_children(self.root)
+        # Pass 1: render everything in full
         self._render(self.root, ctx)
         leaves = self._flat(self.root)
 
+        render_key = None
+        if self.render_cache is not None:
+            render_key = (self.cache_namespace, max_tokens, self._signature(self.root))
+            snapshot = self.render_cache.get_render(render_key)
+            if snapshot is not None:
+                return self._restore_snapshot(snapshot, leaves)
+
+        output = self._fit(leaves, max_tokens)
+        self._stable_prefix = self._assemble_stable_prefix(self.root, wrap_leaves=self._used_fast_path)[0]
+        if self.render_cache is not None:
+            self.render_cache.store_render(
+                render_key,
+                _RenderSnapshot(
+                    output=output,
+                    tokens_before=self._tokens_before_fitting,
+                    tokens_after=self._tokens_after_fitting,
+                    fast_path=self._used_fast_path,
+                    leaves=tuple((n.text, n.tokens, n.shrunk) for n in leaves),
+                ),
+            )
+            self.render_cache.record_render(fast_path=self._used_fast_path, render_hit=False)
+        return output
+
+    def _fit(self, leaves: List[_Node], max_tokens: int) -> str:
         unshrunk_output = self._assemble(self.root, wrap_leaves=True)
         unshrunk_tokens = self._tok(unshrunk_output)
         self._tokens_before_fitting = unshrunk_tokens
@@ -189,31 +423,45 @@ class Prompt:
 
         # Pre-compute leaf overhead only when fitting is actually required.
         for n in leaves:
-            overhead = self._tok(f"<{n.name}></{n.name}>")
+            overhead = self._cached_tok(("overhead", n.name), f"<{n.name}></{n.name}>")
             n._overhead_tokens = overhead  # type: ignore[attr-defined]
             n._length = n.tokens + overhead  # type: ignore[attr-defined]
 
-        # Pass 2: global allocation
-        budgets = self._allocate(leaves, max_tokens)
+        # Pass 2: global allocation
+        if self.render_cache is not None:
+            allocation_key = (
+                self.cache_namespace,
+                max_tokens,
+                tuple((n._length, n.weight, n.non_shrinkable) for n in leaves),  # type: ignore[attr-defined]
+            )
+            budgets = self.render_cache.allocation(
+                allocation_key, lambda: self._allocate(leaves, max_tokens)
+            )
+        else:
+            budgets = self._allocate(leaves, max_tokens)
 
-        # Pass 3: shrink individual leaves as needed
+        # Pass 3: shrink individual leaves as needed
         for n, budget in zip(leaves, budgets):
             overhead = n._overhead_tokens  # type: ignore[attr-defined]
 
             if n.tokens + overhead <= budget:
                 # Fits unshrunk: just wrap
                 n.text = f"<{n.name}>{n.text}</{n.name}>"
-                n.tokens = self._tok(n.text)
+                n.tokens = self._cached_tok(("wrapped", n.name, n.digest), n.text)
                 n.shrunk = False
             else:
-                shrinker_fn: Optional[Callable[[str, float], str]] = None
-                if n.shrinker:
-                    shrinker_fn = (
-                        n.shrinker
-                        if callable(n.shrinker)
-                        else self.shrinkers.get(n.shrinker)
-                    )
-                self._shrink(n, shrinker_fn, budget)
+                shrinker_fn = self._resolve_shrinker(n)
+                if self.render_cache is None:
+                    self._shrink(n, shrinker_fn, budget)
+                    continue
+                fit_key = (self.cache_namespace, n.name, n.digest, budget, shrinker_fn)
+
+                def _compute_fit(node=n, fn=shrinker_fn, leaf_budget=budget) -> Tuple[str, int]:
+                    self._shrink(node, fn, leaf_budget)
+                    return node.text, node.tokens
+
+                n.text, n.tokens = self.render_cache.fit(fit_key, _compute_fit)
+                n.shrunk = True
 
         self._tokens_after_fitting = sum(n.tokens for n in leaves)
         self._last = leaves
@@ -241,10 +489,79 @@ class Prompt:
     def used_fast_path(self) -> bool:
         return self._used_fast_path
 
+    def used_render_cache(self) -> bool:
+        return self._used_render_cache
+
+    def stable_prefix(self) -> str:
+        """Leading part of the last output made only of unshrunk, non-iteration sections."""
+        return self._stable_prefix
+
     # internals -----------------------------------------------------------
     def _tok(self, txt: str) -> int:
         return self.token_estimator(txt)
 
+    def _tok_many(self, texts: List[str]) -> List[int]:
+        if not texts:
+            return []
+        count_many = getattr(self.token_estimator, "count_many", None)
+        if callable(count_many):
+            return list(count_many(texts))
+        return [self._tok(txt) for txt in texts]
+
+    def _cached_tok(self, key: tuple, txt: str) -> int:
+        if self.render_cache is None:
+            return self._tok(txt)
+        return self.render_cache.token_count((self.cache_namespace,) + key, lambda: self._tok(txt))
+
+    def _order_children(self, n: _Node) -> None:
+        n.children.sort(key=_node_volatility)
+        for child in n.children:
+            self._order_children(child)
+
+    def _assemble_stable_prefix(self, node: _Node, *, wrap_leaves: bool) -> Tuple[str, bool]:
+        """Mirror ``_assemble`` but stop at the first leaf that may differ next render."""
+        if node.children:
+            parts: List[str] = []
+            complete = True
+            for child in node.children:
+                text, complete = self._assemble_stable_prefix(child, wrap_leaves=wrap_leaves)
+                parts.append(text)
+                if not complete:
+                    break
+            inner = "\n".join(parts)
+            if node.name == "root":
+                return inner, complete
+            if not complete:
+                return f"<{node.name}>{inner}", False
+            return f"<{node.name}>{inner}</{node.name}>", True
+        if node.shrunk or _node_volatility(node) >= VOLATILITY_ITERATION:
+            return "", False
+        return (f"<{node.name}>{node.text}</{node.name}>" if wrap_leaves else node.text), True
+
+    def _resolve_shrinker(self, n: _Node) -> Optional[Callable[[str, float], str]]:
+        if not n.shrinker:
+            return None
+        return n.shrinker if callable(n.shrinker) else self.shrinkers.get(n.shrinker)
+
+    def _signature(self, n: _Node) -> tuple:
+        if n.children:
+            return (n.name, tuple(self._signature(c) for c in n.children))
+        return (n.name, n.weight, n.non_shrinkable, self._resolve_shrinker(n), n.digest)
+
+    def _restore_snapshot(self, snapshot: _RenderSnapshot, leaves: List[_Node]) -> str:
+        for n, (text, tokens, shrunk) in zip(leaves, snapshot.leaves):
+            n.text = text
+            n.tokens = tokens
+            n.shrunk = shrunk
+        self._last = leaves
+        self._tokens_before_fitting = snapshot.tokens_before
+        self._tokens_after_fitting = snapshot.tokens_after
+        self._used_fast_path = snapshot.fast_path
+        self._used_render_cache = True
+        self._stable_prefix = self._assemble_stable_prefix(self.root, wrap_leaves=snapshot.fast_path)[0]
+        self.render_cache.record_render(fast_path=snapshot.fast_path, render_hit=True)
+        return snapshot.output
+
     def _assemble(self, node: _Node, *, wrap_leaves: bool = False) -> str:
         if node.children:
             inner = "\n".join(
@@ -255,12 +572,13 @@ class Prompt:
         return f"<{node.name}>{node.text}</{node.name}>" if wrap_leaves else node.text
 
     def _render(self, n: _Node, ctx: Dict[str, Any]):
-        if n.children:
-            for c in n.children:
-                self._render(c, ctx)
-            n.tokens = sum(c.tokens for c in n.children)
-            return
+        leaves = self._flat(n)
+        for leaf in leaves:
+            leaf.text = self._render_text(leaf, ctx)
+        self._count_leaves(leaves)
+        self._sum_group_tokens(n)
 
+    def _render_text(self, n: _Node, ctx: Dict[str, Any]) -> str:
         raw = n.renderer(ctx) if callable(n.renderer) else str(n.renderer)
         if n.use_jinja2:
             try:
@@ -269,9 +587,29 @@ class Prompt:
                 raw = jinja2.Template(raw).render(**ctx)
             except ImportError:
                 pass
-
-        n.text = raw
-        n.tokens = self._tok(raw)
+        return raw
+
+    def _count_leaves(self, leaves: List[_Node]) -> None:
+        """Count all leaves in one estimator batch, skipping sections the cache already knows."""
+        pending: List[_Node] = []
+        for leaf in leaves:
+            if self.render_cache is not None:
+                leaf.digest = _text_digest(leaf.text)
+                cached = self.render_cache.lookup_tokens((self.cache_namespace, "section", leaf.digest))
+                if cached is not None:
+                    leaf.tokens = cached
+                    continue
+            pending.append(leaf)
+
+        for leaf, tokens in zip(pending, self._tok_many([leaf.text for leaf in pending])):
+            leaf.tokens = tokens
+            if self.render_cache is not None:
+                self.render_cache.store_tokens((self.cache_namespace, "section", leaf.digest), tokens)
+
+    def _sum_group_tokens(self, n: _Node) -> int:
+        if n.children:
+            n.tokens = sum(self._sum_group_tokens(c) for c in n.children)
+        return n.tokens
 
     def _flat(self, n: _Node) -> List[_Node]:
         return (
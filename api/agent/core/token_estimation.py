@@ -0,0 +1,196 @@
+"""
+Process-wide token estimation for prompt building.
+
+Tokenizers are resolved once per model and worker process, and counts are
+memoized by a digest of the text rather than the text itself, so the cache
+stays small no matter how large the prompt sections are. Long texts can also
+be shared across processes through Redis, which lets system prompts, charters
+and skill blocks that repeat across runs and agents be counted once fleet-wide.
+"""
+
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Callable, Optional, Sequence
+
+import redis
+from django.conf import settings
+from litellm import token_counter
+
+from config.redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+SHARED_CACHE_PREFIX = "prompt:tokens:v1"
+DEFAULT_LOCAL_MAX_ENTRIES = 65_536
+
+
+def token_text_digest(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).hexdigest()
+
+
+def _shared_cache_enabled() -> bool:
+    return bool(getattr(settings, "PROMPT_TOKEN_CACHE_SHARED_ENABLED", False))
+
+
+def _shared_cache_min_chars() -> int:
+    return int(getattr(settings, "PROMPT_TOKEN_CACHE_SHARED_MIN_CHARS", 4096) or 0)
+
+
+def _shared_cache_ttl_seconds() -> int:
+    return int(getattr(settings, "PROMPT_TOKEN_CACHE_SHARED_TTL_SECONDS", 7 * 24 * 60 * 60) or 0)
+
+
+@lru_cache(maxsize=64)
+def _load_tokenizer(model: str) -> Optional[Callable[[Sequence[str]], list[int]]]:
+    """Return a batch counter backed by the model's local tokenizer, if litellm exposes one."""
+    try:
+        from litellm.utils import _select_tokenizer
+
+        selected = _select_tokenizer(model=model)
+    except Exception:  # noqa: BLE001 - litellm internals differ between releases.
+        logger.debug("No local tokenizer available for model %s", model, exc_info=True)
+        return None
+
+    tokenizer_type = selected.get("type") if isinstance(selected, dict) else None
+    tokenizer = selected.get("tokenizer") if isinstance(selected, dict) else None
+    if tokenizer is None:
+        return None
+    if tokenizer_type == "openai_tokenizer":
+        def _count_openai(texts: Sequence[str]) -> list[int]:
+            return [len(tokens) for tokens in tokenizer.encode_batch(list(texts), disallowed_special=())]
+
+        return _count_openai
+    if tokenizer_type == "huggingface_tokenizer":
+        def _count_huggingface(texts: Sequence[str]) -> list[int]:
+            return [len(encoding.ids) for encoding in tokenizer.encode_batch(list(texts))]
+
+        return _count_huggingface
+    return None
+
+
+def _count_with_litellm(model: str, texts: Sequence[str]) -> list[int]:
+    return [token_counter(model=model, text=text) for text in texts]
+
+
+class TokenEstimationService:
+    """Digest-keyed token counts with an optional shared Redis tier."""
+
+    def __init__(self, *, max_entries: int = DEFAULT_LOCAL_MAX_ENTRIES):
+        self.max_entries = max(1, max_entries)
+        self._entries: OrderedDict[tuple[str, str], int] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def count(self, model: str, text: str) -> int:
+        return self.count_many(model, [text])[0]
+
+    def count_many(self, model: str, texts: Sequence[str]) -> list[int]:
+        results: list[Optional[int]] = [None] * len(texts)
+        pending: dict[str, list[int]] = {}
+        with self._lock:
+            for index, text in enumerate(texts):
+                digest = token_text_digest(text)
+                cached = self._entries.pop((model, digest), None)
+                if cached is not None:
+                    self._entries[(model, digest)] = cached
+                    self.hits += 1
+                    results[index] = cached
+                else:
+                    pending.setdefault(digest, []).append(index)
+
+        if pending:
+            shared = self._read_shared(model, pending, texts)
+            computed_digests = [digest for digest in pending if digest not in shared]
+            computed: dict[str, int] = {}
+            if computed_digests:
+                counts = self._compute(model, [texts[pending[digest][0]] for digest in computed_digests])
+                computed = dict(zip(computed_digests, counts))
+                self._write_shared(model, computed, pending, texts)
+
+            with self._lock:
+                for digest, indexes in pending.items():
+                    if digest in shared:
+                        value = shared[digest]
+                        self.shared_hits += 1
+                    else:
+                        value = computed[digest]
+                        self.misses += 1
+                    for index in indexes:
+                        results[index] = value
+                    self._entries[(model, digest)] = value
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return [int(value) for value in results]
+
+    def _compute(self, model: str, texts: list[str]) -> list[int]:
+        batch_counter = _load_tokenizer(model)
+        if batch_counter is not None:
+            try:
+                return batch_counter(texts)
+            except Exception:  # noqa: BLE001 - fall back to litellm's own counting.
+                logger.debug("Local tokenizer failed for model %s", model, exc_info=True)
+        return _count_with_litellm(model, texts)
+
+    def _shareable(self, pending: dict[str, list[int]], texts: Sequence[str]) -> list[str]:
+        if not _shared_cache_enabled():
+            return []
+        min_chars = _shared_cache_min_chars()
+        return [digest for digest, indexes in pending.items() if len(texts[indexes[0]]) >= min_chars]
+
+    def _read_shared(
+        self,
+        model: str,
+        pending: dict[str, list[int]],
+        texts: Sequence[str],
+    ) -> dict[str, int]:
+        digests = self._shareable(pending, texts)
+        if not digests:
+            return {}
+        try:
+            values = get_redis_client().mget([_shared_cache_key(model, digest) for digest in digests])
+        except redis.exceptions.RedisError:
+            logger.debug("Failed to read shared token counts", exc_info=True)
+            return {}
+        shared: dict[str, int] = {}
+        for digest, value in zip(digests, values or ()):
+            try:
+                if value is not None:
+                    shared[digest] = int(value)
+            except (TypeError, ValueError):
+                continue
+        return shared
+
+    def _write_shared(
+        self,
+        model: str,
+        computed: dict[str, int],
+        pending: dict[str, list[int]],
+        texts: Sequence[str],
+    ) -> None:
+        digests = [digest for digest in self._shareable(pending, texts) if digest in computed]
+        if not digests:
+            return
+        ttl = _shared_cache_ttl_seconds() or None
+        try:
+            pipe = get_redis_client().pipeline()
+            for digest in digests:
+                pipe.set(_shared_cache_key(model, digest), int(computed[digest]), ex=ttl)
+            pipe.execute()
+        except redis.exceptions.RedisError:
+            logger.debug("Failed to write shared token counts", exc_info=True)
+
+
+def _shared_cache_key(model: str, digest: str) -> str:
+    return f"{SHARED_CACHE_PREFIX}:{model}:{digest}"
+
+
+_service = TokenEstimationService()
+
+
+def get_token_estimation_service() -> TokenEstimationService:
+    return _service
@@ -0,0 +1,136 @@
+"""
+Long-lived executor for parallel tool batches.
+
+Each worker process keeps one bounded thread pool for tool calls instead of
+starting a pool per batch, so raising the per-batch parallelism does not
+multiply threads across concurrent batches. Admission within a batch is decided
+per tool class: every class has its own in-flight limit, which is how
+source-bearing tools stay serialized while local tools fan out.
+"""
+
+import atexit
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextvars import copy_context
+from typing import Any, Callable, Mapping, Optional
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .link_references import is_source_bearing_tool
+
+TOOL_CLASS_DEFAULT = "default"
+TOOL_CLASS_SOURCE = "source"
+DEFAULT_TOOL_CLASS_LIMITS: Mapping[str, int] = {TOOL_CLASS_SOURCE: 1}
+DEFAULT_MAX_WORKERS = 32
+
+
+def tool_concurrency_class(tool_name: str) -> str:
+    if is_source_bearing_tool(tool_name):
+        return TOOL_CLASS_SOURCE
+    return TOOL_CLASS_DEFAULT
+
+
+def _configured_max_workers() -> int:
+    return max(1, int(getattr(settings, "AGENT_TOOL_EXECUTOR_MAX_WORKERS", DEFAULT_MAX_WORKERS) or 1))
+
+
+class ToolClassSlots:
+    """In-flight accounting for one batch, limited overall and per tool class."""
+
+    def __init__(
+        self,
+        *,
+        max_in_flight: int,
+        class_limits: Mapping[str, int] = DEFAULT_TOOL_CLASS_LIMITS,
+    ):
+        self.max_in_flight = max(1, max_in_flight)
+        self.class_limits = dict(class_limits)
+        self._in_flight: dict[str, int] = {}
+
+    @property
+    def in_flight(self) -> int:
+        return sum(self._in_flight.values())
+
+    def has_capacity(self) -> bool:
+        return self.in_flight < self.max_in_flight
+
+    def available(self, tool_class: str) -> bool:
+        if not self.has_capacity():
+            return False
+        limit = self.class_limits.get(tool_class)
+        return limit is None or self._in_flight.get(tool_class, 0) < limit
+
+    def acquire(self, tool_class: str) -> None:
+        self._in_flight[tool_class] = self._in_flight.get(tool_class, 0) + 1
+
+    def release(self, tool_class: str) -> None:
+        remaining = self._in_flight.get(tool_class, 0) - 1
+        if remaining > 0:
+            self._in_flight[tool_class] = remaining
+        else:
+            self._in_flight.pop(tool_class, None)
+
+
+def _run_tool_task(fn: Callable[..., Any], args: tuple, kwargs: dict) -> Any:
+    # Pool threads outlive a batch; drop connections the way request handling does.
+    close_old_connections()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+class ToolBatchExecutor:
+    """Per-process thread pool shared by every parallel tool batch."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._max_workers = 0
+        self._owner_pid = os.getpid()
+
+    @property
+    def max_workers(self) -> int:
+        return self._max_workers
+
+    def submit(self, fn: Callable[..., Any], /, *args: Any, **kwargs: Any) -> Future:
+        """Run ``fn`` on the shared pool inside a copy of the caller's context."""
+        context = copy_context()
+        return self._get_pool().submit(context.run, _run_tool_task, fn, args, kwargs)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+            owned = os.getpid() == self._owner_pid
+        if pool is not None and owned:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        max_workers = _configured_max_workers()
+        retired = None
+        with self._lock:
+            if os.getpid() != self._owner_pid:
+                # A forked child inherits the pool object but none of its threads.
+                self._pool = None
+                self._owner_pid = os.getpid()
+            if self._pool is not None and self._max_workers != max_workers:
+                retired = self._pool
+                self._pool = None
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="agent-tool")
+                self._max_workers = max_workers
+            pool = self._pool
+        if retired is not None:
+            # Already-submitted calls finish on the old threads.
+            retired.shutdown(wait=False)
+        return pool
+
+
+_executor = ToolBatchExecutor()
+atexit.register(_executor.shutdown)
+
+
+def get_tool_batch_executor() -> ToolBatchExecutor:
+    return _executor
@@ -1,10 +1,15 @@
+import hashlib
 import json
 import logging
 import re
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
 from datetime import datetime
 from typing import Callable, Dict, List, Mapping, Optional, Sequence, Set, Tuple
 
+from django.conf import settings
+
 from ..tools.context_hints import URL_FIELD_PRIORITY, extract_context_hint, hint_from_unstructured_text
 from ..tools.sqlite_guardrails import clear_guarded_connection, open_guarded_sqlite_connection
 from ..tools.sqlite_state import TOOL_RESULTS_TABLE, get_sqlite_db_path
@@ -502,7 +507,9 @@ def prepare_tool_results_for_prompt(
         elif result_id != record.step_id and _UUID_RESULT_ID_RE.match(str(record.step_id)):
             legacy_result_id = record.step_id
 
-        meta, stored_json, stored_text, analysis = _summarize_result(result_text, result_id, record.tool_name)
+        summary = _summary_cache.summarize(result_text, result_id, record.tool_name)
+        meta = dict(summary.meta)
+        stored_json, stored_text, analysis = summary.stored_json, summary.stored_text, summary.analysis
         stored_in_db = record.tool_name not in EXCLUDED_TOOL_NAMES
         is_analysis_eligible = record.tool_name.startswith(SCHEMA_ELIGIBLE_TOOL_PREFIXES)
         is_unwrapped_http_body = (
@@ -907,40 +914,28 @@ def prepare_tool_results_for_prompt(
         )
 
         if stored_in_db:
-            analysis_json_str = None
-            if analysis:
-                try:
-                    analysis_json_str = json.dumps(
-                        analysis_to_dict(analysis),
-                        ensure_ascii=True,
-                        separators=(",", ":"),
-                    )
-                except Exception:
-                    logger.debug("Failed to serialize analysis", exc_info=True)
-
+            row = (
+                result_id,
+                legacy_result_id,
+                record.tool_name,
+                source_batch_id,
+                1 if is_current_source_batch else 0,
+                record.source_url,
+                record.created_at.isoformat(),
+                meta["bytes"],
+                meta["line_count"],
+                1 if meta["is_json"] else 0,
+                meta["json_type"],
+                meta["top_keys"],
+                1 if meta["is_binary"] else 0,
+                1 if meta["has_images"] else 0,
+                1 if meta["has_base64"] else 0,
+                1 if meta["is_truncated"] else 0,
+                meta["truncated_bytes"],
+            )
             rows.append(
-                (
-                    result_id,
-                    legacy_result_id,
-                    record.tool_name,
-                    source_batch_id,
-                    1 if is_current_source_batch else 0,
-                    record.source_url,
-                    record.created_at.isoformat(),
-                    meta["bytes"],
-                    meta["line_count"],
-                    1 if meta["is_json"] else 0,
-                    meta["json_type"],
-                    meta["top_keys"],
-                    1 if meta["is_binary"] else 0,
-                    1 if meta["has_images"] else 0,
-                    1 if meta["has_base64"] else 0,
-                    1 if meta["is_truncated"] else 0,
-                    meta["truncated_bytes"],
-                    stored_json,
-                    analysis_json_str,
-                    stored_text,
-                )
+                row
+                + (stored_json, summary.analysis_json, stored_text, _tool_result_row_digest(row, summary.digest))
             )
 
             if analysis and is_analysis_eligible:
@@ -1000,7 +995,50 @@ def _load_json_payload(
     return None
 
 
+_TOOL_RESULT_COLUMNS = (
+    "result_id",
+    "legacy_result_id",
+    "tool_name",
+    "source_batch_id",
+    "is_current_batch",
+    "source_url",
+    "created_at",
+    "bytes",
+    "line_count",
+    "is_json",
+    "json_type",
+    "top_keys",
+    "is_binary",
+    "has_images",
+    "has_base64",
+    "is_truncated",
+    "truncated_bytes",
+    "result_json",
+    "analysis_json",
+    "result_text",
+    "row_digest",
+)
+_IS_CURRENT_BATCH_INDEX = _TOOL_RESULT_COLUMNS.index("is_current_batch")
+
+
+def _tool_result_row_digest(row: Tuple, content_digest: str) -> str:
+    """Digest a row's scalar columns plus its content digest, ignoring ``is_current_batch``.
+
+    The stored JSON, analysis and text are derived from the content digest, so
+    hashing them again on every render is unnecessary.
+    """
+    fields = row[:_IS_CURRENT_BATCH_INDEX] + row[_IS_CURRENT_BATCH_INDEX + 1:]
+    encoded = json.dumps([content_digest, *fields], ensure_ascii=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(encoded.encode("ascii"), digest_size=16).hexdigest()
+
+
 def _store_tool_results(rows: Sequence[Tuple]) -> None:
+    """Sync ``__tool_results`` to ``rows`` by diff.
+
+    New or changed rows are upserted, evicted rows deleted, and rows whose only
+    change is the current-batch flag are updated in place, so a render that
+    adds one tool call writes one row instead of rewriting the whole table.
+    """
     db_path = get_sqlite_db_path()
     if not db_path:
         logger.warning("SQLite DB path unavailable; tool results not stored.")
@@ -1010,36 +1048,37 @@ def _store_tool_results(rows: Sequence[Tuple]) -> None:
     try:
         conn = open_guarded_sqlite_connection(db_path)
         _ensure_tool_results_table(conn)
-        conn.execute(f'DELETE FROM "{TOOL_RESULTS_TABLE}";')
-        if rows:
+        existing = {
+            result_id: (row_digest, is_current_batch)
+            for result_id, row_digest, is_current_batch in conn.execute(
+                f'SELECT result_id, row_digest, is_current_batch FROM "{TOOL_RESULTS_TABLE}";'
+            )
+        }
+        desired = {row[0]: row for row in rows}
+        evicted = [(result_id,) for result_id in existing if result_id not in desired]
+        upserts: List[Tuple] = []
+        flag_updates: List[Tuple] = []
+        for result_id, row in desired.items():
+            current = existing.get(result_id)
+            if current is None or current[0] is None or current[0] != row[-1]:
+                upserts.append(row)
+            elif current[1] != row[_IS_CURRENT_BATCH_INDEX]:
+                flag_updates.append((row[_IS_CURRENT_BATCH_INDEX], result_id))
+
+        if evicted:
+            conn.executemany(f'DELETE FROM "{TOOL_RESULTS_TABLE}" WHERE result_id = ?;', evicted)
+        if flag_updates:
             conn.executemany(
-                f"""
-                INSERT OR REPLACE INTO "{TOOL_RESULTS_TABLE}" (
-                    result_id,
-                    legacy_result_id,
-                    tool_name,
-                    source_batch_id,
-                    is_current_batch,
-                    source_url,
-                    created_at,
-                    bytes,
-                    line_count,
-                    is_json,
-                    json_type,
-                    top_keys,
-                    is_binary,
-                    has_images,
-                    has_base64,
-                    is_truncated,
-                    truncated_bytes,
-                    result_json,
-                    analysis_json,
-                    result_text
-                ) VALUES (
-                    ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?
-                )
-                """,
-                rows,
+                f'UPDATE "{TOOL_RESULTS_TABLE}" SET is_current_batch = ? WHERE result_id = ?;',
+                flag_updates,
+            )
+        if upserts:
+            conn.executemany(
+                f'''
+                INSERT OR REPLACE INTO "{TOOL_RESULTS_TABLE}" ({", ".join(_TOOL_RESULT_COLUMNS)})
+                VALUES ({", ".join("?" for _ in _TOOL_RESULT_COLUMNS)})
+                ''',
+                upserts,
             )
         conn.commit()
     except Exception:
@@ -1076,7 +1115,8 @@ def _ensure_tool_results_table(conn) -> None:
             truncated_bytes INTEGER,
             result_json TEXT,
             analysis_json TEXT,
-            result_text TEXT
+            result_text TEXT,
+            row_digest TEXT
         )
         """
     )
@@ -1110,6 +1150,10 @@ def _ensure_tool_results_columns(conn) -> None:
         conn.execute(
             f'ALTER TABLE "{TOOL_RESULTS_TABLE}" ADD COLUMN source_url TEXT;'
         )
+    if "row_digest" not in existing:
+        conn.execute(
+            f'ALTER TABLE "{TOOL_RESULTS_TABLE}" ADD COLUMN row_digest TEXT;'
+        )
 
 
 CSV_AUTO_LOAD_MAX_BYTES = 5_000_000  # 5MB
@@ -1358,6 +1402,116 @@ def _summarize_result(
     return meta, result_json, result_text_store, analysis
 
 
+@dataclass(frozen=True)
+class ToolResultSummary:
+    digest: str
+    meta: Dict[str, object]
+    stored_json: Optional[str]
+    stored_text: Optional[str]
+    analysis: Optional[ResultAnalysis]
+    analysis_json: Optional[str]
+    size: int
+
+
+def tool_result_content_digest(result_text: str) -> str:
+    return hashlib.blake2b(result_text.encode("utf-8", "surrogatepass"), digest_size=16).hexdigest()
+
+
+def _build_tool_result_summary(result_text: str, result_id: str, tool_name: str, digest: str) -> ToolResultSummary:
+    meta, stored_json, stored_text, analysis = _summarize_result(result_text, result_id, tool_name)
+    analysis_json = None
+    if analysis:
+        try:
+            analysis_json = json.dumps(
+                analysis_to_dict(analysis),
+                ensure_ascii=True,
+                separators=(",", ":"),
+            )
+        except Exception:
+            logger.debug("Failed to serialize analysis", exc_info=True)
+    size = sum(
+        len(text)
+        for text in (
+            stored_json,
+            stored_text,
+            analysis_json,
+            analysis.prepared_text if analysis else None,
+            analysis.normalized_json if analysis else None,
+        )
+        if text
+    )
+    return ToolResultSummary(
+        digest=digest,
+        meta=meta,
+        stored_json=stored_json,
+        stored_text=stored_text,
+        analysis=analysis,
+        analysis_json=analysis_json,
+        size=size,
+    )
+
+
+class ToolResultSummaryCache:
+    """Byte-bounded LRU of summarized tool results, shared by every render in a worker process.
+
+    Entries are keyed by result id, tool name and a digest of the raw result,
+    so a prompt render only analyzes tool calls it has not seen before.
+    Summaries are treated as read-only by callers.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None) -> None:
+        self._max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, str, str], ToolResultSummary]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def max_bytes(self) -> int:
+        if self._max_bytes is not None:
+            return self._max_bytes
+        return int(getattr(settings, "TOOL_RESULT_SUMMARY_CACHE_MAX_BYTES", 64 * 1024 * 1024) or 0)
+
+    def summarize(self, result_text: str, result_id: str, tool_name: str = "") -> ToolResultSummary:
+        digest = tool_result_content_digest(result_text)
+        key = (str(result_id), tool_name, digest)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                return cached
+
+        summary = _build_tool_result_summary(result_text, result_id, tool_name, digest)
+        budget = self.max_bytes
+        if summary.size > budget:
+            return summary
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.size
+            self._entries[key] = summary
+            self._bytes += summary.size
+            while self._bytes > budget and self._entries:
+                _evicted_key, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+        return summary
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+_summary_cache = ToolResultSummaryCache()
+
+
+def get_tool_result_summary_cache() -> ToolResultSummaryCache:
+    return _summary_cache
+
+
 def _tool_result_succeeded(result_text: str) -> bool:
     try:
         payload = json.loads(result_text)
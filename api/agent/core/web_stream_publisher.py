@@ -0,0 +1,189 @@
+"""
+Background publisher for web UI stream frames.
+
+Stream frames used to be sent with a blocking channel-layer round trip on the
+thread consuming the LLM stream. Frames are now queued per stream and sent from
+one asyncio loop per process. While a stream's previous frame is still in
+flight, newer deltas are merged into a single pending delta, and a cancel drops
+deltas nobody will render, so a slow channel layer turns into fewer, larger
+frames instead of a stalled completion.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from opentelemetry import metrics
+
+logger = logging.getLogger(__name__)
+
+_meter = metrics.get_meter("gobii.web_stream")
+web_stream_frames = _meter.create_counter(
+    "gobii.web_stream.frames",
+    description="Web stream frames by outcome (sent, coalesced, dropped, failed)",
+)
+web_stream_publish_latency = _meter.create_histogram(
+    "gobii.web_stream.publish_latency",
+    unit="s",
+    description="Time from queuing a web stream frame to the channel layer accepting it",
+)
+web_stream_queue_depth = _meter.create_up_down_counter(
+    "gobii.web_stream.queue_depth",
+    description="Web stream frames waiting to be published",
+)
+
+SEND_TIMEOUT_SECONDS = 5.0
+_DELTA_FIELDS = ("reasoning_delta", "content_delta")
+
+StreamKey = tuple[str, int, str]
+
+
+@dataclass
+class _PendingFrame:
+    payload: dict
+    queued_at: float
+
+
+@dataclass
+class _PendingStream:
+    frames: list[_PendingFrame] = field(default_factory=list)
+
+    def add(self, payload: dict, queued_at: float) -> tuple[bool, int]:
+        """Queue ``payload``; returns whether it was merged and how many frames it superseded."""
+        status = payload.get("status")
+        last = self.frames[-1] if self.frames else None
+        if status == "delta" and last is not None and last.payload.get("status") == "delta":
+            merged = dict(last.payload)
+            for name in _DELTA_FIELDS:
+                if payload.get(name):
+                    merged[name] = f"{merged.get(name) or ''}{payload[name]}"
+            last.payload = merged
+            return True, 0
+        dropped = 0
+        if status == "canceled":
+            # A canceled stream is discarded client-side; unsent deltas are superseded.
+            kept = [frame for frame in self.frames if frame.payload.get("status") != "delta"]
+            dropped = len(self.frames) - len(kept)
+            self.frames = kept
+        self.frames.append(_PendingFrame(payload=payload, queued_at=queued_at))
+        return False, dropped
+
+
+class WebStreamPublisher:
+    """Per-process queue of stream frames drained by a dedicated event loop."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._streams: dict[StreamKey, _PendingStream] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._owner_pid: Optional[int] = None
+
+    def publish(self, agent_id: str, user_id: int, payload: dict) -> None:
+        """Queue a frame without waiting for the channel layer."""
+        if not agent_id or user_id is None:
+            return
+        key = (str(agent_id), int(user_id), str(payload.get("stream_id") or ""))
+        loop = self._ensure_loop()
+        with self._lock:
+            pending = self._streams.get(key)
+            spawn = pending is None
+            if spawn:
+                pending = self._streams[key] = _PendingStream()
+            coalesced, dropped = pending.add(payload, time.monotonic())
+        if coalesced:
+            web_stream_frames.add(1, {"outcome": "coalesced"})
+        else:
+            web_stream_queue_depth.add(1 - dropped)
+        if dropped:
+            web_stream_frames.add(dropped, {"outcome": "dropped"})
+        if spawn:
+            loop.call_soon_threadsafe(self._spawn_drain, key)
+
+    def wait_for_stream(self, agent_id: str, user_id: int, stream_id: str, timeout: float) -> bool:
+        """Block until every queued frame of one stream has been handed to the channel layer."""
+        key = (str(agent_id), int(user_id), str(stream_id))
+        deadline = time.monotonic() + max(0.0, timeout)
+        with self._idle:
+            while key in self._streams:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+    def pending_frames(self) -> int:
+        with self._lock:
+            return sum(len(pending.frames) for pending in self._streams.values())
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            pid = os.getpid()
+            if self._owner_pid != pid:
+                # Forked children inherit neither the loop thread nor its queued frames.
+                self._streams = {}
+                self._loop = None
+                self._thread = None
+                self._owner_pid = pid
+            if self._loop is None or self._thread is None or not self._thread.is_alive():
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(
+                    target=self._run_loop,
+                    args=(loop,),
+                    name="web-stream-publisher",
+                    daemon=True,
+                )
+                thread.start()
+                self._loop = loop
+                self._thread = thread
+            return self._loop
+
+    @staticmethod
+    def _run_loop(loop: asyncio.AbstractEventLoop) -> None:
+        asyncio.set_event_loop(loop)
+        loop.run_forever()
+
+    def _spawn_drain(self, key: StreamKey) -> None:
+        asyncio.get_running_loop().create_task(self._drain_stream(key))
+
+    async def _drain_stream(self, key: StreamKey) -> None:
+        agent_id, user_id, _stream_id = key
+        while True:
+            with self._lock:
+                pending = self._streams.get(key)
+                if pending is None or not pending.frames:
+                    self._streams.pop(key, None)
+                    self._idle.notify_all()
+                    return
+                frames, pending.frames = pending.frames, []
+            web_stream_queue_depth.add(-len(frames))
+            for frame in frames:
+                await self._send(agent_id, user_id, frame)
+
+    async def _send(self, agent_id: str, user_id: int, frame: _PendingFrame) -> None:
+        from console.agent_chat.realtime import send_stream_event_async
+
+        status = str(frame.payload.get("status") or "")
+        try:
+            await asyncio.wait_for(
+                send_stream_event_async(agent_id, user_id, frame.payload),
+                timeout=SEND_TIMEOUT_SECONDS,
+            )
+        except Exception:
+            web_stream_frames.add(1, {"outcome": "failed", "status": status})
+            logger.debug("Failed to publish web stream frame for agent %s", agent_id, exc_info=True)
+            return
+        web_stream_frames.add(1, {"outcome": "sent", "status": status})
+        web_stream_publish_latency.record(time.monotonic() - frame.queued_at, {"status": status})
+
+
+_publisher = WebStreamPublisher()
+
+
+def get_web_stream_publisher() -> WebStreamPublisher:
+    return _publisher
@@ -1,12 +1,19 @@
+import logging
 import time
 import uuid
 from dataclasses import dataclass, field
 from typing import Optional
 
+from django.conf import settings
+
 from api.agent.comms.message_reads import is_peer_dm_message
 from api.agent.comms.routing import get_bound_inbound_routing_scope, get_current_inbound_message
 from api.models import CommsChannel, PersistentAgent, PersistentAgentMessage, parse_web_user_address
 
+from .web_stream_publisher import get_web_stream_publisher
+
+logger = logging.getLogger(__name__)
+
 
 @dataclass(frozen=True)
 class WebStreamTarget:
@@ -49,6 +56,8 @@ class WebStreamBroadcaster:
     stream_id: str = field(default_factory=lambda: uuid.uuid4().hex)
     min_flush_interval: float = 0.08
     max_buffer_chars: int = 200
+    # finish()/cancel() wait this long for queued frames so later timeline events do not overtake them.
+    terminal_flush_timeout: float = 0.5
     _last_flush: float = field(default=0.0, init=False)
     _started: bool = field(default=False, init=False)
     _finished: bool = field(default=False, init=False)
@@ -99,6 +108,7 @@ class WebStreamBroadcaster:
         if self._started:
             self.flush()
             self._send({"stream_id": self.stream_id, "status": "done"})
+            self._wait_for_delivery()
         self._finished = True
 
     def cancel(self) -> None:
@@ -106,6 +116,7 @@ class WebStreamBroadcaster:
             return
         if self._started:
             self._send({"stream_id": self.stream_id, "status": "canceled"})
+            self._wait_for_delivery()
         self._finished = True
 
     def _should_flush(self) -> bool:
@@ -122,6 +133,26 @@ class WebStreamBroadcaster:
         return (time.monotonic() - self._last_flush) >= self.min_flush_interval
 
     def _send(self, payload: dict) -> None:
+        if _background_publish_enabled():
+            get_web_stream_publisher().publish(self.target.agent_id, self.target.user_id, payload)
+            return
+
         from console.agent_chat.realtime import send_stream_event
 
         send_stream_event(self.target.agent_id, self.target.user_id, payload)
+
+    def _wait_for_delivery(self) -> None:
+        if not _background_publish_enabled():
+            return
+        delivered = get_web_stream_publisher().wait_for_stream(
+            self.target.agent_id,
+            self.target.user_id,
+            self.stream_id,
+            timeout=self.terminal_flush_timeout,
+        )
+        if not delivered:
+            logger.debug("Web stream %s still publishing after %.2fs", self.stream_id, self.terminal_flush_timeout)
+
+
+def _background_publish_enabled() -> bool:
+    return bool(getattr(settings, "WEB_STREAM_BACKGROUND_PUBLISH_ENABLED", False))
@@ -26,3 +26,4 @@ from .agent_avatar import (  # noqa: F401
 )
 from .reported_message_judge import run_reported_agent_judge_task  # noqa: F401
 from .history_compaction import compact_agent_history_task  # noqa: F401
+from .sqlite_state_compaction import compact_agent_sqlite_state_task  # noqa: F401
@@ -23,6 +23,7 @@ from email.utils import parseaddr
 
 from celery import shared_task
 from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
 from opentelemetry import trace
 
@@ -48,6 +49,8 @@ logger = logging.getLogger(__name__)
 
 MIN_POLL_INTERVAL_SEC = 30
 MAX_ENQUEUES_PER_RUN = 200
+# A claimed account is not offered again for this long unless its poll reschedules it sooner.
+POLL_CLAIM_SEC = 600
 BATCH_SIZE = 100
 MAX_MESSAGES_PER_ACCOUNT = 500
 IMAP_TIMEOUT_SEC = 60
@@ -56,19 +59,11 @@ UID_SEARCH_CHUNK_SIZE = 1000
 _UIDNEXT_RE = re.compile(r"\d+")
 
 
-def _is_due(acct: AgentEmailAccount, now) -> bool:
-    if not acct.is_inbound_enabled:
-        return False
-    if acct.backoff_until and acct.backoff_until > now:
-        return False
+def _next_poll_at(acct: AgentEmailAccount, now):
     interval = max(int(acct.poll_interval_sec or 0), MIN_POLL_INTERVAL_SEC)
     # Add small jitter (±10%)
     jitter_factor = 1.0 + random.uniform(-0.1, 0.1)
-    jittered = int(interval * jitter_factor)
-    last = acct.last_polled_at
-    if not last:
-        return True
-    return (now - last).total_seconds() >= jittered
+    return now + timedelta(seconds=int(interval * jitter_factor))
 
 
 def _parse_uid_list(raw: Iterable[bytes]) -> List[str]:
@@ -169,9 +164,10 @@ def _update_success(acct: AgentEmailAccount, now, last_uid: str, uidvalidity: Op
     acct.connection_error = ""
     acct.imap_last_ok_at = now
     acct.imap_error = ""
+    acct.next_poll_at = _next_poll_at(acct, now)
     acct.save(update_fields=[
         "last_seen_uid", "last_polled_at", "connection_last_ok_at", "connection_error",
-        "imap_last_ok_at", "imap_error",
+        "imap_last_ok_at", "imap_error", "next_poll_at",
     ])
 
 
@@ -192,7 +188,8 @@ def _update_error_backoff(acct: AgentEmailAccount, err: Exception) -> None:
     acct.imap_error = str(err)
     acct.backoff_until = now + timedelta(seconds=next_delay)
     acct.last_polled_at = now
-    acct.save(update_fields=["connection_error", "imap_error", "backoff_until", "last_polled_at"])
+    acct.next_poll_at = acct.backoff_until
+    acct.save(update_fields=["connection_error", "imap_error", "backoff_until", "last_polled_at", "next_poll_at"])
 
 
 def _connect_imap(acct: AgentEmailAccount) -> imaplib.IMAP4:
@@ -222,6 +219,46 @@ def _connect_imap(acct: AgentEmailAccount) -> imaplib.IMAP4:
     return client
 
 
+def imap_sender_blocked(acct: AgentEmailAccount, header_bytes: Optional[bytes]) -> bool:
+    """True when a header-only fetch shows a sender the owning agent does not whitelist."""
+    agent = getattr(acct.endpoint, "owner_agent", None)
+    if agent is None or not header_bytes:
+        return False
+    sender = _extract_sender_from_header_bytes(header_bytes)
+    if sender and not agent.is_sender_whitelisted(CommsChannel.EMAIL, sender):
+        logger.info(
+            "IMAP message from %s is not whitelisted for agent %s; skipping",
+            sender, getattr(agent, "id", None),
+        )
+        return True
+    return False
+
+
+def ingest_imap_message_bytes(acct: AgentEmailAccount, uid: str, raw: bytes) -> bool:
+    """Parse and ingest one fetched message. Returns False when the sender is not whitelisted.
+
+    Shared by the polling task and the IDLE runner, which fetches over its own session.
+    """
+    endpoint = acct.endpoint
+    agent = getattr(endpoint, "owner_agent", None)
+    parsed = ImapEmailAdapter.parse_bytes(
+        raw,
+        recipient_address=endpoint.address,
+        ctx=ImapParsedContext(uid=str(uid), folder=acct.imap_folder or "INBOX"),
+    )
+
+    # Enforce whitelist if we have an agent
+    if agent is not None and not agent.is_sender_whitelisted(CommsChannel.EMAIL, parsed.sender):
+        logger.info(
+            "IMAP message from %s is not whitelisted for agent %s; skipping",
+            parsed.sender, getattr(agent, "id", None),
+        )
+        return False
+
+    ingest_inbound_message(CommsChannel.EMAIL, parsed)
+    return True
+
+
 def _ingest_uid(client: imaplib.IMAP4, acct: AgentEmailAccount, uid: str) -> bool:
     """Fetch and ingest a single UID. Returns True if considered processed.
 
@@ -246,27 +283,13 @@ def _ingest_uid(client: imaplib.IMAP4, acct: AgentEmailAccount, uid: str) -> boo
         if not raw:
             return True  # nothing to do, treat as processed
 
-        parsed = ImapEmailAdapter.parse_bytes(
-            raw,
-            recipient_address=endpoint.address,
-            ctx=ImapParsedContext(uid=str(uid), folder=acct.imap_folder or "INBOX"),
-        )
-
-        # Enforce whitelist if we have an agent
-        if agent is not None and not agent.is_sender_whitelisted(CommsChannel.EMAIL, parsed.sender):
-            logger.info(
-                "IMAP message from %s is not whitelisted for agent %s; skipping",
-                parsed.sender, getattr(agent, "id", None),
-            )
-            return True
-
-        ingest_inbound_message(CommsChannel.EMAIL, parsed)
-        # Mark message as read (\Seen) after successful ingestion
-        try:
-            client.uid("STORE", uid, "+FLAGS", r"(\Seen)")
-        except Exception:
-            # Non-fatal; continue
-            pass
+        if ingest_imap_message_bytes(acct, uid, raw):
+            # Mark message as read (\Seen) after successful ingestion
+            try:
+                client.uid("STORE", uid, "+FLAGS", r"(\Seen)")
+            except Exception:
+                # Non-fatal; continue
+                pass
         return True
     except Exception as e:
         logger.error("Error ingesting UID %s for %s: %s", uid, acct.endpoint.address, e, exc_info=True)
@@ -426,9 +449,10 @@ def _update_gmail_poll_success(acct: AgentEmailAccount, now) -> None:
     acct.imap_last_ok_at = now
     acct.imap_error = ""
     acct.backoff_until = None
+    acct.next_poll_at = _next_poll_at(acct, now)
     acct.save(update_fields=[
         "last_polled_at", "connection_last_ok_at", "connection_error",
-        "imap_last_ok_at", "imap_error", "backoff_until",
+        "imap_last_ok_at", "imap_error", "backoff_until", "next_poll_at",
     ])
 
 
@@ -610,9 +634,10 @@ def _poll_account_locked(acct: AgentEmailAccount) -> None:
                 acct.connection_error = ""
                 acct.imap_last_ok_at = now
                 acct.imap_error = ""
+                acct.next_poll_at = _next_poll_at(acct, now)
                 acct.save(update_fields=[
                     "last_polled_at", "connection_last_ok_at", "connection_error",
-                    "imap_last_ok_at", "imap_error",
+                    "imap_last_ok_at", "imap_error", "next_poll_at",
                 ])
                 return
 
@@ -677,30 +702,38 @@ def poll_imap_inbox(self, account_id: str) -> None:
                 pass
 
 
-@shared_task(bind=True, name="api.agent.tasks.poll_imap_inboxes", expires=90, ignore_result=True)
-def poll_imap_inboxes(self) -> None:
-    """Dispatcher: find due inbound-enabled accounts and enqueue per-account tasks."""
-    now = timezone.now()
+def _claim_due_accounts(now, limit: int) -> List[str]:
+    """Claim up to ``limit`` accounts whose ``next_poll_at`` has passed, oldest first.
 
-    # Select a pool of candidates; filter minimally in DB, due filtering in Python
-    candidates = (
-        AgentEmailAccount.objects.select_related("endpoint")
-        # Only poll accounts whose owner agent matches the current release env.
-        .filter(
-            is_inbound_enabled=True,
-            endpoint__owner_agent__execution_environment=settings.GOBII_RELEASE_ENV,
+    Rows locked by a concurrent dispatcher are skipped, and claimed rows are
+    pushed ``POLL_CLAIM_SEC`` into the future so they are not offered twice
+    while their poll task is queued.
+    """
+    with transaction.atomic():
+        due_ids = list(
+            AgentEmailAccount.objects.select_for_update(skip_locked=True, of=("self",))
+            # Only poll accounts whose owner agent matches the current release env.
+            .filter(
+                is_inbound_enabled=True,
+                next_poll_at__lte=now,
+                endpoint__owner_agent__execution_environment=settings.GOBII_RELEASE_ENV,
+            )
+            .order_by("next_poll_at")
+            .values_list("pk", flat=True)[:limit]
         )
-        .order_by("-updated_at")
-    )
+        if due_ids:
+            # ``update`` skips auto_now and post_save, so claims neither reorder nor nudge IDLE runners.
+            AgentEmailAccount.objects.filter(pk__in=due_ids).update(
+                next_poll_at=now + timedelta(seconds=POLL_CLAIM_SEC)
+            )
+    return [str(pk) for pk in due_ids]
+
 
-    due_ids: List[str] = []
-    for acct in candidates:
-        if _is_due(acct, now):
-            due_ids.append(str(acct.pk))
-            if len(due_ids) >= MAX_ENQUEUES_PER_RUN:
-                break
+@shared_task(bind=True, name="api.agent.tasks.poll_imap_inboxes", expires=90, ignore_result=True)
+def poll_imap_inboxes(self) -> None:
+    """Dispatcher: claim due inbound-enabled accounts and enqueue per-account tasks."""
+    due_ids = _claim_due_accounts(timezone.now(), MAX_ENQUEUES_PER_RUN)
 
-    random.shuffle(due_ids)
     for account_id in due_ids:
         try:
             # Enqueue; task has an expires set in its decorator and will age off if unprocessed
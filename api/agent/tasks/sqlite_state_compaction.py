@@ -0,0 +1,37 @@
+"""Celery task that folds persistent-agent SQLite delta chains into a new base."""
+
+import logging
+
+from celery import shared_task
+
+from api.agent.tools.sqlite_recovery import SQLiteStateError
+from api.agent.tools.sqlite_state import compact_agent_sqlite_state
+from api.services.agent_sqlite_coordination import AGENT_SQLITE_COORDINATION_ERRORS
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(
+    bind=True,
+    name="api.agent.tasks.compact_agent_sqlite_state",
+    ignore_result=True,
+    acks_late=True,
+    reject_on_worker_lost=True,
+)
+def compact_agent_sqlite_state_task(self, persistent_agent_id: str) -> None:  # noqa: ANN001
+    """Compact the agent's SQLite delta chain outside interactive processing."""
+    try:
+        compacted = compact_agent_sqlite_state(persistent_agent_id)
+    except AGENT_SQLITE_COORDINATION_ERRORS:
+        # The agent is busy; its next persisted delta schedules another attempt.
+        logger.info("Skipping SQLite delta compaction for busy agent %s", persistent_agent_id)
+        return
+    except SQLiteStateError:
+        logger.warning(
+            "SQLite delta compaction failed for agent %s",
+            persistent_agent_id,
+            exc_info=True,
+        )
+        return
+    if compacted:
+        logger.info("Compacted SQLite delta chain for agent %s", persistent_agent_id)
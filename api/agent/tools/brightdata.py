@@ -14,6 +14,8 @@ from markdown_it.token import Token
 from requests import Response
 from requests.exceptions import RequestException, Timeout
 
+from api.services.http_client_pool import get_http_client
+
 
 logger = logging.getLogger(__name__)
 
@@ -161,7 +163,8 @@ def _request_brightdata(
     payload: Any = None,
     timeout: Optional[float] = None,
 ) -> tuple[Optional[Response], Optional[dict[str, Any]]]:
-    request = requests.post if method == "POST" else requests.get
+    client = get_http_client()
+    request = client.post if method == "POST" else client.get
     request_kwargs = {
         "headers": _request_headers(),
         "timeout": settings.BRIGHT_DATA_REQUEST_TIMEOUT_SECONDS if timeout is None else timeout,
@@ -10,16 +10,19 @@ import logging
 import mimetypes
 import os
 import re
+import time
 import urllib.parse
 from typing import Dict, Any
 
 import requests
-from requests.exceptions import RequestException
+from requests.exceptions import ConnectTimeout, ProxyError, RequestException
 
 from django.conf import settings
 
 from ...models import GlobalSecret, PersistentAgent, PersistentAgentSecret
+from ...proxy_pool import record_proxy_outcome
 from ...proxy_selection import select_proxy_for_persistent_agent
+from ...services.http_client_pool import get_http_client
 from ...services.native_integrations import NativeIntegrationAuthError, NativeIntegrationConfigurationError, apply_native_integration_auth, find_provider_for_url
 from ...services.persistent_agent_secrets import global_secrets_queryset_for_agent
 from ..files.attachment_helpers import build_signed_filespace_download_url
@@ -593,15 +596,20 @@ def execute_http_request(agent: PersistentAgent, params: Dict[str, Any]) -> Dict
     if proxies:
         request_kwargs["proxies"] = proxies
 
+    request_started = time.monotonic()
     try:
         # Stream to avoid downloading huge bodies – we'll manually truncate
-        resp = requests.request(
+        resp = get_http_client().request(
             method,
             url,
             **request_kwargs,
         )
     except RequestException as e:
+        if isinstance(e, (ProxyError, ConnectTimeout)):
+            # Only failures reaching the proxy count against it; target errors do not.
+            record_proxy_outcome(proxy_server, success=False)
         return {"status": "error", "message": f"HTTP request failed: {e}"}
+    record_proxy_outcome(proxy_server, success=True, latency_seconds=time.monotonic() - request_started)
 
     if download_requested and (resp.status_code < 200 or resp.status_code >= 300):
         resp.close()
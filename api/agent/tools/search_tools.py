@@ -5,6 +5,7 @@ Provides a unified `search_tools` function that queries the LLM once across
 both MCP-discovered tools and builtin tools, then enables any selected tools.
 """
 
+import hashlib
 import json
 import logging
 import re
@@ -12,6 +13,7 @@ from functools import partial
 from typing import Any, Callable, Dict, Iterable, List, Optional
 
 from django.conf import settings
+from django.core.cache import cache
 from django.db.models import F
 from django.utils import timezone
 from opentelemetry import trace
@@ -50,6 +52,7 @@ from .tool_manager import (
     get_enabled_tool_limit,
 )
 from .autotool_heuristics import find_matching_tools
+from .tool_search_index import IndexDocument, get_tool_search_index
 
 logger = logging.getLogger(__name__)
 tracer = trace.get_tracer("gobii.utils")
@@ -764,6 +767,81 @@ def _append_section_summary(
         message_lines.append("; ".join(summary))
 
 
+def _tool_index_document(tool: Any) -> Optional[IndexDocument]:
+    full_name = _tool_attr(tool, "full_name") or _tool_attr(tool, "name")
+    if not isinstance(full_name, str) or not full_name:
+        return None
+    parameters = _tool_attr(tool, "parameters", {}) or {}
+    properties = parameters.get("properties") if isinstance(parameters, dict) else None
+    param_names = " ".join(properties) if isinstance(properties, dict) else ""
+    description = _tool_attr(tool, "description", "") or ""
+    return IndexDocument(key=full_name, name=full_name, text=f"{description} {param_names}")
+
+
+def _skill_index_document(skill: Any) -> Optional[IndexDocument]:
+    name = _tool_attr(skill, "name")
+    if not isinstance(name, str) or not name.strip():
+        return None
+    tool_ids = " ".join(str(tool_id) for tool_id in normalize_skill_tool_ids(_tool_attr(skill, "tools", []) or []))
+    text = " ".join(
+        str(_tool_attr(skill, attr, "") or "")
+        for attr in ("description", "instructions")
+    )
+    return IndexDocument(key=name, name=name, text=f"{text} {tool_ids}")
+
+
+def _prerank_catalog(
+    query: str,
+    entries: List[Any],
+    document_for: Callable[[Any], Optional[IndexDocument]],
+    *,
+    pinned_names: Iterable[str] = (),
+    provider_name: str,
+    label: str,
+) -> List[Any]:
+    """Shortlist ``entries`` by BM25 relevance to ``query`` when the catalog is large.
+
+    Pinned names are always kept. The full catalog is returned when pre-ranking
+    is disabled, the catalog is small, or nothing in it matches the query.
+    """
+    if not getattr(settings, "SEARCH_TOOLS_PRERANK_ENABLED", False):
+        return entries
+    threshold = int(getattr(settings, "SEARCH_TOOLS_PRERANK_THRESHOLD", 80))
+    limit = int(getattr(settings, "SEARCH_TOOLS_PRERANK_LIMIT", 40))
+    if len(entries) <= max(threshold, limit):
+        return entries
+
+    documents = [document for document in map(document_for, entries) if document is not None]
+    ranked = get_tool_search_index(documents).search(query or "", limit)
+    if not ranked:
+        logger.info("search_tools.%s: no lexical matches among %d %s; sending full list", provider_name, len(entries), label)
+        return entries
+
+    keep = {key for key, _score in ranked}
+    keep.update(pinned_names)
+    shortlisted = [
+        entry
+        for entry in entries
+        if (document := document_for(entry)) is not None and document.key in keep
+    ]
+    logger.info(
+        "search_tools.%s: pre-ranked %d %s down to %d",
+        provider_name,
+        len(entries),
+        label,
+        len(shortlisted),
+    )
+    return shortlisted
+
+
+def _selection_cache_key(system_prompt: str, user_prompt: str) -> str:
+    digest = hashlib.sha256()
+    digest.update(system_prompt.encode("utf-8", "replace"))
+    digest.update(b"\x00")
+    digest.update(user_prompt.encode("utf-8", "replace"))
+    return f"search_tools:selection:{digest.hexdigest()}"
+
+
 def _search_with_llm(
     agent: PersistentAgent,
     query: str,
@@ -817,8 +895,35 @@ def _search_with_llm(
         if isinstance(_tool_attr(skill, "skill_key"), str)
     }
 
+    prompt_tools = _prerank_catalog(
+        query,
+        tools,
+        _tool_index_document,
+        pinned_names=find_matching_tools((query or "").lower()).union(
+            _fallback_named_selection(query or "", {name for name in available_names if isinstance(name, str)})
+        ),
+        provider_name=provider_name,
+        label="tools",
+    )
+    prompt_agent_skills = _prerank_catalog(
+        query,
+        agent_skills,
+        _skill_index_document,
+        pinned_names=_fallback_named_selection(query or "", available_agent_skill_names),
+        provider_name=provider_name,
+        label="agent skills",
+    )
+    prompt_global_skills = _prerank_catalog(
+        query,
+        global_skills,
+        _skill_index_document,
+        pinned_names=_fallback_named_selection(query or "", available_global_skill_names),
+        provider_name=provider_name,
+        label="global skills",
+    )
+
     tool_lines: List[str] = []
-    for tool in tools:
+    for tool in prompt_tools:
         full_name = _tool_attr(tool, "full_name") or _tool_attr(tool, "name")
         description = _tool_attr(tool, "description", "")
         parameters = _tool_attr(tool, "parameters", {})
@@ -848,8 +953,8 @@ def _search_with_llm(
     except Exception:  # pragma: no cover - defensive logging
         logger.exception("search_tools.%s: failed to log compact catalog preview", provider_name)
 
-    agent_skill_lines = _build_agent_skill_lines(agent_skills)
-    global_skill_lines = _build_global_skill_lines(global_skills)
+    agent_skill_lines = _build_agent_skill_lines(prompt_agent_skills)
+    global_skill_lines = _build_global_skill_lines(prompt_global_skills)
     system_skill_lines = _build_system_skill_lines(system_skills)
     app_lines = _build_app_lines(app_catalog, enabled_app_slugs=enabled_app_slugs)
     enable_apps_manually_url = _build_app_url("/app/integrations")
@@ -860,7 +965,9 @@ def _search_with_llm(
         "You may already have the tools you need for integration via http_request or other methods.\n"
     )
 
-    examples_text = _build_tool_examples(available_names)
+    examples_text = _build_tool_examples(
+        {_tool_attr(tool, "full_name") or _tool_attr(tool, "name") for tool in prompt_tools}
+    )
     examples_block = f"## Examples\n\n{examples_text}\n\n" if examples_text else ""
     selection_example = (
         "\nExample placeholders: tool_names: [\"<TOOL>\"]; "
@@ -941,71 +1048,101 @@ def _search_with_llm(
         user_prompt += " If none match, call no tool/skill enable function."
 
     try:
+        routing_profile = get_current_eval_routing_profile()
         failover_configs = get_llm_config_with_failover(
             agent=agent,
-            routing_profile=get_current_eval_routing_profile(),
+            routing_profile=routing_profile,
+        )
+        max_items = get_enabled_tool_limit(agent)
+        tool_defs = _build_search_tool_definitions(
+            max_items=max_items,
+            include_agent_skills=bool(agent_skill_lines),
+            include_global_skills=bool(global_skill_lines),
+            include_system_skills=bool(system_skill_lines),
+            include_app_enablement=bool(app_lines and auto_enable_apps and enable_apps_callback is not None),
         )
+
+        # Identical prompts and tool schemas get the same selection; evals always hit the LLM.
+        cache_seconds = int(getattr(settings, "SEARCH_TOOLS_SELECTION_CACHE_SECONDS", 0) or 0)
+        selection_cache_key: Optional[str] = None
+        cached_selection = None
+        if cache_seconds > 0 and routing_profile is None:
+            selection_cache_key = _selection_cache_key(
+                system_prompt,
+                user_prompt + "\n" + json.dumps(tool_defs, sort_keys=True),
+            )
+            try:
+                cached_selection = cache.get(selection_cache_key)
+            except Exception:
+                logger.debug("search_tools.%s: selection cache read failed", provider_name, exc_info=True)
+
         last_exc: Optional[Exception] = None
         for idx, (provider, model, params) in enumerate(failover_configs):
             try:
-                logger.info(
-                    "search_tools.%s: invoking provider %s/%s: provider=%s model=%s",
-                    provider_name,
-                    idx + 1,
-                    len(failover_configs),
-                    provider,
-                    model,
-                )
-                max_items = get_enabled_tool_limit(agent)
-
-                tool_defs = _build_search_tool_definitions(
-                    max_items=max_items,
-                    include_agent_skills=bool(agent_skill_lines),
-                    include_global_skills=bool(global_skill_lines),
-                    include_system_skills=bool(system_skill_lines),
-                    include_app_enablement=bool(app_lines and auto_enable_apps and enable_apps_callback is not None),
-                )
+                if cached_selection is not None:
+                    content_text = cached_selection["content_text"]
+                    parsed_calls = cached_selection["parsed_calls"]
+                    cached_selection = None
+                    logger.info("search_tools.%s: reusing cached selection for query '%s'", provider_name, query[:80])
+                else:
+                    logger.info(
+                        "search_tools.%s: invoking provider %s/%s: provider=%s model=%s",
+                        provider_name,
+                        idx + 1,
+                        len(failover_configs),
+                        provider,
+                        model,
+                    )
 
-                run_kwargs: Dict[str, Any] = {}
-                safety_value = getattr(agent.user, "id", None) if agent and agent.user else None
-                if (
-                    safety_value is not None
-                    and isinstance(provider, str)
-                    and provider.lower().startswith("openai")
-                ):
-                    run_kwargs["safety_identifier"] = str(safety_value)
-
-                prompt_messages = [
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt},
-                ]
-                response = run_completion(
-                    model=model,
-                    messages=prompt_messages,
-                    params=params,
-                    tools=tool_defs,
-                    drop_params=True,
-                    **run_kwargs,
-                )
+                    run_kwargs: Dict[str, Any] = {}
+                    safety_value = getattr(agent.user, "id", None) if agent and agent.user else None
+                    if (
+                        safety_value is not None
+                        and isinstance(provider, str)
+                        and provider.lower().startswith("openai")
+                    ):
+                        run_kwargs["safety_identifier"] = str(safety_value)
+
+                    prompt_messages = [
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt},
+                    ]
+                    response = run_completion(
+                        model=model,
+                        messages=prompt_messages,
+                        params=params,
+                        tools=tool_defs,
+                        drop_params=True,
+                        **run_kwargs,
+                    )
 
-                token_usage, usage = log_agent_completion(
-                    agent,
-                    completion_type=PersistentAgentCompletion.CompletionType.TOOL_SEARCH,
-                    response=response,
-                    model=model,
-                    provider=provider,
-                    pricing_model=params.get("pricing_model"),
-                    prompt_messages=prompt_messages,
-                )
-                set_usage_span_attributes(trace.get_current_span(), usage)
+                    token_usage, usage = log_agent_completion(
+                        agent,
+                        completion_type=PersistentAgentCompletion.CompletionType.TOOL_SEARCH,
+                        response=response,
+                        model=model,
+                        provider=provider,
+                        pricing_model=params.get("pricing_model"),
+                        prompt_messages=prompt_messages,
+                    )
+                    set_usage_span_attributes(trace.get_current_span(), usage)
 
-                message = response.choices[0].message
-                content_text = getattr(message, "content", None) or ""
+                    message = response.choices[0].message
+                    content_text = getattr(message, "content", None) or ""
 
-                parsed_calls = _parse_search_tool_calls(
-                    getattr(message, "tool_calls", None) or [],
-                    provider_name=provider_name,
-                )
+                    parsed_calls = _parse_search_tool_calls(
+                        getattr(message, "tool_calls", None) or [],
+                        provider_name=provider_name,
+                    )
+                    if selection_cache_key is not None:
+                        try:
+                            cache.set(
+                                selection_cache_key,
+                                {"content_text": content_text, "parsed_calls": parsed_calls},
+                                timeout=cache_seconds,
+                            )
+                        except Exception:
+                            logger.debug("search_tools.%s: selection cache write failed", provider_name, exc_info=True)
                 requested = _normalize_requested_selection(
                     parsed_calls["tools"],
                     available_names,
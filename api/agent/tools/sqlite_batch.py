@@ -1,5 +1,6 @@
 import json
 import logging
+import math
 import os
 import platform
 import re
@@ -7,6 +8,7 @@ import sqlite3
 import subprocess
 import sys
 import tempfile
+import time
 from collections import deque
 from dataclasses import dataclass
 from typing import Any, Dict, List, Optional, TYPE_CHECKING
@@ -23,6 +25,15 @@ from .sqlite_guardrails import (
     stop_query_timer,
 )
 from .sqlite_autocorrect import build_cte_column_candidates, build_sqlglot_candidates
+from .sqlite_batch_pool import (
+    RETIRE_FIELD,
+    SERVE_FLAG,
+    SqliteBatchWorkerError,
+    SqliteBatchWorkerTimeout,
+    get_sqlite_batch_worker_pool,
+    read_frame,
+    write_frame,
+)
 from .sqlite_query_quality import build_tool_result_query_advisories
 from .sqlite_recovery import (
     SQLITE_RECOVERY_NOTICE,
@@ -31,13 +42,18 @@ from .sqlite_recovery import (
     SQLiteStateUnrecoverableError,
     protect_current_sqlite_state,
 )
-from .sqlite_state import AGENT_CONFIG_TABLE, EPHEMERAL_TABLES, _sqlite_db_path_var  # type: ignore
+from .sqlite_state import AGENT_CONFIG_TABLE, EPHEMERAL_TABLES, TOOL_RESULTS_TABLE, _sqlite_db_path_var  # type: ignore
 
 if TYPE_CHECKING:
     from ...models import PersistentAgent
 
 MAX_RESULT_ROWS = 100
 MAX_RESULT_BYTES = 8000
+RESULT_FETCH_BATCH_ROWS = 16
+# Rows past this many retained bytes are counted, not kept; results are trimmed to MAX_RESULT_BYTES later.
+RESULT_RETAIN_BYTES = MAX_RESULT_BYTES * 8
+# Rows are only counted this far; larger results report "more than" this many.
+RESULT_COUNT_MAX_ROWS = 10_000
 WARN_RESULT_ROWS = 50
 MAX_AUTO_CORRECTION_ATTEMPTS = 8
 MAX_AUTO_CORRECTION_CANDIDATES = 20
@@ -57,6 +73,10 @@ DEFAULT_SQLITE_BATCH_CPU_SECONDS = 30
 DEFAULT_SQLITE_BATCH_MEMORY_MB = 256
 DEFAULT_SQLITE_BATCH_TERMINATE_GRACE_SECONDS = 1.0
 DEFAULT_SQLITE_BATCH_KILL_GRACE_SECONDS = 1.0
+# Idle pre-started workers kept per process; 0 runs every batch in a fresh interpreter.
+DEFAULT_SQLITE_BATCH_WORKER_POOL_SIZE = 2
+# Batches served by one pooled worker before it is recycled.
+DEFAULT_SQLITE_BATCH_WORKER_MAX_CALLS = 100
 CONFIG_PATCH_NOT_PERSISTED_ERROR = "config_patch_not_persisted"
 CONFIG_PATCH_NOT_PERSISTED_MESSAGE = (
     "Query not executed: patch_text(...) was not assigned back to the same durable config field. "
@@ -150,13 +170,21 @@ def _resolve_sqlite_batch_limits() -> _SqliteBatchLimits:
     )
 
 
-def _apply_resource_limits(limits: _SqliteBatchLimits) -> None:
+def _apply_resource_limits(limits: _SqliteBatchLimits, *, cpu_hard_seconds: Optional[int] = None) -> None:
+    """Apply worker rlimits.
+
+    Pooled workers pass a larger ``cpu_hard_seconds`` ceiling so the soft CPU
+    limit can be re-armed per batch with ``_arm_cpu_limit``.
+    """
     if resource is None:
         return
 
     if limits.cpu_seconds > 0:
         try:
-            resource.setrlimit(resource.RLIMIT_CPU, (limits.cpu_seconds, limits.cpu_seconds))
+            resource.setrlimit(
+                resource.RLIMIT_CPU,
+                (limits.cpu_seconds, cpu_hard_seconds or limits.cpu_seconds),
+            )
         except Exception:
             logger.debug("Failed to set sqlite_batch CPU limit", exc_info=True)
 
@@ -179,6 +207,25 @@ def _apply_resource_limits(limits: _SqliteBatchLimits) -> None:
                     )
 
 
+def _arm_cpu_limit(cpu_seconds: int) -> None:
+    """Give the next batch in a pooled worker its own CPU budget.
+
+    RLIMIT_CPU counts process lifetime CPU, so the soft limit is moved to the
+    CPU already consumed plus one batch worth; breaching it kills the worker.
+    """
+    if resource is None or cpu_seconds <= 0:
+        return
+    try:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        _soft, hard = resource.getrlimit(resource.RLIMIT_CPU)
+        soft = math.ceil(usage.ru_utime + usage.ru_stime) + cpu_seconds
+        if hard != resource.RLIM_INFINITY:
+            soft = min(soft, hard)
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+    except Exception:
+        logger.debug("Failed to re-arm sqlite_batch CPU limit", exc_info=True)
+
+
 def _should_skip_memory_limits_for_virtualapple_emulation() -> bool:
     machine = platform.machine().lower()
     if machine not in {"x86_64", "amd64"}:
@@ -1618,14 +1665,19 @@ def _execute_with_autocorrections(
             cur.execute(f"SAVEPOINT {savepoint}")
             cur.execute(current_query, bindings)
             if cur.description is not None:
-                columns = [col[0] for col in cur.description]
-                rows = [dict(zip(columns, row)) for row in cur.fetchall()]
-                original_count = len(rows)
-                rows, limit_warning = _enforce_result_limits(rows, current_query)
+                rows, original_count = _stream_result_rows(cur)
+                rows, limit_warning = _enforce_result_limits(
+                    rows,
+                    current_query,
+                    total_rows=original_count,
+                )
                 reporting_note = _row_url_reporting_note(rows)
                 result_entry: Dict[str, Any] = {
                     "result": rows,
-                    "message": f"Query {idx} returned {original_count} rows.{limit_warning}{reporting_note}",
+                    "message": (
+                        f"Query {idx} returned {_row_total_label(original_count)} rows."
+                        f"{limit_warning}{reporting_note}"
+                    ),
                 }
                 if reporting_note:
                     result_entry["reporting_note"] = reporting_note.strip()
@@ -1653,6 +1705,8 @@ def _execute_with_autocorrections(
             cur.execute(f"RELEASE SAVEPOINT {savepoint}")
             return result_entry, current_query, corrections, None
         except Exception as orig_exc:
+            if _is_out_of_memory(orig_exc):
+                raise
             last_error_message = consume_patch_text_error() or str(orig_exc)
             last_error_query = current_query
             try:
@@ -1703,6 +1757,11 @@ def _get_error_hint(error_msg: str, sql: str = "") -> str:
         return PATCH_TEXT_USAGE_HINT
     if _has_backslash_quote_issue(error_msg, sql):
         return _sqlite_quote_escape_hint()
+    if "not authorized" in error_lower and TOOL_RESULTS_TABLE in sql.lower():
+        return (
+            f" FIX: {TOOL_RESULTS_TABLE} is read-only. Copy the rows you need into your own table "
+            f"(CREATE TABLE ... AS SELECT ... FROM {TOOL_RESULTS_TABLE}) and change that instead."
+        )
     if "union" in error_lower and "column" in error_lower:
         return " FIX: All SELECTs in UNION/UNION ALL must have the same number of columns."
     if "no column named" in error_lower or "no such column" in error_lower:
@@ -1773,13 +1832,84 @@ def _get_error_hint(error_msg: str, sql: str = "") -> str:
     return ""
 
 
-def _enforce_result_limits(rows: List[Dict[str, Any]], query: str) -> tuple[List[Dict[str, Any]], str]:
+class _ClippedText(str):
+    """Head and tail of an oversized cell that remembers the original UTF-8 size."""
+
+    original_bytes: int
+
+
+def _clip_result_cell(value: Any) -> Any:
+    """Bound a cell while streaming so huge values never stay resident.
+
+    Keeps MAX_RESULT_BYTES of head and tail, more than the final shrink can ever
+    use, so the shrunk output (including its omitted-byte count) is unchanged.
+    """
+    if isinstance(value, bytes) and len(value) > MAX_RESULT_BYTES:
+        return f"[binary value omitted: {len(value)} bytes]"
+    # A character is at most four UTF-8 bytes, so short strings skip encoding.
+    if not isinstance(value, str) or len(value) * 4 <= MAX_RESULT_BYTES * 2:
+        return value
+    raw = value.encode("utf-8")
+    if len(raw) <= MAX_RESULT_BYTES * 2:
+        return value
+    clipped = _ClippedText(
+        raw[:MAX_RESULT_BYTES].decode("utf-8", "ignore")
+        + raw[-MAX_RESULT_BYTES:].decode("utf-8", "ignore")
+    )
+    clipped.original_bytes = len(raw)
+    return clipped
+
+
+def _stream_result_rows(cur: sqlite3.Cursor) -> tuple[List[Dict[str, Any]], int]:
+    """Keep at most MAX_RESULT_ROWS rows (about RESULT_RETAIN_BYTES) and count the rest.
+
+    Rows past the budget are stepped in small batches and dropped without being
+    converted to dicts or clipped. Counting stops after RESULT_COUNT_MAX_ROWS
+    rows, so a huge result costs a bounded number of steps; the total is then
+    RESULT_COUNT_MAX_ROWS + 1, which ``_row_total_label`` reports as a lower bound.
+
+    Returns (retained_rows, total_row_count).
+    """
+    columns = [col[0] for col in cur.description]
+    rows: List[Dict[str, Any]] = []
+    retained_bytes = 0
+    while len(rows) < MAX_RESULT_ROWS and retained_bytes < RESULT_RETAIN_BYTES:
+        raw_row = cur.fetchone()
+        if raw_row is None:
+            return rows, len(rows)
+        row = {column: _clip_result_cell(value) for column, value in zip(columns, raw_row)}
+        rows.append(row)
+        retained_bytes += sum(len(value) if isinstance(value, (str, bytes)) else 8 for value in row.values())
+
+    total_rows = len(rows)
+    while total_rows <= RESULT_COUNT_MAX_ROWS:
+        batch = cur.fetchmany(RESULT_FETCH_BATCH_ROWS)
+        if not batch:
+            return rows, total_rows
+        total_rows += len(batch)
+    return rows, RESULT_COUNT_MAX_ROWS + 1
+
+
+def _row_total_label(total_rows: int) -> str:
+    if total_rows > RESULT_COUNT_MAX_ROWS:
+        return f"more than {RESULT_COUNT_MAX_ROWS}"
+    return str(total_rows)
+
+
+def _enforce_result_limits(
+    rows: List[Dict[str, Any]],
+    query: str,
+    *,
+    total_rows: Optional[int] = None,
+) -> tuple[List[Dict[str, Any]], str]:
     """Enforce context protection limits on query results.
 
-    Returns (limited_rows, warning_message).
+    ``total_rows`` is the full result size when ``rows`` was already capped
+    while streaming. Returns (limited_rows, warning_message).
     """
     warning = ""
-    total_rows = len(rows)
+    if total_rows is None:
+        total_rows = len(rows)
 
     # Check if query already has LIMIT
     query_upper = query.upper()
@@ -1788,7 +1918,7 @@ def _enforce_result_limits(rows: List[Dict[str, Any]], query: str) -> tuple[List
     # Hard cap on rows
     if total_rows > MAX_RESULT_ROWS:
         rows = rows[:MAX_RESULT_ROWS]
-        warning = f" [!] TRUNCATED: {total_rows} rows -> {MAX_RESULT_ROWS}. Add LIMIT to your query."
+        warning = f" [!] TRUNCATED: {_row_total_label(total_rows)} rows -> {MAX_RESULT_ROWS}. Add LIMIT to your query."
 
     # Check byte size. The old row-only reduction stopped at ten rows, so a
     # handful of raw result_text cells could still inject hundreds of KB.
@@ -1803,7 +1933,7 @@ def _enforce_result_limits(rows: List[Dict[str, Any]], query: str) -> tuple[List
             coverage = (
                 f"all {total_rows} rows preserved; oversized cells shortened"
                 if len(rows) == total_rows
-                else f"{total_rows} rows -> {len(rows)}"
+                else f"{_row_total_label(total_rows)} rows -> {len(rows)}"
             )
             warning = (
                 f" [!] TRUNCATED: {coverage} within the result byte limit. "
@@ -1814,16 +1944,17 @@ def _enforce_result_limits(rows: List[Dict[str, Any]], query: str) -> tuple[List
 
     # Warn about missing LIMIT even if not truncated
     if not warning and total_rows > WARN_RESULT_ROWS and not has_limit:
-        warning = f" [!] Large result ({total_rows} rows). Consider adding LIMIT for efficiency."
+        warning = f" [!] Large result ({_row_total_label(total_rows)} rows). Consider adding LIMIT for efficiency."
 
     return rows, warning
 
 
 def _truncate_utf8_head_tail(value: str, max_bytes: int) -> str:
     raw = value.encode("utf-8")
-    if len(raw) <= max_bytes:
+    original_bytes = getattr(value, "original_bytes", len(raw))
+    if original_bytes <= max_bytes:
         return value
-    marker = f"\n...[{len(raw) - max_bytes} bytes omitted]...\n".encode("utf-8")
+    marker = f"\n...[{original_bytes - max_bytes} bytes omitted]...\n".encode("utf-8")
     if len(marker) >= max_bytes:
         return raw[:max_bytes].decode("utf-8", "ignore")
     kept = max_bytes - len(marker)
@@ -2071,12 +2202,126 @@ def _normalize_named_bindings(params: Dict[str, Any]) -> tuple[dict[str, object]
     return bindings, None
 
 
+def _limits_payload(limits: _SqliteBatchLimits) -> Dict[str, Any]:
+    return {
+        "wall_timeout_seconds": limits.wall_timeout_seconds,
+        "cpu_seconds": limits.cpu_seconds,
+        "memory_mb": limits.memory_mb,
+        "query_timeout_seconds": limits.query_timeout_seconds,
+    }
+
+
+def _limits_from_payload(limits_dict: Dict[str, Any]) -> _SqliteBatchLimits:
+    return _SqliteBatchLimits(
+        wall_timeout_seconds=limits_dict.get("wall_timeout_seconds", DEFAULT_SQLITE_BATCH_WALL_TIMEOUT_SECONDS),
+        cpu_seconds=limits_dict.get("cpu_seconds", DEFAULT_SQLITE_BATCH_CPU_SECONDS),
+        memory_mb=limits_dict.get("memory_mb", DEFAULT_SQLITE_BATCH_MEMORY_MB),
+        query_timeout_seconds=limits_dict.get("query_timeout_seconds", DEFAULT_SQLITE_BATCH_WALL_TIMEOUT_SECONDS),
+    )
+
+
 def _run_sqlite_batch_in_subprocess(
     *,
     agent_id: str,
     params: Dict[str, Any],
     db_path: str,
     limits: _SqliteBatchLimits,
+) -> Dict[str, Any]:
+    """Run SQLite batch in an isolated worker process.
+
+    Uses the per-process pool of pre-started workers unless it is disabled with
+    SQLITE_BATCH_WORKER_POOL_SIZE=0.
+    """
+    pool_size = max(
+        0,
+        _coerce_int(
+            _get_setting_value("SQLITE_BATCH_WORKER_POOL_SIZE"),
+            DEFAULT_SQLITE_BATCH_WORKER_POOL_SIZE,
+        ),
+    )
+    if pool_size == 0:
+        return _run_sqlite_batch_in_fresh_subprocess(
+            agent_id=agent_id,
+            params=params,
+            db_path=db_path,
+            limits=limits,
+        )
+    max_calls = max(
+        1,
+        _coerce_int(
+            _get_setting_value("SQLITE_BATCH_WORKER_MAX_CALLS"),
+            DEFAULT_SQLITE_BATCH_WORKER_MAX_CALLS,
+        ),
+    )
+    return _run_sqlite_batch_in_pooled_worker(
+        agent_id=agent_id,
+        params=params,
+        db_path=db_path,
+        limits=limits,
+        pool_size=pool_size,
+        max_calls=max_calls,
+    )
+
+
+def _run_sqlite_batch_in_pooled_worker(
+    *,
+    agent_id: str,
+    params: Dict[str, Any],
+    db_path: str,
+    limits: _SqliteBatchLimits,
+    pool_size: int,
+    max_calls: int,
+) -> Dict[str, Any]:
+    """Run SQLite batch on a pre-started worker, recycling it on any failure.
+
+    The wall timeout covers the whole round-trip, including worker startup when
+    no warm worker was available.
+    """
+    pool = get_sqlite_batch_worker_pool()
+    limits_payload = dict(_limits_payload(limits), max_calls=max_calls)
+    deadline = time.monotonic() + limits.wall_timeout_seconds
+    try:
+        worker = pool.checkout(limits_payload, pool_size=pool_size)
+    except Exception as exc:
+        logger.exception("Failed to start sqlite_batch worker")
+        return {"status": "error", "message": f"SQLite batch failed to start: {exc}"}
+
+    try:
+        result = worker.request(
+            {"agent_id": agent_id, "params": params, "db_path": db_path},
+            deadline=deadline,
+        )
+    except SqliteBatchWorkerTimeout:
+        pool.discard(worker)
+        timeout_label = f"{limits.wall_timeout_seconds:g}"
+        logger.warning("SQLite batch timed out for agent %s after %s seconds", agent_id, timeout_label)
+        return {"status": "error", "message": f"SQLite batch timed out after {timeout_label} seconds."}
+    except SqliteBatchWorkerError as exc:
+        pool.discard(worker)
+        returncode = worker.returncode
+        if returncode is not None and returncode < 0:
+            return {"status": "error", "message": f"SQLite batch terminated by signal {-returncode}."}
+        if returncode:
+            return {"status": "error", "message": f"SQLite batch failed: exit code {returncode}"}
+        logger.error("sqlite_batch worker failed for agent %s: %s", agent_id, exc)
+        return {"status": "error", "message": f"SQLite batch failed: {exc}"}
+    except Exception as exc:
+        pool.discard(worker)
+        logger.exception("Failed to run sqlite_batch worker")
+        return {"status": "error", "message": f"SQLite batch failed to start: {exc}"}
+
+    pool.checkin(worker, pool_size=pool_size, max_calls=max_calls)
+    if not isinstance(result, dict):
+        return {"status": "error", "message": "SQLite batch failed: invalid result format"}
+    return result
+
+
+def _run_sqlite_batch_in_fresh_subprocess(
+    *,
+    agent_id: str,
+    params: Dict[str, Any],
+    db_path: str,
+    limits: _SqliteBatchLimits,
 ) -> Dict[str, Any]:
     """Run SQLite batch in a subprocess using subprocess.Popen.
 
@@ -2087,12 +2332,7 @@ def _run_sqlite_batch_in_subprocess(
         "agent_id": agent_id,
         "params": params,
         "db_path": db_path,
-        "limits": {
-            "wall_timeout_seconds": limits.wall_timeout_seconds,
-            "cpu_seconds": limits.cpu_seconds,
-            "memory_mb": limits.memory_mb,
-            "query_timeout_seconds": limits.query_timeout_seconds,
-        },
+        "limits": _limits_payload(limits),
     }
 
     # Write payload to temp file (safer than piping large payloads)
@@ -2152,6 +2392,13 @@ def _run_sqlite_batch_in_subprocess(
             pass
 
 
+def _is_out_of_memory(exc: BaseException) -> bool:
+    """MemoryError (e.g. from RLIMIT_AS) or an SQLite allocation failure."""
+    if isinstance(exc, MemoryError):
+        return True
+    return isinstance(exc, sqlite3.Error) and "out of memory" in str(exc).lower()
+
+
 def _execute_sqlite_batch_inner(
     *,
     agent_id: str,
@@ -2188,7 +2435,12 @@ def _execute_sqlite_batch_inner(
     all_corrections: List[str] = []
 
     try:
-        conn = open_guarded_sqlite_connection(db_path, timeout_seconds=query_timeout_seconds)
+        # __tool_results is diff-synced from the agent's steps by row digest; agent writes would desync it.
+        conn = open_guarded_sqlite_connection(
+            db_path,
+            timeout_seconds=query_timeout_seconds,
+            read_only_tables=(TOOL_RESULTS_TABLE,),
+        )
         cur = conn.cursor()
         try:
             cur.execute("PRAGMA busy_timeout = 2000;")
@@ -2331,6 +2583,9 @@ def _execute_sqlite_batch_inner(
 
         return response
     except Exception as outer:
+        if _is_out_of_memory(outer):
+            # The worker entry points must see this to retire the process.
+            raise
         if conn is not None:
             conn.rollback()
         return {"status": "error", "message": f"SQLite batch failed: {outer}"}
@@ -2517,13 +2772,7 @@ def _subprocess_worker_main() -> None:
         sys.exit(1)
 
     # Reconstruct limits dataclass from dict
-    limits_dict = payload.get("limits", {})
-    limits = _SqliteBatchLimits(
-        wall_timeout_seconds=limits_dict.get("wall_timeout_seconds", DEFAULT_SQLITE_BATCH_WALL_TIMEOUT_SECONDS),
-        cpu_seconds=limits_dict.get("cpu_seconds", DEFAULT_SQLITE_BATCH_CPU_SECONDS),
-        memory_mb=limits_dict.get("memory_mb", DEFAULT_SQLITE_BATCH_MEMORY_MB),
-        query_timeout_seconds=limits_dict.get("query_timeout_seconds", DEFAULT_SQLITE_BATCH_WALL_TIMEOUT_SECONDS),
-    )
+    limits = _limits_from_payload(payload.get("limits", {}))
 
     # Apply resource limits (CPU time, memory)
     _apply_resource_limits(limits)
@@ -2542,5 +2791,60 @@ def _subprocess_worker_main() -> None:
     print(json.dumps(result))
 
 
+def _serve_worker_main() -> None:
+    """Entry point for a pooled worker: serve framed batches until stdin closes."""
+    limits_dict = json.loads(sys.argv[2]) if len(sys.argv) > 2 else {}
+    limits = _limits_from_payload(limits_dict)
+    max_calls = max(1, _coerce_int(limits_dict.get("max_calls"), DEFAULT_SQLITE_BATCH_WORKER_MAX_CALLS))
+
+    # Keep the protocol stream private: anything else printed goes to stderr.
+    requests_in = os.fdopen(os.dup(sys.stdin.fileno()), "rb", buffering=0)
+    responses_out = os.fdopen(os.dup(sys.stdout.fileno()), "wb", buffering=0)
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    _apply_resource_limits(
+        limits,
+        cpu_hard_seconds=limits.cpu_seconds * (max_calls + 1) if limits.cpu_seconds > 0 else None,
+    )
+    write_frame(responses_out, {"ready": True})
+
+    while True:
+        request = read_frame(requests_in)
+        if request is None:
+            return
+        _arm_cpu_limit(limits.cpu_seconds)
+        out_of_memory = False
+        try:
+            result = _execute_sqlite_batch_inner(
+                agent_id=request.get("agent_id", "unknown"),
+                params=request.get("params", {}),
+                db_path=request.get("db_path", ""),
+                query_timeout_seconds=limits.query_timeout_seconds,
+            )
+        except Exception as exc:
+            out_of_memory = _is_out_of_memory(exc)
+            result = {"status": "error", "message": f"SQLite batch failed: {exc}"}
+        if out_of_memory:
+            # A failed allocation can leave the allocator or SQLite's caches in a bad
+            # state; answer this call, then exit so the pool starts a fresh worker.
+            result = {
+                "status": "error",
+                "message": "SQLite batch failed: out of memory. Select fewer rows or columns.",
+                RETIRE_FIELD: True,
+            }
+        try:
+            write_frame(responses_out, result)
+        except (TypeError, ValueError) as exc:
+            write_frame(
+                responses_out,
+                {"status": "error", "message": f"SQLite batch failed: {exc}", RETIRE_FIELD: out_of_memory},
+            )
+        if out_of_memory:
+            return
+
+
 if __name__ == "__main__":
-    _subprocess_worker_main()
+    if len(sys.argv) > 1 and sys.argv[1] == SERVE_FLAG:
+        _serve_worker_main()
+    else:
+        _subprocess_worker_main()
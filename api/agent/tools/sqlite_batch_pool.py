@@ -0,0 +1,254 @@
+"""
+Pre-warmed worker processes for sqlite_batch.
+
+Each worker is ``python -m api.agent.tools.sqlite_batch --serve`` with the
+batch resource limits applied at startup. Requests and responses travel over
+the worker's stdin/stdout as length-prefixed JSON frames. A worker is reused
+for up to ``max_calls`` batches and discarded on any timeout, crash, signal,
+out-of-memory or protocol error, so a limit breach never leaks into a later call.
+"""
+
+import atexit
+import json
+import logging
+import os
+import selectors
+import struct
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, BinaryIO, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+_FRAME_HEADER = struct.Struct(">I")
+MAX_FRAME_BYTES = 256 * 1024 * 1024
+SERVE_FLAG = "--serve"
+# Set on a response when the worker exits after sending it (e.g. it ran out of memory).
+RETIRE_FIELD = "_worker_retiring"
+
+
+class SqliteBatchWorkerError(RuntimeError):
+    """The worker could not complete the request and must be discarded."""
+
+
+class SqliteBatchWorkerTimeout(SqliteBatchWorkerError):
+    pass
+
+
+def encode_frame(message: Dict[str, Any]) -> bytes:
+    body = json.dumps(message, separators=(",", ":")).encode("utf-8")
+    return _FRAME_HEADER.pack(len(body)) + body
+
+
+def write_frame(stream: BinaryIO, message: Dict[str, Any]) -> None:
+    stream.write(encode_frame(message))
+    stream.flush()
+
+
+def read_frame(stream: BinaryIO) -> Optional[Dict[str, Any]]:
+    """Blocking frame read used inside the worker; None means the parent hung up."""
+    header = _read_exact_blocking(stream, _FRAME_HEADER.size)
+    if header is None:
+        return None
+    (length,) = _FRAME_HEADER.unpack(header)
+    if length > MAX_FRAME_BYTES:
+        raise ValueError(f"sqlite_batch frame too large: {length} bytes")
+    body = _read_exact_blocking(stream, length)
+    if body is None:
+        return None
+    return json.loads(body.decode("utf-8"))
+
+
+def _read_exact_blocking(stream: BinaryIO, size: int) -> Optional[bytes]:
+    chunks = []
+    remaining = size
+    while remaining:
+        chunk = stream.read(remaining)
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+class SqliteBatchWorker:
+    def __init__(self, limits_payload: Dict[str, Any]):
+        self.limits_payload = limits_payload
+        self.calls = 0
+        self.ready = False
+        self.retiring = False
+        self.process = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "api.agent.tools.sqlite_batch",
+                SERVE_FLAG,
+                json.dumps(limits_payload),
+            ],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            bufsize=0,
+            close_fds=True,
+        )
+
+    @property
+    def returncode(self) -> Optional[int]:
+        return self.process.poll()
+
+    def request(self, message: Dict[str, Any], *, deadline: float) -> Dict[str, Any]:
+        if not self.ready:
+            ready = self._read_frame(deadline)
+            if not ready.get("ready"):
+                raise SqliteBatchWorkerError("SQLite batch worker sent an invalid handshake.")
+            self.ready = True
+        try:
+            self.process.stdin.write(encode_frame(message))
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError) as exc:
+            raise SqliteBatchWorkerError(f"SQLite batch worker pipe closed: {exc}") from exc
+        response = self._read_frame(deadline)
+        self.calls += 1
+        if response.pop(RETIRE_FIELD, False):
+            self.retiring = True
+        return response
+
+    def _read_frame(self, deadline: float) -> Dict[str, Any]:
+        header = self._read_exact(_FRAME_HEADER.size, deadline)
+        (length,) = _FRAME_HEADER.unpack(header)
+        if length > MAX_FRAME_BYTES:
+            raise SqliteBatchWorkerError(f"SQLite batch worker frame too large: {length} bytes")
+        body = self._read_exact(length, deadline)
+        try:
+            return json.loads(body.decode("utf-8"))
+        except (UnicodeDecodeError, json.JSONDecodeError) as exc:
+            raise SqliteBatchWorkerError("SQLite batch failed: invalid result format") from exc
+
+    def _read_exact(self, size: int, deadline: float) -> bytes:
+        stdout = self.process.stdout
+        chunks = []
+        remaining = size
+        with selectors.DefaultSelector() as selector:
+            selector.register(stdout, selectors.EVENT_READ)
+            while remaining:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0 or not selector.select(timeout):
+                    raise SqliteBatchWorkerTimeout("SQLite batch worker timed out.")
+                chunk = os.read(stdout.fileno(), min(remaining, 1024 * 1024))
+                if not chunk:
+                    raise SqliteBatchWorkerError("SQLite batch worker exited before responding.")
+                chunks.append(chunk)
+                remaining -= len(chunk)
+        return b"".join(chunks)
+
+    def close(self, *, kill: bool = False, terminate_grace: float = 1.0, kill_grace: float = 1.0) -> None:
+        process = self.process
+        if process.poll() is None:
+            try:
+                if kill:
+                    process.terminate()
+                else:
+                    process.stdin.close()
+                process.wait(timeout=terminate_grace)
+            except (subprocess.TimeoutExpired, OSError):
+                process.kill()
+                try:
+                    process.wait(timeout=kill_grace)
+                except subprocess.TimeoutExpired:
+                    logger.warning("SQLite batch worker %s did not exit after SIGKILL", process.pid)
+        for stream in (process.stdin, process.stdout):
+            try:
+                if stream is not None:
+                    stream.close()
+            except OSError:
+                pass
+
+
+class SqliteBatchWorkerPool:
+    """Per-process pool of idle, pre-started sqlite_batch workers."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._idle: list[SqliteBatchWorker] = []
+        self._owner_pid = os.getpid()
+        self.spawned = 0
+        self.reused = 0
+
+    def checkout(self, limits_payload: Dict[str, Any], *, pool_size: int) -> SqliteBatchWorker:
+        stale: list[SqliteBatchWorker] = []
+        worker = None
+        with self._lock:
+            self._reset_after_fork()
+            while self._idle:
+                candidate = self._idle.pop()
+                if candidate.limits_payload != limits_payload or candidate.returncode is not None:
+                    stale.append(candidate)
+                    continue
+                worker = candidate
+                self.reused += 1
+                break
+        for candidate in stale:
+            candidate.close(kill=True)
+        if worker is None:
+            worker = self._spawn(limits_payload)
+        self._prewarm(limits_payload, pool_size=pool_size)
+        return worker
+
+    def checkin(self, worker: SqliteBatchWorker, *, pool_size: int, max_calls: int) -> None:
+        if worker.retiring or worker.calls >= max_calls or worker.returncode is not None:
+            worker.close()
+            return
+        with self._lock:
+            if os.getpid() == self._owner_pid and len(self._idle) < pool_size:
+                self._idle.append(worker)
+                return
+        worker.close()
+
+    def discard(self, worker: SqliteBatchWorker) -> None:
+        worker.close(kill=True)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            workers, self._idle = self._idle, []
+            owned = os.getpid() == self._owner_pid
+        if owned:
+            for worker in workers:
+                worker.close(kill=True)
+
+    def _spawn(self, limits_payload: Dict[str, Any]) -> SqliteBatchWorker:
+        worker = SqliteBatchWorker(limits_payload)
+        with self._lock:
+            self.spawned += 1
+        return worker
+
+    def _prewarm(self, limits_payload: Dict[str, Any], *, pool_size: int) -> None:
+        """Start one spare in the background when no idle worker is left."""
+        with self._lock:
+            if self._idle or pool_size <= 0:
+                return
+        try:
+            worker = self._spawn(limits_payload)
+        except OSError:
+            logger.warning("Failed to pre-start sqlite_batch worker", exc_info=True)
+            return
+        with self._lock:
+            if len(self._idle) < pool_size:
+                # Insert at the bottom so warm, already-used workers are reused first.
+                self._idle.insert(0, worker)
+                return
+        worker.close(kill=True)
+
+    def _reset_after_fork(self) -> None:
+        # Forked children inherit the parent's pipes; never reuse or signal them.
+        if os.getpid() != self._owner_pid:
+            self._idle = []
+            self._owner_pid = os.getpid()
+
+
+_pool = SqliteBatchWorkerPool()
+atexit.register(_pool.shutdown)
+
+
+def get_sqlite_batch_worker_pool() -> SqliteBatchWorkerPool:
+    return _pool
@@ -8,7 +8,7 @@ import re
 import sqlite3
 import time
 from contextvars import ContextVar
-from typing import Optional
+from typing import Iterable, Optional
 
 from ..core.csv_utils import build_csv_sample, detect_csv_dialect, normalize_csv_text, read_csv_rows
 
@@ -1082,6 +1082,16 @@ _BLOCKED_PRAGMAS = {
     "temp_store_directory",
 }
 
+# Row and schema writes, mapped to the authorizer argument that names the table.
+_TABLE_WRITE_ACTIONS = {
+    sqlite3.SQLITE_INSERT: 0,
+    sqlite3.SQLITE_UPDATE: 0,
+    sqlite3.SQLITE_DELETE: 0,
+    sqlite3.SQLITE_DROP_TABLE: 0,
+    sqlite3.SQLITE_ALTER_TABLE: 1,
+    sqlite3.SQLITE_CREATE_TRIGGER: 1,
+}
+
 _VACUUM_PATTERN = re.compile(
     r"^\s*(?:EXPLAIN\s+(?:QUERY\s+PLAN\s+)?)?VACUUM\b",
     re.IGNORECASE,
@@ -1272,11 +1282,15 @@ def open_guarded_sqlite_connection(
     *,
     timeout_seconds: float = 30.0,
     allow_attach: bool = False,
+    read_only_tables: Iterable[str] = (),
 ) -> sqlite3.Connection:
     """Open a SQLite connection with guardrails against host file access.
 
     allow_attach should only be used for internal maintenance where VACUUM is required.
+    read_only_tables names system-managed tables whose rows and schema this
+    connection may read but not change.
     """
+    protected_tables = {table.lower() for table in read_only_tables}
     conn = sqlite3.connect(db_path)
     try:
         conn.execute("PRAGMA temp_store = MEMORY;")
@@ -1303,6 +1317,9 @@ def open_guarded_sqlite_connection(
     ) -> int:
         if allow_attach and action_code in {sqlite3.SQLITE_ATTACH, sqlite3.SQLITE_DETACH}:
             return sqlite3.SQLITE_OK
+        table_arg = _TABLE_WRITE_ACTIONS.get(action_code)
+        if table_arg is not None and ((param1, param2)[table_arg] or "").lower() in protected_tables:
+            return _deny_action(action_code, param1, param2)
         return _sqlite_authorizer(action_code, param1, param2, db_name, trigger_name)
 
     try:
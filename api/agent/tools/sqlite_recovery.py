@@ -5,7 +5,7 @@ import os
 import shutil
 import sqlite3
 import time
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Optional
 
 from opentelemetry import trace
@@ -19,6 +19,8 @@ from api.utils.sqlite_files import (
     validate_sqlite_file,
 )
 
+from .sqlite_state_delta import SQLiteDeltaState
+
 logger = logging.getLogger(__name__)
 tracer = trace.get_tracer("gobii.utils")
 
@@ -49,6 +51,11 @@ class SQLiteStateSession:
     checkpoint_path: str
     recovery_count: int = 0
     checkpoint_signature: Optional[tuple] = None
+    # Hash and archive size of the canonical stored copy, when known, so an
+    # unchanged candidate can skip recompression and upload.
+    persisted_sha256: Optional[str] = None
+    persisted_archive_bytes: int = 0
+    delta_state: SQLiteDeltaState = field(default_factory=SQLiteDeltaState)
 
     def initialize(self) -> None:
         initialize_sqlite_file(self.db_path)
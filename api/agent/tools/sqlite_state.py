@@ -47,6 +47,32 @@ from .sqlite_recovery import (
     reset_sqlite_state_session,
     set_sqlite_state_session,
 )
+from .sqlite_state_cache import (
+    SQLiteStateCacheEntry,
+    copy_cached_sqlite_state,
+    evict_cached_sqlite_state,
+    get_cached_sqlite_state,
+    sqlite_file_sha256,
+    sqlite_state_cache_enabled,
+    storage_generation,
+    store_cached_sqlite_state,
+)
+from .sqlite_state_delta import (
+    SQLITE_DELTA_COMPACT_AFTER,
+    SQLITE_DELTA_MAX_CHAIN,
+    SQLITE_DELTA_MAX_RATIO,
+    SQLiteDeltaError,
+    SQLiteDeltaManifest,
+    SQLiteDeltaState,
+    SQLitePageFingerprint,
+    apply_sqlite_page_delta,
+    sqlite_delta_manifest_key,
+    sqlite_delta_persistence_enabled,
+    sqlite_delta_quarantine_key,
+    sqlite_delta_storage_key,
+    sqlite_page_fingerprint,
+    write_sqlite_page_delta,
+)
 from . import sqlite_analysis, sqlite_digest
 
 logger = logging.getLogger(__name__)
@@ -112,6 +138,8 @@ JSON_HINT_THRESHOLD = 0.2
 CSV_DETECTION_THRESHOLD = 0.4
 SQLITE_RESTORE_SUBPROCESS_TIMEOUT_SECONDS = 120
 SQLITE_RECOVERY_SUBPROCESS_TIMEOUT_SECONDS = 120
+# A delta chain error is retried once with a freshly read manifest before the restore fails.
+SQLITE_DELTA_RESTORE_ATTEMPTS = 2
 
 _JSON_START_RE = re.compile(r"^\s*[\[{]")
 _CSV_DELIMS = [",", "\t", "|", ";"]
@@ -371,7 +399,7 @@ def _truncate_text(text: str, max_chars: int) -> str:
 
 def _redact_tool_results_schema(create_stmt: str) -> str:
     cleaned = re.sub(
-        r"\blegacy_result_id\s+TEXT\s*,?",
+        r"\b(?:legacy_result_id|row_digest)\s+TEXT\s*,?",
         "",
         create_stmt,
         flags=re.IGNORECASE,
@@ -1102,22 +1130,27 @@ def sqlite_quarantine_storage_key(agent_uuid: str) -> str:
     return f"{sqlite_storage_key(agent_uuid)}.corrupt"
 
 
-def _decompress_sqlite_archive_in_subprocess(archive_path: str, db_path: str) -> None:
+def _decompress_sqlite_archive_in_subprocess(archive_path: str, db_path: str) -> str:
     """Decompress an archive in a child process to isolate native crashes.
 
     If zstandard/native code crashes (e.g., SIGSEGV), only the child dies and
-    the parent worker can safely fall back to a fresh SQLite DB.
+    the parent worker can safely fall back to a fresh SQLite DB. Returns the
+    SHA-256 of the decompressed bytes, hashed while they are written.
     """
     child_code = (
-        "import shutil\n"
+        "import hashlib\n"
         "import sys\n"
         "import zstandard as zstd\n"
         "src = sys.argv[1]\n"
         "dst = sys.argv[2]\n"
+        "digest = hashlib.sha256()\n"
         "with open(src, 'rb') as fsrc:\n"
         "    dctx = zstd.ZstdDecompressor()\n"
         "    with dctx.stream_reader(fsrc) as reader, open(dst, 'wb') as fdst:\n"
-        "        shutil.copyfileobj(reader, fdst)\n"
+        "        for chunk in iter(lambda: reader.read(1 << 20), b''):\n"
+        "            digest.update(chunk)\n"
+        "            fdst.write(chunk)\n"
+        "sys.stdout.write(digest.hexdigest())\n"
     )
     try:
         proc = subprocess.run(
@@ -1133,7 +1166,7 @@ def _decompress_sqlite_archive_in_subprocess(archive_path: str, db_path: str) ->
         ) from exc
 
     if proc.returncode == 0:
-        return
+        return (proc.stdout or "").strip()
 
     stderr = (proc.stderr or "").strip()
     stdout = (proc.stdout or "").strip()
@@ -1211,17 +1244,45 @@ def _quarantine_sqlite_archive(
     )
 
 
-def _restore_sqlite_db_from_storage(storage_key: str, db_path: str, agent_uuid: str) -> bool:
-    """Restore persisted SQLite DB, returning True when restore succeeds."""
+def _restore_sqlite_db_from_storage(
+    storage_key: str,
+    db_path: str,
+    agent_uuid: str,
+    *,
+    manifest: Optional[SQLiteDeltaManifest] = None,
+) -> tuple[bool, bool, Optional[SQLitePageFingerprint]]:
+    """Restore persisted SQLite DB plus any delta chain.
+
+    Returns ``(restored, clean, fingerprint)``; ``clean`` is False when the DB
+    had to be salvaged and therefore no longer matches the canonical stored
+    bytes. ``fingerprint`` is the head state's page fingerprint when a delta
+    chain was replayed, so callers need not hash the file again.
+    """
     archive_path = db_path + ".restore.zst"
     try:
         with default_storage.open(storage_key, "rb") as src, open(archive_path, "wb") as dst:
             shutil.copyfileobj(src, dst)
 
         try:
-            _decompress_sqlite_archive_in_subprocess(archive_path, db_path)
+            base_sha256 = _decompress_sqlite_archive_in_subprocess(archive_path, db_path)
             validate_sqlite_file(db_path)
-            return True
+            fingerprint = None
+            if manifest is not None and manifest.deltas:
+                fingerprint = _apply_sqlite_state_deltas(db_path, manifest, agent_uuid, base_sha256=base_sha256)
+                validate_sqlite_file(db_path)
+            return True, True, fingerprint
+        except SQLiteDeltaError:
+            # The base is intact; salvaging it here would let the next persist write a
+            # full base over the unapplied deltas, so the caller recovers the chain instead.
+            logger.error(
+                "Failed to apply persisted SQLite delta chain for agent %s; preserving canonical state.",
+                agent_uuid,
+                exc_info=True,
+            )
+            remove_sqlite_sidecars(db_path)
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(db_path)
+            raise
         except (RuntimeError, SQLiteStateValidationError, zstd.ZstdError) as exc:
             _quarantine_sqlite_archive(archive_path, agent_uuid=agent_uuid)
             if os.path.exists(db_path) and _recover_sqlite_db_in_subprocess(
@@ -1240,7 +1301,7 @@ def _restore_sqlite_db_from_storage(storage_key: str, db_path: str, agent_uuid:
                     source="api.agent.tools.sqlite_state._restore_sqlite_db_from_storage",
                     message=f"SQLite restore salvaged corrupt state for agent {agent_uuid}",
                 )
-                return True
+                return True, False, None
 
             remove_sqlite_sidecars(db_path)
             try:
@@ -1260,7 +1321,7 @@ def _restore_sqlite_db_from_storage(storage_key: str, db_path: str, agent_uuid:
                 "starting from a validated empty database after quarantine.",
                 agent_uuid,
             )
-            return False
+            return False, False, None
     except OSError:
         logger.error(
             "Failed to read persisted SQLite state for agent %s; preserving canonical state.",
@@ -1276,6 +1337,210 @@ def _restore_sqlite_db_from_storage(storage_key: str, db_path: str, agent_uuid:
             logger.debug("Failed to clean up restore archive for agent %s", agent_uuid, exc_info=True)
 
 
+def _apply_sqlite_delta_object(db_path: str, delta_key: str) -> None:
+    delta_archive_path = db_path + ".delta.zst"
+    delta_path = db_path + ".delta"
+    try:
+        try:
+            with default_storage.open(delta_key, "rb") as src, open(delta_archive_path, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+        except FileNotFoundError as exc:
+            raise SQLiteDeltaError(f"SQLite delta {delta_key} is missing") from exc
+        try:
+            _decompress_sqlite_archive_in_subprocess(delta_archive_path, delta_path)
+        except (RuntimeError, zstd.ZstdError) as exc:
+            raise SQLiteDeltaError(f"SQLite delta {delta_key} could not be decompressed") from exc
+        apply_sqlite_page_delta(db_path, delta_path)
+    finally:
+        for path in (delta_archive_path, delta_path):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+
+
+def _apply_sqlite_state_deltas(
+    db_path: str,
+    manifest: SQLiteDeltaManifest,
+    agent_uuid: str,
+    *,
+    base_sha256: str,
+) -> Optional[SQLitePageFingerprint]:
+    """Replay the manifest's delta chain onto a freshly restored base.
+
+    Returns the head's page fingerprint, or None when the manifest is stale.
+    """
+    if base_sha256 != manifest.base_sha256:
+        # A full base was published after this manifest; the base already holds
+        # every change the stale chain describes.
+        logger.warning(
+            "Ignoring stale SQLite delta manifest for agent %s (%s deltas).",
+            agent_uuid,
+            len(manifest.deltas),
+        )
+        return None
+
+    for delta_key in manifest.delta_keys:
+        _apply_sqlite_delta_object(db_path, delta_key)
+
+    fingerprint = sqlite_page_fingerprint(db_path)
+    if fingerprint.sha256 != manifest.head_sha256:
+        raise SQLiteDeltaError("SQLite delta chain did not reproduce the recorded head state")
+    return fingerprint
+
+
+def _recover_sqlite_delta_chain(
+    storage_key: str,
+    db_path: str,
+    agent_uuid: str,
+    manifest: SQLiteDeltaManifest,
+    exc: SQLiteDeltaError,
+) -> tuple[bool, bool, Optional[SQLitePageFingerprint], Optional[SQLiteDeltaManifest]]:
+    """Quarantine a broken delta chain and restore the base plus its longest valid prefix.
+
+    The broken manifest is kept under a quarantine key, next to the delta
+    objects it references. The live manifest is rewritten to the verified
+    prefix, so the stored state matches what this restore returns and later
+    restores and compactions stop failing on the same chain.
+    """
+    tmp_dir = os.path.dirname(db_path)
+    quarantine_path = os.path.join(tmp_dir, "state.manifest.corrupt.json")
+    try:
+        with open(quarantine_path, "w", encoding="utf-8") as quarantine_file:
+            quarantine_file.write(manifest.to_json())
+        _upload_sqlite_archive(sqlite_delta_quarantine_key(storage_key), quarantine_path)
+    finally:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(quarantine_path)
+
+    restored, clean, _fingerprint = _restore_sqlite_db_from_storage(storage_key, db_path, agent_uuid)
+    prefix = None
+    if restored and clean:
+        prefix = SQLiteDeltaManifest(
+            base_sha256=manifest.base_sha256,
+            head_sha256=manifest.base_sha256,
+            page_size=manifest.page_size,
+        )
+        good_path = db_path + ".prefix"
+        try:
+            for entry in manifest.deltas:
+                shutil.copyfile(db_path, good_path)
+                try:
+                    _apply_sqlite_delta_object(db_path, entry["key"])
+                    applied = sqlite_file_sha256(db_path) == entry["sha256"]
+                except SQLiteDeltaError:
+                    applied = False
+                if not applied:
+                    os.replace(good_path, db_path)
+                    break
+                prefix = prefix.with_delta(
+                    key=entry["key"],
+                    sha256=entry["sha256"],
+                    archive_bytes=entry["bytes"],
+                    pages=entry["pages"],
+                )
+        finally:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(good_path)
+        validate_sqlite_file(db_path)
+
+    if prefix is not None and prefix.deltas:
+        _write_sqlite_delta_manifest(storage_key, prefix, tmp_dir)
+    else:
+        default_storage.delete(sqlite_delta_manifest_key(storage_key))
+        prefix = None
+
+    dropped = len(manifest.deltas) - (len(prefix.deltas) if prefix is not None else 0)
+    logger.error(
+        "Quarantined broken SQLite delta chain for agent %s; dropped %s of %s deltas.",
+        agent_uuid,
+        dropped,
+        len(manifest.deltas),
+    )
+    _log_sqlite_persistence_error(
+        agent_uuid,
+        exc,
+        recovered=restored,
+        error_code="sqlite_restore_delta_chain_truncated",
+        source="api.agent.tools.sqlite_state._recover_sqlite_delta_chain",
+        message=f"SQLite restore dropped {dropped} unreadable delta(s) for agent {agent_uuid}",
+    )
+    fingerprint = sqlite_page_fingerprint(db_path) if restored and clean else None
+    return restored, clean, fingerprint, prefix
+
+
+def _read_sqlite_delta_manifest(storage_key: str) -> Optional[SQLiteDeltaManifest]:
+    manifest_key = sqlite_delta_manifest_key(storage_key)
+    if not default_storage.exists(manifest_key):
+        return None
+    with default_storage.open(manifest_key, "rb") as manifest_file:
+        raw = manifest_file.read()
+    try:
+        return SQLiteDeltaManifest.from_json(raw)
+    except SQLiteDeltaError:
+        logger.error("Ignoring unreadable SQLite delta manifest %s", manifest_key, exc_info=True)
+        return None
+
+
+def _write_sqlite_delta_manifest(storage_key: str, manifest: SQLiteDeltaManifest, tmp_dir: str) -> None:
+    manifest_path = os.path.join(tmp_dir, "state.manifest.json")
+    try:
+        with open(manifest_path, "w", encoding="utf-8") as manifest_file:
+            manifest_file.write(manifest.to_json())
+        _upload_sqlite_archive(sqlite_delta_manifest_key(storage_key), manifest_path)
+    finally:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(manifest_path)
+
+
+def _delete_sqlite_delta_chain(storage_key: str, manifest: Optional[SQLiteDeltaManifest]) -> None:
+    """Best-effort removal of a superseded manifest and its delta objects."""
+    if manifest is None:
+        return
+    for key in [sqlite_delta_manifest_key(storage_key), *manifest.delta_keys]:
+        try:
+            default_storage.delete(key)
+        except Exception:  # noqa: BLE001 - a leftover chain is ignored once the base changes.
+            logger.warning("Failed to delete superseded SQLite delta object %s", key, exc_info=True)
+
+
+def _sqlite_state_generation(
+    base_generation: Optional[str],
+    manifest: Optional[SQLiteDeltaManifest],
+) -> Optional[str]:
+    if base_generation is None or manifest is None:
+        return base_generation
+    return f"{base_generation}|{manifest.head_sha256}:{len(manifest.deltas)}"
+
+
+def _schedule_sqlite_state_compaction(agent_uuid: str) -> None:
+    from api.agent.tasks.sqlite_state_compaction import compact_agent_sqlite_state_task
+
+    try:
+        compact_agent_sqlite_state_task.delay(str(agent_uuid))
+    except Exception:  # noqa: BLE001 - compaction retries on the next persisted delta.
+        logger.warning("Failed to schedule SQLite delta compaction for agent %s", agent_uuid, exc_info=True)
+
+
+def compact_agent_sqlite_state(agent_uuid: str) -> bool:
+    """Fold an agent's delta chain into a new full base archive.
+
+    Returns True when a compaction was written.
+    """
+    from api.services.agent_sqlite_coordination import agent_sqlite_execution
+
+    with agent_sqlite_execution(agent_uuid), tempfile.TemporaryDirectory() as tmp_dir:
+        _db_path, session = _restore_agent_sqlite_db(agent_uuid, tmp_dir)
+        manifest = session.delta_state.manifest
+        if manifest is None or not manifest.deltas:
+            return False
+        _persist_validated_sqlite_state(
+            session=session,
+            storage_key=sqlite_storage_key(agent_uuid),
+            tmp_dir=tmp_dir,
+            force_full=True,
+        )
+        return True
+
+
 @contextlib.contextmanager
 def agent_sqlite_db(agent_uuid: str):  # noqa: D401 – simple generator context mgr
     """Coordinate restore, access, maintenance, and persistence for an agent DB."""
@@ -1303,27 +1568,120 @@ def _restore_agent_sqlite_db(agent_uuid: str, tmp_dir: str) -> tuple[str, SQLite
 
     with tracer.start_as_current_span("Restore Agent SQLite State") as restore_span:
         restored = False
+        cache_hit = False
+        persisted_sha256 = None
+        persisted_archive_bytes = 0
+        restored_fingerprint = None
+        delta_state = SQLiteDeltaState()
         if default_storage.exists(storage_key):
-            restored = _restore_sqlite_db_from_storage(storage_key, db_path, agent_uuid)
+            for attempt in range(1, SQLITE_DELTA_RESTORE_ATTEMPTS + 1):
+                base_generation, persisted_archive_bytes = storage_generation(default_storage, storage_key)
+                manifest = _read_sqlite_delta_manifest(storage_key)
+                if manifest is not None:
+                    persisted_archive_bytes += sum(entry["bytes"] for entry in manifest.deltas)
+                    restore_span.set_attribute("sqlite.delta.chain_length", len(manifest.deltas))
+                delta_state = SQLiteDeltaState(base_generation=base_generation, manifest=manifest)
+                generation = _sqlite_state_generation(base_generation, manifest)
+                cached = get_cached_sqlite_state(agent_uuid, generation)
+                clean = False
+                if cached is not None and _restore_sqlite_db_from_cache(cached, db_path):
+                    restored = cache_hit = clean = True
+                    persisted_sha256 = cached.sha256 or None
+                    restore_span.set_attribute("sqlite.cache.bytes_saved", cached.archive_bytes)
+                else:
+                    try:
+                        restored, clean, restored_fingerprint = _restore_sqlite_db_from_storage(
+                            storage_key,
+                            db_path,
+                            agent_uuid,
+                            manifest=manifest,
+                        )
+                    except SQLiteDeltaError as exc:
+                        # The chain may have been compacted away between reading the manifest
+                        # and fetching its deltas; re-read both before giving up on it.
+                        if attempt < SQLITE_DELTA_RESTORE_ATTEMPTS:
+                            logger.warning(
+                                "Retrying SQLite restore for agent %s after a delta chain error.",
+                                agent_uuid,
+                                exc_info=True,
+                            )
+                            continue
+                        restored, clean, restored_fingerprint, manifest = _recover_sqlite_delta_chain(
+                            storage_key,
+                            db_path,
+                            agent_uuid,
+                            manifest,
+                            exc,
+                        )
+                        persisted_archive_bytes -= sum(entry["bytes"] for entry in delta_state.manifest.deltas)
+                        if manifest is not None:
+                            persisted_archive_bytes += sum(entry["bytes"] for entry in manifest.deltas)
+                        delta_state = SQLiteDeltaState(base_generation=base_generation, manifest=manifest)
+                        generation = _sqlite_state_generation(base_generation, manifest)
+                break
+            if restored and clean:
+                if sqlite_delta_persistence_enabled():
+                    delta_state.fingerprint = restored_fingerprint or sqlite_page_fingerprint(db_path)
+                    persisted_sha256 = delta_state.fingerprint.sha256
+                elif restored_fingerprint is not None:
+                    persisted_sha256 = restored_fingerprint.sha256
+                elif persisted_sha256 is None and sqlite_state_cache_enabled():
+                    persisted_sha256 = sqlite_file_sha256(db_path)
+                if not cache_hit and persisted_sha256 is not None:
+                    store_cached_sqlite_state(
+                        agent_uuid,
+                        source_path=db_path,
+                        generation=generation,
+                        sha256=persisted_sha256,
+                        archive_bytes=persisted_archive_bytes,
+                    )
+        else:
+            evict_cached_sqlite_state(agent_uuid)
         session = SQLiteStateSession(
             agent_uuid=agent_uuid,
             db_path=db_path,
             checkpoint_path=checkpoint_path,
+            persisted_sha256=persisted_sha256,
+            persisted_archive_bytes=persisted_archive_bytes,
+            delta_state=delta_state,
         )
         if not restored:
             session.initialize()
         session.checkpoint(phase="initial_restore")
         restore_span.set_attribute("sqlite.restored", restored)
+        restore_span.set_attribute("sqlite.cache.enabled", sqlite_state_cache_enabled())
+        restore_span.set_attribute("sqlite.cache.hit", cache_hit)
         if os.path.exists(db_path):
             restore_span.set_attribute("sqlite.restored_bytes", os.path.getsize(db_path))
     return db_path, session
 
 
+def _restore_sqlite_db_from_cache(entry: SQLiteStateCacheEntry, db_path: str) -> bool:
+    """Copy a worker-cached DB into place, falling back to storage on any doubt."""
+    if not copy_cached_sqlite_state(entry, db_path):
+        return False
+    try:
+        validate_sqlite_file(db_path)
+    except SQLiteStateValidationError:
+        logger.warning(
+            "Discarding invalid cached SQLite state for agent %s",
+            entry.agent_uuid,
+            exc_info=True,
+        )
+        evict_cached_sqlite_state(entry.agent_uuid)
+        remove_sqlite_sidecars(db_path)
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(db_path)
+        return False
+    return True
+
+
 @contextlib.contextmanager
 def _agent_sqlite_db_uncoordinated(agent_uuid: str):
     """Context manager that restores/persists the per-agent SQLite DB.
 
-    1. Downloads, decompresses, and validates the DB from object storage.
+    1. Downloads, decompresses, and validates the DB from object storage, or
+       copies the worker-local cached copy when it matches the stored generation.
     2. Yields the on-disk path to the SQLite file in a temporary directory.
     3. On exit, snapshots the DB, performs maintenance on that copy, validates
        it, and uploads without a delete window unless the existing 100MB wipe applies.
@@ -1393,9 +1751,11 @@ def _persist_validated_sqlite_state(
     session: SQLiteStateSession,
     storage_key: str,
     tmp_dir: str,
+    force_full: bool = False,
 ) -> None:
     candidate_path = os.path.join(tmp_dir, "state.persist.db")
     archive_path = os.path.join(tmp_dir, "state.persist.db.zst")
+    delta_path = os.path.join(tmp_dir, "state.persist.delta")
     with tracer.start_as_current_span("Persist Agent SQLite State") as persist_span:
         started_at = time.monotonic()
         try:
@@ -1416,6 +1776,45 @@ def _persist_validated_sqlite_state(
                 )
                 if default_storage.exists(storage_key):
                     default_storage.delete(storage_key)
+                _delete_sqlite_delta_chain(storage_key, session.delta_state.manifest)
+                session.delta_state = SQLiteDeltaState()
+                evict_cached_sqlite_state(session.agent_uuid)
+                return
+
+            delta_state = session.delta_state
+            fingerprint = None
+            candidate_sha256 = None
+            if sqlite_delta_persistence_enabled() and delta_state.fingerprint is not None:
+                fingerprint = sqlite_page_fingerprint(candidate_path)
+                candidate_sha256 = fingerprint.sha256
+            elif session.persisted_sha256 or sqlite_state_cache_enabled():
+                candidate_sha256 = sqlite_file_sha256(candidate_path)
+            if (
+                not force_full
+                and candidate_sha256 is not None
+                and candidate_sha256 == session.persisted_sha256
+            ):
+                # The canonical archive already holds these exact bytes.
+                persist_span.set_attribute("sqlite.cache.upload_skipped", True)
+                persist_span.set_attribute("sqlite.cache.bytes_saved", session.persisted_archive_bytes)
+                persist_span.set_attribute("sqlite.persistence.ok", True)
+                return
+
+            if (
+                not force_full
+                and fingerprint is not None
+                and _persist_sqlite_delta(
+                    session=session,
+                    storage_key=storage_key,
+                    candidate_path=candidate_path,
+                    fingerprint=fingerprint,
+                    delta_path=delta_path,
+                    archive_path=archive_path,
+                    tmp_dir=tmp_dir,
+                    persist_span=persist_span,
+                )
+            ):
+                persist_span.set_attribute("sqlite.persistence.ok", True)
                 return
 
             cctx = zstd.ZstdCompressor(level=3)
@@ -1425,8 +1824,29 @@ def _persist_validated_sqlite_state(
             # Opening the canonical key for writing lets overwrite-capable backends replace it
             # without a delete window. GCS publishes the new generation only after upload.
             _upload_sqlite_archive(storage_key, archive_path)
+            # The new base supersedes any delta chain; restore ignores a chain whose
+            # base hash no longer matches, so cleanup failures are harmless.
+            _delete_sqlite_delta_chain(storage_key, delta_state.manifest)
+            persist_span.set_attribute("sqlite.cache.upload_skipped", False)
+            persist_span.set_attribute("sqlite.delta.used", False)
             persist_span.set_attribute("sqlite.persistence.ok", True)
-        except (OSError, RuntimeError, sqlite3.Error, SQLiteStateError, zstd.ZstdError) as exc:
+            archive_bytes = os.path.getsize(archive_path)
+            persist_span.set_attribute("sqlite.persist_upload_bytes", archive_bytes)
+            session.persisted_sha256 = candidate_sha256
+            session.persisted_archive_bytes = archive_bytes
+            generation = None
+            if candidate_sha256 is not None:
+                generation, _stored_bytes = storage_generation(default_storage, storage_key)
+            session.delta_state = SQLiteDeltaState(base_generation=generation, fingerprint=fingerprint)
+            if candidate_sha256 is not None:
+                store_cached_sqlite_state(
+                    session.agent_uuid,
+                    source_path=candidate_path,
+                    generation=generation,
+                    sha256=candidate_sha256,
+                    archive_bytes=archive_bytes,
+                )
+        except (OSError, RuntimeError, sqlite3.Error, SQLiteDeltaError, SQLiteStateError, zstd.ZstdError) as exc:
             persist_span.set_attribute("sqlite.persistence.ok", False)
             if not isinstance(exc, SQLiteStatePersistenceError):
                 persist_span.set_attribute("sqlite.validation.ok", False)
@@ -1441,13 +1861,85 @@ def _persist_validated_sqlite_state(
                 "sqlite.persist_duration_ms",
                 int(round((time.monotonic() - started_at) * 1000)),
             )
-            for path in (candidate_path, archive_path):
+            for path in (candidate_path, archive_path, delta_path):
                 try:
                     os.remove(path)
                 except FileNotFoundError:
                     pass
 
 
+def _persist_sqlite_delta(
+    *,
+    session: SQLiteStateSession,
+    storage_key: str,
+    candidate_path: str,
+    fingerprint: SQLitePageFingerprint,
+    delta_path: str,
+    archive_path: str,
+    tmp_dir: str,
+    persist_span,
+) -> bool:
+    """Append a page delta to the chain; False means a full base should be written."""
+    delta_state = session.delta_state
+    previous = delta_state.fingerprint
+    manifest = delta_state.manifest or SQLiteDeltaManifest(
+        base_sha256=previous.sha256,
+        head_sha256=previous.sha256,
+        page_size=previous.page_size,
+    )
+    if manifest.head_sha256 != previous.sha256 or len(manifest.deltas) >= SQLITE_DELTA_MAX_CHAIN:
+        return False
+
+    changed_pages = write_sqlite_page_delta(candidate_path, fingerprint, previous, delta_path)
+    if changed_pages is None:
+        return False
+    if os.path.getsize(delta_path) > os.path.getsize(candidate_path) * SQLITE_DELTA_MAX_RATIO:
+        return False
+
+    cctx = zstd.ZstdCompressor(level=3)
+    with open(delta_path, "rb") as source, open(archive_path, "wb") as archive:
+        cctx.copy_stream(source, archive)
+    archive_bytes = os.path.getsize(archive_path)
+
+    delta_key = sqlite_delta_storage_key(storage_key)
+    _upload_sqlite_archive(delta_key, archive_path)
+    manifest = manifest.with_delta(
+        key=delta_key,
+        sha256=fingerprint.sha256,
+        archive_bytes=archive_bytes,
+        pages=changed_pages,
+    )
+    try:
+        # The manifest write is the commit point for the new delta.
+        _write_sqlite_delta_manifest(storage_key, manifest, tmp_dir)
+    except SQLiteStatePersistenceError:
+        with contextlib.suppress(Exception):
+            default_storage.delete(delta_key)
+        raise
+
+    persist_span.set_attribute("sqlite.delta.used", True)
+    persist_span.set_attribute("sqlite.delta.pages", changed_pages)
+    persist_span.set_attribute("sqlite.delta.chain_length", len(manifest.deltas))
+    persist_span.set_attribute("sqlite.persist_upload_bytes", archive_bytes)
+    session.persisted_sha256 = fingerprint.sha256
+    session.persisted_archive_bytes += archive_bytes
+    session.delta_state = SQLiteDeltaState(
+        base_generation=delta_state.base_generation,
+        manifest=manifest,
+        fingerprint=fingerprint,
+    )
+    store_cached_sqlite_state(
+        session.agent_uuid,
+        source_path=candidate_path,
+        generation=_sqlite_state_generation(delta_state.base_generation, manifest),
+        sha256=fingerprint.sha256,
+        archive_bytes=session.persisted_archive_bytes,
+    )
+    if len(manifest.deltas) >= SQLITE_DELTA_COMPACT_AFTER:
+        _schedule_sqlite_state_compaction(session.agent_uuid)
+    return True
+
+
 def _upload_sqlite_archive(storage_key: str, archive_path: str) -> None:
     try:
         if default_storage.exists(storage_key):
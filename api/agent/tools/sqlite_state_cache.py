@@ -0,0 +1,220 @@
+"""
+Worker-local cache of restored persistent agent SQLite databases.
+
+Entries are keyed by agent id and the storage generation of the canonical
+archive, so a run landing on the same worker can reuse the last restored or
+persisted copy instead of downloading and decompressing the archive again.
+The cache directory is shared by every process on the worker and bounded by
+total bytes with least-recently-used eviction.
+"""
+
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from django.conf import settings
+from django.core.files.storage import Storage
+
+logger = logging.getLogger(__name__)
+
+_DB_SUFFIX = ".db"
+_META_SUFFIX = ".json"
+_HASH_CHUNK_BYTES = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class SQLiteStateCacheEntry:
+    agent_uuid: str
+    generation: str
+    sha256: str
+    archive_bytes: int
+    db_path: str
+
+
+def sqlite_state_cache_enabled() -> bool:
+    return bool(getattr(settings, "AGENT_SQLITE_STATE_CACHE_ENABLED", False)) and (
+        _max_cache_bytes() > 0
+    )
+
+
+def _cache_dir() -> str:
+    configured = getattr(settings, "AGENT_SQLITE_STATE_CACHE_DIR", "") or ""
+    return configured or os.path.join(tempfile.gettempdir(), "gobii-agent-sqlite-cache")
+
+
+def _max_cache_bytes() -> int:
+    return int(getattr(settings, "AGENT_SQLITE_STATE_CACHE_MAX_BYTES", 0) or 0)
+
+
+def _entry_paths(agent_uuid: str) -> tuple[str, str]:
+    base = os.path.join(_cache_dir(), str(agent_uuid).replace(os.sep, "_"))
+    return base + _DB_SUFFIX, base + _META_SUFFIX
+
+
+def sqlite_file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as source:
+        for chunk in iter(lambda: source.read(_HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def storage_generation(storage: Storage, storage_key: str) -> tuple[Optional[str], int]:
+    """Return a cheap identifier for the stored archive version and its size.
+
+    Size plus modification time changes with every upload on the object stores
+    we use; backends that cannot report either simply disable cache reuse.
+    """
+    try:
+        size = int(storage.size(storage_key))
+        modified_at = storage.get_modified_time(storage_key)
+    except (NotImplementedError, OSError, ValueError):
+        return None, 0
+    except Exception:  # noqa: BLE001 - storage backends expose provider-specific errors.
+        logger.debug("Failed to read storage generation for %s", storage_key, exc_info=True)
+        return None, 0
+    if modified_at is None:
+        return None, size
+    return f"{size}:{modified_at.isoformat()}", size
+
+
+def get_cached_sqlite_state(agent_uuid: str, generation: Optional[str]) -> Optional[SQLiteStateCacheEntry]:
+    """Return the cache entry for ``agent_uuid`` when it matches ``generation``."""
+    if not generation or not sqlite_state_cache_enabled():
+        return None
+    db_path, meta_path = _entry_paths(agent_uuid)
+    try:
+        with open(meta_path, "r", encoding="utf-8") as meta_file:
+            meta = json.load(meta_file)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError):
+        evict_cached_sqlite_state(agent_uuid)
+        return None
+
+    if meta.get("generation") != generation or not os.path.exists(db_path):
+        return None
+    with contextlib.suppress(OSError):
+        os.utime(meta_path)
+    return SQLiteStateCacheEntry(
+        agent_uuid=str(agent_uuid),
+        generation=generation,
+        sha256=str(meta.get("sha256") or ""),
+        archive_bytes=int(meta.get("archive_bytes") or 0),
+        db_path=db_path,
+    )
+
+
+def copy_cached_sqlite_state(entry: SQLiteStateCacheEntry, destination_path: str) -> bool:
+    """Copy a cached database into a run directory; False means treat as a miss."""
+    try:
+        shutil.copyfile(entry.db_path, destination_path)
+    except OSError:
+        logger.debug("Cached SQLite state for agent %s disappeared before copy", entry.agent_uuid)
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(destination_path)
+        return False
+    return True
+
+
+def store_cached_sqlite_state(
+    agent_uuid: str,
+    *,
+    source_path: str,
+    generation: Optional[str],
+    sha256: str,
+    archive_bytes: int,
+) -> None:
+    """Publish ``source_path`` as the cached copy of ``generation``.
+
+    Best-effort: cache failures never affect restore or persistence.
+    """
+    if not sqlite_state_cache_enabled():
+        return
+    if not generation:
+        evict_cached_sqlite_state(agent_uuid)
+        return
+    try:
+        if os.path.getsize(source_path) > _max_cache_bytes():
+            evict_cached_sqlite_state(agent_uuid)
+            return
+        cache_dir = _cache_dir()
+        os.makedirs(cache_dir, exist_ok=True)
+        db_path, meta_path = _entry_paths(agent_uuid)
+        # Drop the old metadata first so readers never pair it with new bytes.
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(meta_path)
+
+        stage_descriptor, stage_path = tempfile.mkstemp(prefix=".stage-", dir=cache_dir)
+        os.close(stage_descriptor)
+        try:
+            shutil.copyfile(source_path, stage_path)
+            os.replace(stage_path, db_path)
+        finally:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(stage_path)
+
+        meta_descriptor, meta_stage_path = tempfile.mkstemp(prefix=".stage-", dir=cache_dir)
+        try:
+            with os.fdopen(meta_descriptor, "w", encoding="utf-8") as meta_file:
+                json.dump(
+                    {
+                        "generation": generation,
+                        "sha256": sha256,
+                        "archive_bytes": int(archive_bytes),
+                        "stored_at": time.time(),
+                    },
+                    meta_file,
+                )
+            os.replace(meta_stage_path, meta_path)
+        finally:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(meta_stage_path)
+    except OSError:
+        logger.warning("Failed to cache SQLite state for agent %s", agent_uuid, exc_info=True)
+        evict_cached_sqlite_state(agent_uuid)
+        return
+    _evict_to_limit()
+
+
+def evict_cached_sqlite_state(agent_uuid: str) -> None:
+    for path in reversed(_entry_paths(agent_uuid)):
+        with contextlib.suppress(FileNotFoundError, OSError):
+            os.remove(path)
+
+
+def _evict_to_limit() -> None:
+    """Remove least-recently-used entries until the cache fits its byte budget."""
+    cache_dir = _cache_dir()
+    entries: list[tuple[float, int, str]] = []
+    total_bytes = 0
+    try:
+        names = os.listdir(cache_dir)
+    except OSError:
+        return
+    for name in names:
+        if not name.endswith(_META_SUFFIX) or name.startswith("."):
+            continue
+        agent_key = name[: -len(_META_SUFFIX)]
+        try:
+            last_used = os.path.getmtime(os.path.join(cache_dir, name))
+            size = os.path.getsize(os.path.join(cache_dir, agent_key + _DB_SUFFIX))
+        except OSError:
+            continue
+        entries.append((last_used, size, agent_key))
+        total_bytes += size
+
+    max_bytes = _max_cache_bytes()
+    entries.sort()
+    for _last_used, size, agent_key in entries:
+        if total_bytes <= max_bytes:
+            break
+        evict_cached_sqlite_state(agent_key)
+        total_bytes -= size
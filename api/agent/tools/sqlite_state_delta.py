@@ -0,0 +1,215 @@
+"""
+Page-level delta format for persistent agent SQLite state.
+
+A persisted agent DB is a full base archive plus an optional chain of page
+deltas described by a small JSON manifest. Each delta holds only the pages
+whose hashes changed since the previous persisted state, so runs that touch a
+few rows of a large, mostly static database upload kilobytes instead of the
+whole file. Storage I/O lives in ``sqlite_state``; this module only knows the
+formats.
+"""
+
+import hashlib
+import json
+import os
+import struct
+import uuid
+from dataclasses import dataclass, field, replace
+from typing import Optional
+
+from django.conf import settings
+
+from api.utils.sqlite_files import SQLITE_HEADER
+
+# Start compacting in the background at this chain length; above the hard cap
+# persistence writes a full base inline.
+SQLITE_DELTA_COMPACT_AFTER = 8
+SQLITE_DELTA_MAX_CHAIN = 24
+# Deltas larger than this fraction of the database are not worth a chain link.
+SQLITE_DELTA_MAX_RATIO = 0.5
+
+_DELTA_MAGIC = b"GSQLDLT1"
+_DELTA_HEADER = struct.Struct(">8sIII")
+_PAGE_NUMBER = struct.Struct(">I")
+_MANIFEST_VERSION = 1
+
+
+class SQLiteDeltaError(Exception):
+    """A delta chain could not be read or applied; the stored state itself is not corrupt."""
+
+
+@dataclass(frozen=True)
+class SQLitePageFingerprint:
+    page_size: int
+    page_hashes: tuple[bytes, ...]
+    sha256: str
+
+
+@dataclass(frozen=True)
+class SQLiteDeltaManifest:
+    base_sha256: str
+    head_sha256: str
+    page_size: int
+    deltas: tuple[dict, ...] = field(default_factory=tuple)
+
+    def with_delta(self, *, key: str, sha256: str, archive_bytes: int, pages: int) -> "SQLiteDeltaManifest":
+        entry = {"key": key, "sha256": sha256, "bytes": int(archive_bytes), "pages": int(pages)}
+        return replace(self, head_sha256=sha256, deltas=self.deltas + (entry,))
+
+    @property
+    def delta_keys(self) -> list[str]:
+        return [str(entry["key"]) for entry in self.deltas]
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "version": _MANIFEST_VERSION,
+                "base_sha256": self.base_sha256,
+                "head_sha256": self.head_sha256,
+                "page_size": self.page_size,
+                "deltas": list(self.deltas),
+            },
+            separators=(",", ":"),
+        )
+
+    @classmethod
+    def from_json(cls, raw: str | bytes) -> "SQLiteDeltaManifest":
+        try:
+            payload = json.loads(raw)
+            if payload.get("version") != _MANIFEST_VERSION:
+                raise ValueError(f"unsupported manifest version {payload.get('version')!r}")
+            deltas = tuple(
+                {
+                    "key": str(entry["key"]),
+                    "sha256": str(entry["sha256"]),
+                    "bytes": int(entry.get("bytes") or 0),
+                    "pages": int(entry.get("pages") or 0),
+                }
+                for entry in payload.get("deltas") or ()
+            )
+            return cls(
+                base_sha256=str(payload["base_sha256"]),
+                head_sha256=str(payload["head_sha256"]),
+                page_size=int(payload["page_size"]),
+                deltas=deltas,
+            )
+        except (KeyError, TypeError, ValueError, AttributeError) as exc:
+            raise SQLiteDeltaError(f"Invalid SQLite delta manifest: {exc}") from exc
+
+
+@dataclass
+class SQLiteDeltaState:
+    """What the current run knows about the persisted base and delta chain."""
+
+    base_generation: Optional[str] = None
+    manifest: Optional[SQLiteDeltaManifest] = None
+    fingerprint: Optional[SQLitePageFingerprint] = None
+
+
+def sqlite_delta_persistence_enabled() -> bool:
+    return bool(getattr(settings, "AGENT_SQLITE_DELTA_PERSISTENCE_ENABLED", False))
+
+
+def sqlite_delta_manifest_key(storage_key: str) -> str:
+    return f"{storage_key}.manifest.json"
+
+
+def sqlite_delta_quarantine_key(storage_key: str) -> str:
+    """Forensic copy of a delta manifest whose chain could not be replayed."""
+    return f"{sqlite_delta_manifest_key(storage_key)}.corrupt"
+
+
+def sqlite_delta_storage_key(storage_key: str) -> str:
+    # Unique names keep a stale manifest from ever pointing at rewritten bytes.
+    return f"{storage_key}.delta/{uuid.uuid4().hex}.zst"
+
+
+def sqlite_page_size(db_path: str) -> int:
+    with open(db_path, "rb") as db_file:
+        header = db_file.read(100)
+    if len(header) < 18 or not header.startswith(SQLITE_HEADER):
+        raise SQLiteDeltaError("SQLite header is invalid.")
+    page_size = int.from_bytes(header[16:18], "big")
+    return 65536 if page_size == 1 else page_size
+
+
+def sqlite_page_fingerprint(db_path: str) -> SQLitePageFingerprint:
+    """Hash every page of ``db_path`` plus the whole file in a single pass."""
+    page_size = sqlite_page_size(db_path)
+    file_digest = hashlib.sha256()
+    page_hashes = []
+    with open(db_path, "rb") as db_file:
+        while True:
+            page = db_file.read(page_size)
+            if not page:
+                break
+            file_digest.update(page)
+            page_hashes.append(hashlib.blake2b(page, digest_size=16).digest())
+    return SQLitePageFingerprint(
+        page_size=page_size,
+        page_hashes=tuple(page_hashes),
+        sha256=file_digest.hexdigest(),
+    )
+
+
+def write_sqlite_page_delta(
+    db_path: str,
+    current: SQLitePageFingerprint,
+    previous: SQLitePageFingerprint,
+    delta_path: str,
+) -> Optional[int]:
+    """Write the pages of ``db_path`` that differ from ``previous``.
+
+    Returns the number of changed pages, or None when the page size changed and
+    only a full base can describe the new state.
+    """
+    if current.page_size != previous.page_size:
+        return None
+    page_size = current.page_size
+    changed = [
+        page_no
+        for page_no, page_hash in enumerate(current.page_hashes)
+        if page_no >= len(previous.page_hashes) or previous.page_hashes[page_no] != page_hash
+    ]
+    with open(db_path, "rb") as db_file, open(delta_path, "wb") as delta_file:
+        delta_file.write(
+            _DELTA_HEADER.pack(_DELTA_MAGIC, page_size, len(current.page_hashes), len(changed))
+        )
+        for page_no in changed:
+            db_file.seek(page_no * page_size)
+            page = db_file.read(page_size)
+            if len(page) != page_size:
+                raise SQLiteDeltaError(f"Short read for SQLite page {page_no}.")
+            delta_file.write(_PAGE_NUMBER.pack(page_no))
+            delta_file.write(page)
+    return len(changed)
+
+
+def apply_sqlite_page_delta(db_path: str, delta_path: str) -> None:
+    """Replay one decompressed page delta onto ``db_path`` in place."""
+    with open(delta_path, "rb") as delta_file:
+        header = delta_file.read(_DELTA_HEADER.size)
+        if len(header) != _DELTA_HEADER.size:
+            raise SQLiteDeltaError("SQLite delta header is truncated.")
+        magic, page_size, page_count, changed_count = _DELTA_HEADER.unpack(header)
+        if magic != _DELTA_MAGIC:
+            raise SQLiteDeltaError("SQLite delta header is invalid.")
+        if sqlite_page_size(db_path) != page_size:
+            raise SQLiteDeltaError("SQLite delta page size does not match the base database.")
+
+        with open(db_path, "r+b") as db_file:
+            for _ in range(changed_count):
+                raw_page_no = delta_file.read(_PAGE_NUMBER.size)
+                page = delta_file.read(page_size)
+                if len(raw_page_no) != _PAGE_NUMBER.size or len(page) != page_size:
+                    raise SQLiteDeltaError("SQLite delta is truncated.")
+                (page_no,) = _PAGE_NUMBER.unpack(raw_page_no)
+                if page_no >= page_count:
+                    raise SQLiteDeltaError(f"SQLite delta page {page_no} is out of range.")
+                db_file.seek(page_no * page_size)
+                db_file.write(page)
+            db_file.truncate(page_count * page_size)
+            db_file.flush()
+            os.fsync(db_file.fileno())
+        if delta_file.read(1):
+            raise SQLiteDeltaError("SQLite delta has trailing data.")
@@ -0,0 +1,139 @@
+"""
+Local lexical pre-ranking for ``search_tools``.
+
+``search_tools`` used to render every available tool and skill into the prompt
+of its inner LLM call, which gets slow and expensive once an agent has
+thousands of MCP or Pipedream tools. A BM25 index over each entry's name,
+description and parameter names picks a shortlist of likely candidates first,
+so the LLM only reads a few dozen lines.
+
+Indexes are cached per process and keyed by a fingerprint of the documents they
+were built from. When ``mcp_tool_cache`` entries, skills or custom tools change,
+the catalog text changes with them, the fingerprint misses, and a fresh index is
+built on the next search.
+"""
+
+import hashlib
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from typing import Iterable, Sequence
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Name tokens are repeated so a name hit outranks the same word buried in a description.
+NAME_TOKEN_WEIGHT = 3
+MAX_CACHED_INDEXES = 32
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    {
+        "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "for", "from", "get", "how", "i",
+        "in", "into", "is", "it", "me", "my", "need", "of", "on", "or", "some", "that", "the", "this",
+        "to", "use", "want", "with", "you", "your",
+    }
+)
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase ``text``, split on non-alphanumerics (including ``_``) and fold simple plurals."""
+    tokens: list[str] = []
+    for token in _TOKEN_RE.findall((text or "").lower()):
+        if token in _STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+@dataclass(frozen=True)
+class IndexDocument:
+    """One searchable catalog entry."""
+
+    key: str
+    name: str
+    text: str = ""
+
+
+class ToolSearchIndex:
+    """Okapi BM25 over a fixed set of documents."""
+
+    def __init__(self, documents: Sequence[IndexDocument]) -> None:
+        self.keys: tuple[str, ...] = tuple(document.key for document in documents)
+        self._term_frequencies: list[Counter] = []
+        self._postings: dict[str, list[int]] = {}
+        lengths: list[int] = []
+        for position, document in enumerate(documents):
+            tokens = tokenize(document.name) * NAME_TOKEN_WEIGHT + tokenize(document.text)
+            frequencies = Counter(tokens)
+            self._term_frequencies.append(frequencies)
+            lengths.append(len(tokens))
+            for term in frequencies:
+                self._postings.setdefault(term, []).append(position)
+        self._lengths = lengths
+        self._average_length = (sum(lengths) / len(lengths)) if lengths else 0.0
+        count = len(lengths)
+        self._idf = {
+            term: math.log(1 + (count - len(positions) + 0.5) / (len(positions) + 0.5))
+            for term, positions in self._postings.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def search(self, query: str, limit: int) -> list[tuple[str, float]]:
+        """Return up to ``limit`` ``(key, score)`` pairs with a positive score, best first."""
+        if limit <= 0 or not self.keys:
+            return []
+        scores: dict[int, float] = {}
+        average_length = self._average_length or 1.0
+        for term in set(tokenize(query)):
+            positions = self._postings.get(term)
+            if not positions:
+                continue
+            idf = self._idf[term]
+            for position in positions:
+                frequency = self._term_frequencies[position][term]
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[position] / average_length)
+                scores[position] = scores.get(position, 0.0) + idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        return [(self.keys[position], score) for position, score in ranked]
+
+
+def catalog_fingerprint(documents: Iterable[IndexDocument]) -> str:
+    digest = hashlib.sha256()
+    for document in documents:
+        for part in (document.key, document.name, document.text):
+            digest.update(part.encode("utf-8", "replace"))
+            digest.update(b"\x1f")
+        digest.update(b"\x1e")
+    return digest.hexdigest()
+
+
+_index_lock = threading.Lock()
+_indexes: "OrderedDict[str, ToolSearchIndex]" = OrderedDict()
+
+
+def get_tool_search_index(documents: Sequence[IndexDocument]) -> ToolSearchIndex:
+    """Return the cached index for ``documents``, building it if the catalog changed."""
+    fingerprint = catalog_fingerprint(documents)
+    with _index_lock:
+        index = _indexes.get(fingerprint)
+        if index is not None:
+            _indexes.move_to_end(fingerprint)
+            return index
+    index = ToolSearchIndex(documents)
+    with _index_lock:
+        _indexes[fingerprint] = index
+        _indexes.move_to_end(fingerprint)
+        while len(_indexes) > MAX_CACHED_INDEXES:
+            _indexes.popitem(last=False)
+    return index
+
+
+def clear_tool_search_indexes() -> None:
+    with _index_lock:
+        _indexes.clear()
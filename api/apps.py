@@ -53,3 +53,21 @@ class ApiConfig(AppConfig):
             import logging
             logger = logging.getLogger(__name__)
             logger.error(f"Failed to register task_credit_signals: {e}")
+
+        try:
+            from . import credit_usage_signals  # pragma: no cover
+
+            credit_usage_signals.register_credit_usage_ledger_signals()
+        except Exception as e:  # pragma: no cover - optional dependency
+            import logging
+            logger = logging.getLogger(__name__)
+            logger.error(f"Failed to register credit_usage_signals: {e}")
+
+        try:
+            from . import proxy_pool  # pragma: no cover
+
+            proxy_pool.register_proxy_pool_invalidation()
+        except Exception as e:  # pragma: no cover - optional dependency
+            import logging
+            logger = logging.getLogger(__name__)
+            logger.error(f"Failed to register proxy_pool signals: {e}")
@@ -0,0 +1,23 @@
+from django.apps import apps
+from django.db.models.signals import post_save
+
+from api.services.credit_usage_ledger import record_credit_usage
+
+
+def _on_step_saved(sender, instance, created, **kwargs) -> None:
+    if not created or instance.credits_cost is None or not instance.agent_id:
+        return
+    record_credit_usage(instance.agent, instance.credits_cost, at=instance.created_at)
+
+
+def register_credit_usage_ledger_signals() -> None:
+    """
+    Register the signal handler that adds newly charged steps to the rolling credit usage ledger.
+    """
+    PersistentAgentStep = apps.get_model("api", "PersistentAgentStep")
+
+    post_save.connect(
+        _on_step_saved,
+        sender=PersistentAgentStep,
+        dispatch_uid="credit_usage_ledger_step_post_save",
+    )
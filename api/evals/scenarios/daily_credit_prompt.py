@@ -5,7 +5,6 @@ from datetime import timedelta
 from decimal import Decimal
 
 import zstandard as zstd
-from django.core.files.storage import default_storage
 from django.urls import reverse
 from django.utils import timezone
 
@@ -15,6 +14,7 @@ from api.evals.execution import ScenarioExecutionTools
 from api.evals.registry import register_scenario
 from api.models import EvalRunTask, Organization, PersistentAgent, PersistentAgentPromptArchive, PersistentAgentStep, PersistentAgentSystemStep, PersistentAgentToolCall, TaskCredit
 from api.services.daily_credit_settings import DailyCreditSettings
+from api.services.prompt_archives import load_prompt_archive_payload
 from constants.grant_types import GrantTypeChoices
 from constants.plans import PlanNames
 from util.tool_costs import get_default_task_credit_cost
@@ -235,10 +235,10 @@ class DailyCreditPromptScenario(EvalScenario, ScenarioExecutionTools):
             step__isnull=False,
         ).order_by("rendered_at")
         for archive in archives:
+            if not archive.storage_key:
+                continue
             try:
-                with default_storage.open(archive.storage_key, "rb") as handle:
-                    payload = zstd.ZstdDecompressor().decompress(handle.read())
-                data = json.loads(payload.decode("utf-8"))
+                data = load_prompt_archive_payload(archive.storage_key)
             except (OSError, UnicodeDecodeError, json.JSONDecodeError, zstd.ZstdError):
                 continue
             return archive, "\n\n".join(
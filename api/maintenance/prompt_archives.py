@@ -1,12 +1,31 @@
 import logging
+import re
 
 logger = logging.getLogger(__name__)
 
+_BLOCK_ARCHIVE_KEY_RE = re.compile(
+    r"^persistent_agents/(?P<agent_id>[^/]+)/prompt_archives/(?P<day>\d{8})T[^/]*\.blocks\.json\.zst$"
+)
+
+
+def _prune_prompt_blocks(agent_id: str, day: str) -> int:
+    """Delete one agent's prompt blocks for ``day`` once no archive manifest from that day remains."""
+    from api.models import PersistentAgentPromptArchive
+    from api.services.prompt_archives import delete_prompt_blocks_for_day
+
+    if PersistentAgentPromptArchive.objects.filter(
+        agent_id=agent_id,
+        storage_key__startswith=f"persistent_agents/{agent_id}/prompt_archives/{day}T",
+    ).exists():
+        return 0
+    return delete_prompt_blocks_for_day(agent_id, day)
+
 
 def prune_prompt_archives_for_cutoff(cutoff, *, dry_run=False, chunk_size=500):
     """
     Delete prompt archive payloads rendered before the provided cutoff.
 
+    Shared prompt blocks are removed once every archive written on their day is gone.
     Returns (found, deleted) counts to aid logging/metrics.
     """
     from api.models import PersistentAgentPromptArchive
@@ -18,6 +37,7 @@ def prune_prompt_archives_for_cutoff(cutoff, *, dry_run=False, chunk_size=500):
 
     found = 0
     deleted = 0
+    block_days: set[tuple[str, str]] = set()
 
     for archive in queryset.iterator(chunk_size=chunk_size):
         found += 1
@@ -28,5 +48,15 @@ def prune_prompt_archives_for_cutoff(cutoff, *, dry_run=False, chunk_size=500):
             deleted += 1
         except Exception:
             logger.exception("Failed to delete prompt archive %s", archive.id)
+            continue
+        match = _BLOCK_ARCHIVE_KEY_RE.match(archive.storage_key or "")
+        if match:
+            block_days.add((match.group("agent_id"), match.group("day")))
+
+    for agent_id, day in sorted(block_days):
+        try:
+            _prune_prompt_blocks(agent_id, day)
+        except Exception:
+            logger.exception("Failed to prune prompt blocks for agent %s day %s", agent_id, day)
 
     return found, deleted
@@ -1,30 +1,49 @@
 from __future__ import annotations
 
+import asyncio
 import logging
 import os
+import signal
 import socket
-import threading
 import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Dict, Optional
-import signal
+from typing import Callable, Dict, Optional, TypeVar
 
 from django.conf import settings
 from django.core.management.base import BaseCommand
-from django.utils import timezone
 from django.db import close_old_connections
-
-from imapclient import IMAPClient
+from django.utils import timezone
+from pottery import Redlock
 
 from api.models import AgentEmailAccount
-from api.agent.comms.email_oauth import get_oauth_sasl_mechanism, resolve_oauth_identity_and_token
+from api.agent.comms.email_oauth import (
+    build_xoauth2_string,
+    get_oauth_sasl_mechanism,
+    resolve_oauth_identity_and_token,
+)
+from api.agent.comms.imap_idle import AsyncImapSession
 from api.agent.tasks import poll_imap_inbox
+from api.agent.tasks.email_polling import (
+    IMAP_TIMEOUT_SEC,
+    MAX_MESSAGES_PER_ACCOUNT,
+    _parse_last_seen,
+    _update_success,
+    imap_sender_blocked,
+    ingest_imap_message_bytes,
+)
+from api.idle_notifications import QUEUE_KEY
 from config.redis_client import get_redis_client
 
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+_BASE_RETRY_SEC = 5
+_MAX_RETRY_SEC = 300
+
 
 def _runner_id() -> str:
     return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4()}"
@@ -33,12 +52,14 @@ def _runner_id() -> str:
 @dataclass
 class Watcher:
     account_id: str
-    thread: threading.Thread
-    stop: threading.Event
+    stop: asyncio.Event
     lease_key: str
     lease_value: str
     address: Optional[str] = None
     config_sig: Optional[str] = None
+    # Set once the session is authenticated and idling; a watcher that never got there counts as failed.
+    connected: bool = False
+    task: Optional[asyncio.Task] = None
 
 
 def _acct_config_sig(acct: AgentEmailAccount) -> str:
@@ -71,15 +92,28 @@ def _eligible_idle_accounts_queryset():
     )
 
 
+def _load_account(account_id: str) -> Optional[AgentEmailAccount]:
+    return (
+        AgentEmailAccount.objects.select_related("endpoint__owner_agent")
+        .filter(pk=account_id)
+        .first()
+    )
+
+
+def _idle_event_triggered(responses) -> bool:
+    """True when any untagged IDLE response announces new mail (EXISTS/RECENT)."""
+    return any(getattr(resp, "is_new_mail", False) for resp in responses or [])
+
+
 class Command(BaseCommand):
-    help = "Run IMAP IDLE watchers that trigger per-account poll tasks."
+    help = "Run IMAP IDLE watchers that fetch new mail over their own sessions."
 
     def add_arguments(self, parser):
         parser.add_argument(
             "--max",
             type=int,
-            default=getattr(settings, "IMAP_IDLE_MAX_CONNECTIONS", 200),
-            help="Maximum concurrent IDLE watchers in this process.",
+            default=getattr(settings, "IMAP_IDLE_MAX_CONNECTIONS", 2000),
+            help="Maximum concurrent IDLE sessions in this process.",
         )
         parser.add_argument(
             "--scan-interval",
@@ -97,7 +131,7 @@ class Command(BaseCommand):
             "--debounce",
             type=int,
             default=getattr(settings, "IMAP_IDLE_DEBOUNCE_SEC", 10),
-            help="Debounce window for IDLE-triggered poll enqueues (seconds).",
+            help="Debounce window for fallback poll enqueues (seconds).",
         )
         parser.add_argument(
             "--lease-ttl",
@@ -105,343 +139,457 @@ class Command(BaseCommand):
             default=getattr(settings, "IMAP_IDLE_LEASE_TTL_SEC", 60),
             help="Redis lease TTL in seconds (heartbeats refresh this before expiry).",
         )
+        parser.add_argument(
+            "--connect-concurrency",
+            type=int,
+            default=getattr(settings, "IMAP_IDLE_CONNECT_CONCURRENCY", 50),
+            help="Maximum IMAP handshakes in flight at once.",
+        )
 
     def handle(self, *args, **options):
         if not getattr(settings, "IMAP_IDLE_ENABLED", False):
             logger.warning("IMAP_IDLE_ENABLED is False; starting anyway. Set to True to enable by default.")
 
-        max_watchers: int = int(options["max"])  # per process
-        scan_interval: int = int(options["scan_interval"])  # seconds
-        idle_reissue_sec: int = int(options["reissue"])  # seconds
-        debounce_sec: int = int(options["debounce"])  # seconds
-        lease_ttl: int = int(options["lease_ttl"])  # seconds
-
-        redis = get_redis_client()
-        rid = _runner_id()
-        logger.info(
-            "Starting IMAP IDLE runner id=%s max=%d scan=%ds reissue=%ds ttl=%ds",
-            rid, max_watchers, scan_interval, idle_reissue_sec, lease_ttl,
+        supervisor = IdleSupervisor(
+            max_watchers=int(options["max"]),
+            scan_interval=int(options["scan_interval"]),
+            idle_reissue_sec=int(options["reissue"]),
+            debounce_sec=int(options["debounce"]),
+            lease_ttl=int(options["lease_ttl"]),
+            connect_concurrency=int(options["connect_concurrency"]),
         )
+        try:
+            asyncio.run(supervisor.run())
+        except KeyboardInterrupt:
+            logger.info("Shutting down IMAP IDLE runner…")
 
-        watchers: Dict[str, Watcher] = {}
-        last_logged_keys: Optional[tuple[str, ...]] = None
-        stop_main = threading.Event()
-        rescan_now = threading.Event()
 
-        def _sig_handler(signum, frame):
-            logger.info("Received signal %s; shutting down IMAP IDLE runner…", signum)
-            stop_main.set()
+class IdleSupervisor:
+    """Multiplex IMAP IDLE sessions for many accounts on one event loop.
 
-        # Graceful shutdown on SIGINT/SIGTERM (K8s)
-        try:
-            signal.signal(signal.SIGINT, _sig_handler)
-            signal.signal(signal.SIGTERM, _sig_handler)
-        except Exception:
-            pass
+    Blocking ORM and Redis work runs in worker threads; sockets never leave the
+    loop. Redis leases keep a single watcher per account across runners.
+    """
 
-        # Queue listener thread: wake main loop early when notified
-        queue_key = "imap-idle:queue"
+    def __init__(
+        self,
+        *,
+        max_watchers: int,
+        scan_interval: int,
+        idle_reissue_sec: int,
+        debounce_sec: int,
+        lease_ttl: int,
+        connect_concurrency: int,
+    ) -> None:
+        self.max_watchers = max_watchers
+        self.scan_interval = scan_interval
+        self.idle_reissue_sec = idle_reissue_sec
+        self.debounce_sec = debounce_sec
+        self.lease_ttl = lease_ttl
+        self.redis = get_redis_client()
+        self.rid = _runner_id()
+        self.watchers: Dict[str, Watcher] = {}
+        self._stop = asyncio.Event()
+        self._rescan = asyncio.Event()
+        self._connect_slots = asyncio.Semaphore(max(1, connect_concurrency))
+        # Consecutive failures per account and when a new watcher may be started again.
+        self._failures: Dict[str, int] = {}
+        self._retry_at: Dict[str, float] = {}
+        self._last_logged_keys: Optional[tuple[str, ...]] = None
+        # BLPOP blocks for up to a second; keep it off the shared executor.
+        self._queue_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="imap-idle-queue")
+
+    async def _call(self, func: Callable[..., T], *args) -> T:
+        """Run blocking ORM/Redis work off the loop with fresh DB connections."""
+
+        def _run():
+            close_old_connections()
+            try:
+                return func(*args)
+            finally:
+                close_old_connections()
 
-        def _queue_listener():
-            while not stop_main.is_set():
-                try:
-                    item = redis.blpop(queue_key, timeout=1)
-                    if item:
-                        _, account_id = item
-                        logger.info("Received IMAP IDLE notify for account %s; triggering rescan", account_id)
-                        rescan_now.set()
-                except Exception:
-                    # Ignore and continue
-                    pass
+        return await asyncio.to_thread(_run)
 
-        q_thread = threading.Thread(target=_queue_listener, name="imap-idle-queue", daemon=True)
-        q_thread.start()
+    # ------------------------------------------------------------ lifecycle
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            # Graceful shutdown on SIGINT/SIGTERM (K8s)
+            try:
+                loop.add_signal_handler(signum, self._on_signal, signum)
+            except (NotImplementedError, RuntimeError):
+                pass
 
+        logger.info(
+            "Starting IMAP IDLE runner id=%s max=%d scan=%ds reissue=%ds ttl=%ds",
+            self.rid, self.max_watchers, self.scan_interval, self.idle_reissue_sec, self.lease_ttl,
+        )
+        background = [
+            asyncio.create_task(self._listen_queue(), name="imap-idle-queue"),
+            asyncio.create_task(self._heartbeat_leases(), name="imap-idle-heartbeat"),
+        ]
         try:
-            while not stop_main.is_set():
-                # Drop stale ORM connections; this loop lives for the process lifetime
-                close_old_connections()
-                # Clear immediate rescan trigger at loop start
-                rescan_now.clear()
-                # 1) Reap dead watchers and release leases
-                for acct_id, w in list(watchers.items()):
-                    if not w.thread.is_alive():
-                        try:
-                            cur = redis.get(w.lease_key)
-                            if cur == w.lease_value:
-                                redis.delete(w.lease_key)
-                        except Exception:
-                            pass
-                        watchers.pop(acct_id, None)
-
-                # 2) Query eligible accounts
-                eligible = _eligible_idle_accounts_queryset()
-
-                # 3) Stop watchers whose account is no longer eligible
-                eligible_ids = {str(a.pk) for a in eligible}
-                for acct_id, w in list(watchers.items()):
-                    if acct_id not in eligible_ids:
-                        logger.info("Stopping watcher for %s (no longer eligible)", acct_id)
-                        w.stop.set()
-                        try:
-                            cur = redis.get(w.lease_key)
-                            if cur == w.lease_value:
-                                redis.delete(w.lease_key)
-                        except Exception:
-                            pass
-                        watchers.pop(acct_id, None)
-
-                # 4) Restart watchers whose connection-relevant config changed
-                for acct in eligible:
-                    acct_id = str(acct.pk)
-                    if acct_id in watchers:
-                        sig = _acct_config_sig(acct)
-                        w = watchers[acct_id]
-                        if w.config_sig and w.config_sig != sig:
-                            logger.info("Restarting watcher for %s due to config change (endpoint=%s)", acct_id, getattr(acct.endpoint, "address", None))
-                            w.stop.set()
-                            try:
-                                cur = redis.get(w.lease_key)
-                                if cur == w.lease_value:
-                                    redis.delete(w.lease_key)
-                            except Exception:
-                                pass
-                            watchers.pop(acct_id, None)
-
-                # 5) Start new watchers up to capacity, acquiring a Redis lease
-                for acct in eligible:
-                    if len(watchers) >= max_watchers:
-                        break
-                    acct_id = str(acct.pk)
-                    if acct_id in watchers:
-                        continue
-                    lease_key = f"imap-idle:watch:{acct_id}"
-                    lease_val = rid
-                    try:
-                        # SETNX with TTL to acquire lease cross-process
-                        ok = redis.set(lease_key, lease_val, nx=True, ex=lease_ttl)
-                    except Exception as e:
-                        logger.warning("Redis error acquiring lease for %s: %s", acct_id, e)
-                        continue
-                    if not ok:
-                        continue  # someone else is watching
-
-                    stop_ev = threading.Event()
-                    t = threading.Thread(
-                        target=_watch_account,
-                        name=f"imap-idle-{acct_id}",
-                        args=(acct_id, stop_ev, lease_key, lease_val, lease_ttl, idle_reissue_sec, debounce_sec),
-                        daemon=True,
-                    )
-                    watchers[acct_id] = Watcher(
-                        account_id=acct_id,
-                        thread=t,
-                        stop=stop_ev,
-                        lease_key=lease_key,
-                        lease_value=lease_val,
-                        address=getattr(acct.endpoint, "address", None),
-                        config_sig=_acct_config_sig(acct),
-                    )
-                    t.start()
-                    logger.info("Started watcher for %s (endpoint=%s)", acct_id, getattr(acct.endpoint, "address", None))
-
-                # 5) Log full active watcher list if changed
-                current_keys = tuple(sorted(watchers.keys()))
-                if current_keys != last_logged_keys:
-                    last_logged_keys = current_keys
-                    if watchers:
-                        details = ", ".join(
-                            f"{w.address or 'unknown'}<{aid}>" for aid, w in watchers.items()
-                        )
-                        logger.info("Active IMAP IDLE watchers (%d): %s", len(watchers), details)
-                    else:
-                        logger.info("Active IMAP IDLE watchers (0): none")
-
-                for _ in range(scan_interval):
-                    if stop_main.is_set():
-                        break
-                    if rescan_now.is_set():
-                        break
-                    time.sleep(1)
-
-        except KeyboardInterrupt:
-            logger.info("Shutting down IMAP IDLE runner…")
-        finally:
-            close_old_connections()
-            for w in watchers.values():
-                w.stop.set()
-            for w in watchers.values():
+            while not self._stop.is_set():
+                self._rescan.clear()
                 try:
-                    w.thread.join(timeout=5)
+                    await self._reconcile()
                 except Exception:
-                    pass
-            for w in watchers.values():
+                    logger.exception("IMAP IDLE reconcile failed")
                 try:
-                    cur = redis.get(w.lease_key)
-                    if cur == w.lease_value:
-                        redis.delete(w.lease_key)
-                except Exception:
+                    await asyncio.wait_for(self._wait_for_wakeup(), timeout=self.scan_interval)
+                except asyncio.TimeoutError:
                     pass
+        finally:
+            for task in background:
+                task.cancel()
+            await self._shutdown_watchers()
+            self._queue_executor.shutdown(wait=False, cancel_futures=True)
+
+    def _on_signal(self, signum) -> None:
+        logger.info("Received signal %s; shutting down IMAP IDLE runner…", signum)
+        self._stop.set()
+
+    async def _wait_for_wakeup(self) -> None:
+        stop = asyncio.ensure_future(self._stop.wait())
+        rescan = asyncio.ensure_future(self._rescan.wait())
+        try:
+            await asyncio.wait({stop, rescan}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            stop.cancel()
+            rescan.cancel()
+
+    async def _shutdown_watchers(self) -> None:
+        watchers = list(self.watchers.values())
+        for w in watchers:
+            w.stop.set()
+        if watchers:
+            await asyncio.wait([w.task for w in watchers], timeout=5)
+            for w in watchers:
+                w.task.cancel()
+            await self._call(self._release_leases, watchers)
+        self.watchers.clear()
+
+    # ---------------------------------------------------------------- leases
+    def _release_leases(self, watchers: list[Watcher]) -> None:
+        for w in watchers:
+            try:
+                cur = self.redis.get(w.lease_key)
+                if cur == w.lease_value:
+                    self.redis.delete(w.lease_key)
+            except Exception:
+                pass
 
+    def _acquire_leases(self, account_ids: list[str]) -> list[str]:
+        pipe = self.redis.pipeline(transaction=False)
+        for acct_id in account_ids:
+            # SETNX with TTL to acquire lease cross-process
+            pipe.set(f"imap-idle:watch:{acct_id}", self.rid, nx=True, ex=self.lease_ttl)
+        results = pipe.execute()
+        return [acct_id for acct_id, ok in zip(account_ids, results) if ok]
+
+    def _refresh_leases(self, watchers: list[Watcher]) -> list[Watcher]:
+        """Extend every lease this runner still owns; return watchers whose lease was lost."""
+        pipe = self.redis.pipeline(transaction=False)
+        for w in watchers:
+            pipe.get(w.lease_key)
+        owners = pipe.execute()
+        lost: list[Watcher] = []
+        pipe = self.redis.pipeline(transaction=False)
+        for w, owner in zip(watchers, owners):
+            if owner == w.lease_value:
+                pipe.expire(w.lease_key, self.lease_ttl)
+            else:
+                lost.append(w)
+        pipe.execute()
+        return lost
+
+    async def _heartbeat_leases(self) -> None:
+        interval = max(1, self.lease_ttl // 3)
+        while True:
+            await asyncio.sleep(interval)
+            watchers = [w for w in self.watchers.values() if not w.task.done()]
+            if not watchers:
+                continue
+            try:
+                lost = await self._call(self._refresh_leases, watchers)
+            except Exception as e:
+                logger.warning("Redis error refreshing IMAP IDLE leases: %s", e)
+                continue
+            for w in lost:
+                logger.info("Watcher %s lost lease; exiting", w.account_id)
+                w.stop.set()
 
-def _watch_account(
-    account_id: str,
-    stop: threading.Event,
-    lease_key: str,
-    lease_val: str,
-    lease_ttl: int,
-    idle_reissue_sec: int,
-    debounce_sec: int,
-):
-    """Maintain a single IDLE session for an account and enqueue poll tasks on new mail events."""
-    redis = get_redis_client()
-    backoff = 5  # seconds
-    max_backoff = 300
-
-    while not stop.is_set():
-        close_old_connections()
-        acct: Optional[AgentEmailAccount] = None
+    def _blpop_once(self):
         try:
-            acct = AgentEmailAccount.objects.select_related("endpoint").get(pk=account_id)
-        except AgentEmailAccount.DoesNotExist:
-            logger.info("Account %s no longer exists; stopping watcher", account_id)
+            return self.redis.blpop(QUEUE_KEY, timeout=1)
+        except Exception:
+            # Ignore and continue
+            time.sleep(1)
+            return None
+
+    async def _listen_queue(self) -> None:
+        """Wake the reconcile loop early when an account changes."""
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await loop.run_in_executor(self._queue_executor, self._blpop_once)
+            if item:
+                _, account_id = item
+                logger.info("Received IMAP IDLE notify for account %s; triggering rescan", account_id)
+                self._rescan.set()
+
+    # ------------------------------------------------------------- reconcile
+    def _stop_watcher(self, acct_id: str) -> Watcher:
+        w = self.watchers.pop(acct_id)
+        w.stop.set()
+        return w
+
+    async def _reconcile(self) -> None:
+        released: list[Watcher] = []
+
+        # 1) Reap finished watchers and release leases
+        for acct_id, w in list(self.watchers.items()):
+            if w.task.done():
+                released.append(self.watchers.pop(acct_id))
+                self._note_watcher_exit(w)
+
+        # 2) Query eligible accounts
+        eligible = await self._call(lambda: list(_eligible_idle_accounts_queryset()))
+        eligible_by_id = {str(a.pk): a for a in eligible}
+
+        # 3) Stop watchers whose account is no longer eligible, or whose connection config changed
+        for acct_id, w in list(self.watchers.items()):
+            acct = eligible_by_id.get(acct_id)
+            if acct is None:
+                logger.info("Stopping watcher for %s (no longer eligible)", acct_id)
+                released.append(self._stop_watcher(acct_id))
+            elif w.config_sig and w.config_sig != _acct_config_sig(acct):
+                logger.info("Restarting watcher for %s due to config change (endpoint=%s)", acct_id, w.address)
+                released.append(self._stop_watcher(acct_id))
+        if released:
+            await self._call(self._release_leases, released)
+
+        # 4) Start new watchers up to capacity, acquiring Redis leases in one round trip
+        now = time.monotonic()
+        capacity = self.max_watchers - len(self.watchers)
+        candidates = [
+            acct_id
+            for acct_id in eligible_by_id
+            if acct_id not in self.watchers and self._retry_at.get(acct_id, 0) <= now
+        ][: max(0, capacity)]
+        if candidates:
+            try:
+                leased = await self._call(self._acquire_leases, candidates)
+            except Exception as e:
+                logger.warning("Redis error acquiring IMAP IDLE leases: %s", e)
+                leased = []
+            for acct_id in leased:
+                self._start_watcher(eligible_by_id[acct_id])
+
+        # 5) Log the active watcher count (and the full list while it is small) if it changed
+        current_keys = tuple(sorted(self.watchers.keys()))
+        if current_keys != self._last_logged_keys:
+            self._last_logged_keys = current_keys
+            if len(self.watchers) <= 50:
+                details = ", ".join(f"{w.address or 'unknown'}<{aid}>" for aid, w in self.watchers.items()) or "none"
+                logger.info("Active IMAP IDLE watchers (%d): %s", len(self.watchers), details)
+            else:
+                logger.info("Active IMAP IDLE watchers (%d)", len(self.watchers))
+
+    def _note_watcher_exit(self, w: Watcher) -> None:
+        failed = w.task.cancelled() or w.task.exception() is not None or not w.connected
+        if not failed:
+            self._failures.pop(w.account_id, None)
+            self._retry_at.pop(w.account_id, None)
             return
+        failures = self._failures.get(w.account_id, 0) + 1
+        self._failures[w.account_id] = failures
+        delay = min(_MAX_RETRY_SEC, _BASE_RETRY_SEC * (2 ** (failures - 1)))
+        self._retry_at[w.account_id] = time.monotonic() + delay
+
+    def _start_watcher(self, acct: AgentEmailAccount) -> None:
+        acct_id = str(acct.pk)
+        stop_ev = asyncio.Event()
+        address = getattr(acct.endpoint, "address", None)
+        w = Watcher(
+            account_id=acct_id,
+            stop=stop_ev,
+            lease_key=f"imap-idle:watch:{acct_id}",
+            lease_value=self.rid,
+            address=address,
+            config_sig=_acct_config_sig(acct),
+        )
+        w.task = asyncio.create_task(self._watch_account(w), name=f"imap-idle-{acct_id}")
+        self.watchers[acct_id] = w
+        logger.info("Started watcher for %s (endpoint=%s)", acct_id, address)
 
+    # ---------------------------------------------------------------- watcher
+    async def _open_session(self, acct: AgentEmailAccount) -> AsyncImapSession:
+        host = acct.imap_host
+        port = int(acct.imap_port or (993 if acct.imap_security == AgentEmailAccount.ImapSecurity.SSL else 143))
+        session = await AsyncImapSession.connect(
+            host,
+            port,
+            use_ssl=acct.imap_security == AgentEmailAccount.ImapSecurity.SSL,
+            starttls=acct.imap_security == AgentEmailAccount.ImapSecurity.STARTTLS,
+            timeout=IMAP_TIMEOUT_SEC,
+        )
         try:
-            # Honor backoff if account has connection issues
-            if acct.backoff_until and acct.backoff_until > timezone.now():
-                sleep_for = max(1, int((acct.backoff_until - timezone.now()).total_seconds()))
-                logger.info("Watcher %s backoff %ds due to account backoff_until", account_id, sleep_for)
-                _sleep_until(stop, sleep_for)
-                continue
-
-            # Connect
-            host = acct.imap_host
-            port = int(acct.imap_port or (993 if acct.imap_security == AgentEmailAccount.ImapSecurity.SSL else 143))
-            use_ssl = acct.imap_security == AgentEmailAccount.ImapSecurity.SSL
-            client = IMAPClient(host, port=port, ssl=use_ssl, timeout=60)
-
-            if acct.imap_security == AgentEmailAccount.ImapSecurity.STARTTLS:
-                client.starttls()
-
             if acct.imap_auth == AgentEmailAccount.ImapAuthMode.OAUTH2:
-                identity, access_token, credential = resolve_oauth_identity_and_token(acct, "imap")
+                identity, access_token, credential = await self._call(resolve_oauth_identity_and_token, acct, "imap")
                 mechanism = get_oauth_sasl_mechanism(credential)
-                client.oauth2_login(identity, access_token, mech=mechanism)
+                await session.authenticate(mechanism, build_xoauth2_string(identity, access_token))
             elif acct.imap_auth != AgentEmailAccount.ImapAuthMode.NONE:
-                client.login(acct.imap_username or "", acct.get_imap_password() or "")
-            folder = acct.imap_folder or "INBOX"
-            client.select_folder(folder, readonly=True)
+                password = await self._call(acct.get_imap_password)
+                await session.login(acct.imap_username or "", password or "")
+            # Read-write so messages fetched here can be marked \Seen like the poll task does
+            await session.select(acct.imap_folder or "INBOX", readonly=False)
+        except BaseException:
+            session.close()
+            raise
+        return session
+
+    async def _watch_account(self, w: Watcher) -> None:
+        """Hold one IDLE session for an account and fetch new mail over it when signalled."""
+        account_id = w.account_id
+        acct = await self._call(_load_account, account_id)
+        if acct is None:
+            logger.info("Account %s no longer exists; stopping watcher", account_id)
+            return
 
-            # If server doesn't support IDLE, log and stop watcher; polling will handle new mail
+        # Honor backoff if account has connection issues
+        if acct.backoff_until and acct.backoff_until > timezone.now():
+            sleep_for = max(1, int((acct.backoff_until - timezone.now()).total_seconds()))
+            logger.info("Watcher %s backoff %ds due to account backoff_until", account_id, sleep_for)
             try:
-                caps = {c.decode().upper() if isinstance(c, (bytes, bytearray)) else str(c).upper() for c in (client.capabilities() or [])}
-            except Exception:
-                caps = set()
-            if "IDLE" not in caps:
+                await asyncio.wait_for(w.stop.wait(), timeout=sleep_for)
+                return
+            except asyncio.TimeoutError:
+                pass
+
+        session: Optional[AsyncImapSession] = None
+        try:
+            async with self._connect_slots:
+                session = await self._open_session(acct)
+
+            # If server doesn't support IDLE, log and stop watcher; polling will handle new mail
+            if "IDLE" not in session.capabilities:
                 logger.info("Watcher %s: server does not support IDLE; stopping watcher (polling continues)", account_id)
-                try:
-                    client.logout()
-                except Exception:
-                    pass
                 return
 
-            logger.info("Watcher %s connected and idling on %s", account_id, folder)
+            w.connected = True
+            logger.info("Watcher %s connected and idling on %s", account_id, acct.imap_folder or "INBOX")
+            await self._idle_loop(w, session)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("Watcher %s IMAP error: %s", account_id, e)
+            w.connected = False
+        finally:
+            if session is not None:
+                if w.stop.is_set():
+                    session.close()
+                else:
+                    await session.logout()
+
+    async def _idle_loop(self, w: Watcher, session: AsyncImapSession) -> None:
+        loop = asyncio.get_running_loop()
+        while not w.stop.is_set():
+            session.new_mail_seen = False
+            await session.idle_start()
+            deadline = loop.time() + self.idle_reissue_sec
+            while not session.new_mail_seen:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                read = asyncio.ensure_future(session.idle_wait(remaining))
+                stopper = asyncio.ensure_future(w.stop.wait())
+                done, _pending = await asyncio.wait({read, stopper}, return_when=asyncio.FIRST_COMPLETED)
+                if read not in done:
+                    # Stopping: the session is closed without DONE, so abandon the pending read.
+                    read.cancel()
+                    return
+                stopper.cancel()
+                if _idle_event_triggered(read.result()):
+                    logger.info("Watcher %s: IDLE event received; fetching new mail", w.account_id)
+
+            # Leave IDLE before fetching or re-issuing
+            await session.idle_done()
+            if session.new_mail_seen:
+                await self._fetch_new_mail(w.account_id, session)
+
+    # ------------------------------------------------------------ fetching
+    def _acquire_poll_lock(self, account_id: str) -> Optional[Redlock]:
+        # Same lock as poll_imap_inbox, so a running poll and this fetch never ingest the same UID twice.
+        lock = Redlock(key=f"imap-poll:{account_id}", masters={self.redis}, auto_release_time=600)
+        if not lock.acquire(blocking=True, timeout=1):
+            return None
+        return lock
+
+    @staticmethod
+    def _release_poll_lock(lock: Redlock) -> None:
+        try:
+            lock.release()
+        except Exception:
+            pass
 
-            start = time.time()
-            # Enter IDLE mode and stay there, checking for responses repeatedly
+    def _enqueue_poll(self, account_id: str) -> None:
+        trig_key = f"imap-trigger:{account_id}"
+        try:
+            ok = self.redis.set(trig_key, "1", nx=True, ex=self.debounce_sec)
+        except Exception:
+            ok = True
+        if ok:
             try:
-                client.idle()
+                poll_imap_inbox.delay(account_id)
             except Exception as e:
-                raise e
+                logger.warning("Failed to enqueue poll for %s: %s", account_id, e)
 
-            while not stop.is_set() and (time.time() - start) < idle_reissue_sec:
-                # Refresh lease and verify ownership
-                try:
-                    cur = redis.get(lease_key)
-                    if cur != lease_val:
-                        logger.info("Watcher %s lost lease; exiting", account_id)
-                        try:
-                            client.idle_done()
-                        except Exception:
-                            pass
-                        try:
-                            client.logout()
-                        except Exception:
-                            pass
-                        return
-                    redis.expire(lease_key, lease_ttl)
-                except Exception:
-                    pass
-
-                # Wait for responses while idling
-                try:
-                    responses = client.idle_check(timeout=30)
-                except Exception:
-                    responses = []
-
-                # Parse events – look for EXISTS or RECENT in any tuple part
-                triggered = False
-                for resp in responses or []:
-                    try:
-                        parts = resp if isinstance(resp, (list, tuple)) else [resp]
-                        for p in parts:
-                            s = p.decode().upper() if isinstance(p, (bytes, bytearray)) else str(p).upper()
-                            if s in ("EXISTS", "RECENT"):
-                                triggered = True
-                                break
-                        if triggered:
-                            break
-                    except Exception:
-                        continue
-
-                if triggered:
-                    logger.info("Watcher %s: IDLE event received; enqueue poll", account_id)
-                    trig_key = f"imap-trigger:{account_id}"
-                    try:
-                        ok = redis.set(trig_key, "1", nx=True, ex=debounce_sec)
-                    except Exception:
-                        ok = True
-                    if ok:
-                        try:
-                            poll_imap_inbox.delay(account_id)
-                        except Exception as e:
-                            logger.warning("Failed to enqueue poll for %s: %s", account_id, e)
-
-            # Leave IDLE before reissuing or exiting
-            try:
-                client.idle_done()
-            except Exception:
-                pass
+    async def _fetch_new_mail(self, account_id: str, session: AsyncImapSession) -> None:
+        """Fetch and ingest UIDs newer than the stored checkpoint over the IDLE session.
 
-            try:
-                client.logout()
-            except Exception:
-                pass
+        Cases the poll task owns (first-run baseline, UIDVALIDITY reset, a poll
+        already running) are handed to ``poll_imap_inbox`` instead.
+        """
+        lock = await self._call(self._acquire_poll_lock, account_id)
+        if lock is None:
+            await self._call(self._enqueue_poll, account_id)
             return
+        delegate = False
+        try:
+            acct = await self._call(_load_account, account_id)
+            if acct is None:
+                return
+            current_validity = session.select_codes.get("UIDVALIDITY") or None
+            stored_validity, stored_uid = _parse_last_seen(acct.last_seen_uid)
+            if not acct.last_seen_uid or (stored_validity and current_validity and stored_validity != current_validity):
+                delegate = True
+                return
 
-        except Exception as e:
-            logger.warning("Watcher %s IMAP error: %s", account_id, e)
-            # On error, release lease so another runner can try
-            try:
-                cur = redis.get(lease_key)
-                if cur == lease_val:
-                    redis.delete(lease_key)
-            except Exception:
-                pass
-            # Backoff and retry
-            _sleep_until(stop, backoff)
-            backoff = min(max_backoff, backoff * 2)
+            uids = [uid for uid in await session.uid_search(f"(UNSEEN UID {stored_uid + 1}:*)") if uid > stored_uid]
+            processed_highest: Optional[int] = None
+            for uid in uids[:MAX_MESSAGES_PER_ACCOUNT]:
+                # Check the whitelist via header-only fetch to avoid downloading the body
+                header = await session.uid_fetch(uid, "BODY.PEEK[HEADER.FIELDS (FROM)]")
+                if await self._call(imap_sender_blocked, acct, header):
+                    processed_highest = uid
+                    continue
+                raw = await session.uid_fetch(uid)
+                if not raw:
+                    processed_highest = uid  # nothing to do, treat as processed
+                    continue
+                try:
+                    ingested = await self._call(ingest_imap_message_bytes, acct, str(uid), raw)
+                except Exception as e:
+                    logger.error("Error ingesting UID %s for %s: %s", uid, acct.endpoint.address, e, exc_info=True)
+                    continue
+                if ingested:
+                    await session.uid_store_seen(uid)
+                processed_highest = uid
+
+            if processed_highest is not None:
+                await self._call(_update_success, acct, timezone.now(), str(processed_highest), current_validity)
         finally:
-            close_old_connections()
-            try:
-                client  # type: ignore[name-defined]
-            except NameError:
-                pass
-
-
-def _sleep_until(stop: threading.Event, seconds: int) -> None:
-    """Sleep for up to `seconds` but wake early if stop is set."""
-    end = time.time() + max(0, int(seconds))
-    while not stop.is_set() and time.time() < end:
-        time.sleep(0.2)
+            await self._call(self._release_poll_lock, lock)
+            if delegate:
+                await self._call(self._enqueue_poll, account_id)
@@ -0,0 +1,26 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0462_task_credit_reservations"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="agentemailaccount",
+            name="next_poll_at",
+            # Existing accounts are backfilled to the migration time, i.e. due on the next dispatch.
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name="agentemailaccount",
+            index=models.Index(
+                condition=models.Q(is_inbound_enabled=True),
+                fields=["next_poll_at"],
+                name="agent_email_next_poll_idx",
+            ),
+        ),
+    ]
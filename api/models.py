@@ -1545,6 +1545,34 @@ class TaskCredit(models.Model):
         return (self.credits or 0) - (self.credits_used or 0)
 
 
+class TaskCreditReservation(models.Model):
+    """A block of credits leased from a TaskCredit so charges can be taken without locking it.
+
+    Each draw adds its own amount to ``credits_used``; settlement records how much
+    of ``reserved`` was drawn in ``consumed``.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    task_credit = models.ForeignKey(
+        TaskCredit,
+        on_delete=models.CASCADE,
+        related_name="reservations",
+    )
+    reserved = models.DecimalField(max_digits=12, decimal_places=3)
+    consumed = models.DecimalField(max_digits=12, decimal_places=3, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+    settled_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["settled_at", "expires_at"], name="taskcredit_resv_settle_idx"),
+        ]
+
+    def __str__(self):
+        return f"TaskCreditReservation {self.id} ({self.reserved} from {self.task_credit_id})"
+
+
 
 class TaskCreditConfig(models.Model):
 
@@ -2566,7 +2594,15 @@ class BrowserUseAgent(models.Model):
         from datetime import timedelta
         from django.utils import timezone
 
+        from api.proxy_pool import get_proxy_pool, proxy_pool_enabled
+
         with traced("SELECT BrowserUseAgent Random Proxy") as span:
+            if proxy_pool_enabled():
+                proxy, priority = get_proxy_pool().select_shared()
+                if proxy:
+                    cls._record_proxy_choice(span, proxy, priority)
+                return proxy
+
             # Consider health checks from the last 45 days as "recent"
             recent_cutoff = timezone.now() - timedelta(days=45)
             available_proxies = cls._shared_proxy_queryset()
@@ -2580,13 +2616,7 @@ class BrowserUseAgent(models.Model):
                 ).distinct().order_by('?').first()
 
             if healthy_static_proxy:
-                span.set_attribute('proxy_choice', str(healthy_static_proxy.id))
-                span.set_attribute('proxy_choice.ip', healthy_static_proxy.static_ip)
-                span.set_attribute('proxy_choice.host', healthy_static_proxy.host)
-                span.set_attribute('proxy_choice.port', healthy_static_proxy.port)
-                span.set_attribute('proxy_choice.proxy_type', healthy_static_proxy.proxy_type)
-                span.set_attribute('proxy_choice.username', healthy_static_proxy.username)
-                span.set_attribute('proxy_choice.priority', '1')
+                cls._record_proxy_choice(span, healthy_static_proxy, '1')
                 return healthy_static_proxy
 
             # Second priority: Any proxy with recent successful health checks
@@ -2597,13 +2627,7 @@ class BrowserUseAgent(models.Model):
                 ).distinct().order_by('?').first()
 
             if healthy_proxy:
-                span.set_attribute('proxy_choice', str(healthy_proxy.id))
-                span.set_attribute('proxy_choice.ip', healthy_proxy.static_ip)
-                span.set_attribute('proxy_choice.host', healthy_proxy.host)
-                span.set_attribute('proxy_choice.port', healthy_proxy.port)
-                span.set_attribute('proxy_choice.proxy_type', healthy_proxy.proxy_type)
-                span.set_attribute('proxy_choice.username', healthy_proxy.username)
-                span.set_attribute('proxy_choice.priority', '2')
+                cls._record_proxy_choice(span, healthy_proxy, '2')
                 return healthy_proxy
 
             # Third priority: Static IP proxies (even without recent health checks)
@@ -2613,13 +2637,7 @@ class BrowserUseAgent(models.Model):
                 ).exclude(static_ip='').order_by('?').first()
 
             if static_ip_proxy:
-                span.set_attribute('proxy_choice', str(static_ip_proxy.id))
-                span.set_attribute('proxy_choice.ip', static_ip_proxy.static_ip)
-                span.set_attribute('proxy_choice.host', static_ip_proxy.host)
-                span.set_attribute('proxy_choice.port', static_ip_proxy.port)
-                span.set_attribute('proxy_choice.proxy_type', static_ip_proxy.proxy_type)
-                span.set_attribute('proxy_choice.username', static_ip_proxy.username)
-                span.set_attribute('proxy_choice.priority', '3')
+                cls._record_proxy_choice(span, static_ip_proxy, '3')
                 return static_ip_proxy
 
             # Final fallback: Any active proxy
@@ -2630,16 +2648,20 @@ class BrowserUseAgent(models.Model):
                 proxy = available_proxies.order_by('?').first()
 
                 if proxy:
-                    span.set_attribute('proxy_choice', str(proxy.id))
-                    span.set_attribute('proxy_choice.ip', proxy.static_ip)
-                    span.set_attribute('proxy_choice.host', proxy.host)
-                    span.set_attribute('proxy_choice.port', proxy.port)
-                    span.set_attribute('proxy_choice.proxy_type', proxy.proxy_type)
-                    span.set_attribute('proxy_choice.username', proxy.username)
-                    span.set_attribute('proxy_choice.priority', '4')
+                    cls._record_proxy_choice(span, proxy, '4')
 
                 return proxy
 
+    @staticmethod
+    def _record_proxy_choice(span, proxy, priority):
+        span.set_attribute('proxy_choice', str(proxy.id))
+        span.set_attribute('proxy_choice.ip', proxy.static_ip)
+        span.set_attribute('proxy_choice.host', proxy.host)
+        span.set_attribute('proxy_choice.port', proxy.port)
+        span.set_attribute('proxy_choice.proxy_type', proxy.proxy_type)
+        span.set_attribute('proxy_choice.username', proxy.username)
+        span.set_attribute('proxy_choice.priority', priority)
+
     def save(self, *args, **kwargs):
         # Auto-assign proxy on creation if none is set
         if self._state.adding and not self.preferred_proxy_id:
@@ -7063,12 +7085,21 @@ class PersistentAgent(models.Model):
         return (soft_target * multiplier).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
 
     def get_daily_credit_usage(self, usage_date=None) -> Decimal:
-        usage_date = usage_date or timezone.localdate()
+        from api.services.credit_usage_ledger import load_agent_credit_usage
+
+        today = timezone.localdate()
+        usage_date = usage_date or today
         start = datetime.datetime.combine(usage_date, datetime.time.min)
         if timezone.is_naive(start):
             start = timezone.make_aware(start)
         end = start + datetime.timedelta(days=1)
 
+        if usage_date == today:
+            usage = load_agent_credit_usage(self, since=start)
+            total = usage.total_since(start) if usage is not None else None
+            if total is not None:
+                return total
+
         total = (
             self.steps.filter(
                 created_at__gte=start,
@@ -11385,6 +11416,8 @@ class AgentEmailAccount(models.Model):
     last_polled_at = models.DateTimeField(null=True, blank=True)
     last_seen_uid = models.CharField(max_length=64, blank=True)
     backoff_until = models.DateTimeField(null=True, blank=True)
+    # When the poll dispatcher should next pick this account up; new accounts are due immediately.
+    next_poll_at = models.DateTimeField(default=timezone.now)
     connection_mode = models.CharField(
         max_length=16, choices=ConnectionMode.choices, default=ConnectionMode.OAUTH2
     )
@@ -11404,6 +11437,11 @@ class AgentEmailAccount(models.Model):
         indexes = [
             models.Index(fields=["is_outbound_enabled"], name="agent_email_outbound_idx"),
             models.Index(fields=["endpoint"], name="agent_email_endpoint_idx"),
+            models.Index(
+                fields=["next_poll_at"],
+                name="agent_email_next_poll_idx",
+                condition=models.Q(is_inbound_enabled=True),
+            ),
         ]
         ordering = ["-updated_at"]
 
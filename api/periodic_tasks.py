@@ -105,6 +105,20 @@ def add_dynamic_schedules():
         "args": [],
     }
 
+    if settings.CREDIT_USAGE_LEDGER_ENABLED:
+        beat_schedule["credit-usage-ledger-reconcile"] = {
+            "task": "api.tasks.reconcile_credit_usage_ledgers",
+            "schedule": crontab(minute=f"*/{settings.CREDIT_USAGE_LEDGER_RECONCILE_MINUTES}"),
+            "args": [],
+        }
+
+    if settings.TASK_CREDIT_RESERVATIONS_ENABLED:
+        beat_schedule["task-credit-reservation-settle"] = {
+            "task": "api.tasks.settle_task_credit_reservations",
+            "schedule": crontab(minute="*"),
+            "args": [],
+        }
+
     # Proactive agent activation sweep
     beat_schedule["proactive-agent-scan"] = {
         "task": "api.tasks.schedule_proactive_agents",
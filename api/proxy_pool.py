@@ -0,0 +1,302 @@
+"""
+In-memory shared proxy pool.
+
+Shared-proxy selection used to run a ``health_check_results`` join with
+``.distinct().order_by('?')`` for every ``http_request`` call and browser task.
+This module keeps a per-process snapshot of the active proxies and the time of
+each proxy's latest passing health check, refreshed on an interval and whenever
+proxy rows change in this process. Selection walks the same four priority tiers
+as the database path and picks a proxy by weighted random draw.
+
+Weights come from live feedback: ``http_request`` and browser tasks report
+proxy failures and latencies, so a proxy that keeps failing is demoted out of
+the healthy tiers until it succeeds again or its cooldown expires, without
+waiting for the next scheduled health check.
+"""
+
+import bisect
+import copy
+import logging
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Optional
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEALTH_CHECK_DAYS = 45
+# Latency EWMA at or below this keeps a proxy at full weight.
+REFERENCE_LATENCY_SECONDS = 1.0
+LATENCY_EWMA_ALPHA = 0.3
+MIN_WEIGHT = 0.05
+
+# Tier labels match the ``proxy_choice.priority`` span attribute of the database path.
+PRIORITY_HEALTHY_STATIC = "1"
+PRIORITY_HEALTHY = "2"
+PRIORITY_STATIC = "3"
+PRIORITY_ANY = "4"
+
+
+@dataclass
+class ProxyFeedback:
+    """Live outcome stats for one proxy, reported by its callers in this process."""
+
+    consecutive_failures: int = 0
+    last_failure_at: float = 0.0
+    latency_ewma: Optional[float] = None
+
+    def record(self, success: bool, latency_seconds: Optional[float], now: float) -> None:
+        if success:
+            self.consecutive_failures = 0
+        else:
+            self.consecutive_failures += 1
+            self.last_failure_at = now
+        if latency_seconds is not None and latency_seconds >= 0:
+            if self.latency_ewma is None:
+                self.latency_ewma = latency_seconds
+            else:
+                self.latency_ewma += LATENCY_EWMA_ALPHA * (latency_seconds - self.latency_ewma)
+
+    def is_demoted(self, now: float, threshold: int, cooldown: float) -> bool:
+        return self.consecutive_failures >= threshold and now - self.last_failure_at < cooldown
+
+    def weight(self) -> float:
+        weight = 1.0 / (1 + self.consecutive_failures)
+        if self.latency_ewma and self.latency_ewma > REFERENCE_LATENCY_SECONDS:
+            weight *= REFERENCE_LATENCY_SECONDS / self.latency_ewma
+        return max(MIN_WEIGHT, weight)
+
+
+@dataclass
+class _PoolSnapshot:
+    proxies: dict = field(default_factory=dict)
+    shared_ids: tuple = ()
+    last_passed_at: dict = field(default_factory=dict)
+    loaded_at: float = 0.0
+    health_cutoff: Optional[datetime] = None
+
+
+class ProxyPool:
+    """Per-process cache of proxy health state with weighted shared-proxy selection."""
+
+    def __init__(self, rng: Optional[random.Random] = None) -> None:
+        self._lock = threading.Lock()
+        self._snapshot: Optional[_PoolSnapshot] = None
+        self._generation = 0
+        self._feedback: dict[str, ProxyFeedback] = {}
+        self._owner_pid: Optional[int] = None
+        self._rng = rng or random.Random()
+
+    # ---------------------------------------------------------------- public
+    def select_shared(self) -> tuple[Optional[object], Optional[str]]:
+        """Return ``(proxy, priority)`` for the best available shared proxy."""
+        snapshot = self._current_snapshot()
+        if not snapshot.shared_ids:
+            return None, None
+        now = time.monotonic()
+        cutoff = snapshot.health_cutoff
+        threshold, cooldown = _demotion_settings()
+        with self._lock:
+            feedback = dict(self._feedback)
+
+        healthy_static: list[str] = []
+        healthy: list[str] = []
+        static: list[str] = []
+        for proxy_id in snapshot.shared_ids:
+            stats = feedback.get(proxy_id)
+            if stats is not None and stats.is_demoted(now, threshold, cooldown):
+                continue
+            proxy = snapshot.proxies[proxy_id]
+            last_pass = snapshot.last_passed_at.get(proxy_id)
+            if last_pass is not None and last_pass >= cutoff:
+                healthy.append(proxy_id)
+                if proxy.static_ip is not None:
+                    healthy_static.append(proxy_id)
+            if proxy.static_ip:
+                static.append(proxy_id)
+
+        for priority, candidates in (
+            (PRIORITY_HEALTHY_STATIC, healthy_static),
+            (PRIORITY_HEALTHY, healthy),
+            (PRIORITY_STATIC, static),
+            (PRIORITY_ANY, list(snapshot.shared_ids)),
+        ):
+            if candidates:
+                proxy_id = self._weighted_choice(candidates, feedback)
+                return copy.copy(snapshot.proxies[proxy_id]), priority
+        return None, None
+
+    def has_recent_health_pass(self, proxy_server, health_check_days: int = DEFAULT_HEALTH_CHECK_DAYS) -> bool:
+        proxy_id = str(proxy_server.pk)
+        if health_check_days > DEFAULT_HEALTH_CHECK_DAYS:
+            # The snapshot only holds passes inside the default window.
+            cutoff = timezone.now() - timedelta(days=health_check_days)
+            if not proxy_server.health_check_results.filter(status="PASSED", checked_at__gte=cutoff).exists():
+                return False
+        else:
+            snapshot = self._current_snapshot()
+            last_pass = snapshot.last_passed_at.get(proxy_id)
+            if last_pass is None:
+                return False
+            if health_check_days == DEFAULT_HEALTH_CHECK_DAYS and snapshot.health_cutoff is not None:
+                cutoff = snapshot.health_cutoff
+            else:
+                cutoff = timezone.now() - timedelta(days=health_check_days)
+            if last_pass < cutoff:
+                return False
+        threshold, cooldown = _demotion_settings()
+        with self._lock:
+            stats = self._feedback.get(proxy_id)
+        return stats is None or not stats.is_demoted(time.monotonic(), threshold, cooldown)
+
+    def record_outcome(self, proxy_id, *, success: bool, latency_seconds: Optional[float] = None) -> None:
+        if not proxy_id:
+            return
+        key = str(proxy_id)
+        now = time.monotonic()
+        with self._lock:
+            self._reset_if_forked()
+            stats = self._feedback.get(key)
+            if stats is None:
+                stats = self._feedback[key] = ProxyFeedback()
+            was_demoted = stats.is_demoted(now, *_demotion_settings())
+            stats.record(success, latency_seconds, now)
+            demoted = stats.is_demoted(now, *_demotion_settings())
+        if demoted and not was_demoted:
+            logger.info("Demoting proxy %s after %s consecutive live failures", key, stats.consecutive_failures)
+
+    def feedback_for(self, proxy_id) -> Optional[ProxyFeedback]:
+        with self._lock:
+            stats = self._feedback.get(str(proxy_id))
+            return copy.copy(stats) if stats is not None else None
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._snapshot = None
+
+    # -------------------------------------------------------------- internal
+    def _reset_if_forked(self) -> None:
+        pid = os.getpid()
+        if self._owner_pid != pid:
+            self._snapshot = None
+            self._feedback = {}
+            self._owner_pid = pid
+
+    def _current_snapshot(self) -> _PoolSnapshot:
+        refresh_seconds = float(getattr(settings, "PROXY_POOL_REFRESH_SECONDS", 30))
+        with self._lock:
+            self._reset_if_forked()
+            snapshot = self._snapshot
+            generation = self._generation
+        if snapshot is not None and time.monotonic() - snapshot.loaded_at < refresh_seconds:
+            return snapshot
+        snapshot = _load_snapshot()
+        with self._lock:
+            # Do not cache a load that raced with an invalidation.
+            if self._generation == generation:
+                self._snapshot = snapshot
+        return snapshot
+
+    def _weighted_choice(self, candidates: list[str], feedback: dict[str, ProxyFeedback]) -> str:
+        if len(candidates) == 1:
+            return candidates[0]
+        cumulative: list[float] = []
+        total = 0.0
+        for proxy_id in candidates:
+            stats = feedback.get(proxy_id)
+            total += stats.weight() if stats is not None else 1.0
+            cumulative.append(total)
+        index = bisect.bisect_right(cumulative, self._rng.random() * total)
+        return candidates[min(index, len(candidates) - 1)]
+
+
+def _demotion_settings() -> tuple[int, float]:
+    return (
+        int(getattr(settings, "PROXY_POOL_DEMOTE_AFTER_FAILURES", 3)),
+        float(getattr(settings, "PROXY_POOL_DEMOTE_COOLDOWN_SECONDS", 300)),
+    )
+
+
+def _load_snapshot() -> _PoolSnapshot:
+    ProxyServer = apps.get_model("api", "ProxyServer")
+    ProxyHealthCheckResult = apps.get_model("api", "ProxyHealthCheckResult")
+
+    proxies = list(ProxyServer.objects.filter(is_active=True).select_related("dedicated_allocation"))
+    by_id = {str(proxy.pk): proxy for proxy in proxies}
+    shared_ids = tuple(
+        proxy_id
+        for proxy_id, proxy in by_id.items()
+        if not proxy.is_dedicated or not proxy.is_dedicated_allocated
+    )
+    health_cutoff = timezone.now() - timedelta(days=DEFAULT_HEALTH_CHECK_DAYS)
+    last_passed_at = {
+        str(row["proxy_server_id"]): row["last_passed_at"]
+        for row in (
+            ProxyHealthCheckResult.objects.filter(
+                proxy_server__is_active=True,
+                status=ProxyHealthCheckResult.Status.PASSED,
+                checked_at__gte=health_cutoff,
+            )
+            .values("proxy_server_id")
+            .annotate(last_passed_at=Max("checked_at"))
+        )
+    }
+    return _PoolSnapshot(
+        proxies=by_id,
+        shared_ids=shared_ids,
+        last_passed_at=last_passed_at,
+        loaded_at=time.monotonic(),
+        health_cutoff=health_cutoff,
+    )
+
+
+def proxy_pool_enabled() -> bool:
+    return bool(getattr(settings, "PROXY_POOL_CACHE_ENABLED", False))
+
+
+_pool = ProxyPool()
+
+
+def get_proxy_pool() -> ProxyPool:
+    return _pool
+
+
+def record_proxy_outcome(proxy_server, *, success: bool, latency_seconds: Optional[float] = None) -> None:
+    """Report how a request through ``proxy_server`` went so the pool can demote bad proxies."""
+    if proxy_server is None:
+        return
+    try:
+        _pool.record_outcome(getattr(proxy_server, "pk", None), success=success, latency_seconds=latency_seconds)
+    except Exception:
+        logger.debug("Failed to record proxy outcome", exc_info=True)
+
+
+def _invalidate_proxy_pool(sender, instance, **kwargs) -> None:
+    transaction.on_commit(_pool.invalidate)
+
+
+def register_proxy_pool_invalidation() -> None:
+    """Drop this process's proxy snapshot whenever proxy rows or health results change."""
+    for model_name in ("ProxyServer", "ProxyHealthCheckResult", "DedicatedProxyAllocation"):
+        model = apps.get_model("api", model_name)
+        post_save.connect(
+            _invalidate_proxy_pool,
+            sender=model,
+            dispatch_uid=f"proxy_pool_invalidate_{model_name}_post_save",
+        )
+        post_delete.connect(
+            _invalidate_proxy_pool,
+            sender=model,
+            dispatch_uid=f"proxy_pool_invalidate_{model_name}_post_delete",
+        )
@@ -13,6 +13,8 @@ from typing import Any, Callable, Optional
 from django.conf import settings
 from django.utils import timezone
 
+from .proxy_pool import get_proxy_pool, proxy_pool_enabled
+
 logger = logging.getLogger(__name__)
 
 
@@ -30,6 +32,9 @@ def proxy_has_recent_health_pass(proxy_server, health_check_days: int = 45) -> b
     if not proxy_server or not proxy_server.is_active:
         return False
 
+    if proxy_pool_enabled():
+        return get_proxy_pool().has_recent_health_pass(proxy_server, health_check_days)
+
     recent_cutoff = timezone.now() - timedelta(days=health_check_days)
     return proxy_server.health_check_results.filter(
         status="PASSED", checked_at__gte=recent_cutoff
@@ -0,0 +1,223 @@
+"""
+Per-process wake-up hub for MCP callers waiting on agent timeline events.
+
+``gobii_wait_for_agent_event`` used to re-read the timeline every half second
+for the whole wait, so each waiter cost a database query per tick. Waiters now
+register here instead. The hub holds one channel-layer channel per process,
+joins an agent's chat group while anyone in the process is waiting on that
+agent, and wakes those waiters when a timeline event is broadcast to the group.
+A waiter only re-reads the timeline after it has been woken.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Broadcast by console.agent_chat.signals whenever a message, step, thinking or plan event is appended.
+WAKE_MESSAGE_TYPES = frozenset({"timeline_event"})
+SUBSCRIBE_TIMEOUT_SECONDS = 2.0
+RECEIVE_RETRY_SECONDS = 1.0
+# channels_redis expires group membership after a day; re-join well before that.
+GROUP_REFRESH_SECONDS = 3600.0
+
+
+def _agent_group_name(agent_id: str) -> str:
+    # Same group the agent chat consumers join.
+    return f"agent-chat-{agent_id}"
+
+
+class AgentEventWaiter:
+    """One caller's registration for wake-ups on a single agent."""
+
+    def __init__(self, hub: "AgentTimelineEventHub", agent_id: str) -> None:
+        self.agent_id = agent_id
+        self.subscribed = False
+        self._hub = hub
+        self._woken = threading.Event()
+
+    def wait(self, timeout: float) -> bool:
+        """Block up to ``timeout`` seconds for a timeline event; returns whether one arrived."""
+        woken = self._woken.wait(max(0.0, timeout))
+        self._woken.clear()
+        return woken
+
+    def wake(self) -> None:
+        self._woken.set()
+
+    def close(self) -> None:
+        self._hub.unsubscribe(self)
+
+    def __enter__(self) -> "AgentEventWaiter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class AgentTimelineEventHub:
+    """Fans channel-layer timeline broadcasts out to in-process waiters."""
+
+    def __init__(self, layer_factory: Optional[Callable] = None) -> None:
+        self._layer_factory = layer_factory
+        self._lock = threading.Lock()
+        self._waiters: dict[str, set[AgentEventWaiter]] = {}
+        self._joined_at: dict[str, float] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._owner_pid: Optional[int] = None
+        self._layer = None
+        self._channel_name: Optional[str] = None
+        self._group_lock: Optional[asyncio.Lock] = None
+
+    def subscribe(self, agent_id) -> AgentEventWaiter:
+        """Register a waiter and make sure this process is in the agent's group.
+
+        The returned waiter has ``subscribed`` set only once the group join has
+        been confirmed; callers should fall back to periodic reads otherwise.
+        """
+        waiter = AgentEventWaiter(self, str(agent_id))
+        loop = self._ensure_loop()
+        with self._lock:
+            self._waiters.setdefault(waiter.agent_id, set()).add(waiter)
+            joined_at = self._joined_at.get(waiter.agent_id)
+        if joined_at is not None and time.monotonic() - joined_at < GROUP_REFRESH_SECONDS:
+            waiter.subscribed = True
+            return waiter
+        try:
+            future = asyncio.run_coroutine_threadsafe(self._join(waiter.agent_id), loop)
+            future.result(timeout=SUBSCRIBE_TIMEOUT_SECONDS)
+        except Exception:
+            logger.debug("Failed to join timeline group for agent %s", waiter.agent_id, exc_info=True)
+            return waiter
+        waiter.subscribed = True
+        return waiter
+
+    def unsubscribe(self, waiter: AgentEventWaiter) -> None:
+        with self._lock:
+            waiters = self._waiters.get(waiter.agent_id)
+            if waiters is None or waiter not in waiters:
+                return
+            waiters.discard(waiter)
+            if waiters:
+                return
+            self._waiters.pop(waiter.agent_id, None)
+            was_joined = self._joined_at.pop(waiter.agent_id, None) is not None
+            loop = self._loop
+        if was_joined and loop is not None:
+            asyncio.run_coroutine_threadsafe(self._leave(waiter.agent_id), loop)
+
+    def waiter_count(self, agent_id=None) -> int:
+        with self._lock:
+            if agent_id is not None:
+                return len(self._waiters.get(str(agent_id), ()))
+            return sum(len(waiters) for waiters in self._waiters.values())
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            pid = os.getpid()
+            if self._owner_pid != pid:
+                # Forked children share neither the loop thread nor the parent's channel.
+                self._waiters = {}
+                self._joined_at = {}
+                self._loop = None
+                self._thread = None
+                self._layer = None
+                self._channel_name = None
+                self._group_lock = None
+                self._owner_pid = pid
+            if self._loop is None or self._thread is None or not self._thread.is_alive():
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(
+                    target=self._run_loop,
+                    args=(loop,),
+                    name="agent-event-hub",
+                    daemon=True,
+                )
+                thread.start()
+                self._loop = loop
+                self._thread = thread
+                self._layer = None
+                self._channel_name = None
+                self._group_lock = None
+                self._joined_at = {}
+            return self._loop
+
+    @staticmethod
+    def _run_loop(loop: asyncio.AbstractEventLoop) -> None:
+        asyncio.set_event_loop(loop)
+        loop.run_forever()
+
+    async def _ensure_channel(self):
+        if self._group_lock is None:
+            self._group_lock = asyncio.Lock()
+        if self._channel_name is None:
+            if self._layer_factory is not None:
+                layer = self._layer_factory()
+            else:
+                from channels.layers import get_channel_layer
+
+                layer = get_channel_layer()
+            if layer is None:
+                raise RuntimeError("Channel layer unavailable")
+            channel_name = await layer.new_channel()
+            self._layer = layer
+            self._channel_name = channel_name
+            asyncio.get_running_loop().create_task(self._receive_loop(layer, channel_name))
+        return self._layer, self._channel_name
+
+    async def _join(self, agent_id: str) -> None:
+        layer, channel_name = await self._ensure_channel()
+        async with self._group_lock:
+            await layer.group_add(_agent_group_name(agent_id), channel_name)
+        with self._lock:
+            if agent_id in self._waiters:
+                self._joined_at[agent_id] = time.monotonic()
+
+    async def _leave(self, agent_id: str) -> None:
+        if self._channel_name is None:
+            return
+        async with self._group_lock:
+            with self._lock:
+                if agent_id in self._waiters:
+                    # Someone started waiting again while the discard was queued.
+                    return
+            try:
+                await self._layer.group_discard(_agent_group_name(agent_id), self._channel_name)
+            except Exception:
+                logger.debug("Failed to leave timeline group for agent %s", agent_id, exc_info=True)
+
+    async def _receive_loop(self, layer, channel_name: str) -> None:
+        while self._channel_name == channel_name:
+            try:
+                message = await layer.receive(channel_name)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.debug("Agent event hub receive failed", exc_info=True)
+                await asyncio.sleep(RECEIVE_RETRY_SECONDS)
+                continue
+            self.dispatch(message)
+
+    def dispatch(self, message: dict) -> None:
+        """Wake every waiter for the agent named in a channel-layer message."""
+        if not isinstance(message, dict) or message.get("type") not in WAKE_MESSAGE_TYPES:
+            return
+        agent_id = message.get("agent_id")
+        if not agent_id:
+            return
+        with self._lock:
+            waiters = list(self._waiters.get(str(agent_id), ()))
+        for waiter in waiters:
+            waiter.wake()
+
+
+_hub = AgentTimelineEventHub()
+
+
+def get_agent_timeline_event_hub() -> AgentTimelineEventHub:
+    return _hub
@@ -0,0 +1,640 @@
+"""
+Chunked, content-addressed persistence for browser-use Chrome profiles.
+
+A persisted profile is a JSON manifest that lists every file as a sequence of
+chunk digests, plus one zstd-compressed object per distinct chunk under the
+agent's profile prefix. Restore only downloads chunks that are missing from a
+worker-local chunk cache, and persist only uploads chunks the previous manifest
+did not reference, so a run that touches a few cookie pages of a large profile
+moves kilobytes instead of the whole archive.
+"""
+
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import shutil
+import stat
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+import zstandard as zstd
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from pottery import Redlock
+
+from config.redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+PROFILE_CHUNK_BYTES = 1024 * 1024
+PROFILE_TRANSFER_WORKERS = 8
+_MANIFEST_VERSION = 1
+_COMPRESSION_LEVEL = 3
+# Superseded manifests stay readable this long so in-flight restores can finish.
+MANIFEST_GRACE_SECONDS = 600
+PROFILE_LOCK_TTL_SECONDS = 300
+PROFILE_LOCK_WAIT_SECONDS = 60
+# How long deleted chunk digests are remembered for saves that started before the deletion.
+PROFILE_DELETED_CHUNKS_TTL_SECONDS = 7 * 24 * 60 * 60
+
+
+class BrowserProfileStoreError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class ProfileFileEntry:
+    path: str
+    mode: int
+    size: int
+    chunks: tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class BrowserProfileManifest:
+    files: tuple[ProfileFileEntry, ...] = ()
+    dirs: tuple[str, ...] = ()
+    chunk_bytes: int = PROFILE_CHUNK_BYTES
+
+    @property
+    def chunk_digests(self) -> set[str]:
+        return {digest for entry in self.files for digest in entry.chunks}
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(entry.size for entry in self.files)
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "version": _MANIFEST_VERSION,
+                "chunk_bytes": self.chunk_bytes,
+                "dirs": list(self.dirs),
+                "files": [
+                    {"path": entry.path, "mode": entry.mode, "size": entry.size, "chunks": list(entry.chunks)}
+                    for entry in self.files
+                ],
+            },
+            separators=(",", ":"),
+        )
+
+    @classmethod
+    def from_json(cls, raw: str | bytes) -> "BrowserProfileManifest":
+        try:
+            payload = json.loads(raw)
+            if payload.get("version") != _MANIFEST_VERSION:
+                raise ValueError(f"unsupported manifest version {payload.get('version')!r}")
+            files = tuple(
+                ProfileFileEntry(
+                    path=str(entry["path"]),
+                    mode=int(entry.get("mode") or 0o600),
+                    size=int(entry["size"]),
+                    chunks=tuple(str(digest) for digest in entry["chunks"]),
+                )
+                for entry in payload.get("files") or ()
+            )
+            return cls(
+                files=files,
+                dirs=tuple(str(path) for path in payload.get("dirs") or ()),
+                chunk_bytes=int(payload.get("chunk_bytes") or PROFILE_CHUNK_BYTES),
+            )
+        except (KeyError, TypeError, ValueError, AttributeError) as exc:
+            raise BrowserProfileStoreError(f"Invalid browser profile manifest: {exc}") from exc
+
+
+@dataclass
+class ProfileTransferStats:
+    files: int = 0
+    bytes: int = 0
+    chunks: int = 0
+    transferred_chunks: int = 0
+    transferred_bytes: int = 0
+    cached_chunks: int = 0
+    deleted_chunks: int = 0
+
+    def as_attributes(self) -> dict[str, int]:
+        return {
+            "files": self.files,
+            "bytes": self.bytes,
+            "chunks": self.chunks,
+            "transferred_chunks": self.transferred_chunks,
+            "transferred_bytes": self.transferred_bytes,
+            "cached_chunks": self.cached_chunks,
+            "deleted_chunks": self.deleted_chunks,
+        }
+
+
+def browser_profile_chunk_store_enabled() -> bool:
+    return bool(getattr(settings, "BROWSER_PROFILE_CHUNK_STORE_ENABLED", False))
+
+
+def profile_storage_prefix(agent_uuid: str) -> str:
+    clean_uuid = agent_uuid.replace("-", "")
+    return f"browser_profiles/{clean_uuid[:2]}/{clean_uuid[2:4]}/{agent_uuid}"
+
+
+def profile_manifest_key(agent_uuid: str) -> str:
+    """Single mutable manifest key written before manifests were versioned; read as a fallback."""
+    return f"{profile_storage_prefix(agent_uuid)}.manifest.json"
+
+
+def profile_manifest_dir(agent_uuid: str) -> str:
+    return f"{profile_storage_prefix(agent_uuid)}.manifests"
+
+
+def profile_manifest_generation_key(agent_uuid: str, generation: str) -> str:
+    return f"{profile_manifest_dir(agent_uuid)}/{generation}.json"
+
+
+def profile_chunk_dir(agent_uuid: str) -> str:
+    return f"{profile_storage_prefix(agent_uuid)}.chunks"
+
+
+def profile_chunk_key(agent_uuid: str, digest: str) -> str:
+    return f"{profile_chunk_dir(agent_uuid)}/{digest}.zst"
+
+
+def _chunk_digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=32).hexdigest()
+
+
+class ProfileChunkCache:
+    """Bounded on-disk cache of compressed profile chunks shared by tasks on a worker."""
+
+    def __init__(self, root: str, *, max_bytes: int):
+        self.root = root
+        self.max_bytes = max(0, max_bytes)
+        self._lock = threading.Lock()
+        self._approx_bytes: Optional[int] = None
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], f"{digest}.zst")
+
+    def get(self, digest: str) -> Optional[bytes]:
+        path = self._path(digest)
+        try:
+            with open(path, "rb") as chunk_file:
+                data = chunk_file.read()
+            os.utime(path)
+        except OSError:
+            return None
+        return data
+
+    def __contains__(self, digest: str) -> bool:
+        return os.path.exists(self._path(digest))
+
+    def put(self, digest: str, compressed: bytes) -> None:
+        if self.max_bytes <= 0:
+            return
+        path = self._path(digest)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "wb") as chunk_file:
+                chunk_file.write(compressed)
+            os.replace(tmp_path, path)
+        except OSError:
+            logger.debug("Failed to cache browser profile chunk %s", digest, exc_info=True)
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+            return
+        with self._lock:
+            if self._approx_bytes is None:
+                self._approx_bytes = self._scan_bytes()
+            else:
+                self._approx_bytes += len(compressed)
+            if self._approx_bytes > self.max_bytes:
+                self._approx_bytes = self._evict()
+
+    def _entries(self) -> list[tuple[float, int, str]]:
+        entries = []
+        for dirpath, _dirnames, filenames in os.walk(self.root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                try:
+                    info = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((info.st_mtime, info.st_size, path))
+        return entries
+
+    def _scan_bytes(self) -> int:
+        return sum(size for _mtime, size, _path in self._entries())
+
+    def _evict(self) -> int:
+        """Drop least recently used chunks until the cache is at 80% of its budget."""
+        entries = sorted(self._entries())
+        total = sum(size for _mtime, size, _path in entries)
+        target = int(self.max_bytes * 0.8)
+        for _mtime, size, path in entries:
+            if total <= target:
+                break
+            with contextlib.suppress(OSError):
+                os.remove(path)
+                total -= size
+        return total
+
+
+_chunk_cache: Optional[ProfileChunkCache] = None
+_chunk_cache_lock = threading.Lock()
+
+
+def get_profile_chunk_cache() -> ProfileChunkCache:
+    global _chunk_cache
+    root = getattr(settings, "BROWSER_PROFILE_CHUNK_CACHE_DIR", "") or os.path.join(
+        tempfile.gettempdir(), "gobii-browser-profile-chunks"
+    )
+    max_bytes = int(getattr(settings, "BROWSER_PROFILE_CHUNK_CACHE_MAX_BYTES", 0) or 0)
+    with _chunk_cache_lock:
+        if _chunk_cache is None or _chunk_cache.root != root or _chunk_cache.max_bytes != max(0, max_bytes):
+            _chunk_cache = ProfileChunkCache(root, max_bytes=max_bytes)
+        return _chunk_cache
+
+
+def _safe_profile_path(profile_dir: str, rel_path: str) -> str:
+    abs_dest = os.path.realpath(profile_dir)
+    target = os.path.realpath(os.path.join(profile_dir, rel_path))
+    if os.path.isabs(rel_path) or not target.startswith(abs_dest + os.sep):
+        raise BrowserProfileStoreError(f"Unsafe path in browser profile manifest: {rel_path}")
+    return target
+
+
+def scan_profile(
+    profile_dir: str,
+    *,
+    chunk_bytes: int = PROFILE_CHUNK_BYTES,
+) -> tuple[BrowserProfileManifest, dict[str, tuple[str, int, int]]]:
+    """Chunk and hash every regular file of ``profile_dir`` in one pass.
+
+    Returns the manifest and, for each distinct chunk, where to read it back
+    from as ``(relative_path, offset, length)``. Symlinks (Chrome's Singleton*
+    markers) are not persisted; Chrome recreates them on launch.
+    """
+    files: list[ProfileFileEntry] = []
+    dirs: list[str] = []
+    locations: dict[str, tuple[str, int, int]] = {}
+    for dirpath, dirnames, filenames in os.walk(profile_dir):
+        dirnames.sort()
+        rel_dir = os.path.relpath(dirpath, profile_dir)
+        if rel_dir != ".":
+            dirs.append(rel_dir)
+        for filename in sorted(filenames):
+            full_path = os.path.join(dirpath, filename)
+            rel_path = os.path.relpath(full_path, profile_dir)
+            try:
+                info = os.lstat(full_path)
+                if not stat.S_ISREG(info.st_mode):
+                    continue
+                chunks = []
+                size = 0
+                with open(full_path, "rb") as source:
+                    while True:
+                        data = source.read(chunk_bytes)
+                        if not data:
+                            break
+                        digest = _chunk_digest(data)
+                        locations.setdefault(digest, (rel_path, size, len(data)))
+                        chunks.append(digest)
+                        size += len(data)
+            except FileNotFoundError:
+                continue
+            files.append(
+                ProfileFileEntry(
+                    path=rel_path,
+                    mode=stat.S_IMODE(info.st_mode),
+                    size=size,
+                    chunks=tuple(chunks),
+                )
+            )
+    manifest = BrowserProfileManifest(files=tuple(files), dirs=tuple(dirs), chunk_bytes=chunk_bytes)
+    return manifest, locations
+
+
+def _new_manifest_generation() -> str:
+    # Sorts by creation time; the suffix keeps concurrent writers from colliding.
+    return f"{time.time_ns():020d}-{uuid.uuid4().hex[:8]}"
+
+
+def _generation_age_seconds(generation: str) -> float:
+    try:
+        created_ns = int(generation.split("-", 1)[0])
+    except ValueError:
+        return float("inf")
+    return max(0.0, (time.time_ns() - created_ns) / 1e9)
+
+
+def list_manifest_generations(agent_uuid: str) -> list[str]:
+    """Generations of the agent's immutable manifests, oldest first."""
+    try:
+        _dirs, files = default_storage.listdir(profile_manifest_dir(agent_uuid))
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+    return sorted(name[: -len(".json")] for name in files if name.endswith(".json"))
+
+
+def _read_manifest_object(storage_key: str) -> BrowserProfileManifest:
+    with default_storage.open(storage_key, "rb") as manifest_file:
+        raw = manifest_file.read()
+    return BrowserProfileManifest.from_json(raw)
+
+
+def read_profile_manifest(agent_uuid: str) -> Optional[BrowserProfileManifest]:
+    """Return the newest readable manifest, falling back to the single-key layout."""
+    for generation in reversed(list_manifest_generations(agent_uuid)):
+        try:
+            return _read_manifest_object(profile_manifest_generation_key(agent_uuid, generation))
+        except (BrowserProfileStoreError, FileNotFoundError):
+            # Deleted by a sweep or still being written; an older generation is still complete.
+            logger.warning("Skipping unreadable browser profile manifest %s for %s", generation, agent_uuid)
+    legacy_key = profile_manifest_key(agent_uuid)
+    if not default_storage.exists(legacy_key):
+        return None
+    return _read_manifest_object(legacy_key)
+
+
+@contextlib.contextmanager
+def _profile_lock(agent_uuid: str, *, blocking: bool = True):
+    """Serialize manifest writes and chunk sweeps for one agent; yields whether the lock is held."""
+    lock = Redlock(
+        key=f"browser-profile-store:{agent_uuid}",
+        masters={get_redis_client()},
+        auto_release_time=PROFILE_LOCK_TTL_SECONDS,
+    )
+    acquired = lock.acquire(timeout=PROFILE_LOCK_WAIT_SECONDS) if blocking else lock.acquire(blocking=False)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            with contextlib.suppress(Exception):
+                lock.release()
+
+
+def _deleted_chunks_key(agent_uuid: str) -> str:
+    return f"browser-profile-store:{agent_uuid}:deleted-chunks"
+
+
+def _deleted_chunk_digests(agent_uuid: str) -> set[str]:
+    members = get_redis_client().smembers(_deleted_chunks_key(agent_uuid)) or set()
+    return {member.decode("utf-8") if isinstance(member, bytes) else member for member in members}
+
+
+def _save_object(storage_key: str, data: bytes) -> None:
+    saved_key = default_storage.save(storage_key, ContentFile(data))
+    if saved_key != storage_key:
+        with contextlib.suppress(Exception):
+            default_storage.delete(saved_key)
+        raise BrowserProfileStoreError(f"Storage backend saved an unexpected key: {saved_key}")
+
+
+def _fetch_chunk(agent_uuid: str, digest: str, cache: ProfileChunkCache) -> bytes:
+    """Return the decompressed chunk, downloading it if the cache does not have it."""
+    compressed = cache.get(digest)
+    from_cache = compressed is not None
+    if compressed is None:
+        with default_storage.open(profile_chunk_key(agent_uuid, digest), "rb") as chunk_file:
+            compressed = chunk_file.read()
+    data = zstd.ZstdDecompressor().decompress(compressed)
+    if _chunk_digest(data) != digest:
+        raise BrowserProfileStoreError(f"Browser profile chunk {digest} failed verification")
+    if not from_cache:
+        cache.put(digest, compressed)
+    return data
+
+
+def _clear_profile_dir(profile_dir: str) -> None:
+    for name in os.listdir(profile_dir):
+        path = os.path.join(profile_dir, name)
+        if os.path.isdir(path) and not os.path.islink(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            with contextlib.suppress(OSError):
+                os.remove(path)
+
+
+def _restore_manifest(
+    agent_uuid: str,
+    profile_dir: str,
+    manifest: BrowserProfileManifest,
+    cache: ProfileChunkCache,
+) -> ProfileTransferStats:
+    digests = manifest.chunk_digests
+    missing = [digest for digest in digests if digest not in cache]
+    stats = ProfileTransferStats(
+        files=len(manifest.files),
+        bytes=manifest.total_bytes,
+        chunks=len(digests),
+        cached_chunks=len(digests) - len(missing),
+    )
+    try:
+        # Warm the cache concurrently; files are then assembled from local chunks.
+        if missing and cache.max_bytes > 0:
+            with ThreadPoolExecutor(max_workers=min(PROFILE_TRANSFER_WORKERS, len(missing))) as pool:
+                for data in pool.map(lambda digest: _fetch_chunk(agent_uuid, digest, cache), missing):
+                    stats.transferred_chunks += 1
+                    stats.transferred_bytes += len(data)
+
+        for rel_dir in manifest.dirs:
+            os.makedirs(_safe_profile_path(profile_dir, rel_dir), exist_ok=True)
+        for entry in manifest.files:
+            target = _safe_profile_path(profile_dir, entry.path)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, "wb") as destination:
+                for digest in entry.chunks:
+                    destination.write(_fetch_chunk(agent_uuid, digest, cache))
+            os.chmod(target, entry.mode or 0o600)
+    except BaseException:
+        _clear_profile_dir(profile_dir)
+        raise
+    return stats
+
+
+def restore_browser_profile(
+    agent_uuid: str,
+    profile_dir: str,
+    *,
+    cache: Optional[ProfileChunkCache] = None,
+) -> Optional[tuple[BrowserProfileManifest, ProfileTransferStats]]:
+    """Rebuild ``profile_dir`` from the agent's manifest; None when there is none.
+
+    On failure the partially restored profile is cleared before re-raising, so
+    the browser never starts on a mix of old and missing files. If a chunk
+    vanished because a newer manifest superseded the one being restored, the
+    restore is retried once from the newest manifest.
+    """
+    if not browser_profile_chunk_store_enabled():
+        return None
+    manifest = read_profile_manifest(agent_uuid)
+    if manifest is None:
+        return None
+    cache = cache or get_profile_chunk_cache()
+    try:
+        return manifest, _restore_manifest(agent_uuid, profile_dir, manifest, cache)
+    except FileNotFoundError:
+        latest = read_profile_manifest(agent_uuid)
+        if latest is None or latest == manifest:
+            raise
+        logger.info("Browser profile manifest for %s changed during restore; retrying", agent_uuid)
+        return latest, _restore_manifest(agent_uuid, profile_dir, latest, cache)
+
+
+def persist_browser_profile(
+    agent_uuid: str,
+    profile_dir: str,
+    *,
+    previous: Optional[BrowserProfileManifest],
+    cache: Optional[ProfileChunkCache] = None,
+) -> tuple[BrowserProfileManifest, ProfileTransferStats]:
+    """Upload chunks the previous manifest lacks, then publish a new manifest generation.
+
+    Manifests are never overwritten: each save writes a new immutable object, so
+    readers always see a complete one. Chunks only disappear through
+    :func:`sweep_browser_profile_chunks`, which records their digests first, so
+    under the agent's profile lock only referenced chunks in that record are
+    re-checked (and re-uploaded if missing) before the manifest is written.
+    """
+    cache = cache or get_profile_chunk_cache()
+    manifest, locations = scan_profile(profile_dir)
+    known = previous.chunk_digests if previous is not None else set()
+    upload = [digest for digest in locations if digest not in known]
+    stats = ProfileTransferStats(
+        files=len(manifest.files),
+        bytes=manifest.total_bytes,
+        chunks=len(locations),
+        cached_chunks=len(locations) - len(upload),
+    )
+
+    def _ensure_chunk(digest: str) -> int:
+        """Upload ``digest`` unless storage already has it; returns the bytes uploaded."""
+        storage_key = profile_chunk_key(agent_uuid, digest)
+        # Chunk keys are content addressed, so an existing object already holds these bytes.
+        if default_storage.exists(storage_key):
+            return 0
+        rel_path, offset, length = locations[digest]
+        with open(os.path.join(profile_dir, rel_path), "rb") as source:
+            source.seek(offset)
+            data = source.read(length)
+        if len(data) != length or _chunk_digest(data) != digest:
+            raise BrowserProfileStoreError(f"Browser profile file changed while persisting: {rel_path}")
+        compressed = zstd.ZstdCompressor(level=_COMPRESSION_LEVEL).compress(data)
+        _save_object(storage_key, compressed)
+        cache.put(digest, compressed)
+        return len(compressed)
+
+    def _ensure_all(digests: list[str]) -> None:
+        if not digests:
+            return
+        with ThreadPoolExecutor(max_workers=min(PROFILE_TRANSFER_WORKERS, len(digests))) as pool:
+            for uploaded_bytes in pool.map(_ensure_chunk, digests):
+                if uploaded_bytes:
+                    stats.transferred_chunks += 1
+                    stats.transferred_bytes += uploaded_bytes
+
+    # Bulk uploads happen outside the lock; only the existence check and publish are serialized.
+    _ensure_all(upload)
+    with _profile_lock(agent_uuid) as locked:
+        if not locked:
+            raise BrowserProfileStoreError(f"Timed out waiting for the browser profile lock of {agent_uuid}")
+        deleted_digests = _deleted_chunk_digests(agent_uuid)
+        deleted = [digest for digest in locations if digest in deleted_digests]
+        _ensure_all(deleted)
+        if deleted:
+            # Those chunks exist again, so later saves need not re-check them.
+            get_redis_client().srem(_deleted_chunks_key(agent_uuid), *deleted)
+        generation = _new_manifest_generation()
+        _save_object(
+            profile_manifest_generation_key(agent_uuid, generation),
+            manifest.to_json().encode("utf-8"),
+        )
+    stats.deleted_chunks = sweep_browser_profile_chunks(agent_uuid)
+    return manifest, stats
+
+
+def sweep_browser_profile_chunks(agent_uuid: str) -> int:
+    """Drop superseded manifests and the chunks no retained manifest references.
+
+    The newest manifest is always kept, along with any younger than
+    ``MANIFEST_GRACE_SECONDS`` so restores that already read one can finish.
+    Runs under the agent's profile lock and skips the sweep if another save
+    or sweep holds it. Returns the number of chunks deleted.
+    """
+    try:
+        with _profile_lock(agent_uuid, blocking=False) as locked:
+            if not locked:
+                return 0
+            generations = list_manifest_generations(agent_uuid)
+            if not generations:
+                return 0
+            retained = [
+                generation
+                for index, generation in enumerate(generations)
+                if index == len(generations) - 1 or _generation_age_seconds(generation) < MANIFEST_GRACE_SECONDS
+            ]
+            live: set[str] = set()
+            for generation in retained:
+                # Writes happen under this lock, so a retained manifest that cannot be read
+                # is corrupt rather than in flight; keep everything rather than guess.
+                live |= _read_manifest_object(profile_manifest_generation_key(agent_uuid, generation)).chunk_digests
+
+            for generation in generations:
+                if generation not in retained:
+                    _delete_object(profile_manifest_generation_key(agent_uuid, generation))
+            if default_storage.exists(profile_manifest_key(agent_uuid)):
+                _delete_object(profile_manifest_key(agent_uuid))
+            return _delete_chunks(agent_uuid, set(_list_chunk_digests(agent_uuid)) - live)
+    except Exception:  # noqa: BLE001 - leftover chunks are only wasted space.
+        logger.warning("Browser profile chunk sweep failed for %s", agent_uuid, exc_info=True)
+        return 0
+
+
+def _list_chunk_digests(agent_uuid: str) -> list[str]:
+    try:
+        _dirs, files = default_storage.listdir(profile_chunk_dir(agent_uuid))
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+    return [name[: -len(".zst")] for name in files if name.endswith(".zst")]
+
+
+def _delete_object(storage_key: str) -> bool:
+    try:
+        default_storage.delete(storage_key)
+    except Exception:  # noqa: BLE001
+        logger.warning("Failed to delete browser profile object %s", storage_key, exc_info=True)
+        return False
+    return True
+
+
+def _delete_chunks(agent_uuid: str, digests: Iterable[str]) -> int:
+    digests = list(digests)
+    if not digests:
+        return 0
+    # Record the digests before deleting so an in-flight save re-checks exactly these chunks.
+    pipe = get_redis_client().pipeline()
+    pipe.sadd(_deleted_chunks_key(agent_uuid), *digests)
+    pipe.expire(_deleted_chunks_key(agent_uuid), PROFILE_DELETED_CHUNKS_TTL_SECONDS)
+    pipe.execute()
+    return sum(1 for digest in digests if _delete_object(profile_chunk_key(agent_uuid, digest)))
+
+
+def delete_browser_profile_manifest(agent_uuid: str) -> None:
+    """Best-effort removal of a chunked profile, used when falling back to archives."""
+    generations = list_manifest_generations(agent_uuid)
+    legacy_key = profile_manifest_key(agent_uuid)
+    if not generations and not default_storage.exists(legacy_key):
+        return
+    with _profile_lock(agent_uuid) as locked:
+        if not locked:
+            logger.warning("Skipped deleting browser profile manifests for %s: profile lock busy", agent_uuid)
+            return
+        for generation in list_manifest_generations(agent_uuid):
+            _delete_object(profile_manifest_generation_key(agent_uuid, generation))
+        if default_storage.exists(legacy_key):
+            _delete_object(legacy_key)
+        _delete_chunks(agent_uuid, _list_chunk_digests(agent_uuid))
@@ -0,0 +1,262 @@
+"""
+Rolling credit usage counters for agents and their owners.
+
+Daily usage and burn-rate checks used to run ``SUM(credits_cost)`` over
+``PersistentAgentStep`` on every prompt build and tool call. Charges are now
+also added to per-minute Redis buckets (one hash per scope and UTC hour), so
+any window inside the retained horizon is answered from at most a few dozen
+small hashes. The step table stays the source of truth: a scope is seeded from
+it the first time it is read, and ``reconcile_credit_usage`` rewrites the
+buckets periodically to repair drift from missed increments or direct updates.
+"""
+
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.db.models.functions import TruncMinute
+from django.utils import timezone
+
+from config.redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+LEDGER_KEY_PREFIX = "credit-usage:v1"
+SCOPE_AGENT = "agent"
+SCOPE_USER = "user"
+SCOPE_ORGANIZATION = "org"
+
+# Long enough for a full local day, including 25-hour DST days.
+READ_HORIZON = timedelta(hours=26)
+MILLICREDITS = Decimal("1000")
+
+UsageScope = tuple[str, str]
+
+
+def _ledger_enabled() -> bool:
+    return bool(getattr(settings, "CREDIT_USAGE_LEDGER_ENABLED", False))
+
+
+def _ready_ttl_seconds() -> int:
+    return max(60, int(getattr(settings, "CREDIT_USAGE_LEDGER_READY_TTL_SECONDS", 3600) or 0))
+
+
+def _seed_horizon() -> timedelta:
+    # A seed stays trusted for the ready TTL, so it must cover that much extra history.
+    return READ_HORIZON + timedelta(seconds=_ready_ttl_seconds())
+
+
+def _bucket_ttl_seconds() -> int:
+    return int(_seed_horizon().total_seconds()) + 3600
+
+
+def agent_usage_scope(agent) -> UsageScope:
+    return (SCOPE_AGENT, str(agent.id))
+
+
+def owner_usage_scope(agent) -> Optional[UsageScope]:
+    """Owner scope matching burn-rate snapshots: the organization if any, else the user."""
+    organization_id = getattr(agent, "organization_id", None)
+    if organization_id:
+        return (SCOPE_ORGANIZATION, str(organization_id))
+    user_id = getattr(agent, "user_id", None)
+    if user_id:
+        return (SCOPE_USER, str(user_id))
+    return None
+
+
+def _agent_scopes(agent) -> list[UsageScope]:
+    scopes = [agent_usage_scope(agent)]
+    owner_scope = owner_usage_scope(agent)
+    if owner_scope is not None:
+        scopes.append(owner_scope)
+    return scopes
+
+
+def _minute(at: datetime) -> datetime:
+    return at.astimezone(dt_timezone.utc).replace(second=0, microsecond=0)
+
+
+def _hours(start: datetime, end: datetime) -> Iterable[datetime]:
+    hour = _minute(start).replace(minute=0)
+    last = _minute(end).replace(minute=0)
+    while hour <= last:
+        yield hour
+        hour += timedelta(hours=1)
+
+
+def _bucket_key(scope: UsageScope, hour: datetime) -> str:
+    scope_type, scope_id = scope
+    return f"{LEDGER_KEY_PREFIX}:{scope_type}:{scope_id}:{hour:%Y%m%d%H}"
+
+
+def _ready_key(scope: UsageScope) -> str:
+    scope_type, scope_id = scope
+    return f"{LEDGER_KEY_PREFIX}:{scope_type}:{scope_id}:ready"
+
+
+def _to_millicredits(amount: Decimal) -> int:
+    return int((Decimal(amount) * MILLICREDITS).to_integral_value(rounding=ROUND_HALF_UP))
+
+
+@dataclass(frozen=True)
+class CreditUsageSnapshot:
+    """Per-minute usage for one scope, covering ``since`` up to the time it was loaded."""
+
+    since: datetime
+    minutes: dict[datetime, int]
+
+    def total_since(self, start: datetime) -> Optional[Decimal]:
+        """Credits charged at or after ``start``, or None when ``start`` predates the snapshot."""
+        start_minute = _minute(start)
+        if start_minute < _minute(self.since):
+            return None
+        total = sum(value for minute, value in self.minutes.items() if minute >= start_minute)
+        return Decimal(total) / MILLICREDITS
+
+
+def record_credit_usage(agent, amount: Optional[Decimal], *, at: Optional[datetime] = None) -> None:
+    """Add a charge (or a negative refund) to the agent's and owner's buckets after commit."""
+    if not _ledger_enabled() or agent is None or amount is None:
+        return
+    millicredits = _to_millicredits(amount)
+    if millicredits == 0:
+        return
+    minute = _minute(at or timezone.now())
+    scopes = _agent_scopes(agent)
+
+    def _apply() -> None:
+        if minute < _minute(timezone.now() - _seed_horizon()):
+            return
+        try:
+            pipe = get_redis_client().pipeline(transaction=False)
+            for scope in scopes:
+                key = _bucket_key(scope, minute)
+                pipe.hincrby(key, str(minute.minute), millicredits)
+                pipe.expire(key, _bucket_ttl_seconds())
+            pipe.execute()
+        except Exception:
+            logger.debug("Failed to record credit usage for agent %s", getattr(agent, "id", None), exc_info=True)
+
+    transaction.on_commit(_apply)
+
+
+def _steps_for_scope(scope: UsageScope):
+    from api.models import PersistentAgentStep
+
+    scope_type, scope_id = scope
+    if scope_type == SCOPE_AGENT:
+        scope_filter = Q(agent_id=scope_id)
+    elif scope_type == SCOPE_ORGANIZATION:
+        scope_filter = Q(agent__organization_id=scope_id)
+    elif scope_type == SCOPE_USER:
+        scope_filter = Q(agent__user_id=scope_id, agent__organization_id__isnull=True)
+    else:
+        raise ValueError(f"Unknown credit usage scope: {scope_type}")
+    return PersistentAgentStep.objects.filter(scope_filter, credits_cost__isnull=False)
+
+
+def reconcile_credit_usage(scope: UsageScope, *, now: Optional[datetime] = None) -> int:
+    """Rewrite a scope's buckets from the step table; returns the number of non-empty minutes."""
+    now = now or timezone.now()
+    start = _minute(now - _seed_horizon())
+    rows = (
+        _steps_for_scope(scope)
+        .filter(created_at__gte=start)
+        .annotate(minute=TruncMinute("created_at", tzinfo=dt_timezone.utc))
+        .order_by()
+        .values("minute")
+        .annotate(total=Sum("credits_cost"))
+    )
+    buckets: dict[str, dict[str, int]] = {}
+    for row in rows:
+        minute = _minute(row["minute"])
+        millicredits = _to_millicredits(row["total"] or Decimal("0"))
+        if millicredits:
+            buckets.setdefault(_bucket_key(scope, minute), {})[str(minute.minute)] = millicredits
+
+    pipe = get_redis_client().pipeline(transaction=True)
+    for hour in _hours(start, now):
+        pipe.delete(_bucket_key(scope, hour))
+    for key, mapping in buckets.items():
+        pipe.hset(key, mapping=mapping)
+        pipe.expire(key, _bucket_ttl_seconds())
+    pipe.set(_ready_key(scope), "1", ex=_ready_ttl_seconds())
+    pipe.execute()
+    return sum(len(mapping) for mapping in buckets.values())
+
+
+def load_credit_usage(scope: UsageScope, *, since: datetime) -> Optional[CreditUsageSnapshot]:
+    """Return per-minute usage since ``since``, or None when callers should aggregate steps instead."""
+    if not _ledger_enabled():
+        return None
+    now = timezone.now()
+    if since < now - READ_HORIZON:
+        return None
+    try:
+        client = get_redis_client()
+        if not client.exists(_ready_key(scope)):
+            reconcile_credit_usage(scope, now=now)
+        hours = list(_hours(since, now))
+        pipe = client.pipeline(transaction=False)
+        for hour in hours:
+            pipe.hgetall(_bucket_key(scope, hour))
+        results = pipe.execute()
+    except Exception:
+        logger.debug("Credit usage ledger unavailable for %s %s", *scope, exc_info=True)
+        return None
+
+    minutes: dict[datetime, int] = {}
+    for hour, fields in zip(hours, results):
+        for field, value in (fields or {}).items():
+            try:
+                minutes[hour.replace(minute=int(field))] = int(value)
+            except (TypeError, ValueError):
+                continue
+    return CreditUsageSnapshot(since=since, minutes=minutes)
+
+
+def load_agent_credit_usage(agent, *, since: datetime) -> Optional[CreditUsageSnapshot]:
+    return load_credit_usage(agent_usage_scope(agent), since=since)
+
+
+def reconcile_active_credit_usage(*, active_minutes: Optional[int] = None) -> int:
+    """Reconcile every agent and owner scope charged within the last ``active_minutes``."""
+    from api.models import PersistentAgentStep
+
+    if not _ledger_enabled():
+        return 0
+    if active_minutes is None:
+        active_minutes = int(getattr(settings, "CREDIT_USAGE_LEDGER_RECONCILE_MINUTES", 15) or 15) * 2
+    now = timezone.now()
+    active = (
+        PersistentAgentStep.objects.filter(
+            created_at__gte=now - timedelta(minutes=active_minutes),
+            credits_cost__isnull=False,
+        )
+        .order_by()
+        .values_list("agent_id", "agent__user_id", "agent__organization_id")
+        .distinct()
+    )
+    scopes: set[UsageScope] = set()
+    for agent_id, user_id, organization_id in active:
+        scopes.add((SCOPE_AGENT, str(agent_id)))
+        if organization_id:
+            scopes.add((SCOPE_ORGANIZATION, str(organization_id)))
+        elif user_id:
+            scopes.add((SCOPE_USER, str(user_id)))
+
+    reconciled = 0
+    for scope in sorted(scopes):
+        try:
+            reconcile_credit_usage(scope, now=now)
+        except Exception:
+            logger.exception("Failed to reconcile credit usage ledger for %s %s", *scope)
+            continue
+        reconciled += 1
+    return reconciled
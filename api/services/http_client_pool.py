@@ -0,0 +1,339 @@
+"""
+Shared keep-alive HTTP client for agent tools.
+
+``http_request`` and the Bright Data tools used bare ``requests.request`` /
+``requests.post`` calls, so every call paid a fresh TCP + TLS handshake, plus a
+proxy CONNECT when proxied, even while an agent paginated the same API dozens
+of times in a row. Calls now go through one ``requests.Session`` per proxy. Each
+session's urllib3 pools keep connections to each (scheme, host) alive between
+calls. A per-(proxy, scheme, host) semaphore bounds concurrency, and sessions or
+host slots that sit idle are evicted.
+
+Connection reuse and an estimate of the handshake time it saved are exported as
+OpenTelemetry metrics.
+"""
+
+import logging
+import os
+from http.cookiejar import DefaultCookiePolicy
+import threading
+import time
+import weakref
+from dataclasses import dataclass, field
+from typing import Any, Optional
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from opentelemetry import metrics
+from requests.adapters import HTTPAdapter
+from requests.exceptions import RequestException
+from requests.utils import select_proxy
+
+logger = logging.getLogger(__name__)
+
+_meter = metrics.get_meter("gobii.http_client")
+http_client_requests = _meter.create_counter(
+    "gobii.http_client.requests",
+    description="Pooled HTTP client requests by connection outcome (reused, new, unknown)",
+)
+http_client_handshake_saved = _meter.create_counter(
+    "gobii.http_client.handshake_saved",
+    unit="s",
+    description="Estimated connection setup time avoided by reusing pooled connections",
+)
+http_client_sessions = _meter.create_up_down_counter(
+    "gobii.http_client.sessions",
+    description="Open pooled HTTP client sessions (one per proxy)",
+)
+
+SWEEP_INTERVAL_SECONDS = 30.0
+LATENCY_EWMA_ALPHA = 0.2
+
+HostKey = tuple[str, str, str]
+
+
+class HttpClientBusyError(RequestException):
+    """Raised when a host's concurrency limit stays exhausted past the wait timeout."""
+
+
+@dataclass
+class _HostSlot:
+    semaphore: threading.BoundedSemaphore
+    active: int = 0
+    last_used: float = 0.0
+    new_connection_latency: Optional[float] = None
+    reused_connection_latency: Optional[float] = None
+
+    def observe(self, reused: bool, elapsed: float) -> float:
+        """Fold one request's latency in; return the setup time a reuse is estimated to have saved."""
+        attr = "reused_connection_latency" if reused else "new_connection_latency"
+        current = getattr(self, attr)
+        setattr(self, attr, elapsed if current is None else current + LATENCY_EWMA_ALPHA * (elapsed - current))
+        if not reused or self.new_connection_latency is None or self.reused_connection_latency is None:
+            return 0.0
+        return max(0.0, self.new_connection_latency - self.reused_connection_latency)
+
+
+class _RejectAllCookiePolicy(DefaultCookiePolicy):
+    """Keep pooled sessions stateless: a session is shared by every agent using the same proxy."""
+
+    def set_ok(self, cookie, request) -> bool:
+        return False
+
+    def return_ok(self, cookie, request) -> bool:
+        return False
+
+
+@dataclass
+class _PooledSession:
+    session: requests.Session
+    last_used: float = 0.0
+    hosts: set[HostKey] = field(default_factory=set)
+
+
+class _SlotRelease:
+    """Releases a host slot exactly once, whichever of close() or GC gets there first."""
+
+    def __init__(self, client: "PooledHttpClient", key: HostKey) -> None:
+        self._client = client
+        self._key = key
+        self._lock = threading.Lock()
+        self._released = False
+
+    def __call__(self) -> None:
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        self._client._release_slot(self._key)
+
+
+class PooledHttpClient:
+    """Process-wide pool of keep-alive sessions keyed by proxy, scheme and host."""
+
+    def __init__(
+        self,
+        *,
+        max_per_host: Optional[int] = None,
+        hosts_per_session: Optional[int] = None,
+        max_sessions: Optional[int] = None,
+        idle_timeout: Optional[float] = None,
+        acquire_timeout: Optional[float] = None,
+    ) -> None:
+        self._max_per_host = max_per_host
+        self._hosts_per_session = hosts_per_session
+        self._max_sessions = max_sessions
+        self._idle_timeout = idle_timeout
+        self._acquire_timeout = acquire_timeout
+        self._lock = threading.Lock()
+        self._sessions: dict[str, _PooledSession] = {}
+        self._slots: dict[HostKey, _HostSlot] = {}
+        self._last_sweep = 0.0
+        self._owner_pid: Optional[int] = None
+
+    # ---------------------------------------------------------------- public
+    def request(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        proxies = kwargs.get("proxies") or {}
+        parts = urlsplit(url)
+        proxy_url = select_proxy(url, proxies) if proxies else None
+        key: HostKey = (proxy_url or "", parts.scheme.lower(), (parts.netloc or "").lower())
+
+        session = self._session_for(key)
+        slot = self._acquire_slot(key)
+        release = _SlotRelease(self, key)
+        stream = bool(kwargs.get("stream"))
+        started = time.monotonic()
+        connection_pool = self._connection_pool(session, url, proxy_url)
+        connections_before = getattr(connection_pool, "num_connections", None)
+        try:
+            response = session.request(method, url, **kwargs)
+        except BaseException:
+            release()
+            raise
+        elapsed = time.monotonic() - started
+        self._record(slot, key, connection_pool, connections_before, elapsed)
+
+        if not stream:
+            release()
+            return response
+        # Streamed bodies keep the connection checked out until the caller closes them.
+        original_close = response.close
+
+        def close() -> None:
+            try:
+                original_close()
+            finally:
+                release()
+
+        response.close = close
+        weakref.finalize(response, release)
+        return response
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def close_all(self) -> None:
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions = {}
+            self._slots = {}
+        for pooled in sessions:
+            self._close_session(pooled)
+
+    def session_count(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+    # -------------------------------------------------------------- internal
+    def _setting(self, override, name: str, default):
+        return override if override is not None else getattr(settings, name, default)
+
+    def _reset_if_forked(self) -> None:
+        pid = os.getpid()
+        if self._owner_pid != pid:
+            # Sockets inherited across fork must not be shared with the parent.
+            self._sessions = {}
+            self._slots = {}
+            self._owner_pid = pid
+
+    def _session_for(self, key: HostKey) -> requests.Session:
+        proxy_key = key[0]
+        now = time.monotonic()
+        evicted: list[_PooledSession] = []
+        with self._lock:
+            self._reset_if_forked()
+            if now - self._last_sweep >= SWEEP_INTERVAL_SECONDS:
+                self._last_sweep = now
+                evicted.extend(self._evict_idle_locked(now))
+            pooled = self._sessions.get(proxy_key)
+            if pooled is None:
+                max_sessions = int(self._setting(self._max_sessions, "HTTP_CLIENT_POOL_MAX_SESSIONS", 64))
+                while len(self._sessions) >= max_sessions:
+                    victim = self._least_recently_used_idle_locked()
+                    if victim is None:
+                        break
+                    evicted.append(self._sessions.pop(victim))
+                pooled = self._sessions[proxy_key] = _PooledSession(session=self._new_session())
+                http_client_sessions.add(1)
+            pooled.last_used = now
+            pooled.hosts.add(key)
+        for victim in evicted:
+            self._close_session(victim)
+        return pooled.session
+
+    def _new_session(self) -> requests.Session:
+        session = requests.Session()
+        # Cookies passed per call still apply (and follow redirects); responses never store any.
+        session.cookies.set_policy(_RejectAllCookiePolicy())
+        adapter = HTTPAdapter(
+            pool_connections=int(self._setting(self._hosts_per_session, "HTTP_CLIENT_POOL_HOSTS_PER_SESSION", 32)),
+            pool_maxsize=int(self._setting(self._max_per_host, "HTTP_CLIENT_POOL_MAX_PER_HOST", 8)),
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def _acquire_slot(self, key: HostKey) -> _HostSlot:
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is None:
+                limit = int(self._setting(self._max_per_host, "HTTP_CLIENT_POOL_MAX_PER_HOST", 8))
+                slot = self._slots[key] = _HostSlot(semaphore=threading.BoundedSemaphore(max(1, limit)))
+            slot.active += 1
+            slot.last_used = time.monotonic()
+        timeout = float(self._setting(self._acquire_timeout, "HTTP_CLIENT_POOL_ACQUIRE_TIMEOUT_SECONDS", 30))
+        if not slot.semaphore.acquire(timeout=timeout):
+            with self._lock:
+                slot.active -= 1
+            raise HttpClientBusyError(f"Too many concurrent requests to {key[2]}; try again shortly.")
+        return slot
+
+    def _release_slot(self, key: HostKey) -> None:
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is None:
+                return
+            slot.active = max(0, slot.active - 1)
+            slot.last_used = time.monotonic()
+        slot.semaphore.release()
+
+    @staticmethod
+    def _connection_pool(session: requests.Session, url: str, proxy_url: Optional[str]):
+        try:
+            adapter = session.get_adapter(url)
+            manager = adapter.proxy_manager_for(proxy_url) if proxy_url else adapter.poolmanager
+            return manager.connection_from_url(url)
+        except Exception:
+            return None
+
+    @staticmethod
+    def _record(slot: _HostSlot, key: HostKey, connection_pool, connections_before, elapsed: float) -> None:
+        attributes = {"scheme": key[1], "proxied": bool(key[0])}
+        connections_after = getattr(connection_pool, "num_connections", None)
+        if connections_before is None or connections_after is None:
+            http_client_requests.add(1, {**attributes, "connection": "unknown"})
+            return
+        # Approximate under concurrency: another request may open a connection meanwhile.
+        reused = connections_after == connections_before
+        http_client_requests.add(1, {**attributes, "connection": "reused" if reused else "new"})
+        saved = slot.observe(reused, elapsed)
+        if saved:
+            http_client_handshake_saved.add(saved, attributes)
+
+    def _evict_idle_locked(self, now: float) -> list[_PooledSession]:
+        idle_timeout = float(self._setting(self._idle_timeout, "HTTP_CLIENT_POOL_IDLE_TIMEOUT_SECONDS", 90))
+        for key, slot in list(self._slots.items()):
+            if slot.active == 0 and now - slot.last_used >= idle_timeout:
+                del self._slots[key]
+        evicted = []
+        for proxy_key, pooled in list(self._sessions.items()):
+            if now - pooled.last_used >= idle_timeout and not self._session_busy_locked(pooled):
+                evicted.append(self._sessions.pop(proxy_key))
+        return evicted
+
+    def _least_recently_used_idle_locked(self) -> Optional[str]:
+        candidates = [
+            (pooled.last_used, proxy_key)
+            for proxy_key, pooled in self._sessions.items()
+            if not self._session_busy_locked(pooled)
+        ]
+        return min(candidates)[1] if candidates else None
+
+    def _session_busy_locked(self, pooled: _PooledSession) -> bool:
+        return any(self._slots.get(key) is not None and self._slots[key].active for key in pooled.hosts)
+
+    @staticmethod
+    def _close_session(pooled: _PooledSession) -> None:
+        http_client_sessions.add(-1)
+        try:
+            pooled.session.close()
+        except Exception:
+            logger.debug("Failed to close pooled HTTP session", exc_info=True)
+
+
+class _DirectHttpClient:
+    """Unpooled client with the same interface, calling ``requests`` per request."""
+
+    def request(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        return requests.request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        return requests.get(url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        return requests.post(url, **kwargs)
+
+
+_pooled_client = PooledHttpClient()
+_direct_client = _DirectHttpClient()
+
+
+def get_http_client():
+    """Return the shared pooled client, or a direct one when pooling is disabled."""
+    if getattr(settings, "HTTP_CLIENT_POOL_ENABLED", False):
+        return _pooled_client
+    return _direct_client
@@ -1,18 +1,315 @@
+"""
+Prompt archive persistence.
+
+Each prompt is split into blocks at content-defined paragraph boundaries and
+every unique block is stored once per agent and day; the archive object is a
+small manifest of block digests. Successive loop iterations share most of their
+prompt, so only changed blocks cost a write. Object-store writes run on a
+bounded background queue so the agent loop does not wait on storage.
+"""
+
+import atexit
+import hashlib
 import json
 import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime, timezone
 from typing import Any, Optional, Tuple
 from uuid import UUID, uuid4
 
 import zstandard as zstd
+from django.conf import settings
 from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
+from django.db import close_old_connections
 
 from api.models import PersistentAgent, PersistentAgentError, PersistentAgentPromptArchive
 from api.services.agent_error_logging import log_agent_error
 
 logger = logging.getLogger(__name__)
 
+PROMPT_BLOCKS_FORMAT = "prompt-blocks/1"
+_PROMPT_FIELDS = ("system_prompt", "user_prompt")
+_MIN_BLOCK_CHARS = 2048
+_MAX_BLOCK_CHARS = 16384
+# Roughly one in four paragraph ends closes a block once it has MIN chars, so a
+# local edit only shifts boundaries until the next content-defined cut.
+_BOUNDARY_MASK = 0x3
+_KNOWN_BLOCKS_MAX = 4096
+_UPLOAD_QUEUE_MAX = 64
+_UPLOAD_QUEUE_PUT_TIMEOUT_SECONDS = 0.5
+_UPLOAD_SHUTDOWN_FLUSH_SECONDS = 10.0
+
+
+def _archive_prefix(agent_id: Any) -> str:
+    return f"persistent_agents/{agent_id}/prompt_archives/"
+
+
+def prompt_block_prefix(agent_id: Any, day: str) -> str:
+    """Storage prefix for one agent's prompt blocks written on ``day`` (``YYYYMMDD``)."""
+    return f"persistent_agents/{agent_id}/prompt_blocks/{day}/"
+
+
+def delete_prompt_blocks_for_day(agent_id: Any, day: str) -> int:
+    """Delete every stored block under one agent/day prefix; callers ensure no archive still needs them."""
+    prefix = prompt_block_prefix(agent_id, day)
+    try:
+        _dirs, files = default_storage.listdir(prefix)
+    except (FileNotFoundError, NotImplementedError):
+        return 0
+    deleted = 0
+    for name in files:
+        key = f"{prefix}{name}"
+        try:
+            default_storage.delete(key)
+        except Exception:
+            logger.exception("Failed to delete prompt block %s", key)
+            continue
+        deleted += 1
+    _known_blocks.clear()
+    return deleted
+
+
+def _split_prompt_blocks(text: str) -> list[str]:
+    """Split ``text`` losslessly into blocks whose boundaries depend only on nearby content."""
+    blocks: list[str] = []
+    current: list[str] = []
+    current_len = 0
+    for paragraph in text.split("\n\n"):
+        piece = paragraph + "\n\n"
+        current.append(piece)
+        current_len += len(piece)
+        boundary = hashlib.blake2b(paragraph.encode("utf-8"), digest_size=1).digest()[0] & _BOUNDARY_MASK == 0
+        if (current_len >= _MIN_BLOCK_CHARS and boundary) or current_len >= _MAX_BLOCK_CHARS:
+            blocks.append("".join(current))
+            current = []
+            current_len = 0
+    if current:
+        blocks.append("".join(current))
+    if blocks:
+        # ``split`` consumed no trailing separator, so drop the one added to the last paragraph.
+        blocks[-1] = blocks[-1][:-2]
+    return [block for block in blocks if block]
+
+
+@dataclass
+class _PromptArchiveUpload:
+    agent_id: str
+    archive_id: UUID
+    archive_key: str
+    manifest: bytes
+    blocks: dict[str, bytes]
+
+
+class _KnownBlocks:
+    """Process-local LRU of block keys already confirmed in storage."""
+
+    def __init__(self, max_entries: int = _KNOWN_BLOCKS_MAX) -> None:
+        self._lock = threading.Lock()
+        self._keys: OrderedDict[str, None] = OrderedDict()
+        self._max_entries = max_entries
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            if key not in self._keys:
+                return False
+            self._keys.move_to_end(key)
+            return True
+
+    def add(self, key: str) -> None:
+        with self._lock:
+            self._keys[key] = None
+            self._keys.move_to_end(key)
+            while len(self._keys) > self._max_entries:
+                self._keys.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._keys.clear()
+
+
+_known_blocks = _KnownBlocks()
+
+
+def _write_upload(upload: _PromptArchiveUpload) -> None:
+    for key, compressed in upload.blocks.items():
+        if key in _known_blocks:
+            continue
+        # Blocks are immutable and content-addressed, so an existing object is reusable as-is.
+        if not default_storage.exists(key):
+            default_storage.save(key, ContentFile(compressed))
+        _known_blocks.add(key)
+    default_storage.save(upload.archive_key, ContentFile(upload.manifest))
+
+
+def _mark_upload_failed(upload: _PromptArchiveUpload, exc: Exception) -> None:
+    logger.warning(
+        "Prompt archive upload failed for agent %s key=%s: %s",
+        upload.agent_id,
+        upload.archive_key,
+        exc,
+        exc_info=True,
+    )
+    # The agent loop already holds this row's id for its completion record, so
+    # keep the row and clear the key; readers treat a blank key as no payload.
+    PersistentAgentPromptArchive.objects.filter(id=upload.archive_id).update(storage_key="")
+
+
+class PromptArchiveUploader:
+    """Bounded per-process queue of archive uploads drained by one daemon thread."""
+
+    def __init__(self, max_pending: int = _UPLOAD_QUEUE_MAX) -> None:
+        self._queue: queue.Queue[_PromptArchiveUpload] = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._owner_pid: Optional[int] = None
+
+    def submit(self, upload: _PromptArchiveUpload) -> bool:
+        """Queue ``upload``; returns False when the queue stays full and the caller must upload inline."""
+        self._ensure_worker()
+        try:
+            self._queue.put(upload, timeout=_UPLOAD_QUEUE_PUT_TIMEOUT_SECONDS)
+        except queue.Full:
+            return False
+        return True
+
+    def join(self) -> None:
+        """Block until every queued upload has been attempted."""
+        self._queue.join()
+
+    def flush(self, timeout: float) -> bool:
+        """Wait up to ``timeout`` seconds for queued uploads; returns whether the queue drained."""
+        deadline = time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def shutdown(self, timeout: float = _UPLOAD_SHUTDOWN_FLUSH_SECONDS) -> None:
+        """Drain the queue before the process exits.
+
+        The daemon thread gets ``timeout`` seconds; if it is stuck on a slow
+        write, the caller writes what is still queued inline. Anything it cannot
+        write has its metadata row marked as having no payload.
+        """
+        if self._owner_pid != os.getpid() or self._queue.unfinished_tasks == 0:
+            return
+        deadline = time.monotonic() + timeout
+        if self.flush(timeout / 2):
+            return
+        while True:
+            try:
+                upload = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                if time.monotonic() >= deadline:
+                    raise TimeoutError("process exited before the prompt archive was written")
+                _write_upload(upload)
+            except Exception as exc:
+                _mark_upload_failed(upload, exc)
+            finally:
+                self._queue.task_done()
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def _ensure_worker(self) -> None:
+        pid = os.getpid()
+        with self._lock:
+            if self._owner_pid == pid and self._thread is not None and self._thread.is_alive():
+                return
+            if self._owner_pid != pid:
+                # Queued uploads belong to the parent; a forked child starts empty.
+                self._queue = queue.Queue(maxsize=self._queue.maxsize)
+            self._owner_pid = pid
+            self._thread = threading.Thread(target=self._run, name="prompt-archive-uploader", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            upload = self._queue.get()
+            try:
+                close_old_connections()
+                try:
+                    _write_upload(upload)
+                except Exception as exc:
+                    _mark_upload_failed(upload, exc)
+            except Exception:
+                logger.exception("Prompt archive uploader failed to handle a queued upload")
+            finally:
+                self._queue.task_done()
+
+
+_uploader = PromptArchiveUploader()
+atexit.register(_uploader.shutdown)
+
+
+def get_prompt_archive_uploader() -> PromptArchiveUploader:
+    return _uploader
+
+
+def _background_upload_enabled() -> bool:
+    return bool(getattr(settings, "PROMPT_ARCHIVE_BACKGROUND_UPLOAD_ENABLED", False))
+
+
+def _build_upload(
+    agent_id: str,
+    archive_payload: dict[str, Any],
+    timestamp: datetime,
+) -> Tuple[str, bytes, dict[str, bytes]]:
+    day = timestamp.strftime("%Y%m%d")
+    block_prefix = prompt_block_prefix(agent_id, day)
+    compressor = zstd.ZstdCompressor(level=3)
+    blocks: dict[str, bytes] = {}
+    digests: dict[str, list[str]] = {}
+    metadata = dict(archive_payload)
+    for field_name in _PROMPT_FIELDS:
+        field_digests: list[str] = []
+        for block in _split_prompt_blocks(str(metadata.pop(field_name, "") or "")):
+            block_bytes = block.encode("utf-8")
+            digest = hashlib.sha256(block_bytes).hexdigest()
+            field_digests.append(digest)
+            key = f"{block_prefix}{digest}.zst"
+            if key not in blocks:
+                blocks[key] = compressor.compress(block_bytes)
+        digests[field_name] = field_digests
+    manifest = {
+        "format": PROMPT_BLOCKS_FORMAT,
+        "block_prefix": block_prefix,
+        "blocks": digests,
+        "payload": metadata,
+    }
+    archive_key = f"{_archive_prefix(agent_id)}{timestamp.strftime('%Y%m%dT%H%M%S%fZ')}_{uuid4().hex}.blocks.json.zst"
+    return archive_key, compressor.compress(json.dumps(manifest).encode("utf-8")), blocks
+
+
+def load_prompt_archive_payload(storage_key: str, *, storage=None) -> dict[str, Any]:
+    """Read an archive in either the block-manifest or the legacy single-object format."""
+    storage = storage or default_storage
+    decompressor = zstd.ZstdDecompressor()
+    with storage.open(storage_key, "rb") as stored:
+        data = json.loads(decompressor.decompress(stored.read()).decode("utf-8"))
+    if not isinstance(data, dict) or data.get("format") != PROMPT_BLOCKS_FORMAT:
+        return data
+    payload = dict(data.get("payload") or {})
+    block_prefix = data.get("block_prefix") or ""
+    for field_name, digests in (data.get("blocks") or {}).items():
+        parts = []
+        for digest in digests:
+            with storage.open(f"{block_prefix}{digest}.zst", "rb") as stored:
+                parts.append(decompressor.decompress(stored.read()).decode("utf-8"))
+        payload[field_name] = "".join(parts)
+    return payload
+
 
 def archive_agent_prompt(
     *,
@@ -25,7 +322,11 @@ def archive_agent_prompt(
     token_budget: int,
     extra_payload: dict[str, Any] | None = None,
 ) -> Tuple[Optional[str], Optional[int], Optional[int], Optional[UUID]]:
-    """Compress and persist a prompt payload without interrupting agent execution on failure."""
+    """Compress and persist a prompt payload without interrupting agent execution on failure.
+
+    ``compressed_bytes`` counts the manifest plus blocks this process has not
+    already stored, i.e. the storage this archive actually adds.
+    """
     timestamp = datetime.now(timezone.utc)
     archive_payload = {
         "agent_id": str(agent.id),
@@ -40,20 +341,18 @@ def archive_agent_prompt(
     }
 
     try:
-        payload_bytes = json.dumps(archive_payload).encode("utf-8")
-        compressed = zstd.ZstdCompressor(level=3).compress(payload_bytes)
-        archive_key = (
-            f"persistent_agents/{agent.id}/prompt_archives/"
-            f"{timestamp.strftime('%Y%m%dT%H%M%S%fZ')}_{uuid4().hex}.json.zst"
+        raw_bytes = len(json.dumps(archive_payload).encode("utf-8"))
+        archive_key, manifest, blocks = _build_upload(str(agent.id), archive_payload, timestamp)
+        compressed_bytes = len(manifest) + sum(
+            len(compressed) for key, compressed in blocks.items() if key not in _known_blocks
         )
-        default_storage.save(archive_key, ContentFile(compressed))
         try:
             archive = PersistentAgentPromptArchive.objects.create(
                 agent=agent,
                 rendered_at=timestamp,
                 storage_key=archive_key,
-                raw_bytes=len(payload_bytes),
-                compressed_bytes=len(compressed),
+                raw_bytes=raw_bytes,
+                compressed_bytes=compressed_bytes,
                 tokens_before=tokens_before,
                 tokens_after=tokens_after,
                 tokens_saved=tokens_saved,
@@ -68,27 +367,41 @@ def archive_agent_prompt(
                 logger=logger,
                 context={
                     "archive_key": archive_key,
-                    "raw_bytes": len(payload_bytes),
-                    "compressed_bytes": len(compressed),
+                    "raw_bytes": raw_bytes,
+                    "compressed_bytes": compressed_bytes,
                     "tokens_before": tokens_before,
                     "tokens_after": tokens_after,
                     "tokens_saved": tokens_saved,
                 },
             )
+            return archive_key, raw_bytes, compressed_bytes, None
+
+        pending = _PromptArchiveUpload(
+            agent_id=str(agent.id),
+            archive_id=archive.id,
+            archive_key=archive_key,
+            manifest=manifest,
+            blocks=blocks,
+        )
+        queued = _background_upload_enabled() and _uploader.submit(pending)
+        if not queued:
+            # Backpressure: with the queue full (or background uploads off) the caller pays for the write.
             try:
-                default_storage.delete(archive_key)
+                _write_upload(pending)
             except Exception:
-                logger.exception("Failed to delete orphaned prompt archive from storage: %s", archive_key)
-            return archive_key, len(payload_bytes), len(compressed), None
+                PersistentAgentPromptArchive.objects.filter(id=archive.id).delete()
+                raise
 
         logger.info(
-            "Archived prompt for agent %s: key=%s raw_bytes=%d compressed_bytes=%d",
+            "Archived prompt for agent %s: key=%s raw_bytes=%d compressed_bytes=%d blocks=%d queued=%s",
             agent.id,
             archive_key,
-            len(payload_bytes),
-            len(compressed),
+            raw_bytes,
+            compressed_bytes,
+            len(blocks),
+            queued,
         )
-        return archive_key, len(payload_bytes), len(compressed), archive.id
+        return archive_key, raw_bytes, compressed_bytes, archive.id
     except Exception as exc:
         log_agent_error(
             agent,
@@ -9,6 +9,7 @@ from dataclasses import dataclass
 from decimal import Decimal
 from types import SimpleNamespace
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError as DjangoValidationError
 from django.core.serializers.json import DjangoJSONEncoder
@@ -32,6 +33,7 @@ from api.agent.files.filespace_service import get_or_create_default_filespace, w
 from api.models import AgentFsNode, AgentPeerLink, ApiKey, CommsChannel, Organization, OrganizationMembership, PersistentAgent, build_web_user_address
 from api.serializers import PersistentAgentSerializer
 from api.services.agent_settings_resume import queue_settings_change_resume
+from api.services.agent_event_hub import get_agent_timeline_event_hub
 from api.services.agent_debug_trace import (
     DEBUG_TRACE_DEFAULT_INCLUDE,
     DEBUG_TRACE_DEFAULT_LIMIT,
@@ -93,6 +95,8 @@ SERVER_INFO = {
 WAIT_DEFAULT_TIMEOUT_SECONDS = 10
 WAIT_MAX_TIMEOUT_SECONDS = 30
 WAIT_POLL_INTERVAL_SECONDS = 0.5
+# With event-hub wake-ups, still re-read occasionally in case a broadcast was missed.
+WAIT_EVENT_REFRESH_SECONDS = 5.0
 WAIT_EVENT_TYPES = {"message", "steps", "thinking", "plan"}
 WAIT_FILTER_FIELDS = {
     "from_actor_type",
@@ -1519,48 +1523,65 @@ def _tool_wait_for_agent_event(request, arguments):
     deadline = start + timeout_seconds
     latest_cursor = after_cursor
     events: list[dict] = []
+    waiter = None
 
-    while True:
-        direction = "newer" if latest_cursor else "initial"
-        window = fetch_timeline_window(agent, cursor=latest_cursor, direction=direction, limit=limit)
-        if window.newest_cursor:
-            latest_cursor = window.newest_cursor
-        events = [
-            event
-            for event in window.events
-            if _wait_event_matches(agent, event, event_types=event_types, filters=filters)
-        ]
-        if events:
-            waited_seconds = round(time.monotonic() - start, 3)
-            return _with_access_metadata(
-                {
-                    "matched": True,
-                    "timed_out": False,
-                    "events": events,
-                    "next_cursor": latest_cursor,
-                    "latest_cursor": latest_cursor,
-                    "waited_seconds": waited_seconds,
-                },
-                access=access,
-                agent=agent,
-            )
-        if time.monotonic() >= deadline:
-            waited_seconds = round(time.monotonic() - start, 3)
-            return _with_access_metadata(
-                {
-                    "matched": False,
-                    "timed_out": True,
-                    "events": [],
-                    "next_cursor": latest_cursor,
-                    "latest_cursor": latest_cursor,
-                    "waited_seconds": waited_seconds,
-                },
-                access=access,
-                agent=agent,
-            )
-        sleep_seconds = min(WAIT_POLL_INTERVAL_SECONDS, max(0, deadline - time.monotonic()))
-        if sleep_seconds:
-            time.sleep(sleep_seconds)
+    try:
+        while True:
+            direction = "newer" if latest_cursor else "initial"
+            window = fetch_timeline_window(agent, cursor=latest_cursor, direction=direction, limit=limit)
+            if window.newest_cursor:
+                latest_cursor = window.newest_cursor
+            events = [
+                event
+                for event in window.events
+                if _wait_event_matches(agent, event, event_types=event_types, filters=filters)
+            ]
+            if events:
+                waited_seconds = round(time.monotonic() - start, 3)
+                return _with_access_metadata(
+                    {
+                        "matched": True,
+                        "timed_out": False,
+                        "events": events,
+                        "next_cursor": latest_cursor,
+                        "latest_cursor": latest_cursor,
+                        "waited_seconds": waited_seconds,
+                    },
+                    access=access,
+                    agent=agent,
+                )
+            if time.monotonic() >= deadline:
+                waited_seconds = round(time.monotonic() - start, 3)
+                return _with_access_metadata(
+                    {
+                        "matched": False,
+                        "timed_out": True,
+                        "events": [],
+                        "next_cursor": latest_cursor,
+                        "latest_cursor": latest_cursor,
+                        "waited_seconds": waited_seconds,
+                    },
+                    access=access,
+                    agent=agent,
+                )
+            if waiter is None and _wait_event_hub_enabled():
+                waiter = get_agent_timeline_event_hub().subscribe(agent.id)
+                # Re-read once: anything appended before the subscription would never wake us.
+                continue
+            remaining = max(0, deadline - time.monotonic())
+            if waiter is not None and waiter.subscribed:
+                waiter.wait(min(WAIT_EVENT_REFRESH_SECONDS, remaining))
+                continue
+            sleep_seconds = min(WAIT_POLL_INTERVAL_SECONDS, remaining)
+            if sleep_seconds:
+                time.sleep(sleep_seconds)
+    finally:
+        if waiter is not None:
+            waiter.close()
+
+
+def _wait_event_hub_enabled() -> bool:
+    return bool(getattr(settings, "MCP_WAIT_EVENT_HUB_ENABLED", False))
 
 
 def _tool_list_agent_files(request, arguments):
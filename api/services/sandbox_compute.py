@@ -28,7 +28,12 @@ from api.models import AgentComputeSession, ComputeSnapshot, GlobalSecret, Persi
 from api.proxy_selection import select_proxy, select_proxy_for_persistent_agent
 from api.services.mcp_runtime_policy import mcp_server_requires_agent_sandbox
 from api.services.mcp_tool_cache import set_cached_mcp_tool_definitions
-from api.services.sandbox_filespace_sync import apply_filespace_push, build_filespace_pull_manifest
+from api.services.sandbox_filespace_sync import (
+    FilespacePushStreamError,
+    apply_filespace_push,
+    build_filespace_pull_manifest,
+    filespace_push_from_response,
+)
 from api.services.sandbox_internal_paths import (
     CUSTOM_TOOL_SQLITE_FILESPACE_PATH,
     GOBII_AGENT_SQLITE_PATH_ENV,
@@ -737,6 +742,35 @@ class HttpSandboxBackend(SandboxComputeBackend):
             payload["proxy_env"] = proxy_env
         return self._post("sandbox/compute/sync_filespace", payload)
 
+    def stream_filespace_push(
+        self,
+        agent,
+        session: AgentComputeSession,
+        *,
+        payload: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        payload = dict(payload or {})
+        payload.update({"agent_id": str(agent.id), "direction": "push", "transfer": "stream"})
+        proxy_env = _proxy_env_for_session(session)
+        if proxy_env:
+            payload["proxy_env"] = proxy_env
+        url = f"{self.base_url}/sandbox/compute/sync_filespace"
+        headers = {"Content-Type": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        try:
+            response = requests.post(
+                url,
+                json=payload,
+                headers=headers,
+                timeout=_http_timeout_seconds(),
+                stream=True,
+            )
+            response.raise_for_status()
+        except requests.RequestException as exc:
+            return {"status": "error", "message": str(exc)}
+        return filespace_push_from_response(response)
+
     def terminate(
         self,
         agent,
@@ -1665,18 +1699,24 @@ class SandboxComputeService:
         *,
         since: Optional[timezone.datetime] = None,
         internal_paths: Optional[Sequence[str]] = None,
+        stream: bool = False,
     ) -> Dict[str, Any]:
         payload: Dict[str, Any] = {}
         if since is not None:
             payload["since"] = since.isoformat()
         if internal_paths:
             payload["internal_paths"] = list(internal_paths)
+        # Streaming backends return `changes` as a lazy iterator over a binary
+        # push stream, so only callers that consume changes once may opt in.
+        stream_push = getattr(self._backend, "stream_filespace_push", None) if stream else None
+        if stream_push is not None:
+            return stream_push(agent, session, payload=payload)
         return self._backend.sync_filespace(agent, session, direction="push", payload=payload)
 
     def _sync_workspace_push(self, agent, session: AgentComputeSession) -> Optional[Dict[str, Any]]:
         if isinstance(self._backend, LocalSandboxBackend):
             return None
-        response = self._request_workspace_push(agent, session, since=session.last_filespace_sync_at)
+        response = self._request_workspace_push(agent, session, since=session.last_filespace_sync_at, stream=True)
         return self._apply_workspace_push_response(agent, session, response)
 
     def _apply_workspace_push_response(
@@ -1690,7 +1730,11 @@ class SandboxComputeService:
 
         changes = response.get("changes") or []
         sync_timestamp = _parse_sync_timestamp(response.get("sync_timestamp"))
-        applied = apply_filespace_push(agent, changes, sync_timestamp=sync_timestamp)
+        try:
+            applied = apply_filespace_push(agent, changes, sync_timestamp=sync_timestamp)
+        except FilespacePushStreamError as exc:
+            logger.warning("Sandbox filespace push stream failed agent=%s: %s", agent.id, exc)
+            return {"status": "error", "message": str(exc)}
         if applied.get("status") != "ok":
             return applied
 
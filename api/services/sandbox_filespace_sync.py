@@ -1,8 +1,12 @@
 import base64
+import hashlib
+import json
 import logging
+import struct
 from datetime import datetime
-from typing import Any, Dict, Iterable, Optional
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
 
+import requests
 from django.utils import timezone
 from django.db import DatabaseError
 
@@ -13,6 +17,115 @@ from api.services.sandbox_internal_paths import is_filespace_sync_ignored_path,
 
 logger = logging.getLogger(__name__)
 
+FILESPACE_PUSH_STREAM_CONTENT_TYPE = "application/vnd.gobii.filespace-push-stream"
+_STREAM_LENGTH = struct.Struct(">I")
+
+
+class FilespacePushStreamError(ValueError):
+    """Raised when a streamed filespace push is truncated or malformed."""
+
+
+class _ChunkReader:
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._buffer = bytearray()
+
+    def read_exact(self, size: int) -> bytes:
+        while len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                raise FilespacePushStreamError("Filespace push stream ended unexpectedly.")
+            self._buffer.extend(chunk)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    def read_length(self) -> int:
+        return _STREAM_LENGTH.unpack(self.read_exact(_STREAM_LENGTH.size))[0]
+
+    def read_frame(self) -> Dict[str, Any]:
+        raw = self.read_exact(self.read_length())
+        try:
+            frame = json.loads(raw)
+        except ValueError as exc:
+            raise FilespacePushStreamError("Filespace push stream frame is not valid JSON.") from exc
+        if not isinstance(frame, dict):
+            raise FilespacePushStreamError("Filespace push stream frame is not an object.")
+        return frame
+
+
+def _iter_stream_changes(reader: _ChunkReader) -> Iterator[Dict[str, Any]]:
+    while True:
+        frame = reader.read_frame()
+        frame_type = frame.pop("type", None)
+        if frame_type == "end":
+            return
+        if frame_type != "change":
+            raise FilespacePushStreamError(f"Unexpected filespace push stream frame: {frame_type}")
+        if not frame.pop("has_content", False):
+            yield frame
+            continue
+        # Only the file currently being applied is held in memory.
+        content = bytearray()
+        digest = hashlib.sha256()
+        while True:
+            size = reader.read_length()
+            if size == 0:
+                break
+            chunk = reader.read_exact(size)
+            digest.update(chunk)
+            content.extend(chunk)
+        expected = frame.get("checksum_sha256")
+        if isinstance(expected, str) and expected and digest.hexdigest() != expected.lower():
+            # The file changed between the sandbox scan and the stream; drop it
+            # and let the next push pick up the newer mtime.
+            frame["content_error"] = "checksum_mismatch"
+            yield frame
+            continue
+        frame["content"] = bytes(content)
+        yield frame
+
+
+def _closing_changes(changes: Iterator[Dict[str, Any]], response: requests.Response) -> Iterator[Dict[str, Any]]:
+    try:
+        yield from changes
+    except requests.RequestException as exc:
+        raise FilespacePushStreamError(f"Filespace push stream failed: {exc}") from exc
+    finally:
+        response.close()
+
+
+def read_filespace_push_stream(chunks: Iterable[bytes]) -> Tuple[Dict[str, Any], Iterator[Dict[str, Any]]]:
+    """Parse a streamed push into its start header and a lazy iterator of changes."""
+    reader = _ChunkReader(chunks)
+    header = reader.read_frame()
+    if header.pop("type", None) != "start":
+        raise FilespacePushStreamError("Filespace push stream is missing its start frame.")
+    return header, _iter_stream_changes(reader)
+
+
+def filespace_push_from_response(response: requests.Response) -> Dict[str, Any]:
+    """Build a push result from a sandbox response, streamed or legacy JSON.
+
+    Streamed pushes keep the response open and expose ``changes`` as a lazy
+    iterator that closes it once exhausted.
+    """
+    content_type = response.headers.get("Content-Type")
+    if not isinstance(content_type, str) or not content_type.startswith(FILESPACE_PUSH_STREAM_CONTENT_TYPE):
+        try:
+            return response.json()
+        except ValueError:
+            return {"status": "error", "message": "Invalid JSON response from sandbox API."}
+        finally:
+            response.close()
+    try:
+        header, changes = read_filespace_push_stream(response.iter_content(chunk_size=256 * 1024))
+    except (FilespacePushStreamError, requests.RequestException) as exc:
+        response.close()
+        return {"status": "error", "message": f"Filespace push stream failed: {exc}"}
+    header["changes"] = _closing_changes(changes, response)
+    return header
+
 
 def _coerce_sync_timestamp(value: Optional[datetime]) -> datetime:
     if isinstance(value, datetime):
@@ -115,6 +228,17 @@ def apply_filespace_push(
             deleted += 1
             continue
 
+        checksum = change.get("checksum_sha256")
+        if (
+            existing
+            and not existing.is_deleted
+            and isinstance(checksum, str)
+            and checksum
+            and existing.checksum_sha256 == checksum.lower()
+        ):
+            skipped += 1
+            continue
+
         content_bytes = _decode_change_content(change)
         if content_bytes is None:
             errors += 1
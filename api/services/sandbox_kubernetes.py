@@ -20,6 +20,7 @@ from api.services.sandbox_compute import (
     SandboxSessionUpdate,
     _SANDBOX_PROXY_CLEARED_ATTR,
 )
+from api.services.sandbox_filespace_sync import filespace_push_from_response
 from api.services.system_settings import get_sandbox_compute_pod_image, get_sandbox_egress_proxy_pod_image
 
 logger = logging.getLogger(__name__)
@@ -491,6 +492,27 @@ class KubernetesSandboxBackend(SandboxComputeBackend):
         body.update({"agent_id": str(agent.id), "direction": direction})
         return self._proxy_post(_sandbox_service_name(agent.id), "/sandbox/compute/sync_filespace", body)
 
+    def stream_filespace_push(
+        self,
+        agent,
+        session: AgentComputeSession,
+        *,
+        payload: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        if not session.pod_name:
+            return {"status": "error", "message": "Sandbox pod not available."}
+        body = dict(payload or {})
+        body.update({"agent_id": str(agent.id), "direction": "push", "transfer": "stream"})
+        response, error = self._proxy_post_response(
+            _sandbox_service_name(agent.id),
+            "/sandbox/compute/sync_filespace",
+            body,
+            stream=True,
+        )
+        if error:
+            return error
+        return filespace_push_from_response(response)
+
     def snapshot_workspace(self, agent, session: AgentComputeSession, *, reason: str) -> Dict[str, Any]:
         if not self._uses_pvc_workspace():
             return {
@@ -652,55 +674,73 @@ class KubernetesSandboxBackend(SandboxComputeBackend):
             ),
         )
 
-    def _proxy_post(
+    def _proxy_post_response(
         self,
         service_name: str,
         path: str,
         payload: Dict[str, Any],
         *,
         timeout: Optional[int] = None,
-    ) -> Dict[str, Any]:
+        stream: bool = False,
+    ) -> tuple[Optional[requests.Response], Optional[Dict[str, Any]]]:
         request_timeout = timeout or self._proxy_timeout
         url = _sandbox_service_url(self._namespace, service_name, path)
-        with requests.Session() as session:
-            session.trust_env = False
-            for attempt in range(1, _PROXY_POST_MAX_ATTEMPTS + 1):
-                try:
-                    response = session.post(
-                        url,
-                        json=payload,
-                        timeout=request_timeout,
-                        headers={"X-Sandbox-Compute-Token": self._compute_api_token},
-                    )
-                    response.raise_for_status()
-                    break
-                except requests.RequestException as exc:
-                    retryable = _is_transient_proxy_request_error(exc)
-                    if not retryable or attempt >= _PROXY_POST_MAX_ATTEMPTS:
-                        logger.warning(
-                            "Sandbox proxy POST failed service=%s path=%s attempt=%s/%s retryable=%s error=%s",
-                            service_name,
-                            path,
-                            attempt,
-                            _PROXY_POST_MAX_ATTEMPTS,
-                            retryable,
-                            exc,
-                        )
-                        return {"status": "error", "message": f"Sandbox proxy request failed: {exc}"}
-                    delay = (
-                        _PROXY_POST_RETRY_BASE_DELAY_SECONDS * attempt
-                        + random.uniform(0, _PROXY_POST_RETRY_JITTER_SECONDS)
-                    )
-                    logger.info(
-                        "Retrying sandbox proxy POST service=%s path=%s attempt=%s/%s delay_seconds=%.3f error=%s",
+        session = requests.Session()
+        session.trust_env = False
+        for attempt in range(1, _PROXY_POST_MAX_ATTEMPTS + 1):
+            try:
+                response = session.post(
+                    url,
+                    json=payload,
+                    timeout=request_timeout,
+                    headers={"X-Sandbox-Compute-Token": self._compute_api_token},
+                    stream=stream,
+                )
+                response.raise_for_status()
+                break
+            except requests.RequestException as exc:
+                retryable = _is_transient_proxy_request_error(exc)
+                if not retryable or attempt >= _PROXY_POST_MAX_ATTEMPTS:
+                    logger.warning(
+                        "Sandbox proxy POST failed service=%s path=%s attempt=%s/%s retryable=%s error=%s",
                         service_name,
                         path,
                         attempt,
                         _PROXY_POST_MAX_ATTEMPTS,
-                        delay,
+                        retryable,
                         exc,
                     )
-                    time.sleep(delay)
+                    session.close()
+                    return None, {"status": "error", "message": f"Sandbox proxy request failed: {exc}"}
+                delay = (
+                    _PROXY_POST_RETRY_BASE_DELAY_SECONDS * attempt
+                    + random.uniform(0, _PROXY_POST_RETRY_JITTER_SECONDS)
+                )
+                logger.info(
+                    "Retrying sandbox proxy POST service=%s path=%s attempt=%s/%s delay_seconds=%.3f error=%s",
+                    service_name,
+                    path,
+                    attempt,
+                    _PROXY_POST_MAX_ATTEMPTS,
+                    delay,
+                    exc,
+                )
+                time.sleep(delay)
+        if not stream:
+            session.close()
+        return response, None
+
+    def _proxy_post(
+        self,
+        service_name: str,
+        path: str,
+        payload: Dict[str, Any],
+        *,
+        timeout: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        response, error = self._proxy_post_response(service_name, path, payload, timeout=timeout)
+        if error:
+            return error
         if not response.text:
             return {"status": "error", "message": "Sandbox proxy returned empty response."}
         try:
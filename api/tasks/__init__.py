@@ -40,6 +40,10 @@ from .billing_rollup import rollup_and_meter_usage_task  # noqa: F401
 # Burn rate snapshot refresh
 from .burn_rate_snapshots import refresh_burn_rate_snapshots_task  # noqa: F401
 
+# Credit usage ledger reconciliation
+from .credit_usage_ledger import reconcile_credit_usage_ledgers_task  # noqa: F401
+from .task_credit_reservations import settle_task_credit_reservations_task  # noqa: F401
+
 # Proactive agent scheduler
 from .proactive_agents import schedule_proactive_agents_task  # noqa: F401
 
@@ -72,6 +76,7 @@ import api.evals.tasks  # noqa: F401
 from .agent_lifecycle import agent_shutdown_cleanup_task  # noqa: F401
 from .outbox import (  # noqa: F401
     dispatch_approved_outbox_email,
+    dispatch_approved_outbox_emails,
     expire_pending_outbox_emails,
     reconcile_approved_outbox_emails,
     send_outbox_review_digests,
@@ -30,6 +30,14 @@ from ..agent.core.budget import AgentBudgetManager
 from ..agent.core.llm_config import AgentLLMTier, get_agent_llm_tier, get_allowed_tier_rank
 from ..agent.files.filespace_service import get_or_create_default_filespace
 from ..models import BrowserUseAgentTask, BrowserUseAgentTaskStep, ProxyServer, AgentFsNode, PersistentAgent
+from ..proxy_pool import record_proxy_outcome
+from ..services.browser_profile_store import (
+    BrowserProfileManifest,
+    browser_profile_chunk_store_enabled,
+    delete_browser_profile_manifest,
+    persist_browser_profile,
+    restore_browser_profile,
+)
 from ..services.browser_settings import DEFAULT_MAX_BROWSER_STEPS, get_browser_settings_for_owner
 from ..services.agent_background_follow_up import enqueue_agent_background_follow_up
 from ..services.owner_execution_pause import EXECUTION_PAUSE_MESSAGE, is_owner_execution_paused, resolve_agent_owner, resolve_browser_task_owner
@@ -249,12 +257,13 @@ CHROME_PROFILE_PRUNE_FILES = ["BrowserMetrics-spare.pma", "SingletonCookie", "Si
 CHROME_PROFILE_MAX_SIZE_BYTES = 500 * 1024 * 1024  # 500 MB
 
 
-def _prune_chrome_profile(profile_dir: str) -> None:
+def _prune_chrome_profile(profile_dir: str) -> int:
     """Remove cache/temporary sub-directories and files from a Chrome user data
-    directory to minimise its size before persistence."""
-    # --------------------------------------------------------------
-    #  Measure size before pruning
-    # --------------------------------------------------------------
+    directory to minimise its size before persistence.
+
+    Returns the profile size in bytes after pruning. Sizes are accumulated while
+    pruning, so the profile is walked once rather than measured before and after.
+    """
     def _dir_size(path: str) -> int:
         size = 0
         for dirpath, _dnames, fnames in os.walk(path):
@@ -265,37 +274,47 @@ def _prune_chrome_profile(profile_dir: str) -> None:
                     pass  # File may disappear; ignore
         return size
 
-    pre_prune_size_bytes = _dir_size(profile_dir)
-    logger.info("Chrome profile size before pruning: %.1f MB", pre_prune_size_bytes / (1024 * 1024))
-
     pruned_dirs: list[str] = []
     pruned_files: list[str] = []
+    pruned_dir_bytes = 0
 
-    # Remove known directories first
+    # Remove known directories first, measuring only the subtrees being removed
     for rel_path in CHROME_PROFILE_PRUNE_DIRS:
         full_path = os.path.join(profile_dir, rel_path)
         if os.path.exists(full_path):
+            dir_bytes = _dir_size(full_path)
             try:
                 _robust_rmtree(full_path)
                 pruned_dirs.append(rel_path)
+                pruned_dir_bytes += dir_bytes
                 logger.info("Pruned chrome profile dir: %s", full_path)
             except Exception:  # noqa: BLE001
                 logger.warning("Failed to prune dir %s", full_path, exc_info=True)
 
-    # Remove individual files and wildcard patterns
+    # Remove individual files and wildcard patterns while sizing the rest
+    remaining_bytes = 0
+    pruned_file_bytes = 0
     for root, _dirs, files in os.walk(profile_dir):
         for filename in files:
+            file_path = os.path.join(root, filename)
+            try:
+                file_bytes = os.path.getsize(file_path)
+            except OSError:
+                file_bytes = 0  # File may disappear or be a dangling symlink
             if filename in CHROME_PROFILE_PRUNE_FILES or filename.endswith((".tmp", ".old")):
-                file_path = os.path.join(root, filename)
                 try:
                     os.unlink(file_path)
                     pruned_files.append(filename)
+                    pruned_file_bytes += file_bytes
                     logger.info("Pruned chrome profile file: %s", file_path)
+                    continue
                 except Exception:  # noqa: BLE001
                     logger.warning("Failed to prune file %s", file_path, exc_info=True)
+            remaining_bytes += file_bytes
 
-    # Measure size after pruning
-    post_prune_size_bytes = _dir_size(profile_dir)
+    pre_prune_size_bytes = remaining_bytes + pruned_file_bytes + pruned_dir_bytes
+    post_prune_size_bytes = remaining_bytes
+    logger.info("Chrome profile size before pruning: %.1f MB", pre_prune_size_bytes / (1024 * 1024))
     logger.info(
         "Chrome profile pruning completed: size before %.1f MB, after %.1f MB; %d dirs, %d files removed",
         pre_prune_size_bytes / (1024 * 1024),
@@ -317,6 +336,7 @@ def _prune_chrome_profile(profile_dir: str) -> None:
             _robust_rmtree(profile_dir)
             os.makedirs(profile_dir, exist_ok=True)
             logger.info("Chrome profile directory reset due to size constraint")
+            return 0
         except Exception:  # noqa: BLE001
             logger.exception("Failed to reset oversized chrome profile directory")
     else:
@@ -324,6 +344,7 @@ def _prune_chrome_profile(profile_dir: str) -> None:
             "Chrome profile size after pruning within limit: %.1f MB",
             post_prune_size_bytes / (1024 * 1024),
         )
+    return post_prune_size_bytes
 
 # --------------------------------------------------------------------------- #
 #  Provider config / tiers / defaults
@@ -676,6 +697,20 @@ def build_available_file_paths(persistent_agent_id: Optional[str]) -> list[str]:
 # --------------------------------------------------------------------------- #
 #  Proxy helpers
 # --------------------------------------------------------------------------- #
+# Chromium network errors that point at the proxy rather than the target site.
+_PROXY_FAILURE_MARKERS = (
+    "ERR_PROXY_CONNECTION_FAILED",
+    "ERR_TUNNEL_CONNECTION_FAILED",
+    "ERR_PROXY_AUTH",
+    "ERR_SOCKS_CONNECTION_FAILED",
+    "ERR_NO_SUPPORTED_PROXIES",
+)
+
+
+def _is_proxy_failure(error_message: Optional[str]) -> bool:
+    return bool(error_message) and any(marker in error_message for marker in _PROXY_FAILURE_MARKERS)
+
+
 @tracer.start_as_current_span("SELECT Proxy")
 def select_proxy_for_task(task_obj, override_proxy=None) -> Optional[ProxyServer]:
     """Select appropriate proxy for a task based on agent preferences and health checks."""
@@ -866,6 +901,93 @@ def _safe_extract_tar_member(tar_obj: tarfile.TarFile, member: tarfile.TarInfo,
 
     tar_obj.extract(member, path=dest_dir)
 
+# --------------------------------------------------------------------------- #
+#  Single-archive profile persistence (chunk store disabled)
+# --------------------------------------------------------------------------- #
+
+def _save_profile_archive(agent_id: str, profile_dir: str, storage_key: str, save_span: Any) -> None:
+    """Persist *profile_dir* as a single tar.zst archive at *storage_key*."""
+    tmp_tar_path = tempfile.mktemp(suffix=".tar")
+    tmp_zst_path = tmp_tar_path + ".zst"
+    save_span.set_attribute("temp_tar_path", tmp_tar_path)
+    save_span.set_attribute("temp_zst_path", tmp_zst_path)
+
+    try:
+        # Create tar archive
+        tar_start = time.time()
+        with tarfile.open(tmp_tar_path, "w") as tar:
+            tar.add(profile_dir, arcname=".")
+
+        tar_time = time.time() - tar_start
+        tar_size = os.path.getsize(tmp_tar_path)
+        save_span.set_attribute("tar.duration_seconds", tar_time)
+        save_span.set_attribute("tar.size_bytes", tar_size)
+
+        logger.info(
+            "Tar archive created for agent %s: %d bytes in %.2fs",
+            agent_id,
+            tar_size,
+            tar_time
+        )
+
+        # Compress with zstd
+        compress_start = time.time()
+        cctx = zstd.ZstdCompressor(level=3)
+        with open(tmp_tar_path, "rb") as f_in, open(tmp_zst_path, "wb") as f_out:
+            cctx.copy_stream(f_in, f_out)
+
+        compress_time = time.time() - compress_start
+        compressed_size = os.path.getsize(tmp_zst_path)
+        compression_ratio = compressed_size / tar_size if tar_size > 0 else 0
+
+        save_span.set_attribute("compression.duration_seconds", compress_time)
+        save_span.set_attribute("compressed.size_bytes", compressed_size)
+        save_span.set_attribute("compression.ratio", compression_ratio)
+
+        logger.info(
+            "Compression completed for agent %s: %d -> %d bytes (%.1f%% ratio) in %.2fs",
+            agent_id,
+            tar_size,
+            compressed_size,
+            compression_ratio * 100,
+            compress_time
+        )
+
+        # Upload to storage
+        upload_start = time.time()
+        with open(tmp_zst_path, "rb") as f_in:
+            existed = default_storage.exists(storage_key)
+            if existed:
+                logger.info("Replacing existing profile for agent %s", agent_id)
+                default_storage.delete(storage_key)
+                save_span.set_attribute("replaced_existing", True)
+            else:
+                save_span.set_attribute("replaced_existing", False)
+
+            # Stream upload to storage to avoid loading entire archive in memory
+            default_storage.save(storage_key, File(f_in))
+
+        upload_time = time.time() - upload_start
+        save_span.set_attribute("upload.duration_seconds", upload_time)
+
+        logger.info(
+            "Upload completed for agent %s: %d bytes in %.2fs",
+            agent_id,
+            compressed_size,
+            upload_time
+        )
+
+    finally:
+        # Clean up temporary files
+        cleanup_start = time.time()
+        if tmp_tar_path and os.path.exists(tmp_tar_path):
+            os.unlink(tmp_tar_path)
+        if tmp_zst_path and os.path.exists(tmp_zst_path):
+            os.unlink(tmp_zst_path)
+        cleanup_time = time.time() - cleanup_start
+        save_span.set_attribute("cleanup.duration_seconds", cleanup_time)
+
+
 # --------------------------------------------------------------------------- #
 #  Agent runner
 # --------------------------------------------------------------------------- #
@@ -922,6 +1044,7 @@ async def _run_agent(
         llm: Any = None
         extraction_llm: Any = None
         temp_profile_dir = tempfile.mkdtemp(prefix="bu_profile_")
+        profile_manifest: Optional[BrowserProfileManifest] = None
 
         logger.debug("Created temporary profile directory: %s", temp_profile_dir)
 
@@ -945,7 +1068,24 @@ async def _run_agent(
                     except Exception:
                         pass
 
-                    if default_storage.exists(storage_key):
+                    chunked_restore = restore_browser_profile(browser_use_agent_id, temp_profile_dir)
+                    if chunked_restore is not None:
+                        profile_manifest, restore_stats = chunked_restore
+                        restore_span.set_attribute("profile.exists", True)
+                        restore_span.set_attribute("profile.format", "chunked")
+                        for name, value in restore_stats.as_attributes().items():
+                            restore_span.set_attribute(f"restore.{name}", value)
+                        logger.info(
+                            "Browser profile restored for agent %s: %d files, %d bytes; %d/%d chunks fetched in %.2fs",
+                            browser_use_agent_id,
+                            restore_stats.files,
+                            restore_stats.bytes,
+                            restore_stats.transferred_chunks,
+                            restore_stats.chunks,
+                            time.time() - start_time,
+                        )
+                        restore_span.set_attribute("restore.success", True)
+                    elif default_storage.exists(storage_key):
                         logger.info(
                             "Found existing browser profile for agent %s, starting restore from %s",
                             browser_use_agent_id,
@@ -1348,114 +1488,42 @@ async def _run_agent(
                     save_span.set_attribute("storage.backend", str(type(default_storage).__name__))
 
                     start_time = time.time()
-                    tmp_tar_path = None
-                    tmp_zst_path = None
 
                     try:
-                        # Check source directory size and file count
                         try:
-                            # Prune unnecessary cache/temp data before archiving
-                            _prune_chrome_profile(temp_profile_dir)
+                            # Prune unnecessary cache/temp data before persisting
+                            source_size = _prune_chrome_profile(temp_profile_dir)
                             save_span.set_attribute("profile.pruned", True)
-
-                            source_size = 0
-                            file_count = 0
-                            for dirpath, dirnames, filenames in os.walk(temp_profile_dir):
-                                for filename in filenames:
-                                    filepath = os.path.join(dirpath, filename)
-                                    source_size += os.path.getsize(filepath)
-                                    file_count += 1
-
                             save_span.set_attribute("source_profile.size_bytes", source_size)
-                            save_span.set_attribute("source_profile.file_count", file_count)
-                            logger.info(
-                                "Starting browser profile save for agent %s: %d files, %d bytes",
-                                browser_use_agent_id,
-                                file_count,
-                                source_size
-                            )
                         except Exception:
-                            logger.debug("Could not calculate source directory stats")
-
-                        tmp_tar_path = tempfile.mktemp(suffix=".tar")
-                        tmp_zst_path = tmp_tar_path + ".zst"
-                        save_span.set_attribute("temp_tar_path", tmp_tar_path)
-                        save_span.set_attribute("temp_zst_path", tmp_zst_path)
-
-                        try:
-                            # Create tar archive
-                            tar_start = time.time()
-                            with tarfile.open(tmp_tar_path, "w") as tar:
-                                tar.add(temp_profile_dir, arcname=".")
-
-                            tar_time = time.time() - tar_start
-                            tar_size = os.path.getsize(tmp_tar_path)
-                            save_span.set_attribute("tar.duration_seconds", tar_time)
-                            save_span.set_attribute("tar.size_bytes", tar_size)
+                            logger.debug("Could not prune browser profile before save", exc_info=True)
 
-                            logger.info(
-                                "Tar archive created for agent %s: %d bytes in %.2fs",
+                        if browser_profile_chunk_store_enabled():
+                            profile_manifest, save_stats = persist_browser_profile(
                                 browser_use_agent_id,
-                                tar_size,
-                                tar_time
+                                temp_profile_dir,
+                                previous=profile_manifest,
                             )
-
-                            # Compress with zstd
-                            compress_start = time.time()
-                            cctx = zstd.ZstdCompressor(level=3)
-                            with open(tmp_tar_path, "rb") as f_in, open(tmp_zst_path, "wb") as f_out:
-                                cctx.copy_stream(f_in, f_out)
-
-                            compress_time = time.time() - compress_start
-                            compressed_size = os.path.getsize(tmp_zst_path)
-                            compression_ratio = compressed_size / tar_size if tar_size > 0 else 0
-
-                            save_span.set_attribute("compression.duration_seconds", compress_time)
-                            save_span.set_attribute("compressed.size_bytes", compressed_size)
-                            save_span.set_attribute("compression.ratio", compression_ratio)
-
+                            save_span.set_attribute("profile.format", "chunked")
+                            save_span.set_attribute("source_profile.file_count", save_stats.files)
+                            for name, value in save_stats.as_attributes().items():
+                                save_span.set_attribute(f"save.{name}", value)
                             logger.info(
-                                "Compression completed for agent %s: %d -> %d bytes (%.1f%% ratio) in %.2fs",
+                                "Browser profile chunks uploaded for agent %s: %d/%d chunks, %d bytes",
                                 browser_use_agent_id,
-                                tar_size,
-                                compressed_size,
-                                compression_ratio * 100,
-                                compress_time
+                                save_stats.transferred_chunks,
+                                save_stats.chunks,
+                                save_stats.transferred_bytes,
                             )
-
-                            # Upload to storage
-                            upload_start = time.time()
-                            with open(tmp_zst_path, "rb") as f_in:
-                                existed = default_storage.exists(storage_key)
-                                if existed:
-                                    logger.info("Replacing existing profile for agent %s", browser_use_agent_id)
+                            try:
+                                # The manifest supersedes any archive from before the chunk store.
+                                if default_storage.exists(storage_key):
                                     default_storage.delete(storage_key)
-                                    save_span.set_attribute("replaced_existing", True)
-                                else:
-                                    save_span.set_attribute("replaced_existing", False)
-
-                                # Stream upload to storage to avoid loading entire archive in memory
-                                default_storage.save(storage_key, File(f_in))
-
-                            upload_time = time.time() - upload_start
-                            save_span.set_attribute("upload.duration_seconds", upload_time)
-
-                            logger.info(
-                                "Upload completed for agent %s: %d bytes in %.2fs",
-                                browser_use_agent_id,
-                                compressed_size,
-                                upload_time
-                            )
-
-                        finally:
-                            # Clean up temporary files
-                            cleanup_start = time.time()
-                            if tmp_tar_path and os.path.exists(tmp_tar_path):
-                                os.unlink(tmp_tar_path)
-                            if tmp_zst_path and os.path.exists(tmp_zst_path):
-                                os.unlink(tmp_zst_path)
-                            cleanup_time = time.time() - cleanup_start
-                            save_span.set_attribute("cleanup.duration_seconds", cleanup_time)
+                            except Exception:  # noqa: BLE001
+                                logger.warning("Failed to delete legacy profile archive %s", storage_key, exc_info=True)
+                        else:
+                            _save_profile_archive(browser_use_agent_id, temp_profile_dir, storage_key, save_span)
+                            delete_browser_profile_manifest(browser_use_agent_id)
 
                         total_time = time.time() - start_time
                         save_span.set_attribute("save.total_duration_seconds", total_time)
@@ -1473,15 +1541,6 @@ async def _run_agent(
                         save_span.set_attribute("save.error_duration_seconds", error_time)
                         save_span.set_attribute("error.message", str(e))
 
-                        # Emergency cleanup in case of error
-                        try:
-                            if tmp_tar_path and os.path.exists(tmp_tar_path):
-                                os.unlink(tmp_tar_path)
-                            if tmp_zst_path and os.path.exists(tmp_zst_path):
-                                os.unlink(tmp_zst_path)
-                        except Exception:
-                            pass
-
                         logger.exception(
                             "Failed to save browser profile for agent %s after %.2fs: %s",
                             browser_use_agent_id,
@@ -1857,6 +1916,7 @@ def _process_browser_use_task_core(
                 task_obj.save(update_fields=["status", "error_message"])
                 return
 
+        proxy_server = None
         try:
             override_proxy = None
             span.set_attribute('task.uses_override_proxy', override_proxy_id is not None)
@@ -2097,6 +2157,7 @@ def _process_browser_use_task_core(
                 task_obj.status = BrowserUseAgentTask.StatusChoices.COMPLETED
                 task_obj.error_message = None
                 task_obj.filespace_artifacts = filespace_artifacts
+                record_proxy_outcome(proxy_server, success=True)
 
                 agent_span.set_attribute('task.id', str(task_obj.id))
                 agent_span.set_attribute('task.status', str(BrowserUseAgentTask.StatusChoices.COMPLETED))
@@ -2113,6 +2174,8 @@ def _process_browser_use_task_core(
             })
             task_obj.status = BrowserUseAgentTask.StatusChoices.FAILED
             task_obj.error_message = error_message
+            if _is_proxy_failure(error_message):
+                record_proxy_outcome(proxy_server, success=False)
 
             # Ensure a fresh/healthy DB connection before writing failure step
             close_old_connections()
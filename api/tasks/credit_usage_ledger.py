@@ -0,0 +1,17 @@
+import logging
+
+from celery import shared_task
+
+from observability import traced
+from api.services.credit_usage_ledger import reconcile_active_credit_usage
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, ignore_result=True, name="api.tasks.reconcile_credit_usage_ledgers")
+def reconcile_credit_usage_ledgers_task(self) -> int:
+    with traced("CREDIT_USAGE Reconcile Ledgers") as span:
+        reconciled = reconcile_active_credit_usage()
+        span.set_attribute("credit_usage_ledger.scopes", reconciled)
+        logger.info("Reconciled %s credit usage ledger scopes", reconciled)
+        return reconciled
@@ -4,7 +4,7 @@ from celery import shared_task
 from django.db import transaction
 from django.utils import timezone
 
-from api.agent.comms.outbound_delivery import deliver_agent_email
+from api.agent.comms.outbound_delivery import deliver_agent_emails
 from api.models import DeliveryStatus, OutboundEmailReview, PersistentAgentUserActionEvent
 from api.services.outbound_email_review import expire_review_if_needed, track_review_event
 from api.services.outbox_notifications import send_due_outbox_digests
@@ -14,16 +14,11 @@ from util.analytics import AnalyticsEvent
 logger = logging.getLogger(__name__)
 
 
-@shared_task(name="api.tasks.dispatch_approved_outbox_email")
-def dispatch_approved_outbox_email(review_id: str) -> None:
-    review = (
-        OutboundEmailReview.objects.select_related("message", "agent")
-        .filter(pk=review_id, status=OutboundEmailReview.Status.APPROVED)
-        .first()
-    )
-    if review is None or review.message.latest_status != DeliveryStatus.QUEUED:
-        return
-    deliver_agent_email(review.message)
+# Approved emails from one sending account are delivered over one SMTP session per batch.
+OUTBOX_DISPATCH_BATCH_SIZE = 50
+
+
+def _record_outbox_delivery_failure(review: OutboundEmailReview) -> None:
     review.message.refresh_from_db(fields=["latest_status", "latest_error_message"])
     if review.message.latest_status == DeliveryStatus.FAILED:
         PersistentAgentUserActionEvent.objects.create(
@@ -38,17 +33,51 @@ def dispatch_approved_outbox_email(review_id: str) -> None:
         track_review_event(review, AnalyticsEvent.OUTBOX_EMAIL_FAILED)
 
 
+def _dispatch_approved_reviews(review_ids: list[str]) -> None:
+    reviews = [
+        review
+        for review in OutboundEmailReview.objects.select_related("message", "agent").filter(
+            pk__in=review_ids,
+            status=OutboundEmailReview.Status.APPROVED,
+        )
+        if review.message.latest_status == DeliveryStatus.QUEUED
+    ]
+    if not reviews:
+        return
+    deliver_agent_emails([review.message for review in reviews])
+    for review in reviews:
+        _record_outbox_delivery_failure(review)
+
+
+@shared_task(name="api.tasks.dispatch_approved_outbox_email")
+def dispatch_approved_outbox_email(review_id: str) -> None:
+    _dispatch_approved_reviews([review_id])
+
+
+@shared_task(name="api.tasks.dispatch_approved_outbox_emails")
+def dispatch_approved_outbox_emails(review_ids: list[str]) -> None:
+    _dispatch_approved_reviews(review_ids)
+
+
 @shared_task(name="api.tasks.reconcile_approved_outbox_emails")
 def reconcile_approved_outbox_emails() -> int:
-    review_ids = list(
+    pending = list(
         OutboundEmailReview.objects.filter(
             status=OutboundEmailReview.Status.APPROVED,
             message__latest_status=DeliveryStatus.QUEUED,
-        ).values_list("id", flat=True)[:500]
+        ).values_list("id", "message__from_endpoint_id")[:500]
     )
-    for review_id in review_ids:
-        dispatch_approved_outbox_email.delay(str(review_id))
-    return len(review_ids)
+    by_endpoint: dict[object, list[str]] = {}
+    for review_id, endpoint_id in pending:
+        by_endpoint.setdefault(endpoint_id, []).append(str(review_id))
+    for review_ids in by_endpoint.values():
+        for start in range(0, len(review_ids), OUTBOX_DISPATCH_BATCH_SIZE):
+            batch = review_ids[start:start + OUTBOX_DISPATCH_BATCH_SIZE]
+            if len(batch) == 1:
+                dispatch_approved_outbox_email.delay(batch[0])
+            else:
+                dispatch_approved_outbox_emails.delay(batch)
+    return len(pending)
 
 
 @shared_task(name="api.tasks.expire_pending_outbox_emails")
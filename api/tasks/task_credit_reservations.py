@@ -0,0 +1,18 @@
+import logging
+
+from celery import shared_task
+
+from observability import traced
+from tasks.credit_reservations import settle_expired_reservations
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, ignore_result=True, name="api.tasks.settle_task_credit_reservations")
+def settle_task_credit_reservations_task(self) -> int:
+    with traced("TASK_CREDITS Settle Expired Reservations") as span:
+        settled = settle_expired_reservations()
+        span.set_attribute("task_credit_reservations.settled", settled)
+        if settled:
+            logger.info("Settled %s expired task credit reservations", settled)
+        return settled
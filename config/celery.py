@@ -1,7 +1,14 @@
 import pathlib, sys, os
 from pathlib import Path
 from celery import Celery
-from celery.signals import worker_ready, worker_shutdown, worker_process_init, task_prerun, task_postrun
+from celery.signals import (
+    worker_ready,
+    worker_shutdown,
+    worker_process_init,
+    worker_process_shutdown,
+    task_prerun,
+    task_postrun,
+)
 from .bootsteps import LivenessProbe
 
 # Ensure the browser-use task counter signal handlers are registered
@@ -54,6 +61,18 @@ def worker_process_init_handler(**_):
     
     print(f"OpenTelemetry initialization completed for worker PID {os.getpid()}")
 
+@worker_process_shutdown.connect
+def worker_process_shutdown_handler(**_):
+    """
+    Flush queued prompt archive uploads before a worker child exits.
+    Pool children skip atexit handlers, so the uploader's own hook never runs there.
+    """
+    try:
+        from api.services.prompt_archives import get_prompt_archive_uploader
+        get_prompt_archive_uploader().shutdown()
+    except Exception as e:
+        print(f"Error flushing prompt archive uploads: {e}")
+
 @task_prerun.connect
 def task_prerun_handler(sender=None, task_id=None, task=None, args=None, kwargs=None, **kwds):
     """
@@ -57,6 +57,26 @@ class _FakePipeline:
         self._ops.append(("srem", args, kwargs))
         return self
 
+    def hincrby(self, *args, **kwargs):
+        self._ops.append(("hincrby", args, kwargs))
+        return self
+
+    def hgetall(self, *args, **kwargs):
+        self._ops.append(("hgetall", args, kwargs))
+        return self
+
+    def rpush(self, *args, **kwargs):
+        self._ops.append(("rpush", args, kwargs))
+        return self
+
+    def ltrim(self, *args, **kwargs):
+        self._ops.append(("ltrim", args, kwargs))
+        return self
+
+    def lrange(self, *args, **kwargs):
+        self._ops.append(("lrange", args, kwargs))
+        return self
+
     def execute(self):
         results = []
         for name, args, kwargs in self._ops:
@@ -117,6 +137,9 @@ class _FakeRedis:
     def get(self, key: str) -> Optional[Any]:
         return self._kv.get(key)
 
+    def mget(self, keys) -> list[Optional[Any]]:
+        return [self._kv.get(key) for key in keys]
+
     def set(
         self,
         key: str,
@@ -317,6 +340,64 @@ class _FakeRedis:
                 self.hdel(message_key, agent_id)
                 claimed.extend([agent_id, generation or "", queue or "", generic, inbound_message_id or ""])
             return claimed
+        if "gobii_credit_reservation_charge_v1" in normalized_script:
+            balance_key, amount = args[0], int(args[1])
+            current = self.get(balance_key)
+            balance = int(current) if current is not None else -1
+            if balance < amount:
+                return -1
+            self._kv[balance_key] = balance - amount
+            return balance - amount
+        if "gobii_credit_reservation_drain_v1" in normalized_script:
+            balance = self.get(args[0])
+            if balance is not None:
+                self.delete(args[0])
+            return balance
+        if "gobii_credit_reservation_refund_v1" in normalized_script:
+            current = self.get(args[0])
+            if current is None:
+                return -1
+            self._kv[args[0]] = int(current) + int(args[1])
+            return self._kv[args[0]]
+        if "gobii_credit_reservation_swap_v1" in normalized_script:
+            previous = self.get(args[0])
+            self.set(args[0], args[1], px=int(args[2]))
+            return previous
+        if "gobii_llm_health_success_v1" in normalized_script:
+            key = args[0]
+            alpha, dev_alpha = float(args[1]), float(args[2])
+            opened_until = self.hget(key, "opened_until") or "0"
+            error_rate = float(self.hget(key, "error_rate") or 0)
+            self.hincrby(key, "samples", 1)
+            self.hset(key, mapping={"error_rate": error_rate * (1 - alpha), "consecutive_failures": 0, "opened_until": 0})
+            for field, sample in (("latency_ms", args[3]), ("ttft_ms", args[4])):
+                if sample == "":
+                    continue
+                sample = float(sample)
+                current = self.hget(key, field)
+                if current is None:
+                    current, deviation = sample, sample / 2
+                else:
+                    current = float(current)
+                    deviation = float(self.hget(key, f"{field[:-3]}_dev_ms") or 0)
+                    deviation += dev_alpha * (abs(sample - current) - deviation)
+                    current += alpha * (sample - current)
+                self.hset(key, mapping={field: current, f"{field[:-3]}_dev_ms": deviation})
+            self.expire(key, int(args[5]))
+            return opened_until
+        if "gobii_llm_health_failure_v1" in normalized_script:
+            key = args[0]
+            alpha, now = float(args[1]), float(args[3])
+            failures = self.hincrby(key, "consecutive_failures", 1)
+            error_rate = float(self.hget(key, "error_rate") or 0)
+            self.hincrby(key, "samples", 1)
+            self.hset(key, "error_rate", error_rate + alpha * (1 - error_rate))
+            opened = 0
+            if failures >= int(args[2]) and now >= float(self.hget(key, "opened_until") or 0):
+                self.hset(key, "opened_until", now + float(args[4]))
+                opened = 1
+            self.expire(key, int(args[5]))
+            return [failures, opened]
 
         # Implement the specific check-then-increment used by AgentBudgetManager
         # Args: KEYS[1] -> steps_key; ARGV[1] -> max_steps
@@ -386,6 +467,19 @@ class _FakeRedis:
         lst.append(value)
         return len(lst)
 
+    def ltrim(self, key: str, start: int, end: int) -> bool:
+        lst = self._lists.get(key, [])
+        kept = lst[start:] if end == -1 else lst[start:end + 1]
+        if kept:
+            self._lists[key] = kept
+        else:
+            self._lists.pop(key, None)
+        return True
+
+    def lrange(self, key: str, start: int, end: int) -> list:
+        lst = self._lists.get(key, [])
+        return list(lst[start:] if end == -1 else lst[start:end + 1])
+
     def blpop(self, keys, timeout: int = 0):
         # Support single key or list of keys
         if isinstance(keys, (list, tuple)):
@@ -91,6 +91,14 @@ DEFERRED_REFERRAL_CREDITS_ENABLED = env.bool("DEFERRED_REFERRAL_CREDITS_ENABLED"
 # Allow disabling the first-run setup redirect (e.g., in automated tests)
 FIRST_RUN_SETUP_ENABLED = env.bool("FIRST_RUN_SETUP_ENABLED", default=True)
 AGENT_PROMPT_RUN_CACHE_ENABLED = env.bool("AGENT_PROMPT_RUN_CACHE_ENABLED", default=True)
+# Share token counts for long prompt blocks across workers through Redis.
+PROMPT_TOKEN_CACHE_SHARED_ENABLED = env.bool("PROMPT_TOKEN_CACHE_SHARED_ENABLED", default=True)
+PROMPT_TOKEN_CACHE_SHARED_MIN_CHARS = env.int("PROMPT_TOKEN_CACHE_SHARED_MIN_CHARS", default=4096)
+PROMPT_TOKEN_CACHE_SHARED_TTL_SECONDS = env.int("PROMPT_TOKEN_CACHE_SHARED_TTL_SECONDS", default=7 * 24 * 60 * 60)
+# Threads shared by every parallel tool batch in a worker process.
+AGENT_TOOL_EXECUTOR_MAX_WORKERS = env.int("AGENT_TOOL_EXECUTOR_MAX_WORKERS", default=32)
+# Memory budget for tool-result analyses reused across prompt renders in a worker process.
+TOOL_RESULT_SUMMARY_CACHE_MAX_BYTES = env.int("TOOL_RESULT_SUMMARY_CACHE_MAX_BYTES", default=64 * 1024 * 1024)
 # Permit skipping LLM bootstrap enforcement (useful for non-interactive tests)
 LLM_BOOTSTRAP_OPTIONAL = env.bool("LLM_BOOTSTRAP_OPTIONAL", default=False)
 # Redirect legacy console HTML pages to the immersive app. Console APIs and
@@ -205,6 +213,22 @@ MCP_STDIO_REQUEST_TIMEOUT_SECONDS = env.float(
     "MCP_STDIO_REQUEST_TIMEOUT_SECONDS",
     default=300.0,
 )
+# Worker-local cache of restored agent SQLite databases, keyed by storage generation.
+AGENT_SQLITE_STATE_CACHE_ENABLED = env.bool("AGENT_SQLITE_STATE_CACHE_ENABLED", default=True)
+AGENT_SQLITE_STATE_CACHE_DIR = env("AGENT_SQLITE_STATE_CACHE_DIR", default="")
+AGENT_SQLITE_STATE_CACHE_MAX_BYTES = env.int(
+    "AGENT_SQLITE_STATE_CACHE_MAX_BYTES",
+    default=2 * 1024 * 1024 * 1024,
+)
+# Persist agent SQLite state as a base archive plus page-level deltas.
+AGENT_SQLITE_DELTA_PERSISTENCE_ENABLED = env.bool("AGENT_SQLITE_DELTA_PERSISTENCE_ENABLED", default=True)
+# Persist browser-use Chrome profiles as a manifest of content-addressed chunks.
+BROWSER_PROFILE_CHUNK_STORE_ENABLED = env.bool("BROWSER_PROFILE_CHUNK_STORE_ENABLED", default=True)
+BROWSER_PROFILE_CHUNK_CACHE_DIR = env("BROWSER_PROFILE_CHUNK_CACHE_DIR", default="")
+BROWSER_PROFILE_CHUNK_CACHE_MAX_BYTES = env.int(
+    "BROWSER_PROFILE_CHUNK_CACHE_MAX_BYTES",
+    default=2 * 1024 * 1024 * 1024,
+)
 # Maximum number of safe tool calls executed concurrently in one batch.
 MAX_PARALLEL_TOOL_CALLS = env.int("MAX_PARALLEL_TOOL_CALLS", default=6)
 CUSTOM_TOOL_CHILD_FAILURE_LIMIT = env.int("CUSTOM_TOOL_CHILD_FAILURE_LIMIT", default=3)
@@ -213,8 +237,37 @@ LITELLM_MAX_RETRIES = env.int("LITELLM_MAX_RETRIES", default=2)
 LITELLM_RETRY_BACKOFF_SECONDS = env.float("LITELLM_RETRY_BACKOFF_SECONDS", default=1.0)
 # Extra full-loop retries when a provider repeatedly returns structurally empty completions.
 AGENT_EMPTY_LLM_RESPONSE_LOOP_RETRIES = env.int("AGENT_EMPTY_LLM_RESPONSE_LOOP_RETRIES", default=1)
+# Share per-provider latency, error-rate and circuit-breaker state across workers to order LLM failover.
+LLM_PROVIDER_HEALTH_ENABLED = env.bool("LLM_PROVIDER_HEALTH_ENABLED", default=True)
+LLM_PROVIDER_CIRCUIT_FAILURE_THRESHOLD = env.int("LLM_PROVIDER_CIRCUIT_FAILURE_THRESHOLD", default=3)
+LLM_PROVIDER_CIRCUIT_COOLDOWN_SECONDS = env.int("LLM_PROVIDER_CIRCUIT_COOLDOWN_SECONDS", default=60)
+LLM_PROVIDER_DEGRADED_ERROR_RATE = env.float("LLM_PROVIDER_DEGRADED_ERROR_RATE", default=0.5)
+# Start the next failover endpoint when a non-streamed completion outlasts the first one's p95 latency.
+LLM_HEDGED_REQUESTS_ENABLED = env.bool("LLM_HEDGED_REQUESTS_ENABLED", default=False)
+LLM_HEDGE_DEFAULT_DELAY_SECONDS = env.float("LLM_HEDGE_DEFAULT_DELAY_SECONDS", default=15.0)
+LLM_HEDGE_MIN_DELAY_SECONDS = env.float("LLM_HEDGE_MIN_DELAY_SECONDS", default=2.0)
+LLM_HEDGE_MAX_DELAY_SECONDS = env.float("LLM_HEDGE_MAX_DELAY_SECONDS", default=60.0)
 # Proxy health check: deactivate after N consecutive failures
 PROXY_CONSECUTIVE_FAILURE_THRESHOLD = env.int("PROXY_CONSECUTIVE_FAILURE_THRESHOLD", default=3)
+# Select shared proxies from a per-process snapshot instead of querying health results per call.
+PROXY_POOL_CACHE_ENABLED = env.bool("PROXY_POOL_CACHE_ENABLED", default=True)
+PROXY_POOL_REFRESH_SECONDS = env.int("PROXY_POOL_REFRESH_SECONDS", default=30)
+# Live request failures that pull a proxy out of the healthy tiers, and for how long.
+PROXY_POOL_DEMOTE_AFTER_FAILURES = env.int("PROXY_POOL_DEMOTE_AFTER_FAILURES", default=3)
+PROXY_POOL_DEMOTE_COOLDOWN_SECONDS = env.int("PROXY_POOL_DEMOTE_COOLDOWN_SECONDS", default=300)
+# Reuse keep-alive connections for http_request and Bright Data calls, per proxy and host.
+HTTP_CLIENT_POOL_ENABLED = env.bool("HTTP_CLIENT_POOL_ENABLED", default=True)
+HTTP_CLIENT_POOL_MAX_PER_HOST = env.int("HTTP_CLIENT_POOL_MAX_PER_HOST", default=8)
+HTTP_CLIENT_POOL_HOSTS_PER_SESSION = env.int("HTTP_CLIENT_POOL_HOSTS_PER_SESSION", default=32)
+HTTP_CLIENT_POOL_MAX_SESSIONS = env.int("HTTP_CLIENT_POOL_MAX_SESSIONS", default=64)
+HTTP_CLIENT_POOL_IDLE_TIMEOUT_SECONDS = env.int("HTTP_CLIENT_POOL_IDLE_TIMEOUT_SECONDS", default=90)
+HTTP_CLIENT_POOL_ACQUIRE_TIMEOUT_SECONDS = env.int("HTTP_CLIENT_POOL_ACQUIRE_TIMEOUT_SECONDS", default=30)
+# Pre-rank large search_tools catalogs locally so the inner LLM only sees a shortlist.
+SEARCH_TOOLS_PRERANK_ENABLED = env.bool("SEARCH_TOOLS_PRERANK_ENABLED", default=True)
+SEARCH_TOOLS_PRERANK_THRESHOLD = env.int("SEARCH_TOOLS_PRERANK_THRESHOLD", default=80)
+SEARCH_TOOLS_PRERANK_LIMIT = env.int("SEARCH_TOOLS_PRERANK_LIMIT", default=40)
+# Reuse the inner LLM's selection for identical search_tools prompts (0 disables).
+SEARCH_TOOLS_SELECTION_CACHE_SECONDS = env.int("SEARCH_TOOLS_SELECTION_CACHE_SECONDS", default=600)
 # Decodo inventory alerting
 DECODO_LOW_INVENTORY_THRESHOLD = env.int("DECODO_LOW_INVENTORY_THRESHOLD", default=30)
 DECODO_LOW_INVENTORY_EMAIL = env(
@@ -915,6 +968,10 @@ CHANNEL_LAYERS = {
         "CONFIG": {"hosts": [REDIS_URL]},
     }
 }
+# Send LLM stream frames from a background publisher instead of the streaming thread.
+WEB_STREAM_BACKGROUND_PUBLISH_ENABLED = env.bool("WEB_STREAM_BACKGROUND_PUBLISH_ENABLED", default=True)
+# Wake MCP wait_for_agent_event callers from agent chat group broadcasts instead of polling the timeline.
+MCP_WAIT_EVENT_HUB_ENABLED = env.bool("MCP_WAIT_EVENT_HUB_ENABLED", default=True)
 
 # ────────── Celery ──────────
 CELERY_BROKER_URL = REDIS_URL
@@ -1010,6 +1067,20 @@ BURN_RATE_SNAPSHOT_DEFAULT_WINDOW_MINUTES = 1440
 BURN_RATE_SNAPSHOT_REFRESH_MINUTES = 10
 BURN_RATE_SNAPSHOT_STALE_MINUTES = 30
 
+# ────────── Credit Usage Ledger ──────────
+# Serve daily credit usage and burn rates from rolling Redis counters instead of step aggregates.
+CREDIT_USAGE_LEDGER_ENABLED = env.bool("CREDIT_USAGE_LEDGER_ENABLED", default=True)
+# How long a scope's counters are trusted before the next read reseeds them from steps.
+CREDIT_USAGE_LEDGER_READY_TTL_SECONDS = env.int("CREDIT_USAGE_LEDGER_READY_TTL_SECONDS", default=3600)
+CREDIT_USAGE_LEDGER_RECONCILE_MINUTES = env.int("CREDIT_USAGE_LEDGER_RECONCILE_MINUTES", default=15)
+
+# ────────── Task Credit Reservations ──────────
+# Lease blocks of credits into Redis so parallel charges skip the locked TaskCredit transaction.
+TASK_CREDIT_RESERVATIONS_ENABLED = env.bool("TASK_CREDIT_RESERVATIONS_ENABLED", default=True)
+# Credits a lease may draw before the next charge picks a credit block again.
+TASK_CREDIT_RESERVATION_SIZE = Decimal(env("TASK_CREDIT_RESERVATION_SIZE", default="5"))
+TASK_CREDIT_RESERVATION_TTL_SECONDS = env.int("TASK_CREDIT_RESERVATION_TTL_SECONDS", default=60)
+
 # ────────── Agent Avatar Backfill ──────────
 AGENT_AVATAR_BACKFILL_ENABLED = env.bool("AGENT_AVATAR_BACKFILL_ENABLED", default=True)
 AGENT_AVATAR_BACKFILL_INTERVAL_MINUTES = env.int(
@@ -1072,6 +1143,8 @@ AGENT_SOFT_EXPIRATION_INACTIVITY_DAYS = env.int("AGENT_SOFT_EXPIRATION_INACTIVIT
 AGENT_SOFT_EXPIRATION_DOWNGRADE_GRACE_HOURS = env.int("AGENT_SOFT_EXPIRATION_DOWNGRADE_GRACE_HOURS", default=48)
 # Retention window for persisted prompt archives
 PROMPT_ARCHIVE_RETENTION_DAYS = env.int("PROMPT_ARCHIVE_RETENTION_DAYS", default=14)
+# Upload prompt archive blocks from a bounded background queue instead of the agent loop.
+PROMPT_ARCHIVE_BACKGROUND_UPLOAD_ENABLED = env.bool("PROMPT_ARCHIVE_BACKGROUND_UPLOAD_ENABLED", default=True)
 AGENT_OWNER_CUSTOM_INSTRUCTIONS_MAX_CHARS = env.int(
     "AGENT_OWNER_CUSTOM_INSTRUCTIONS_MAX_CHARS",
     default=env.int("ORGANIZATION_CUSTOM_INSTRUCTIONS_MAX_CHARS", default=16000),
@@ -1554,11 +1627,23 @@ OTEL_EXPORTER_OTLP_LOG_ENDPOINT = env("OTEL_EXPORTER_OTLP_LOG_ENDPOINT", default
 # Postmark Inbound Webhook Token - this is a token we create, and add to header on email open/click webhooks in Postmark
 # Infuriatingly, Postmark does not allow you to set it as a header for inbound delivery webhooks, so we have to use a query
 
+# ────────── SMTP Connection Pool ──────────
+# Reuse authenticated SMTP sessions for per-agent accounts within a worker process.
+SMTP_POOL_ENABLED = env.bool("SMTP_POOL_ENABLED", default=True)
+# Close pooled sessions left idle longer than this (seconds).
+SMTP_POOL_IDLE_TIMEOUT_SEC = env.int("SMTP_POOL_IDLE_TIMEOUT_SEC", default=60)
+# Retire a session after this many messages to stay under server per-session limits.
+SMTP_POOL_MAX_MESSAGES_PER_CONNECTION = env.int("SMTP_POOL_MAX_MESSAGES_PER_CONNECTION", default=100)
+# Idle sessions kept per account.
+SMTP_POOL_MAX_IDLE_PER_ACCOUNT = env.int("SMTP_POOL_MAX_IDLE_PER_ACCOUNT", default=2)
+
 # ────────── IMAP IDLE Runner ──────────
 # Global enable for the management-command based IDLE watcher.
 IMAP_IDLE_ENABLED = env.bool("IMAP_IDLE_ENABLED", default=False)
-# Max local watchers per runner process; scale horizontally with multiple runners.
-IMAP_IDLE_MAX_CONNECTIONS = env.int("IMAP_IDLE_MAX_CONNECTIONS", default=200)
+# Max IDLE sessions per runner process; sessions share one asyncio loop, so thousands fit.
+IMAP_IDLE_MAX_CONNECTIONS = env.int("IMAP_IDLE_MAX_CONNECTIONS", default=2000)
+# Max IMAP connect/login handshakes in flight at once per runner (avoids reconnect storms).
+IMAP_IDLE_CONNECT_CONCURRENCY = env.int("IMAP_IDLE_CONNECT_CONCURRENCY", default=50)
 # How often to rescan the DB for accounts to watch (seconds)
 IMAP_IDLE_SCAN_INTERVAL_SEC = env.int("IMAP_IDLE_SCAN_INTERVAL_SEC", default=30)
 # Re-issue IDLE at this interval to avoid server timeouts (seconds; ~25 minutes default)
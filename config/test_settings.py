@@ -103,6 +103,33 @@ LLM_BOOTSTRAP_OPTIONAL = True
 # and its provider clients in Celery eager mode.
 BROWSER_USE_TASK_EXECUTION_DISABLED = True
 
+# Keep agent SQLite restores hermetic; cache and delta tests opt in with override_settings.
+AGENT_SQLITE_STATE_CACHE_ENABLED = False
+AGENT_SQLITE_DELTA_PERSISTENCE_ENABLED = False
+PROMPT_TOKEN_CACHE_SHARED_ENABLED = False
+# Publish web stream frames inline so tests observe them synchronously.
+WEB_STREAM_BACKGROUND_PUBLISH_ENABLED = False
+# Write prompt archives inline so tests can read them back immediately.
+PROMPT_ARCHIVE_BACKGROUND_UPLOAD_ENABLED = False
+# Open a fresh SMTP session per send so tests never share mocked clients.
+SMTP_POOL_ENABLED = False
+# Poll the timeline in MCP waits; the in-memory channel layer cannot be shared with the hub loop.
+MCP_WAIT_EVENT_HUB_ENABLED = False
+# Query proxies directly so tests see rows created inside their own transaction.
+PROXY_POOL_CACHE_ENABLED = False
+# Call requests directly so tests can patch requests.request/get/post.
+HTTP_CLIENT_POOL_ENABLED = False
+# Show search_tools the full catalog and call the (mocked) LLM on every search.
+SEARCH_TOOLS_PRERANK_ENABLED = False
+SEARCH_TOOLS_SELECTION_CACHE_SECONDS = 0
+# Keep failover order fixed; the fake Redis would otherwise carry provider health between tests.
+LLM_PROVIDER_HEALTH_ENABLED = False
+# Aggregate credit usage from steps so tests never depend on ledger state.
+CREDIT_USAGE_LEDGER_ENABLED = False
+# Charge credit rows directly: leases live in the process-wide fake Redis and would
+# outlive the owners they were opened for. Reservation tests opt in with a fresh client.
+TASK_CREDIT_RESERVATIONS_ENABLED = False
+
 # -----------------------------------------------------------------------------
 #  Silence Django's noisy "Adding permission ..." output at high verbosity
 # -----------------------------------------------------------------------------
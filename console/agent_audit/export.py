@@ -14,6 +14,7 @@ from django.db.models import QuerySet
 from django.utils import timezone
 
 from api.models import PersistentAgent, PersistentAgentCompletion, PersistentAgentError, PersistentAgentMessage, PersistentAgentStep
+from api.services.prompt_archives import load_prompt_archive_payload
 from console.agent_audit.serializers import serialize_completion, serialize_error, serialize_message, serialize_prompt_meta, serialize_tool_call
 
 
@@ -91,9 +92,7 @@ def _load_prompt_archive_payload(archive) -> dict[str, Any] | None:
         return None
 
     try:
-        with default_storage.open(storage_key, "rb") as stored:
-            dctx = zstd.ZstdDecompressor()
-            payload_bytes = dctx.decompress(stored.read())
+        payload = load_prompt_archive_payload(storage_key, storage=default_storage)
     except FileNotFoundError:
         return {"error": "missing_payload"}
     except GoogleCloudNotFound:
@@ -107,9 +106,6 @@ def _load_prompt_archive_payload(archive) -> dict[str, Any] | None:
     except (OSError, zstd.ZstdError):
         logger.warning("Failed to read prompt archive payload for %s", getattr(archive, "id", None), exc_info=True)
         return {"error": "read_failed"}
-
-    try:
-        payload = json.loads(payload_bytes.decode("utf-8"))
     except (json.JSONDecodeError, UnicodeDecodeError):
         logger.warning("Failed to decode prompt archive payload for %s", getattr(archive, "id", None), exc_info=True)
         return {"error": "decode_failed"}
@@ -44,6 +44,19 @@ def send_stream_event(agent_id: str, user_id: int, payload: dict) -> None:
     )
 
 
+async def send_stream_event_async(agent_id: str, user_id: int, payload: dict) -> None:
+    if not agent_id or user_id is None:
+        return
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        logger.debug("Channel layer unavailable; skipping stream send for agent %s user %s", agent_id, user_id)
+        return
+    await channel_layer.group_send(
+        user_stream_group_name(agent_id, user_id),
+        {"type": "stream_event", "agent_id": str(agent_id), "payload": payload},
+    )
+
+
 def send_user_group_event(agent_id: str, user_id: int, message_type: str, payload: dict) -> None:
     if not agent_id or user_id is None:
         return
@@ -16,7 +16,6 @@ from typing import Any
 from urllib.parse import urljoin, urlparse
 
 import httpx
-import zstandard as zstd
 from allauth.core.exceptions import ImmediateHttpResponse
 from anymail.exceptions import AnymailAPIError, AnymailError
 from celery.exceptions import CeleryError
@@ -148,6 +147,7 @@ from api.services.agent_owner_custom_instructions import (
     save_custom_instructions_for_user_id,
 )
 from api.services.portable_agent_exports import user_can_export_agent
+from api.services.prompt_archives import load_prompt_archive_payload
 from constants.feature_flags import PORTABLE_AGENT_EXPORTS
 from api.services.product_announcements import build_product_announcements_payload, mark_product_announcements_read
 from api.services.signup_preview import resume_signup_preview_agent_if_eligible, user_has_existing_personal_agent_for_signup_preview
@@ -2844,18 +2844,13 @@ class StaffPromptArchiveAPIView(SystemAdminAPIView):
         if not default_storage.exists(archive.storage_key):
             return JsonResponse({"error": "missing"}, status=404)
         try:
-            with default_storage.open(archive.storage_key, "rb") as stored:
-                dctx = zstd.ZstdDecompressor()
-                payload_bytes = dctx.decompress(stored.read())
-        except Exception:
-            logger.exception("Failed to read prompt archive %s", archive_id)
-            return JsonResponse({"error": "read_failed"}, status=500)
-
-        try:
-            payload = json.loads(payload_bytes.decode("utf-8"))
+            payload = load_prompt_archive_payload(archive.storage_key)
         except (json.JSONDecodeError, UnicodeDecodeError):
             logger.warning("Failed to decode prompt archive payload for %s", archive_id, exc_info=True)
             payload = None
+        except Exception:
+            logger.exception("Failed to read prompt archive %s", archive_id)
+            return JsonResponse({"error": "read_failed"}, status=500)
 
         return JsonResponse(
             {
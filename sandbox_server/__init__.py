@@ -10,6 +10,7 @@ _MODULE_NAMES = (
     "run",
     "tools",
     "sync",
+    "mcp_sessions",
     "mcp",
     "app",
 )
@@ -1,17 +1,9 @@
-import asyncio
-
-from asgiref.sync import ThreadSensitiveContext
-from asgiref.wsgi import WsgiToAsgi
-
-from sandbox_server.app import application as wsgi_application
+from sandbox_server.app import asgi_application as http_application
 from sandbox_server.server.sqlite_rsync import (
     SQLITE_RSYNC_WEBSOCKET_PATH,
     websocket_application,
 )
 
-http_application = WsgiToAsgi(wsgi_application)
-_HTTP_CONCURRENCY = asyncio.Semaphore(4)
-
 
 async def application(scope, receive, send):
     if scope["type"] == "websocket":
@@ -20,7 +12,14 @@ async def application(scope, receive, send):
             return
         await send({"type": "websocket.close", "code": 4404})
         return
-    # WsgiToAsgi otherwise shares one thread-sensitive executor for the whole
-    # process, which would make health checks wait behind long-running tools.
-    async with _HTTP_CONCURRENCY, ThreadSensitiveContext():
-        await http_application(scope, receive, send)
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    # Routes are admitted per concurrency class, so health checks and control-plane
+    # calls never queue behind long-running compute requests.
+    await http_application(scope, receive, send)
@@ -1,13 +1,31 @@
+import asyncio
+import io
+import json
 import logging
 import time
-from typing import Any, Callable, Dict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
 
+from sandbox_server.config import _compute_route_concurrency, _control_route_concurrency
 from sandbox_server.logging_config import configure_logging
 from sandbox_server.mcp import _handle_discover_mcp_tools, _handle_mcp_request
-from sandbox_server.run import _handle_deploy_or_resume, _handle_run_command, _handle_terminate
+from sandbox_server.run import (
+    _handle_deploy_or_resume,
+    _handle_run_command,
+    _handle_run_command_async,
+    _handle_terminate,
+)
 from sandbox_server.sync import _handle_sync_filespace
-from sandbox_server.tools import _handle_tool_request
-from sandbox_server.workspace import _elapsed_ms, _extract_traceparent, _json_response, _parse_json, _require_auth
+from sandbox_server.tools import _handle_tool_request, _handle_tool_request_async
+from sandbox_server.workspace import (
+    _StreamingResponse,
+    _elapsed_ms,
+    _extract_traceparent,
+    _json_response,
+    _parse_json,
+    _require_auth,
+)
 
 logger = logging.getLogger(__name__)
 configure_logging()
@@ -22,15 +40,78 @@ _ROUTES: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
     "/sandbox/compute/discover_mcp_tools": _handle_discover_mcp_tools,
 }
 
+# Routes with a native coroutine handler; every other route runs its sync handler on a worker thread.
+_ASYNC_ROUTES: Dict[str, Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]] = {
+    "/sandbox/compute/run_command": _handle_run_command_async,
+    "/sandbox/compute/tool_request": _handle_tool_request_async,
+}
 
-def application(environ: Dict[str, Any], start_response: Callable) -> list[bytes]:
-    started_at = time.monotonic()
-    path = environ.get("PATH_INFO", "") or ""
-    method = environ.get("REQUEST_METHOD", "GET").upper()
+_ROUTE_CLASS_COMPUTE = "compute"
+_ROUTE_CLASS_CONTROL = "control"
+
+# Long-running work is limited separately so it cannot starve fast control-plane calls.
+_ROUTE_CLASSES: Dict[str, str] = {
+    "/sandbox/compute/deploy_or_resume": _ROUTE_CLASS_CONTROL,
+    "/sandbox/compute/run_command": _ROUTE_CLASS_COMPUTE,
+    "/sandbox/compute/tool_request": _ROUTE_CLASS_COMPUTE,
+    "/sandbox/compute/mcp_request": _ROUTE_CLASS_COMPUTE,
+    "/sandbox/compute/sync_filespace": _ROUTE_CLASS_CONTROL,
+    "/sandbox/compute/terminate": _ROUTE_CLASS_CONTROL,
+    "/sandbox/compute/discover_mcp_tools": _ROUTE_CLASS_CONTROL,
+}
+
+
+@dataclass
+class _RouteStats:
+    queued: int = 0
+    running: int = 0
+    completed: int = 0
+    failed: int = 0
+    total_ms: int = 0
+    max_ms: int = 0
+    max_queue_ms: int = 0
 
-    if path.rstrip("/") == "/healthz":
-        return _json_response(start_response, "200 OK", {"status": "ok"})
 
+class _ConcurrencyClass:
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.limit = limit
+        self.executor = ThreadPoolExecutor(max_workers=limit, thread_name_prefix=f"sandbox-{name}")
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.limit)
+            self._loop = loop
+        return self._semaphore
+
+
+_concurrency_classes: Dict[str, _ConcurrencyClass] = {}
+_route_stats: Dict[str, _RouteStats] = {}
+
+
+def _concurrency_class(name: str) -> _ConcurrencyClass:
+    concurrency = _concurrency_classes.get(name)
+    if concurrency is None:
+        limit = _compute_route_concurrency() if name == _ROUTE_CLASS_COMPUTE else _control_route_concurrency()
+        concurrency = _concurrency_classes[name] = _ConcurrencyClass(name, limit)
+    return concurrency
+
+
+def route_metrics() -> Dict[str, Dict[str, int]]:
+    """Per-route queue depth, in-flight count and latency totals for this process."""
+    return {route: asdict(stats) for route, stats in _route_stats.items()}
+
+
+def _admit_request(
+    environ: Dict[str, Any],
+    path: str,
+    method: str,
+    started_at: float,
+) -> Tuple[Optional[Dict[str, Any]], Optional[Tuple[str, Dict[str, Any]]]]:
+    """Validate method, auth, body and route; returns the payload or an HTTP status and error body."""
     if method != "POST":
         logger.warning(
             "Sandbox request rejected path=%s method=%s http_status=405 duration_ms=%s",
@@ -38,7 +119,7 @@ def application(environ: Dict[str, Any], start_response: Callable) -> list[bytes
             method,
             _elapsed_ms(started_at),
         )
-        return _json_response(start_response, "405 Method Not Allowed", {"status": "error", "message": "POST only."})
+        return None, ("405 Method Not Allowed", {"status": "error", "message": "POST only."})
 
     auth_error = _require_auth(environ)
     if auth_error:
@@ -48,7 +129,7 @@ def application(environ: Dict[str, Any], start_response: Callable) -> list[bytes
             method,
             _elapsed_ms(started_at),
         )
-        return _json_response(start_response, "401 Unauthorized", auth_error)
+        return None, ("401 Unauthorized", auth_error)
 
     payload, parse_error = _parse_json(environ)
     if parse_error:
@@ -58,7 +139,7 @@ def application(environ: Dict[str, Any], start_response: Callable) -> list[bytes
             method,
             _elapsed_ms(started_at),
         )
-        return _json_response(start_response, "400 Bad Request", parse_error)
+        return None, ("400 Bad Request", parse_error)
     if payload is None:
         logger.warning(
             "Sandbox request rejected path=%s method=%s http_status=400 reason=invalid_payload duration_ms=%s",
@@ -66,15 +147,14 @@ def application(environ: Dict[str, Any], start_response: Callable) -> list[bytes
             method,
             _elapsed_ms(started_at),
         )
-        return _json_response(start_response, "400 Bad Request", {"status": "error", "message": "Invalid request."})
+        return None, ("400 Bad Request", {"status": "error", "message": "Invalid request."})
     traceparent, trace_id = _extract_traceparent(environ)
     if traceparent:
         payload["_traceparent"] = traceparent
     if trace_id:
         payload["_trace_id"] = trace_id
 
-    handler = _ROUTES.get(path.rstrip("/"))
-    if not handler:
+    if path.rstrip("/") not in _ROUTES:
         logger.warning(
             "Sandbox request rejected path=%s method=%s http_status=404 trace_id=%s duration_ms=%s",
             path,
@@ -82,15 +162,42 @@ def application(environ: Dict[str, Any], start_response: Callable) -> list[bytes
             trace_id,
             _elapsed_ms(started_at),
         )
-        return _json_response(start_response, "404 Not Found", {"status": "error", "message": "Unknown endpoint."})
+        return None, ("404 Not Found", {"status": "error", "message": "Unknown endpoint."})
+    return payload, None
+
 
+def _request_agent_id(payload: Dict[str, Any]) -> Optional[str]:
     agent_id = payload.get("agent_id")
-    if not isinstance(agent_id, str):
-        agent_id = None
-    elif not agent_id.strip():
-        agent_id = None
-    else:
-        agent_id = agent_id.strip()
+    if not isinstance(agent_id, str) or not agent_id.strip():
+        return None
+    return agent_id.strip()
+
+
+def _result_status(result: Any) -> str:
+    if isinstance(result, _StreamingResponse):
+        return result.status
+    if isinstance(result, dict):
+        maybe_status = result.get("status")
+        if isinstance(maybe_status, str) and maybe_status:
+            return maybe_status
+    return "unknown"
+
+
+def application(environ: Dict[str, Any], start_response: Callable) -> list[bytes]:
+    started_at = time.monotonic()
+    path = environ.get("PATH_INFO", "") or ""
+    method = environ.get("REQUEST_METHOD", "GET").upper()
+
+    if path.rstrip("/") == "/healthz":
+        return _json_response(start_response, "200 OK", {"status": "ok"})
+
+    payload, rejection = _admit_request(environ, path, method, started_at)
+    if rejection:
+        return _json_response(start_response, *rejection)
+
+    handler = _ROUTES[path.rstrip("/")]
+    agent_id = _request_agent_id(payload)
+    trace_id = payload.get("_trace_id")
 
     try:
         result = handler(payload)
@@ -109,12 +216,6 @@ def application(environ: Dict[str, Any], start_response: Callable) -> list[bytes
             {"status": "error", "message": "Sandbox compute request failed."},
         )
 
-    status = "unknown"
-    if isinstance(result, dict):
-        maybe_status = result.get("status")
-        if isinstance(maybe_status, str) and maybe_status:
-            status = maybe_status
-
     logger.info(
         (
             "Sandbox request completed path=%s method=%s agent=%s status=%s "
@@ -123,10 +224,162 @@ def application(environ: Dict[str, Any], start_response: Callable) -> list[bytes
         path,
         method,
         agent_id,
-        status,
+        _result_status(result),
         trace_id,
         _elapsed_ms(started_at),
         environ.get("CONTENT_LENGTH", "0"),
     )
 
+    if isinstance(result, _StreamingResponse):
+        start_response("200 OK", [("Content-Type", result.content_type)])
+        return result.chunks
     return _json_response(start_response, "200 OK", result)
+
+
+def _asgi_environ(scope: Dict[str, Any], body: bytes) -> Dict[str, Any]:
+    """Expose ASGI headers and body in the WSGI shape the request helpers read."""
+    environ: Dict[str, Any] = {
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.input": io.BytesIO(body),
+    }
+    for raw_name, raw_value in scope.get("headers") or []:
+        name = raw_name.decode("latin-1").upper().replace("-", "_")
+        if name in {"CONTENT_LENGTH", "CONTENT_TYPE"}:
+            continue
+        environ[f"HTTP_{name}"] = raw_value.decode("latin-1")
+    return environ
+
+
+async def _read_body(receive: Callable) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message.get("type") == "http.disconnect":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            break
+    return b"".join(chunks)
+
+
+async def _send_json(send: Callable, status: str, payload: Dict[str, Any]) -> None:
+    body = json.dumps(payload).encode("utf-8")
+    await send(
+        {
+            "type": "http.response.start",
+            "status": int(status.split(" ", 1)[0]),
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("ascii")),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _send_stream(send: Callable, response: _StreamingResponse, executor: ThreadPoolExecutor) -> None:
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", response.content_type.encode("latin-1"))],
+        }
+    )
+    loop = asyncio.get_running_loop()
+    # Chunks are produced by blocking file reads, so pull them on the route's executor.
+    while True:
+        chunk = await loop.run_in_executor(executor, next, response.chunks, None)
+        if chunk is None:
+            break
+        await send({"type": "http.response.body", "body": chunk, "more_body": True})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def asgi_application(scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+    started_at = time.monotonic()
+    path = scope.get("path", "") or ""
+    method = (scope.get("method") or "GET").upper()
+
+    if path.rstrip("/") == "/healthz":
+        await _send_json(send, "200 OK", {"status": "ok"})
+        return
+
+    body = await _read_body(receive) if method == "POST" else b""
+    environ = _asgi_environ(scope, body)
+    payload, rejection = _admit_request(environ, path, method, started_at)
+    if rejection:
+        await _send_json(send, *rejection)
+        return
+
+    route = path.rstrip("/")
+    route_class = _ROUTE_CLASSES.get(route, _ROUTE_CLASS_CONTROL)
+    concurrency = _concurrency_class(route_class)
+    stats = _route_stats.setdefault(route, _RouteStats())
+    agent_id = _request_agent_id(payload)
+    trace_id = payload.get("_trace_id")
+
+    queue_depth = stats.queued
+    stats.queued += 1
+    queue_ms = 0
+    admitted = False
+    try:
+        async with concurrency.semaphore():
+            stats.queued -= 1
+            stats.running += 1
+            admitted = True
+            queue_ms = _elapsed_ms(started_at)
+            async_handler = _ASYNC_ROUTES.get(route)
+            if async_handler is not None:
+                result = await async_handler(payload)
+            else:
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(concurrency.executor, _ROUTES[route], payload)
+    except Exception:
+        stats.failed += 1
+        logger.exception(
+            "Sandbox compute request failed path=%s method=%s agent=%s route_class=%s trace_id=%s duration_ms=%s",
+            path,
+            method,
+            agent_id,
+            route_class,
+            trace_id,
+            _elapsed_ms(started_at),
+        )
+        await _send_json(
+            send,
+            "500 Internal Server Error",
+            {"status": "error", "message": "Sandbox compute request failed."},
+        )
+        return
+    finally:
+        if admitted:
+            stats.running -= 1
+        else:
+            stats.queued -= 1
+
+    duration_ms = _elapsed_ms(started_at)
+    stats.completed += 1
+    stats.total_ms += duration_ms
+    stats.max_ms = max(stats.max_ms, duration_ms)
+    stats.max_queue_ms = max(stats.max_queue_ms, queue_ms)
+    logger.info(
+        (
+            "Sandbox request completed path=%s method=%s agent=%s status=%s "
+            "trace_id=%s duration_ms=%s payload_bytes=%s route_class=%s queue_ms=%s queue_depth=%s running=%s"
+        ),
+        path,
+        method,
+        agent_id,
+        _result_status(result),
+        trace_id,
+        duration_ms,
+        len(body),
+        route_class,
+        queue_ms,
+        queue_depth,
+        stats.running + 1,
+    )
+    if isinstance(result, _StreamingResponse):
+        await _send_stream(send, result, concurrency.executor)
+        return
+    await _send_json(send, "200 OK", result)
@@ -270,3 +270,63 @@ def _mcp_timeout_seconds() -> int:
         except ValueError:
             pass
     return 120
+
+
+def _mcp_session_idle_ttl_seconds() -> int:
+    raw = os.environ.get("SANDBOX_COMPUTE_MCP_SESSION_IDLE_TTL_SECONDS")
+    if raw:
+        try:
+            value = int(raw)
+            if value > 0:
+                return value
+        except ValueError:
+            pass
+    return 600
+
+
+def _mcp_session_max_sessions() -> int:
+    raw = os.environ.get("SANDBOX_COMPUTE_MCP_MAX_SESSIONS")
+    if raw:
+        try:
+            value = int(raw)
+            if value >= 0:
+                return value
+        except ValueError:
+            pass
+    return 32
+
+
+def _mcp_session_health_check_seconds() -> int:
+    raw = os.environ.get("SANDBOX_COMPUTE_MCP_SESSION_HEALTH_CHECK_SECONDS")
+    if raw:
+        try:
+            value = int(raw)
+            if value > 0:
+                return value
+        except ValueError:
+            pass
+    return 30
+
+
+def _compute_route_concurrency() -> int:
+    raw = os.environ.get("SANDBOX_COMPUTE_MAX_CONCURRENT_COMPUTE")
+    if raw:
+        try:
+            value = int(raw)
+            if value > 0:
+                return value
+        except ValueError:
+            pass
+    return 16
+
+
+def _control_route_concurrency() -> int:
+    raw = os.environ.get("SANDBOX_COMPUTE_MAX_CONCURRENT_CONTROL")
+    if raw:
+        try:
+            value = int(raw)
+            if value > 0:
+                return value
+        except ValueError:
+            pass
+    return 32
@@ -21,6 +21,7 @@ from sandbox_server.config import (
     _workspace_root,
 )
 from sandbox_server.manifest import _proxy_env_from_manifest, _store_proxy_env
+from sandbox_server.mcp_sessions import MCPSessionPool
 from sandbox_server.workspace import _elapsed_ms, _require_agent_id, _trace_context
 
 logger = logging.getLogger(__name__)
@@ -272,7 +273,7 @@ def _prepare_runtime_proxy_env(
     return agent_id, None
 
 
-async def _call_mcp_tool(runtime: Dict[str, Any], tool_name: str, params: Dict[str, Any]) -> Any:
+def _build_mcp_client(runtime: Dict[str, Any]) -> Client:
     if runtime.get("url"):
         transport = StreamableHttpTransport(url=runtime["url"], headers=runtime["headers"])
     else:
@@ -281,26 +282,33 @@ async def _call_mcp_tool(runtime: Dict[str, Any], tool_name: str, params: Dict[s
             args=runtime["args"],
             env=runtime["env"],
         )
+    return Client(transport)
 
-    client = Client(transport)
-    async with client:
-        timeout = _mcp_timeout_seconds()
-        return await asyncio.wait_for(client.call_tool(tool_name, params), timeout=timeout)
 
+_mcp_sessions = MCPSessionPool(_build_mcp_client)
+
+
+def get_mcp_session_pool() -> MCPSessionPool:
+    return _mcp_sessions
+
+
+async def _call_mcp_tool(
+    runtime: Dict[str, Any],
+    tool_name: str,
+    params: Dict[str, Any],
+    agent_id: Optional[str] = None,
+) -> Any:
+    return await _mcp_sessions.call_tool(
+        runtime,
+        agent_id,
+        tool_name,
+        params,
+        timeout=_mcp_timeout_seconds(),
+    )
 
-async def _discover_mcp_tools(runtime: Dict[str, Any]) -> list[Dict[str, Any]]:
-    if runtime.get("url"):
-        transport = StreamableHttpTransport(url=runtime["url"], headers=runtime["headers"])
-    else:
-        transport = GobiiStdioTransport(
-            command=runtime["command"],
-            args=runtime["args"],
-            env=runtime["env"],
-        )
 
-    client = Client(transport)
-    async with client:
-        tools = await client.list_tools()
+async def _discover_mcp_tools(runtime: Dict[str, Any], agent_id: Optional[str] = None) -> list[Dict[str, Any]]:
+    tools = await _mcp_sessions.list_tools(runtime, agent_id)
 
     serialized: list[Dict[str, Any]] = []
     for tool in tools or []:
@@ -342,7 +350,7 @@ def _handle_mcp_request(payload: Dict[str, Any]) -> Dict[str, Any]:
     params = payload.get("params") if isinstance(payload.get("params"), dict) else {}
 
     try:
-        result = asyncio.run(_call_mcp_tool(runtime, tool_name.strip(), params))
+        result = _mcp_sessions.run(_call_mcp_tool(runtime, tool_name.strip(), params, agent_id))
     except Exception as exc:
         duration_ms = int((time.time() - start) * 1000)
         trace_id, _traceparent = _trace_context(payload)
@@ -385,12 +393,12 @@ def _handle_discover_mcp_tools(payload: Dict[str, Any]) -> Dict[str, Any]:
     runtime, runtime_error = _parse_mcp_server_payload(payload)
     if runtime_error:
         return runtime_error
-    _agent_id, error = _prepare_runtime_proxy_env(payload, runtime, skip_when_url=True)
+    agent_id, error = _prepare_runtime_proxy_env(payload, runtime, skip_when_url=True)
     if error:
         return error
     trace_id, _traceparent = _trace_context(payload)
     try:
-        tools = asyncio.run(_discover_mcp_tools(runtime))
+        tools = _mcp_sessions.run(_discover_mcp_tools(runtime, agent_id))
     except Exception as exc:
         logger.exception(
             "Sandbox discover_mcp_tools failed server_id=%s duration_ms=%s trace_id=%s",
@@ -0,0 +1,298 @@
+"""
+Long-lived MCP client sessions for the sandbox server.
+
+Every ``mcp_request`` used to build a new transport and client, which for stdio
+servers meant launching ``npx``/``uvx`` and repeating the MCP initialize
+handshake on each tool call. Sessions are now kept open on a dedicated event
+loop and reused per agent and runtime fingerprint, so a warm call costs a single
+round-trip. Idle sessions are closed after a TTL, the pool is capped with LRU
+eviction, sessions that have been idle for a while are pinged before reuse,
+and a dead session is restarted transparently on the next request.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+from sandbox_server.config import (
+    _mcp_session_health_check_seconds,
+    _mcp_session_idle_ttl_seconds,
+    _mcp_session_max_sessions,
+)
+
+logger = logging.getLogger(__name__)
+
+_HEALTH_CHECK_TIMEOUT_SECONDS = 5.0
+_CLOSE_TIMEOUT_SECONDS = 10.0
+_MAX_REAP_INTERVAL_SECONDS = 30.0
+
+SessionKey = tuple[str, str]
+T = TypeVar("T")
+
+
+def _runtime_fingerprint(runtime: Dict[str, Any]) -> str:
+    material = {
+        name: runtime.get(name)
+        for name in ("config_id", "command", "args", "url", "env", "headers")
+    }
+    encoded = json.dumps(material, sort_keys=True, ensure_ascii=True, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class _PooledSession:
+    key: SessionKey
+    server_name: str
+    client: Any
+    last_used: float
+    last_checked: float
+    in_use: int = 0
+    retired: bool = False
+
+
+class MCPSessionPool:
+    """Per-process pool of connected MCP clients, owned by one background event loop."""
+
+    def __init__(self, client_factory: Callable[[Dict[str, Any]], Any]):
+        self._client_factory = client_factory
+        self._sessions: "OrderedDict[SessionKey, _PooledSession]" = OrderedDict()
+        self._key_locks: Dict[SessionKey, asyncio.Lock] = {}
+        self._thread_lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._owner_pid: Optional[int] = None
+        self._reaper: Optional[asyncio.Task] = None
+
+    # Sync entry point --------------------------------------------------
+
+    def run(self, coro: Awaitable[T]) -> T:
+        """Run ``coro`` on the pool's loop and block the calling thread for its result."""
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._thread_lock:
+            pid = os.getpid()
+            if self._owner_pid != pid:
+                # Forked workers inherit neither the loop thread nor the server processes.
+                self._sessions = OrderedDict()
+                self._key_locks = {}
+                self._reaper = None
+                self._loop = None
+                self._thread = None
+                self._owner_pid = pid
+            if self._loop is None or self._thread is None or not self._thread.is_alive():
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(
+                    target=self._run_loop,
+                    args=(loop,),
+                    name="mcp-session-pool",
+                    daemon=True,
+                )
+                thread.start()
+                self._loop = loop
+                self._thread = thread
+                self._reaper = None
+            return self._loop
+
+    @staticmethod
+    def _run_loop(loop: asyncio.AbstractEventLoop) -> None:
+        asyncio.set_event_loop(loop)
+        loop.run_forever()
+
+    # Pool operations (run on the pool loop) ----------------------------
+
+    async def call_tool(
+        self,
+        runtime: Dict[str, Any],
+        agent_id: Optional[str],
+        tool_name: str,
+        params: Dict[str, Any],
+        *,
+        timeout: float,
+    ) -> Any:
+        async def _call(client):
+            return await asyncio.wait_for(client.call_tool(tool_name, params), timeout=timeout)
+
+        # Not retried: the server may already have run the tool when the session died.
+        return await self._with_client(runtime, agent_id, _call, retry_dead=False)
+
+    async def list_tools(self, runtime: Dict[str, Any], agent_id: Optional[str]) -> list[Any]:
+        async def _list(client):
+            return await client.list_tools()
+
+        return await self._with_client(runtime, agent_id, _list, retry_dead=True)
+
+    async def _with_client(
+        self,
+        runtime: Dict[str, Any],
+        agent_id: Optional[str],
+        operation: Callable[[Any], Awaitable[T]],
+        *,
+        retry_dead: bool,
+    ) -> T:
+        self._ensure_reaper()
+        attempts = 2 if retry_dead else 1
+        for attempt in range(attempts):
+            session = await self._acquire(runtime, agent_id)
+            if session is None:
+                # Every pooled session is busy and the pool is full: fall back to a one-shot client.
+                client = self._client_factory(runtime)
+                async with client:
+                    return await operation(client)
+            try:
+                result = await operation(session.client)
+            except Exception:
+                dead = not session.client.is_connected()
+                if dead:
+                    self._retire(session, reason="disconnected")
+                if dead and attempt + 1 < attempts:
+                    continue
+                raise
+            else:
+                session.last_checked = time.monotonic()
+                return result
+            finally:
+                await self._release(session)
+        raise RuntimeError("MCP session unavailable")
+
+    async def _acquire(self, runtime: Dict[str, Any], agent_id: Optional[str]) -> Optional[_PooledSession]:
+        max_sessions = _mcp_session_max_sessions()
+        if max_sessions <= 0:
+            return None
+        key = (agent_id or "", _runtime_fingerprint(runtime))
+        lock = self._key_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            session = self._sessions.get(key)
+            if session is not None:
+                if await self._is_healthy(session):
+                    self._sessions.move_to_end(key)
+                    session.in_use += 1
+                    session.last_used = time.monotonic()
+                    return session
+                self._retire(session, reason="unhealthy")
+                await self._close_if_idle(session)
+
+            if len(self._sessions) >= max_sessions and not await self._evict_lru():
+                return None
+
+            started_at = time.monotonic()
+            client = self._client_factory(runtime)
+            await client.__aenter__()
+            now = time.monotonic()
+            session = _PooledSession(
+                key=key,
+                server_name=runtime.get("name") or runtime.get("config_id") or "",
+                client=client,
+                last_used=now,
+                last_checked=now,
+                in_use=1,
+            )
+            self._sessions[key] = session
+            logger.info(
+                "Sandbox mcp_session opened agent=%s server=%s sessions=%s duration_ms=%s",
+                key[0] or None,
+                session.server_name,
+                len(self._sessions),
+                int((now - started_at) * 1000),
+            )
+            return session
+
+    async def _is_healthy(self, session: _PooledSession) -> bool:
+        if not session.client.is_connected():
+            return False
+        now = time.monotonic()
+        if session.in_use or now - session.last_checked < _mcp_session_health_check_seconds():
+            return True
+        try:
+            await asyncio.wait_for(session.client.ping(), timeout=_HEALTH_CHECK_TIMEOUT_SECONDS)
+        except Exception:
+            logger.info(
+                "Sandbox mcp_session failed health check agent=%s server=%s",
+                session.key[0] or None,
+                session.server_name,
+            )
+            return False
+        session.last_checked = now
+        return True
+
+    async def _release(self, session: _PooledSession) -> None:
+        session.in_use = max(0, session.in_use - 1)
+        session.last_used = time.monotonic()
+        await self._close_if_idle(session)
+
+    def _retire(self, session: _PooledSession, *, reason: str) -> None:
+        if self._sessions.get(session.key) is session:
+            del self._sessions[session.key]
+        if not session.retired:
+            session.retired = True
+            logger.info(
+                "Sandbox mcp_session retired agent=%s server=%s reason=%s",
+                session.key[0] or None,
+                session.server_name,
+                reason,
+            )
+
+    async def _close_if_idle(self, session: _PooledSession) -> None:
+        if not session.retired or session.in_use:
+            return
+        try:
+            await asyncio.wait_for(session.client.close(), timeout=_CLOSE_TIMEOUT_SECONDS)
+        except Exception:
+            logger.debug("Failed to close MCP session for %s", session.server_name, exc_info=True)
+
+    async def _evict_lru(self) -> bool:
+        for session in list(self._sessions.values()):
+            if session.in_use == 0:
+                self._retire(session, reason="evicted")
+                await self._close_if_idle(session)
+                return True
+        return False
+
+    async def reap_idle(self, now: Optional[float] = None) -> int:
+        """Close sessions idle past the TTL, or whose server has gone away; returns how many."""
+        now = time.monotonic() if now is None else now
+        cutoff = now - _mcp_session_idle_ttl_seconds()
+        expired = [
+            session
+            for session in self._sessions.values()
+            if session.in_use == 0 and (session.last_used <= cutoff or not session.client.is_connected())
+        ]
+        for session in expired:
+            self._retire(session, reason="idle")
+            await self._close_if_idle(session)
+        for key in [key for key, lock in self._key_locks.items() if key not in self._sessions and not lock.locked()]:
+            self._key_locks.pop(key, None)
+        return len(expired)
+
+    async def close_agent(self, agent_id: str) -> int:
+        """Retire every session belonging to ``agent_id``; busy ones close when their call returns."""
+        sessions = [session for session in self._sessions.values() if session.key[0] == agent_id]
+        for session in sessions:
+            self._retire(session, reason="terminated")
+            await self._close_if_idle(session)
+        return len(sessions)
+
+    def _ensure_reaper(self) -> None:
+        if self._reaper is not None and not self._reaper.done():
+            return
+        self._reaper = asyncio.get_running_loop().create_task(self._reap_forever())
+
+    async def _reap_forever(self) -> None:
+        while True:
+            interval = min(_MAX_REAP_INTERVAL_SECONDS, max(1.0, _mcp_session_idle_ttl_seconds() / 2))
+            await asyncio.sleep(interval)
+            try:
+                await self.reap_idle()
+            except Exception:
+                logger.exception("Failed to reap idle MCP sessions")
+
+    def __len__(self) -> int:
+        return len(self._sessions)
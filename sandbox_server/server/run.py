@@ -1,3 +1,4 @@
+import asyncio
 import json
 import logging
 import os
@@ -29,16 +30,31 @@ from sandbox_server.workspace import (
 logger = logging.getLogger(__name__)
 
 
-def _terminate_process_group(process: subprocess.Popen) -> None:
+def _signal_process_group(pid: int, sig: int) -> bool:
     try:
-        os.killpg(process.pid, signal.SIGTERM)
+        os.killpg(pid, sig)
     except (PermissionError, ProcessLookupError):
+        return False
+    return True
+
+
+def _terminate_process_group(process: subprocess.Popen) -> None:
+    if not _signal_process_group(process.pid, signal.SIGTERM):
         return
     time.sleep(0.05)
-    try:
-        os.killpg(process.pid, signal.SIGKILL)
-    except (PermissionError, ProcessLookupError):
-        pass
+    _signal_process_group(process.pid, signal.SIGKILL)
+
+
+async def _terminate_process_group_async(pid: int) -> None:
+    if not _signal_process_group(pid, signal.SIGTERM):
+        return
+    await asyncio.sleep(0.05)
+    _signal_process_group(pid, signal.SIGKILL)
+
+
+def _read_captured(handle) -> str:
+    handle.seek(0)
+    return handle.read().decode("utf-8", errors="replace")
 
 
 def _run_managed_process(
@@ -80,6 +96,52 @@ def _run_managed_process(
         return subprocess.CompletedProcess(command, process.returncode, stdout, stderr)
 
 
+async def _run_managed_process_async(
+    command,
+    *,
+    shell: bool,
+    cwd: str,
+    env: Dict[str, str],
+    timeout: int,
+) -> subprocess.CompletedProcess:
+    """Event-loop twin of ``_run_managed_process`` for the ASGI server."""
+    with tempfile.TemporaryFile() as stdout_file, tempfile.TemporaryFile() as stderr_file:
+        spawn_kwargs = {
+            "cwd": cwd,
+            "env": env,
+            "stdout": stdout_file,
+            "stderr": stderr_file,
+            "start_new_session": True,
+        }
+        if shell:
+            process = await asyncio.create_subprocess_shell(command, **spawn_kwargs)
+        else:
+            process = await asyncio.create_subprocess_exec(*command, **spawn_kwargs)
+        try:
+            await asyncio.wait_for(process.wait(), timeout=timeout)
+        except asyncio.TimeoutError as exc:
+            await _terminate_process_group_async(process.pid)
+            await process.wait()
+            raise subprocess.TimeoutExpired(
+                command,
+                timeout,
+                output=_read_captured(stdout_file),
+                stderr=_read_captured(stderr_file),
+            ) from exc
+        except asyncio.CancelledError:
+            await _terminate_process_group_async(process.pid)
+            # Reap the killed child so a cancelled request does not leave a zombie behind.
+            await asyncio.shield(process.wait())
+            raise
+        await _terminate_process_group_async(process.pid)
+        return subprocess.CompletedProcess(
+            command,
+            process.returncode,
+            _read_captured(stdout_file),
+            _read_captured(stderr_file),
+        )
+
+
 def _sandbox_env_with_proxy_manifest(
     agent_root,
     extra_env: Optional[Dict[str, str]] = None,
@@ -155,23 +217,22 @@ def _handle_deploy_or_resume(payload: Dict[str, Any]) -> Dict[str, Any]:
     return _session_update("running")
 
 
-def _handle_run_command(payload: Dict[str, Any]) -> Dict[str, Any]:
-    start = time.time()
+def _prepare_run_command(payload: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
     agent_id, error = _require_agent_id(payload)
     if error:
-        return error
+        return None, error
     agent_root = _agent_workspace(agent_id)
     _store_proxy_env(agent_root, payload)
     command = payload.get("command")
     if not isinstance(command, str) or not command.strip():
-        return {"status": "error", "message": "Missing required parameter: command"}
+        return None, {"status": "error", "message": "Missing required parameter: command"}
     if payload.get("interactive") is True:
-        return {"status": "error", "message": "Interactive sessions are not supported yet."}
+        return None, {"status": "error", "message": "Interactive sessions are not supported yet."}
     cwd = payload.get("cwd")
     if isinstance(cwd, str) and cwd.strip():
         cwd_path, _ = _normalize_workspace_path(agent_root, cwd)
         if cwd_path is None:
-            return {"status": "error", "message": "Invalid cwd path."}
+            return None, {"status": "error", "message": "Invalid cwd path."}
         cwd = str(cwd_path)
     else:
         cwd = str(agent_root)
@@ -183,37 +244,54 @@ def _handle_run_command(payload: Dict[str, Any]) -> Dict[str, Any]:
         payload.get("timeout"),
         default=_run_command_timeout_seconds(),
     )
+    return {
+        "agent_id": agent_id,
+        "command": command,
+        "cwd": cwd,
+        "process": {
+            "command": command,
+            "shell": True,
+            "cwd": cwd,
+            "env": _sandbox_env_with_proxy_manifest(agent_root, env, trusted_env_keys=trusted_env_keys),
+            "timeout": timeout,
+        },
+    }, None
 
-    try:
-        result = _run_managed_process(
-            command,
-            shell=True,
-            cwd=cwd,
-            env=_sandbox_env_with_proxy_manifest(agent_root, env, trusted_env_keys=trusted_env_keys),
-            timeout=timeout,
-        )
-    except subprocess.TimeoutExpired:
+
+def _complete_run_command(
+    payload: Dict[str, Any],
+    invocation: Dict[str, Any],
+    start: float,
+    result: Optional[subprocess.CompletedProcess] = None,
+    exc: Optional[BaseException] = None,
+) -> Dict[str, Any]:
+    agent_id = invocation["agent_id"]
+    command = invocation["command"]
+    cwd = invocation["cwd"]
+    if isinstance(exc, subprocess.TimeoutExpired):
         duration_ms = int((time.time() - start) * 1000)
         trace_id, _traceparent = _trace_context(payload)
-        logger.exception(
+        logger.error(
             "Sandbox run_command timed out agent=%s command=%s cwd=%s duration_ms=%s trace_id=%s",
             agent_id,
             command,
             cwd,
             duration_ms,
             trace_id,
+            exc_info=exc,
         )
         return {"status": "error", "message": "Command timed out."}
-    except OSError as exc:
+    if isinstance(exc, OSError):
         duration_ms = int((time.time() - start) * 1000)
         trace_id, _traceparent = _trace_context(payload)
-        logger.exception(
+        logger.error(
             "Sandbox run_command failed to start agent=%s command=%s cwd=%s duration_ms=%s trace_id=%s",
             agent_id,
             command,
             cwd,
             duration_ms,
             trace_id,
+            exc_info=exc,
         )
         return {"status": "error", "message": f"Command failed to start: {exc}"}
 
@@ -248,16 +326,40 @@ def _handle_run_command(payload: Dict[str, Any]) -> Dict[str, Any]:
     return response
 
 
-def _handle_python_exec(payload: Dict[str, Any]) -> Dict[str, Any]:
+def _handle_run_command(payload: Dict[str, Any]) -> Dict[str, Any]:
     start = time.time()
-    agent_id, error = _require_agent_id(payload)
+    invocation, error = _prepare_run_command(payload)
+    if error:
+        return error
+    try:
+        result = _run_managed_process(**invocation["process"])
+    except (subprocess.TimeoutExpired, OSError) as exc:
+        return _complete_run_command(payload, invocation, start, exc=exc)
+    return _complete_run_command(payload, invocation, start, result=result)
+
+
+async def _handle_run_command_async(payload: Dict[str, Any]) -> Dict[str, Any]:
+    start = time.time()
+    # Workspace setup and proxy manifest writes touch the filesystem; keep them off the event loop.
+    invocation, error = await asyncio.to_thread(_prepare_run_command, payload)
     if error:
         return error
+    try:
+        result = await _run_managed_process_async(**invocation["process"])
+    except (subprocess.TimeoutExpired, OSError) as exc:
+        return _complete_run_command(payload, invocation, start, exc=exc)
+    return _complete_run_command(payload, invocation, start, result=result)
+
+
+def _prepare_python_exec(payload: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    agent_id, error = _require_agent_id(payload)
+    if error:
+        return None, error
     agent_root = _agent_workspace(agent_id)
     _store_proxy_env(agent_root, payload)
     code = payload.get("code")
     if not isinstance(code, str) or not code.strip():
-        return {"status": "error", "message": "Missing required parameter: code"}
+        return None, {"status": "error", "message": "Missing required parameter: code"}
     timeout = _normalize_timeout(
         payload.get("timeout_seconds"),
         default=_python_default_timeout_seconds(),
@@ -267,33 +369,46 @@ def _handle_python_exec(payload: Dict[str, Any]) -> Dict[str, Any]:
     trusted_env_keys = payload.get("trusted_env_keys")
     if not isinstance(trusted_env_keys, list):
         trusted_env_keys = []
+    return {
+        "agent_id": agent_id,
+        "process": {
+            "command": [sys.executable, "-c", code],
+            "shell": False,
+            "cwd": str(agent_root),
+            "env": _sandbox_env_with_proxy_manifest(agent_root, extra_env, trusted_env_keys=trusted_env_keys),
+            "timeout": timeout,
+        },
+    }, None
 
-    try:
-        result = _run_managed_process(
-            [sys.executable, "-c", code],
-            shell=False,
-            cwd=str(agent_root),
-            env=_sandbox_env_with_proxy_manifest(agent_root, extra_env, trusted_env_keys=trusted_env_keys),
-            timeout=timeout,
-        )
-    except subprocess.TimeoutExpired:
+
+def _complete_python_exec(
+    payload: Dict[str, Any],
+    invocation: Dict[str, Any],
+    start: float,
+    result: Optional[subprocess.CompletedProcess] = None,
+    exc: Optional[BaseException] = None,
+) -> Dict[str, Any]:
+    agent_id = invocation["agent_id"]
+    if isinstance(exc, subprocess.TimeoutExpired):
         duration_ms = int((time.time() - start) * 1000)
         trace_id, _traceparent = _trace_context(payload)
-        logger.exception(
+        logger.error(
             "Sandbox python_exec timed out agent=%s duration_ms=%s trace_id=%s",
             agent_id,
             duration_ms,
             trace_id,
+            exc_info=exc,
         )
         return {"status": "error", "message": "Python execution timed out."}
-    except OSError as exc:
+    if isinstance(exc, OSError):
         duration_ms = int((time.time() - start) * 1000)
         trace_id, _traceparent = _trace_context(payload)
-        logger.exception(
+        logger.error(
             "Sandbox python_exec failed to start agent=%s duration_ms=%s trace_id=%s",
             agent_id,
             duration_ms,
             trace_id,
+            exc_info=exc,
         )
         return {"status": "error", "message": f"Python execution failed to start: {exc}"}
 
@@ -315,6 +430,44 @@ def _handle_python_exec(payload: Dict[str, Any]) -> Dict[str, Any]:
     return response
 
 
+def _handle_python_exec(payload: Dict[str, Any]) -> Dict[str, Any]:
+    start = time.time()
+    invocation, error = _prepare_python_exec(payload)
+    if error:
+        return error
+    try:
+        result = _run_managed_process(**invocation["process"])
+    except (subprocess.TimeoutExpired, OSError) as exc:
+        return _complete_python_exec(payload, invocation, start, exc=exc)
+    return _complete_python_exec(payload, invocation, start, result=result)
+
+
+async def _handle_python_exec_async(payload: Dict[str, Any]) -> Dict[str, Any]:
+    start = time.time()
+    invocation, error = await asyncio.to_thread(_prepare_python_exec, payload)
+    if error:
+        return error
+    try:
+        result = await _run_managed_process_async(**invocation["process"])
+    except (subprocess.TimeoutExpired, OSError) as exc:
+        return _complete_python_exec(payload, invocation, start, exc=exc)
+    return _complete_python_exec(payload, invocation, start, result=result)
+
+
+def _close_agent_mcp_sessions(agent_id: str) -> int:
+    # Imported lazily: the MCP module loads after this one.
+    from sandbox_server.mcp import get_mcp_session_pool
+
+    pool = get_mcp_session_pool()
+    if not len(pool):
+        return 0
+    try:
+        return pool.run(pool.close_agent(agent_id))
+    except Exception:
+        logger.warning("Failed to close MCP sessions for agent=%s", agent_id, exc_info=True)
+        return 0
+
+
 def _handle_terminate(payload: Dict[str, Any]) -> Dict[str, Any]:
     started_at = time.monotonic()
     agent_id, error = _require_agent_id(payload)
@@ -322,12 +475,14 @@ def _handle_terminate(payload: Dict[str, Any]) -> Dict[str, Any]:
         return error
     agent_root = _agent_workspace(agent_id)
     proxy_env_updated = _store_proxy_env(agent_root, payload)
+    mcp_sessions_closed = _close_agent_mcp_sessions(agent_id)
     trace_id, _traceparent = _trace_context(payload)
     logger.info(
-        "Sandbox terminate agent=%s status=ok duration_ms=%s proxy_env_updated=%s trace_id=%s",
+        "Sandbox terminate agent=%s status=ok duration_ms=%s proxy_env_updated=%s mcp_sessions_closed=%s trace_id=%s",
         agent_id,
         _elapsed_ms(started_at),
         proxy_env_updated,
+        mcp_sessions_closed,
         trace_id,
     )
     return _session_update("stopped")
@@ -1,9 +1,12 @@
 import base64
+import json
 import logging
 import os
+import struct
 import time
 from datetime import datetime, timezone
-from typing import Any, Dict, Optional
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional
 
 import requests
 
@@ -21,9 +24,11 @@ from sandbox_server.workspace import (
     _normalize_workspace_path,
     _parse_entry_updated_at,
     _parse_since,
+    _read_file_checksum,
     _require_agent_id,
     _resolve_local_checksum,
     _safe_url_for_log,
+    _StreamingResponse,
     _trace_context,
     _workspace_root_git_worktree_prefixes,
     _workspace_size_bytes,
@@ -31,6 +36,8 @@ from sandbox_server.workspace import (
 
 logger = logging.getLogger(__name__)
 _SQLITE_SIDECAR_SUFFIXES = ("-wal", "-shm", "-journal")
+FILESPACE_PUSH_STREAM_CONTENT_TYPE = "application/vnd.gobii.filespace-push-stream"
+_PUSH_STREAM_CHUNK_BYTES = 256 * 1024
 
 
 def _requests_proxies_from_env(proxy_env: Optional[Dict[str, str]]) -> Optional[Dict[str, str]]:
@@ -113,6 +120,76 @@ def _requested_push_paths(agent_root, payload: Dict[str, Any]) -> list[tuple[Any
     return normalized_paths
 
 
+def _remote_checksum(local_meta: Any, since: float) -> Optional[str]:
+    """Checksum the filespace is known to hold for a path, if the manifest can vouch for it."""
+    if not isinstance(local_meta, dict):
+        return None
+    checksum = _normalize_checksum(local_meta.get("checksum_sha256"))
+    if not checksum:
+        return None
+    if local_meta.get("source") == "pull":
+        return checksum
+    # A push is only known to have landed once the API echoes its sync
+    # timestamp back as the next `since`.
+    pushed_at = local_meta.get("pushed_at")
+    if isinstance(pushed_at, (int, float)) and pushed_at <= since + 1e-3:
+        return checksum
+    return None
+
+
+def _mark_pushed(manifest: Dict[str, Any], sent: Dict[str, str], pushed_at: float) -> None:
+    """Stamp ``pushed_at`` on entries whose sent checksum still matches the manifest."""
+    for rel, checksum in sent.items():
+        local_meta = manifest["files"].get(rel)
+        if isinstance(local_meta, dict) and local_meta.get("checksum_sha256") == checksum:
+            local_meta["pushed_at"] = pushed_at
+
+
+def _stream_frame(header: Dict[str, Any]) -> bytes:
+    body = json.dumps(header, sort_keys=True).encode("utf-8")
+    return struct.pack(">I", len(body)) + body
+
+
+def _iter_push_stream(
+    pending: list[tuple[Dict[str, Any], Optional[Path]]],
+    sync_timestamp: str,
+    on_complete: Optional[Callable[[Dict[str, str]], None]] = None,
+) -> Iterator[bytes]:
+    """Encode a push as length-prefixed JSON frames with file bodies in bounded chunks.
+
+    Each change frame with ``has_content`` is followed by ``>I``-prefixed
+    content chunks and a zero-length terminator; the stream ends with an
+    ``end`` frame so readers can detect truncation. Once the consumer asks for
+    more after the ``end`` frame, ``on_complete`` receives the checksum of
+    every file whose content went out.
+    """
+    yield _stream_frame({"type": "start", "status": "ok", "sync_timestamp": sync_timestamp})
+    sent = 0
+    sent_files: Dict[str, str] = {}
+    for change, path in pending:
+        if path is None:
+            yield _stream_frame({"type": "change", **change})
+            sent += 1
+            continue
+        try:
+            handle = open(path, "rb")
+        except OSError:
+            continue
+        with handle:
+            yield _stream_frame({"type": "change", "has_content": True, **change})
+            while True:
+                chunk = handle.read(_PUSH_STREAM_CHUNK_BYTES)
+                if not chunk:
+                    break
+                yield struct.pack(">I", len(chunk)) + chunk
+        yield struct.pack(">I", 0)
+        sent += 1
+        sent_files[change["path"]] = change["checksum_sha256"]
+    yield _stream_frame({"type": "end", "changes": sent})
+    if on_complete is not None:
+        on_complete(sent_files)
+
+
 def _handle_sync_filespace(payload: Dict[str, Any]) -> Dict[str, Any]:
     started_at = time.monotonic()
     agent_id, error = _require_agent_id(payload)
@@ -132,12 +209,15 @@ def _handle_sync_filespace(payload: Dict[str, Any]) -> Dict[str, Any]:
 
     if direction == "push":
         since = _parse_since(payload.get("since"))
+        stream = payload.get("transfer") == "stream"
         scan_started_at = time.monotonic()
-        changes: list[Dict[str, Any]] = []
+        pending: list[tuple[Dict[str, Any], Optional[Path]]] = []
+        pushed_paths: set[str] = set()
         seen_paths: set[str] = set()
         scanned_files = 0
         uploaded_files = 0
         uploaded_bytes = 0
+        deduped_files = 0
         deleted_count = 0
         for path in _iter_workspace_files(agent_root):
             scanned_files += 1
@@ -150,19 +230,26 @@ def _handle_sync_filespace(payload: Dict[str, Any]) -> Dict[str, Any]:
             mtime = stat.st_mtime
             if since is not None and mtime <= since:
                 continue
-            try:
-                content = path.read_bytes()
-            except OSError:
+            # The manifest doubles as an mtime/size index, so files whose stat
+            # still matches it are not re-read just to be hashed.
+            local_meta = manifest["files"].get(rel)
+            checksum_sha256 = _resolve_local_checksum(path, local_meta)
+            if checksum_sha256 is None:
                 continue
-            mime_type = _guess_mime_type(path)
-            checksum_sha256 = _checksum_bytes(content)
-            changes.append(
-                {
-                    "path": rel,
-                    "content_b64": base64.b64encode(content).decode("utf-8"),
-                    "mime_type": mime_type,
-                    "checksum_sha256": checksum_sha256,
-                }
+            if since is not None and checksum_sha256 == _remote_checksum(local_meta, since):
+                manifest["files"][rel] = {**local_meta, "mtime": mtime, "size": stat.st_size}
+                deduped_files += 1
+                continue
+            pending.append(
+                (
+                    {
+                        "path": rel,
+                        "mime_type": _guess_mime_type(path),
+                        "checksum_sha256": checksum_sha256,
+                        "size_bytes": stat.st_size,
+                    },
+                    path,
+                )
             )
             manifest["files"][rel] = {
                 "mtime": mtime,
@@ -170,8 +257,9 @@ def _handle_sync_filespace(payload: Dict[str, Any]) -> Dict[str, Any]:
                 "checksum_sha256": checksum_sha256,
             }
             manifest["deleted"].pop(rel, None)
+            pushed_paths.add(rel)
             uploaded_files += 1
-            uploaded_bytes += len(content)
+            uploaded_bytes += stat.st_size
 
         for path, rel in _requested_push_paths(agent_root, payload):
             if rel in seen_paths:
@@ -180,7 +268,7 @@ def _handle_sync_filespace(payload: Dict[str, Any]) -> Dict[str, Any]:
             try:
                 stat = path.stat()
             except OSError:
-                changes.append({"path": rel, "is_deleted": True})
+                pending.append(({"path": rel, "is_deleted": True}, None))
                 deleted_count += 1
                 continue
             if not path.is_file():
@@ -189,21 +277,22 @@ def _handle_sync_filespace(payload: Dict[str, Any]) -> Dict[str, Any]:
             # workspace files, so include them even when `since` would filter
             # out unchanged exports. Custom tool completion relies on this for
             # the shared SQLite DB.
-            try:
-                content = path.read_bytes()
-            except OSError:
+            checksum_sha256 = _read_file_checksum(path)
+            if checksum_sha256 is None:
                 continue
-            mime_type = _guess_mime_type(path)
-            changes.append(
-                {
-                    "path": rel,
-                    "content_b64": base64.b64encode(content).decode("utf-8"),
-                    "mime_type": mime_type,
-                    "checksum_sha256": _checksum_bytes(content),
-                }
+            pending.append(
+                (
+                    {
+                        "path": rel,
+                        "mime_type": _guess_mime_type(path),
+                        "checksum_sha256": checksum_sha256,
+                        "size_bytes": stat.st_size,
+                    },
+                    path,
+                )
             )
             uploaded_files += 1
-            uploaded_bytes += len(content)
+            uploaded_bytes += stat.st_size
 
         deleted = manifest.get("deleted", {})
         ignored_prefixes = _workspace_root_git_worktree_prefixes(agent_root)
@@ -216,37 +305,78 @@ def _handle_sync_filespace(payload: Dict[str, Any]) -> Dict[str, Any]:
             deleted_at = time.time()
             if since is not None and deleted_at <= since:
                 continue
-            changes.append({"path": rel, "is_deleted": True})
+            pending.append(({"path": rel, "is_deleted": True}, None))
             deleted[rel] = {"deleted_at": deleted_at}
             manifest["files"].pop(rel, None)
             deleted_count += 1
         manifest["deleted"] = deleted
-        _save_manifest(agent_root, manifest)
-        response = {
-            "status": "ok",
-            "changes": changes,
-            "sync_timestamp": datetime.now(timezone.utc).isoformat(),
-        }
+        sync_time = datetime.now(timezone.utc)
         logger.info(
             (
                 "Sandbox sync_filespace agent=%s direction=push status=ok "
-                "changes=%s uploaded_files=%s uploaded_bytes=%s deleted=%s scanned_files=%s "
-                "scan_ms=%s manifest_load_ms=%s total_ms=%s since_set=%s proxy_env_updated=%s trace_id=%s"
+                "changes=%s uploaded_files=%s uploaded_bytes=%s deduped_files=%s deleted=%s scanned_files=%s "
+                "scan_ms=%s manifest_load_ms=%s total_ms=%s since_set=%s transfer=%s proxy_env_updated=%s trace_id=%s"
             ),
             agent_id,
-            len(changes),
+            len(pending),
             uploaded_files,
             uploaded_bytes,
+            deduped_files,
             deleted_count,
             scanned_files,
             _elapsed_ms(scan_started_at),
             manifest_load_ms,
             _elapsed_ms(started_at),
             since is not None,
+            "stream" if stream else "json",
             proxy_env_updated,
             trace_id,
         )
-        return response
+        # `pushed_at` is only recorded for files whose content was actually sent.
+        if stream:
+            _save_manifest(agent_root, manifest)
+
+            def _record_streamed(sent_files: Dict[str, str]) -> None:
+                streamed_manifest = _load_manifest(agent_root)
+                _mark_pushed(
+                    streamed_manifest,
+                    {rel: checksum for rel, checksum in sent_files.items() if rel in pushed_paths},
+                    sync_time.timestamp(),
+                )
+                _save_manifest(agent_root, streamed_manifest)
+
+            return _StreamingResponse(
+                FILESPACE_PUSH_STREAM_CONTENT_TYPE,
+                _iter_push_stream(pending, sync_time.isoformat(), on_complete=_record_streamed),
+            )
+        changes: list[Dict[str, Any]] = []
+        sent_files: Dict[str, str] = {}
+        for change, path in pending:
+            if path is None:
+                changes.append(change)
+                continue
+            try:
+                content = path.read_bytes()
+            except OSError:
+                continue
+            content_checksum = _checksum_bytes(content)
+            changes.append(
+                {
+                    "path": change["path"],
+                    "content_b64": base64.b64encode(content).decode("utf-8"),
+                    "mime_type": change["mime_type"],
+                    "checksum_sha256": content_checksum,
+                }
+            )
+            if change["path"] in pushed_paths:
+                sent_files[change["path"]] = content_checksum
+        _mark_pushed(manifest, sent_files, sync_time.timestamp())
+        _save_manifest(agent_root, manifest)
+        return {
+            "status": "ok",
+            "changes": changes,
+            "sync_timestamp": sync_time.isoformat(),
+        }
 
     if direction == "pull":
         entries = payload.get("files") or payload.get("changes") or []
@@ -325,6 +455,7 @@ def _handle_sync_filespace(payload: Dict[str, Any]) -> Dict[str, Any]:
                         "size": local_stat.st_size if local_stat else 0,
                         "updated_at": entry.get("updated_at"),
                         "checksum_sha256": remote_checksum,
+                        "source": "pull",
                     }
                     manifest["deleted"].pop(normalized, None)
                     skipped += 1
@@ -449,6 +580,7 @@ def _handle_sync_filespace(payload: Dict[str, Any]) -> Dict[str, Any]:
                 "size": full_path.stat().st_size,
                 "updated_at": entry.get("updated_at"),
                 "checksum_sha256": written_checksum,
+                "source": "pull",
             }
             manifest["deleted"].pop(normalized, None)
 
@@ -1,88 +1,98 @@
+import asyncio
 import json
 import logging
 import time
-from typing import Any, Dict
+from typing import Any, Dict, Optional, Tuple
 
 from sandbox_server.config import _agent_workspace
 from sandbox_server.files import _handle_create_file, _handle_create_pdf
 from sandbox_server.manifest import _store_proxy_env
-from sandbox_server.run import _handle_python_exec
+from sandbox_server.run import _handle_python_exec, _handle_python_exec_async
 from sandbox_server.workspace import _require_agent_id, _trace_context
 
 logger = logging.getLogger(__name__)
 
 
-def _handle_tool_request(payload: Dict[str, Any]) -> Dict[str, Any]:
-    start = time.time()
+def _prepare_tool_request(payload: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
     agent_id, error = _require_agent_id(payload)
     if error:
-        return error
+        return None, error
     tool_name = payload.get("tool_name")
     if not isinstance(tool_name, str) or not tool_name.strip():
-        return {"status": "error", "message": "Missing required parameter: tool_name"}
+        return None, {"status": "error", "message": "Missing required parameter: tool_name"}
     params = payload.get("params") if isinstance(payload.get("params"), dict) else {}
     agent_root = _agent_workspace(agent_id)
     _store_proxy_env(agent_root, payload)
-
     if tool_name == "python_exec":
         params = dict(params)
         params["agent_id"] = agent_id
-        response = _handle_python_exec(params)
-        duration_ms = int((time.time() - start) * 1000)
-        trace_id, _traceparent = _trace_context(payload)
-        logger.info(
-            "Sandbox tool_request agent=%s tool=%s status=%s duration_ms=%s trace_id=%s result=%s",
-            agent_id,
-            tool_name,
-            response.get("status"),
-            duration_ms,
-            trace_id,
-            json.dumps(response, sort_keys=True, ensure_ascii=True),
-        )
-        return response
-    if tool_name == "create_file":
-        response = _handle_create_file(agent_root, params)
-        duration_ms = int((time.time() - start) * 1000)
-        trace_id, _traceparent = _trace_context(payload)
-        logger.info(
-            "Sandbox tool_request agent=%s tool=%s status=%s duration_ms=%s trace_id=%s result=%s",
-            agent_id,
-            tool_name,
-            response.get("status"),
-            duration_ms,
-            trace_id,
-            json.dumps(response, sort_keys=True, ensure_ascii=True),
-        )
-        return response
-    if tool_name == "create_pdf":
-        response = _handle_create_pdf(agent_root, params)
-        duration_ms = int((time.time() - start) * 1000)
-        trace_id, _traceparent = _trace_context(payload)
-        logger.info(
-            "Sandbox tool_request agent=%s tool=%s status=%s duration_ms=%s trace_id=%s result=%s",
-            agent_id,
-            tool_name,
-            response.get("status"),
-            duration_ms,
-            trace_id,
-            json.dumps(response, sort_keys=True, ensure_ascii=True),
-        )
-        return response
+    return {
+        "agent_id": agent_id,
+        "agent_root": agent_root,
+        "tool_name": tool_name,
+        "params": params,
+    }, None
+
 
-    response = {
+def _unsupported_tool_response(tool_name: str) -> Dict[str, Any]:
+    return {
         "status": "error",
         "error_code": "sandbox_unsupported_tool",
         "message": f"Sandbox tool '{tool_name}' is not supported yet.",
     }
+
+
+def _log_tool_response(
+    payload: Dict[str, Any],
+    request: Dict[str, Any],
+    start: float,
+    response: Dict[str, Any],
+) -> Dict[str, Any]:
     duration_ms = int((time.time() - start) * 1000)
     trace_id, _traceparent = _trace_context(payload)
     logger.info(
         "Sandbox tool_request agent=%s tool=%s status=%s duration_ms=%s trace_id=%s result=%s",
-        agent_id,
-        tool_name,
+        request["agent_id"],
+        request["tool_name"],
         response.get("status"),
         duration_ms,
         trace_id,
         json.dumps(response, sort_keys=True, ensure_ascii=True),
     )
     return response
+
+
+def _handle_tool_request(payload: Dict[str, Any]) -> Dict[str, Any]:
+    start = time.time()
+    request, error = _prepare_tool_request(payload)
+    if error:
+        return error
+    tool_name = request["tool_name"]
+
+    if tool_name == "python_exec":
+        response = _handle_python_exec(request["params"])
+    elif tool_name == "create_file":
+        response = _handle_create_file(request["agent_root"], request["params"])
+    elif tool_name == "create_pdf":
+        response = _handle_create_pdf(request["agent_root"], request["params"])
+    else:
+        response = _unsupported_tool_response(tool_name)
+    return _log_tool_response(payload, request, start, response)
+
+
+async def _handle_tool_request_async(payload: Dict[str, Any]) -> Dict[str, Any]:
+    start = time.time()
+    request, error = await asyncio.to_thread(_prepare_tool_request, payload)
+    if error:
+        return error
+    tool_name = request["tool_name"]
+
+    if tool_name == "python_exec":
+        response = await _handle_python_exec_async(request["params"])
+    elif tool_name == "create_file":
+        response = await asyncio.to_thread(_handle_create_file, request["agent_root"], request["params"])
+    elif tool_name == "create_pdf":
+        response = await asyncio.to_thread(_handle_create_pdf, request["agent_root"], request["params"])
+    else:
+        response = _unsupported_tool_response(tool_name)
+    return _log_tool_response(payload, request, start, response)
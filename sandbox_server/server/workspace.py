@@ -4,9 +4,10 @@ import json
 import mimetypes
 import os
 import time
+from dataclasses import dataclass
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
 from urllib.parse import urlsplit
 
 from sandbox_server.config import _TRACEPARENT_HEADER, _TRACEPARENT_PARTS, _TRACE_ID_HEX_LEN, _workspace_max_bytes
@@ -217,6 +218,15 @@ def _decode_content(change: Dict[str, Any]) -> Optional[bytes]:
     return None
 
 
+@dataclass
+class _StreamingResponse:
+    """Handler result whose body is sent as raw chunks instead of a JSON document."""
+
+    content_type: str
+    chunks: Iterator[bytes]
+    status: str = "ok"
+
+
 def _json_response(start_response: Callable, status: str, payload: Dict[str, Any]) -> list[bytes]:
     body = json.dumps(payload).encode("utf-8")
     headers = [
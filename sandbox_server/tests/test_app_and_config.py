@@ -1,3 +1,4 @@
+import asyncio
 import io
 import json
 import os
@@ -8,7 +9,7 @@ import unittest
 from pathlib import Path
 from unittest.mock import patch
 
-from sandbox_server.app import application
+from sandbox_server.app import _concurrency_classes, application, asgi_application, route_metrics
 from sandbox_server.config import _agent_workspace, _sandbox_env
 
 
@@ -44,6 +45,85 @@ class SandboxAppAndConfigTests(unittest.TestCase):
             {"status": "error", "message": "Sandbox compute request failed."},
         )
 
+    def _call_asgi(self, path, payload):
+        body = json.dumps(payload).encode("utf-8")
+        events = [{"type": "http.request", "body": body, "more_body": False}]
+        sent = []
+
+        async def receive():
+            return events.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            "type": "http",
+            "method": "POST",
+            "path": path,
+            "headers": [(b"authorization", b"Bearer sandbox-token")],
+        }
+        return scope, receive, send, sent
+
+    def test_asgi_application_returns_500_when_handler_raises(self):
+        def _raise(_payload):
+            raise RuntimeError("boom")
+
+        scope, receive, send, sent = self._call_asgi("/sandbox/compute/sync_filespace", {"agent_id": "agent-1"})
+        with patch.dict("os.environ", {"SANDBOX_COMPUTE_API_TOKEN": "sandbox-token"}, clear=False), patch.dict(
+            "sandbox_server.app._ROUTES",
+            {"/sandbox/compute/sync_filespace": _raise},
+            clear=False,
+        ):
+            asyncio.run(asgi_application(scope, receive, send))
+
+        self.assertEqual(sent[0]["status"], 500)
+        self.assertEqual(
+            json.loads(sent[1]["body"]),
+            {"status": "error", "message": "Sandbox compute request failed."},
+        )
+        self.assertGreaterEqual(route_metrics()["/sandbox/compute/sync_filespace"]["failed"], 1)
+
+    def test_asgi_control_routes_do_not_queue_behind_compute_routes(self):
+        async def _slow_compute(_payload):
+            await asyncio.sleep(0.5)
+            return {"status": "ok"}
+
+        def _fast_control(_payload):
+            return {"status": "ok"}
+
+        async def _run():
+            compute = self._call_asgi("/sandbox/compute/run_command", {"agent_id": "agent-1"})
+            control = self._call_asgi("/sandbox/compute/terminate", {"agent_id": "agent-1"})
+            compute_task = asyncio.create_task(asgi_application(*compute[:3]))
+            await asyncio.sleep(0.05)
+            await asyncio.wait_for(asgi_application(*control[:3]), timeout=0.3)
+            self.assertFalse(compute_task.done())
+            self.assertEqual(control[3][0]["status"], 200)
+            await compute_task
+            self.assertEqual(compute[3][0]["status"], 200)
+
+        _concurrency_classes.clear()
+        with patch.dict(
+            "os.environ",
+            {
+                "SANDBOX_COMPUTE_API_TOKEN": "sandbox-token",
+                "SANDBOX_COMPUTE_MAX_CONCURRENT_COMPUTE": "1",
+            },
+            clear=False,
+        ), patch.dict(
+            "sandbox_server.app._ASYNC_ROUTES",
+            {"/sandbox/compute/run_command": _slow_compute},
+            clear=False,
+        ), patch.dict(
+            "sandbox_server.app._ROUTES",
+            {"/sandbox/compute/terminate": _fast_control},
+            clear=False,
+        ):
+            try:
+                asyncio.run(_run())
+            finally:
+                _concurrency_classes.clear()
+
     def test_agent_workspace_isolated_per_agent_by_default(self):
         with tempfile.TemporaryDirectory() as tmp_dir, patch.dict(
             "os.environ",
@@ -0,0 +1,151 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+
+from sandbox_server.mcp_sessions import MCPSessionPool
+
+
+class _FakeClient:
+    instances: list["_FakeClient"] = []
+
+    def __init__(self, runtime):
+        self.runtime = runtime
+        self.connected = False
+        self.closed = False
+        self.calls: list[str] = []
+        self.pings = 0
+        _FakeClient.instances.append(self)
+
+    async def __aenter__(self):
+        self.connected = True
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def is_connected(self):
+        return self.connected
+
+    async def ping(self):
+        self.pings += 1
+        return True
+
+    async def call_tool(self, tool_name, params):
+        if not self.connected:
+            raise RuntimeError("session closed")
+        self.calls.append(tool_name)
+        return {"tool": tool_name, "params": params}
+
+    async def list_tools(self):
+        if not self.connected:
+            raise RuntimeError("session closed")
+        return [{"name": "query"}]
+
+    async def close(self):
+        self.connected = False
+        self.closed = True
+
+
+def _runtime(name="postgres", **overrides):
+    runtime = {
+        "config_id": f"cfg-{name}",
+        "name": name,
+        "command": "npx",
+        "args": ["-y", name],
+        "url": "",
+        "env": {},
+        "headers": {},
+    }
+    runtime.update(overrides)
+    return runtime
+
+
+class MCPSessionPoolTests(unittest.TestCase):
+    def setUp(self):
+        _FakeClient.instances = []
+        self.pool = MCPSessionPool(_FakeClient)
+
+    def _call(self, runtime, agent_id="agent-1", tool_name="query"):
+        return self.pool.run(self.pool.call_tool(runtime, agent_id, tool_name, {}, timeout=5))
+
+    def test_warm_calls_reuse_one_session_per_agent_and_runtime(self):
+        runtime = _runtime()
+        self._call(runtime)
+        self._call(runtime)
+        self.pool.run(self.pool.list_tools(runtime, "agent-1"))
+        self.assertEqual(len(_FakeClient.instances), 1)
+        self.assertEqual(_FakeClient.instances[0].calls, ["query", "query"])
+
+        self._call(runtime, agent_id="agent-2")
+        self._call(_runtime(env={"HTTPS_PROXY": "http://proxy:8080"}))
+        self.assertEqual(len(_FakeClient.instances), 3)
+        self.assertEqual(len(self.pool), 3)
+
+    def test_dead_session_is_restarted(self):
+        runtime = _runtime()
+        self._call(runtime)
+        _FakeClient.instances[0].connected = False
+
+        self._call(runtime)
+
+        self.assertEqual(len(_FakeClient.instances), 2)
+        self.assertTrue(_FakeClient.instances[0].closed)
+        self.assertEqual(_FakeClient.instances[1].calls, ["query"])
+
+    def test_discovery_retries_when_session_dies_mid_request(self):
+        runtime = _runtime()
+        self.pool.run(self.pool.list_tools(runtime, "agent-1"))
+        first = _FakeClient.instances[0]
+
+        async def _die():
+            first.connected = False
+            raise RuntimeError("server exited")
+
+        with patch.object(first, "list_tools", side_effect=_die):
+            tools = self.pool.run(self.pool.list_tools(runtime, "agent-1"))
+
+        self.assertEqual(tools, [{"name": "query"}])
+        self.assertEqual(len(_FakeClient.instances), 2)
+
+    def test_idle_session_is_pinged_before_reuse(self):
+        runtime = _runtime()
+        with patch.dict("os.environ", {"SANDBOX_COMPUTE_MCP_SESSION_HEALTH_CHECK_SECONDS": "1"}):
+            self._call(runtime)
+            session = next(iter(self.pool._sessions.values()))
+            session.last_checked -= 5
+            self._call(runtime)
+        self.assertEqual(_FakeClient.instances[0].pings, 1)
+        self.assertEqual(len(_FakeClient.instances), 1)
+
+    def test_lru_session_is_evicted_at_capacity(self):
+        with patch.dict("os.environ", {"SANDBOX_COMPUTE_MCP_MAX_SESSIONS": "2"}):
+            self._call(_runtime("a"))
+            self._call(_runtime("b"))
+            self._call(_runtime("a"))
+            self._call(_runtime("c"))
+
+        first, second, third = _FakeClient.instances
+        self.assertFalse(first.closed)
+        self.assertTrue(second.closed)
+        self.assertFalse(third.closed)
+        self.assertEqual(len(self.pool), 2)
+
+    def test_idle_sessions_are_reaped_and_terminate_closes_agent_sessions(self):
+        with patch.dict("os.environ", {"SANDBOX_COMPUTE_MCP_SESSION_IDLE_TTL_SECONDS": "60"}):
+            self._call(_runtime("a"))
+            self._call(_runtime("b"), agent_id="agent-2")
+            session = next(iter(self.pool._sessions.values()))
+            reaped = self.pool.run(self.pool.reap_idle(now=session.last_used + 61))
+        self.assertEqual(reaped, 2)
+        self.assertEqual(len(self.pool), 0)
+
+        self._call(_runtime("a"))
+        self._call(_runtime("b"), agent_id="agent-2")
+        self.assertEqual(self.pool.run(self.pool.close_agent("agent-1")), 1)
+        self.assertEqual(len(self.pool), 1)
+        self.assertTrue(_FakeClient.instances[2].closed)
+        self.assertFalse(_FakeClient.instances[3].closed)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,4 @@
+import asyncio
 import os
 import signal
 import tempfile
@@ -5,7 +6,7 @@ import unittest
 from pathlib import Path
 from unittest.mock import patch
 
-from sandbox_server.run import _handle_run_command, _run_managed_process
+from sandbox_server.run import _handle_run_command, _run_managed_process, _run_managed_process_async
 
 
 class RunCommandUvTests(unittest.TestCase):
@@ -21,6 +22,52 @@ class RunCommandUvTests(unittest.TestCase):
         with self.assertRaises(ProcessLookupError):
             os.kill(child_pid, signal.SIGCONT)
 
+    def test_async_managed_process_terminates_background_children(self):
+        result = asyncio.run(
+            _run_managed_process_async(
+                "sleep 30 & echo $!",
+                shell=True,
+                cwd="/tmp",
+                env=os.environ.copy(),
+                timeout=5,
+            )
+        )
+        child_pid = int(result.stdout.strip())
+        with self.assertRaises(ProcessLookupError):
+            os.kill(child_pid, signal.SIGCONT)
+
+    def test_cancelled_async_managed_process_is_killed_and_reaped(self):
+        spawned = []
+        create_subprocess_shell = asyncio.create_subprocess_shell
+
+        async def spawn(*args, **kwargs):
+            process = await create_subprocess_shell(*args, **kwargs)
+            spawned.append(process)
+            return process
+
+        async def run_and_cancel():
+            task = asyncio.create_task(
+                _run_managed_process_async(
+                    "trap '' TERM; sleep 30",
+                    shell=True,
+                    cwd="/tmp",
+                    env=os.environ.copy(),
+                    timeout=30,
+                )
+            )
+            while not spawned:
+                await asyncio.sleep(0.01)
+            # Let the shell install its trap so only the follow-up SIGKILL ends it.
+            await asyncio.sleep(0.2)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            # Reaped before the cancellation propagated, not later by the child watcher.
+            self.assertIsNotNone(spawned[0].returncode)
+
+        with patch("sandbox_server.run.asyncio.create_subprocess_shell", side_effect=spawn):
+            asyncio.run(asyncio.wait_for(run_and_cancel(), timeout=10))
+
     def test_run_command_creates_uv_project_env_under_gobii_instead_of_dot_venv(self):
         with tempfile.TemporaryDirectory() as tmp_dir, tempfile.TemporaryDirectory() as runtime_cache:
             workspace = Path(tmp_dir)
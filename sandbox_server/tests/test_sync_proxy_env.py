@@ -1,3 +1,5 @@
+import json
+import struct
 import unittest
 from datetime import datetime
 from hashlib import sha256
@@ -7,8 +9,8 @@ from tempfile import TemporaryDirectory
 from unittest.mock import patch
 
 from sandbox_server.server.internal_paths import CUSTOM_TOOL_SQLITE_FILESPACE_PATH
-from sandbox_server.sync import _download_file, _handle_sync_filespace
-from sandbox_server.workspace import _workspace_size_bytes
+from sandbox_server.sync import FILESPACE_PUSH_STREAM_CONTENT_TYPE, _download_file, _handle_sync_filespace
+from sandbox_server.workspace import _read_file_checksum, _workspace_size_bytes
 
 
 class SyncProxyEnvTests(unittest.TestCase):
@@ -401,6 +403,174 @@ class SyncProxyEnvTests(unittest.TestCase):
         self.assertEqual(len(result["changes"]), 1)
         self.assertEqual(result["changes"][0]["path"], CUSTOM_TOOL_SQLITE_FILESPACE_PATH)
 
+    def test_handle_sync_filespace_push_skips_files_matching_pulled_checksum(self):
+        with TemporaryDirectory() as tmp_dir:
+            agent_root = Path(tmp_dir).resolve()
+            pulled_path = agent_root / "pulled.txt"
+            pulled_path.write_bytes(b"from filespace")
+            edited_path = agent_root / "edited.txt"
+            edited_path.write_bytes(b"edited locally")
+            pulled_stat = pulled_path.stat()
+            manifest = {
+                "files": {
+                    "/pulled.txt": {
+                        "mtime": pulled_stat.st_mtime,
+                        "size": pulled_stat.st_size,
+                        "checksum_sha256": sha256(b"from filespace").hexdigest(),
+                        "source": "pull",
+                    },
+                    "/edited.txt": {
+                        "mtime": 1.0,
+                        "size": 3,
+                        "checksum_sha256": sha256(b"old").hexdigest(),
+                        "source": "pull",
+                    },
+                },
+                "deleted": {},
+            }
+            payload = {
+                "agent_id": "agent-1",
+                "direction": "push",
+                "since": "2000-01-01T00:00:00+00:00",
+            }
+            with patch(
+                "sandbox_server.sync._agent_workspace",
+                return_value=agent_root,
+            ), patch(
+                "sandbox_server.sync._store_proxy_env",
+                return_value=False,
+            ), patch(
+                "sandbox_server.sync._proxy_env_from_manifest",
+                return_value=None,
+            ), patch(
+                "sandbox_server.sync._load_manifest",
+                return_value=manifest,
+            ), patch(
+                "sandbox_server.sync._save_manifest"
+            ), patch(
+                "sandbox_server.workspace._read_file_checksum",
+                wraps=_read_file_checksum,
+            ) as mock_checksum:
+                result = _handle_sync_filespace(payload)
+
+        self.assertEqual(result["status"], "ok")
+        self.assertEqual([change["path"] for change in result["changes"]], ["/edited.txt"])
+        self.assertEqual(mock_checksum.call_count, 1)
+        self.assertIn("pushed_at", manifest["files"]["/edited.txt"])
+        self.assertEqual(manifest["files"]["/pulled.txt"]["source"], "pull")
+
+    def test_handle_sync_filespace_push_streams_length_prefixed_frames(self):
+        payload = {
+            "agent_id": "agent-1",
+            "direction": "push",
+            "transfer": "stream",
+        }
+
+        with TemporaryDirectory() as tmp_dir:
+            agent_root = Path(tmp_dir).resolve()
+            agent_root.joinpath("report.txt").write_bytes(b"report bytes")
+            with patch(
+                "sandbox_server.sync._agent_workspace",
+                return_value=agent_root,
+            ), patch(
+                "sandbox_server.sync._store_proxy_env",
+                return_value=False,
+            ), patch(
+                "sandbox_server.sync._proxy_env_from_manifest",
+                return_value=None,
+            ), patch(
+                "sandbox_server.sync._load_manifest",
+                return_value={"files": {}, "deleted": {}},
+            ), patch(
+                "sandbox_server.sync._save_manifest"
+            ):
+                result = _handle_sync_filespace(payload)
+                body = b"".join(result.chunks)
+
+        self.assertEqual(result.content_type, FILESPACE_PUSH_STREAM_CONTENT_TYPE)
+        frames = []
+        offset = 0
+        while offset < len(body):
+            (size,) = struct.unpack(">I", body[offset:offset + 4])
+            offset += 4
+            frames.append(body[offset:offset + size])
+            offset += size
+        self.assertEqual(json.loads(frames[0])["type"], "start")
+        change = json.loads(frames[1])
+        self.assertEqual(change["path"], "/report.txt")
+        self.assertTrue(change["has_content"])
+        self.assertEqual(change["checksum_sha256"], sha256(b"report bytes").hexdigest())
+        self.assertEqual(frames[2], b"report bytes")
+        self.assertEqual(frames[3], b"")
+        self.assertEqual(json.loads(frames[4]), {"changes": 1, "type": "end"})
+
+    def test_handle_sync_filespace_push_records_pushed_at_only_for_files_it_read(self):
+        payload = {"agent_id": "agent-1", "direction": "push"}
+        manifest = {"files": {}, "deleted": {}}
+        read_bytes = Path.read_bytes
+
+        def flaky_read_bytes(path):
+            if path.name == "locked.txt":
+                raise PermissionError("locked")
+            return read_bytes(path)
+
+        with TemporaryDirectory() as tmp_dir:
+            agent_root = Path(tmp_dir).resolve()
+            agent_root.joinpath("readable.txt").write_bytes(b"readable")
+            agent_root.joinpath("locked.txt").write_bytes(b"locked")
+            with patch(
+                "sandbox_server.sync._agent_workspace",
+                return_value=agent_root,
+            ), patch(
+                "sandbox_server.sync._store_proxy_env",
+                return_value=False,
+            ), patch(
+                "sandbox_server.sync._proxy_env_from_manifest",
+                return_value=None,
+            ), patch(
+                "sandbox_server.sync._load_manifest",
+                return_value=manifest,
+            ), patch(
+                "sandbox_server.sync._save_manifest"
+            ), patch.object(Path, "read_bytes", flaky_read_bytes):
+                result = _handle_sync_filespace(payload)
+
+        self.assertEqual([change["path"] for change in result["changes"]], ["/readable.txt"])
+        self.assertIn("pushed_at", manifest["files"]["/readable.txt"])
+        self.assertNotIn("pushed_at", manifest["files"]["/locked.txt"])
+
+    def test_handle_sync_filespace_push_stream_records_pushed_at_once_fully_sent(self):
+        payload = {"agent_id": "agent-1", "direction": "push", "transfer": "stream"}
+        manifest = {"files": {}, "deleted": {}}
+
+        with TemporaryDirectory() as tmp_dir:
+            agent_root = Path(tmp_dir).resolve()
+            agent_root.joinpath("report.txt").write_bytes(b"report bytes")
+            with patch(
+                "sandbox_server.sync._agent_workspace",
+                return_value=agent_root,
+            ), patch(
+                "sandbox_server.sync._store_proxy_env",
+                return_value=False,
+            ), patch(
+                "sandbox_server.sync._proxy_env_from_manifest",
+                return_value=None,
+            ), patch(
+                "sandbox_server.sync._load_manifest",
+                return_value=manifest,
+            ), patch(
+                "sandbox_server.sync._save_manifest"
+            ):
+                result = _handle_sync_filespace(payload)
+                chunks = iter(result.chunks)
+                for _ in range(4):
+                    next(chunks)
+                # Stopping before the end frame, as a dropped connection would.
+                self.assertNotIn("pushed_at", manifest["files"]["/report.txt"])
+                list(chunks)
+
+        self.assertIn("pushed_at", manifest["files"]["/report.txt"])
+
     def test_handle_sync_filespace_pull_clears_custom_tool_sqlite_sidecars_before_write(self):
         payload = {
             "agent_id": "agent-1",
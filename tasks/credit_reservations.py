@@ -0,0 +1,327 @@
+"""
+Leased task-credit blocks for owners with many agents charging in parallel.
+
+Every charge used to lock the owner's oldest ``TaskCredit`` row inside a
+transaction, so all agents of a large organization queued behind one row lock.
+A charge now first tries to draw from the owner's active reservation: a block
+leased from that row whose balance lives in Redis and is decremented by a Lua
+script. The draw itself is a single conditional ``UPDATE`` of ``credits_used``
+on the known row, with no ``SELECT ... FOR UPDATE`` and no transaction. Only
+opening a reservation locks the credit row, once per block.
+
+``credits_used`` therefore moves with every charge, so every reader of it
+(availability, usage views, billing) stays exact while a lease is open.
+Settlement drains whatever balance is left and records ``consumed`` on the
+reservation. A reservation is settled as soon as a newer one replaces it, when
+a draw no longer fits the credit row, and at the latest by the periodic sweep
+once it expires.
+
+Reservations are only used outside ``transaction.atomic`` blocks, because a
+Redis charge cannot be rolled back together with a caller's transaction.
+"""
+
+import logging
+from datetime import timedelta
+from decimal import ROUND_DOWN, Decimal
+from typing import Optional
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from config.redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+RESERVATION_KEY_PREFIX = "task-credit-reservation:v1"
+MILLICREDITS = Decimal("1000")
+CREDIT_QUANTUM = Decimal("0.001")
+# Balances outlive their lease so a late sweep still finds what is left to return.
+BALANCE_GRACE_SECONDS = 24 * 60 * 60
+
+_CHARGE_SCRIPT = """
+-- gobii_credit_reservation_charge_v1
+local balance = tonumber(redis.call('GET', KEYS[1]) or '-1')
+if balance < tonumber(ARGV[1]) then
+    return -1
+end
+return redis.call('DECRBY', KEYS[1], ARGV[1])
+"""
+
+_DRAIN_SCRIPT = """
+-- gobii_credit_reservation_drain_v1
+local balance = redis.call('GET', KEYS[1])
+if balance then
+    redis.call('DEL', KEYS[1])
+end
+return balance
+"""
+
+_REFUND_SCRIPT = """
+-- gobii_credit_reservation_refund_v1
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return -1
+end
+return redis.call('INCRBY', KEYS[1], ARGV[1])
+"""
+
+_SWAP_SCRIPT = """
+-- gobii_credit_reservation_swap_v1
+local previous = redis.call('GET', KEYS[1])
+redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+return previous
+"""
+
+
+def reservations_enabled() -> bool:
+    return bool(getattr(settings, "TASK_CREDIT_RESERVATIONS_ENABLED", False))
+
+
+def _reservation_size() -> Decimal:
+    size = Decimal(str(getattr(settings, "TASK_CREDIT_RESERVATION_SIZE", "5") or "0"))
+    return size.quantize(CREDIT_QUANTUM, rounding=ROUND_DOWN)
+
+
+def _ttl_seconds() -> int:
+    return max(1, int(getattr(settings, "TASK_CREDIT_RESERVATION_TTL_SECONDS", 60) or 0))
+
+
+def _active_key(owner_type: str, owner_id) -> str:
+    return f"{RESERVATION_KEY_PREFIX}:{owner_type}:{owner_id}:active"
+
+
+def _balance_key(reservation_id) -> str:
+    return f"{RESERVATION_KEY_PREFIX}:balance:{reservation_id}"
+
+
+def _to_millicredits(amount: Decimal) -> Optional[int]:
+    """Exact integer millicredits, or None when ``amount`` is finer than a credit column can hold."""
+    scaled = Decimal(amount) * MILLICREDITS
+    if scaled != scaled.to_integral_value():
+        return None
+    return int(scaled)
+
+
+def _decode(value) -> str:
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+def _charge_active(client, active_key: str, amount: Decimal, millicredits: int):
+    """Draw ``amount`` from the owner's active reservation; returns the charged credit, or None.
+
+    The Redis balance is taken first and handed back when the credit row can no
+    longer absorb the draw, e.g. because locked-path charges used up the block.
+    """
+    pointer = client.get(active_key)
+    if not pointer:
+        return None
+    reservation_id, _, credit_id = _decode(pointer).partition(":")
+    if not credit_id:
+        return None
+    balance_key = _balance_key(reservation_id)
+    if int(client.eval(_CHARGE_SCRIPT, 1, balance_key, millicredits)) < 0:
+        return None
+
+    TaskCredit = apps.get_model("api", "TaskCredit")
+    try:
+        charged = TaskCredit.objects.filter(
+            id=credit_id,
+            expiration_date__gt=timezone.now(),
+            voided=False,
+            credits_used__lte=F("credits") - amount,
+        ).update(credits_used=F("credits_used") + amount)
+    except Exception:
+        client.eval(_REFUND_SCRIPT, 1, balance_key, millicredits)
+        raise
+    if not charged:
+        client.eval(_REFUND_SCRIPT, 1, balance_key, millicredits)
+        return None
+    return TaskCredit.objects.get(id=credit_id)
+
+
+def charge_reserved_credit(owner, amount: Decimal, *, is_organization: bool):
+    """Charge ``amount`` against the owner's reservation, leasing a new block when needed.
+
+    Returns the charged ``TaskCredit``, or None whenever the caller should fall
+    back to charging a locked credit row directly: reservations are disabled,
+    the caller is inside a transaction, the amount spans credit blocks, or Redis
+    is unavailable.
+    """
+    if not reservations_enabled() or owner is None or amount is None:
+        return None
+    amount = Decimal(amount)
+    millicredits = _to_millicredits(amount)
+    if not millicredits or millicredits < 0:
+        return None
+    if transaction.get_connection().in_atomic_block:
+        return None
+
+    TaskCredit = apps.get_model("api", "TaskCredit")
+    owner_type = "org" if is_organization else "user"
+    active_key = _active_key(owner_type, owner.id)
+    try:
+        client = get_redis_client()
+        credit = _charge_active(client, active_key, amount, millicredits)
+        if credit is not None:
+            return credit
+        credit = _open_reservation(client, owner, amount, millicredits, owner_type, is_organization)
+        if credit is None:
+            # Settle the exhausted lease now rather than leaving it to the sweep.
+            _release_active_reservation(client, active_key)
+        return credit
+    except TaskCredit.DoesNotExist:
+        return None
+    except Exception:
+        logger.warning(
+            "Task credit reservation unavailable for %s %s; charging credit row directly",
+            owner_type,
+            owner.id,
+            exc_info=True,
+        )
+        return None
+
+
+def _open_reservation(
+    client,
+    owner,
+    amount: Decimal,
+    millicredits: int,
+    owner_type: str,
+    is_organization: bool,
+):
+    TaskCredit = apps.get_model("api", "TaskCredit")
+    TaskCreditReservation = apps.get_model("api", "TaskCreditReservation")
+    active_key = _active_key(owner_type, owner.id)
+    owner_filter = {"organization_id": owner.id} if is_organization else {"user_id": owner.id}
+    now = timezone.now()
+
+    with transaction.atomic():
+        credit = (
+            TaskCredit.objects.select_for_update()
+            .filter(
+                expiration_date__gt=now,
+                credits_used__lt=F("credits"),
+                voided=False,
+                **owner_filter,
+            )
+            .order_by("expiration_date")
+            .first()
+        )
+        if credit is None:
+            return None
+
+        # Another worker may have opened a reservation while this one waited for the lock.
+        charged = _charge_active(client, active_key, amount, millicredits)
+        if charged is not None:
+            return charged
+
+        lease = min(max(_reservation_size(), amount), credit.credits - credit.credits_used)
+        if lease < amount:
+            # Charges spanning two blocks keep using the locked path.
+            return None
+
+        reservation = TaskCreditReservation.objects.create(
+            task_credit=credit,
+            reserved=lease,
+            expires_at=now + timedelta(seconds=_ttl_seconds()),
+        )
+        credit.credits_used = F("credits_used") + amount
+        credit.save(update_fields=["credits_used"])
+        credit.refresh_from_db()
+        # Written before commit: if this fails nothing was leased, and an orphaned key just expires.
+        client.set(
+            _balance_key(reservation.id),
+            _to_millicredits(lease) - millicredits,
+            ex=_ttl_seconds() + BALANCE_GRACE_SECONDS,
+        )
+
+    try:
+        previous = client.eval(
+            _SWAP_SCRIPT,
+            1,
+            active_key,
+            f"{reservation.id}:{credit.id}",
+            _ttl_seconds() * 1000,
+        )
+    except Exception:
+        # Unreachable reservations are settled by the sweep once they expire.
+        logger.warning("Failed to publish task credit reservation %s", reservation.id, exc_info=True)
+        previous = None
+    if previous:
+        previous_id = _decode(previous).partition(":")[0]
+        if previous_id and previous_id != str(reservation.id):
+            try:
+                settle_reservation(previous_id)
+            except Exception:
+                logger.exception("Failed to settle replaced task credit reservation %s", previous_id)
+    return credit
+
+
+def _release_active_reservation(client, active_key: str) -> None:
+    """Unpublish and settle the owner's active reservation."""
+    pointer = client.eval(_DRAIN_SCRIPT, 1, active_key)
+    if not pointer:
+        return
+    reservation_id = _decode(pointer).partition(":")[0]
+    if reservation_id:
+        settle_reservation(reservation_id)
+
+
+def settle_reservation(reservation_id) -> bool:
+    """Close a reservation and record what was drawn from it; False if it was already settled."""
+    TaskCreditReservation = apps.get_model("api", "TaskCreditReservation")
+    client = get_redis_client()
+    balance_key = _balance_key(reservation_id)
+    drained = None
+
+    try:
+        with transaction.atomic():
+            reservation = (
+                TaskCreditReservation.objects.select_for_update()
+                .filter(id=reservation_id, settled_at__isnull=True)
+                .first()
+            )
+            if reservation is None:
+                return False
+
+            # Drained under the row lock so concurrent settlers cannot both claim the balance.
+            drained = client.eval(_DRAIN_SCRIPT, 1, balance_key)
+            if drained is None:
+                logger.warning(
+                    "Task credit reservation %s has no balance left in Redis; treating it as fully consumed",
+                    reservation.id,
+                )
+                remaining = Decimal("0")
+            else:
+                remaining = Decimal(int(_decode(drained))) / MILLICREDITS
+                remaining = min(max(remaining, Decimal("0")), reservation.reserved)
+
+            reservation.consumed = reservation.reserved - remaining
+            reservation.settled_at = timezone.now()
+            reservation.save(update_fields=["consumed", "settled_at"])
+    except Exception:
+        if drained is not None:
+            client.set(balance_key, drained, ex=BALANCE_GRACE_SECONDS)
+        raise
+    return True
+
+
+def settle_expired_reservations(*, now=None, limit: int = 500) -> int:
+    """Settle reservations whose lease has run out; returns how many were settled."""
+    TaskCreditReservation = apps.get_model("api", "TaskCreditReservation")
+    now = now or timezone.now()
+    expired = list(
+        TaskCreditReservation.objects.filter(settled_at__isnull=True, expires_at__lte=now)
+        .order_by("expires_at")
+        .values_list("id", flat=True)[:limit]
+    )
+    settled = 0
+    for reservation_id in expired:
+        try:
+            if settle_reservation(reservation_id):
+                settled += 1
+        except Exception:
+            logger.exception("Failed to settle task credit reservation %s", reservation_id)
+    return settled
@@ -15,6 +15,7 @@ from billing.services import BillingService
 from constants.grant_types import GrantTypeChoices
 from constants.plans import PlanNames, PlanNamesChoices
 from observability import traced, trace
+from tasks.credit_reservations import charge_reserved_credit
 from util.analytics import Analytics
 from util.tool_costs import get_most_expensive_tool_cost
 from util.constants.task_constants import TASKS_UNLIMITED
@@ -591,6 +592,11 @@ class TaskCreditService:
             )
             last_credit = credit
         else:
+            last_credit = charge_reserved_credit(user, plan_amount, is_organization=False)
+            if last_credit is not None:
+                TaskCreditService.handle_task_threshold(user)
+                return last_credit
+
             # Consume possibly fractional amount across one or more credit blocks
             with transaction.atomic():
                 remaining = Decimal(plan_amount)
@@ -802,6 +808,10 @@ class TaskCreditService:
                 )
                 return credit
             else:
+                credit = charge_reserved_credit(owner, plan_amount, is_organization=True)
+                if credit is not None:
+                    return credit
+
                 # Fractional consumption for organizations across blocks
                 with tracer.start_as_current_span(
                     "TaskCreditService Consume Organization Credit Transaction"
@@ -5,7 +5,6 @@ import tempfile
 from decimal import Decimal
 from types import SimpleNamespace
 from unittest.mock import patch, MagicMock
-import zstandard
 from django.test import TestCase, tag
 from django.contrib.auth import get_user_model
 from django.core.files.storage import FileSystemStorage
@@ -28,6 +27,7 @@ from api.agent.tasks.agent_tags import _generate_via_llm as generate_tags_via_ll
 from api.agent.tasks.short_description import _generate_via_llm as generate_short_desc_via_llm
 from api.agent.tasks.mini_description import _generate_via_llm as generate_mini_desc_via_llm
 from api.agent.tools.search_tools import _search_with_llm
+from api.services.prompt_archives import load_prompt_archive_payload
 from console.agent_audit.serializers import serialize_completion
 from tests.utils.token_usage import make_completion_response
 
@@ -740,8 +740,7 @@ class TokenUsageTrackingTest(TestCase):
         self.assertEqual(completion.llm_provider, "provider")
         self.assertEqual(completion.thinking_content, "Reasoned path")
         self.assertIsNotNone(completion.prompt_archive_id)
-        with storage.open(completion.prompt_archive.storage_key, "rb") as archive_file:
-            archive_payload = json.loads(zstandard.ZstdDecompressor().decompress(archive_file.read()))
+        archive_payload = load_prompt_archive_payload(completion.prompt_archive.storage_key, storage=storage)
         self.assertEqual(archive_payload["system_prompt"], "System instructions")
         self.assertEqual(archive_payload["user_prompt"], "User request")
 
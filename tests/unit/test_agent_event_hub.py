@@ -0,0 +1,84 @@
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.test import SimpleTestCase, tag
+
+from api.services.agent_event_hub import AgentTimelineEventHub
+
+
+class _FakeChannelLayer:
+    def __init__(self):
+        self.groups: dict[str, set[str]] = defaultdict(set)
+        self.queues: dict[str, asyncio.Queue] = {}
+        self.discarded = threading.Event()
+
+    async def new_channel(self):
+        name = f"specific.test!{len(self.queues)}"
+        self.queues[name] = asyncio.Queue()
+        return name
+
+    async def group_add(self, group, channel):
+        self.groups[group].add(channel)
+
+    async def group_discard(self, group, channel):
+        self.groups[group].discard(channel)
+        self.discarded.set()
+
+    async def group_send(self, group, message):
+        for channel in self.groups.get(group, ()):
+            self.queues[channel].put_nowait(message)
+
+    async def receive(self, channel):
+        return await self.queues[channel].get()
+
+
+@tag("batch_mcp_tools")
+class AgentTimelineEventHubTests(SimpleTestCase):
+    def setUp(self):
+        self.layer = _FakeChannelLayer()
+        self.hub = AgentTimelineEventHub(layer_factory=lambda: self.layer)
+
+    def _group_send(self, agent_id, message_type="timeline_event"):
+        message = {"type": message_type, "payload": {}, "agent_id": agent_id}
+        future = asyncio.run_coroutine_threadsafe(
+            self.layer.group_send(f"agent-chat-{agent_id}", message),
+            self.hub._loop,
+        )
+        future.result(timeout=2)
+
+    def test_waiters_wake_only_for_their_agent_timeline_events(self):
+        first = self.hub.subscribe("agent-a")
+        second = self.hub.subscribe("agent-a")
+        other = self.hub.subscribe("agent-b")
+        self.assertTrue(first.subscribed)
+        self.assertEqual(len(self.layer.groups["agent-chat-agent-a"]), 1)
+
+        self._group_send("agent-a", message_type="processing_event")
+        self.assertFalse(first.wait(0.05))
+
+        self._group_send("agent-a")
+        self.assertTrue(first.wait(2))
+        self.assertTrue(second.wait(2))
+        self.assertFalse(other.wait(0.05))
+
+        for waiter in (first, second, other):
+            waiter.close()
+        self.assertEqual(self.hub.waiter_count(), 0)
+
+    def test_group_is_left_after_last_waiter_closes(self):
+        with self.hub.subscribe("agent-a"):
+            with self.hub.subscribe("agent-a"):
+                pass
+            self.assertFalse(self.layer.discarded.is_set())
+            self.assertEqual(self.hub.waiter_count("agent-a"), 1)
+
+        self.assertTrue(self.layer.discarded.wait(2))
+        self.assertEqual(self.layer.groups["agent-chat-agent-a"], set())
+
+    def test_unavailable_layer_leaves_waiter_unsubscribed(self):
+        hub = AgentTimelineEventHub(layer_factory=lambda: None)
+        waiter = hub.subscribe("agent-a")
+        self.assertFalse(waiter.subscribed)
+        waiter.close()
+        self.assertEqual(hub.waiter_count(), 0)
@@ -0,0 +1,183 @@
+import os
+import shutil
+import tempfile
+import uuid
+from unittest.mock import patch
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.test import SimpleTestCase, override_settings, tag
+
+from api.services.browser_profile_store import (
+    PROFILE_CHUNK_BYTES,
+    BrowserProfileManifest,
+    BrowserProfileStoreError,
+    ProfileChunkCache,
+    ProfileFileEntry,
+    _delete_chunks,
+    list_manifest_generations,
+    persist_browser_profile,
+    profile_chunk_key,
+    profile_manifest_generation_key,
+    profile_manifest_key,
+    restore_browser_profile,
+    sweep_browser_profile_chunks,
+)
+
+
+@tag("batch_browser_profile")
+class BrowserProfileStoreTests(SimpleTestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix="profile_store_test_")
+        self.addCleanup(lambda: shutil.rmtree(self.root, ignore_errors=True))
+        self.storage = FileSystemStorage(location=os.path.join(self.root, "storage"))
+        self.cache = ProfileChunkCache(os.path.join(self.root, "cache"), max_bytes=64 * 1024 * 1024)
+        self.agent_uuid = "5f2a9c1e-8b7d-4e6f-a3c2-1d0e9f8b7a6c"
+        storage_patch = patch("api.services.browser_profile_store.default_storage", self.storage)
+        storage_patch.start()
+        self.addCleanup(storage_patch.stop)
+
+    def _profile_dir(self, name: str) -> str:
+        path = os.path.join(self.root, name)
+        os.makedirs(path)
+        return path
+
+    def _write(self, profile_dir: str, rel_path: str, data: bytes) -> None:
+        path = os.path.join(profile_dir, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as target:
+            target.write(data)
+
+    def _latest_manifest_key(self) -> str:
+        return profile_manifest_generation_key(self.agent_uuid, list_manifest_generations(self.agent_uuid)[-1])
+
+    def _read(self, profile_dir: str, rel_path: str) -> bytes:
+        with open(os.path.join(profile_dir, rel_path), "rb") as source:
+            return source.read()
+
+    def test_persist_and_restore_round_trip(self):
+        source = self._profile_dir("source")
+        cookies = os.urandom(PROFILE_CHUNK_BYTES * 2 + 123)
+        self._write(source, os.path.join("Default", "Cookies"), cookies)
+        self._write(source, "Local State", b"{}")
+        os.makedirs(os.path.join(source, "Default", "Extensions"))
+
+        manifest, stats = persist_browser_profile(self.agent_uuid, source, previous=None, cache=self.cache)
+        self.assertEqual(stats.files, 2)
+        self.assertEqual(stats.transferred_chunks, 4)
+        self.assertEqual(len(list_manifest_generations(self.agent_uuid)), 1)
+
+        target = self._profile_dir("target")
+        restored, restore_stats = restore_browser_profile(
+            self.agent_uuid,
+            target,
+            cache=ProfileChunkCache(os.path.join(self.root, "cold"), max_bytes=64 * 1024 * 1024),
+        )
+        self.assertEqual(restored, manifest)
+        self.assertEqual(restore_stats.transferred_chunks, 4)
+        self.assertEqual(self._read(target, os.path.join("Default", "Cookies")), cookies)
+        self.assertEqual(self._read(target, "Local State"), b"{}")
+        self.assertTrue(os.path.isdir(os.path.join(target, "Default", "Extensions")))
+
+    def test_small_change_uploads_only_changed_chunks(self):
+        source = self._profile_dir("source")
+        cookies = bytearray(os.urandom(PROFILE_CHUNK_BYTES * 3))
+        self._write(source, "Cookies", bytes(cookies))
+        first, _stats = persist_browser_profile(self.agent_uuid, source, previous=None, cache=self.cache)
+        old_digest = first.files[0].chunks[1]
+
+        cookies[PROFILE_CHUNK_BYTES + 10] ^= 0xFF
+        self._write(source, "Cookies", bytes(cookies))
+        with patch("api.services.browser_profile_store.MANIFEST_GRACE_SECONDS", 0):
+            second, stats = persist_browser_profile(self.agent_uuid, source, previous=first, cache=self.cache)
+
+        self.assertEqual(stats.transferred_chunks, 1)
+        self.assertEqual(stats.deleted_chunks, 1)
+        self.assertEqual(len(list_manifest_generations(self.agent_uuid)), 1)
+        self.assertFalse(self.storage.exists(profile_chunk_key(self.agent_uuid, old_digest)))
+        self.assertTrue(self.storage.exists(profile_chunk_key(self.agent_uuid, second.files[0].chunks[1])))
+
+    def test_restore_with_warm_cache_downloads_nothing(self):
+        source = self._profile_dir("source")
+        self._write(source, "Preferences", os.urandom(4096))
+        persist_browser_profile(self.agent_uuid, source, previous=None, cache=self.cache)
+
+        target = self._profile_dir("target")
+        with patch.object(self.storage, "open", wraps=self.storage.open) as storage_open:
+            _manifest, stats = restore_browser_profile(self.agent_uuid, target, cache=self.cache)
+
+        opened = [call.args[0] for call in storage_open.call_args_list]
+        self.assertEqual(opened, [self._latest_manifest_key()])
+        self.assertEqual(stats.transferred_chunks, 0)
+        self.assertEqual(stats.cached_chunks, 1)
+        self.assertEqual(self._read(target, "Preferences"), self._read(source, "Preferences"))
+
+    def test_unsafe_manifest_path_clears_partial_restore(self):
+        manifest = BrowserProfileManifest(
+            files=(ProfileFileEntry(path="../escape", mode=0o600, size=0, chunks=()),),
+            dirs=("Default",),
+        )
+        self.storage.save(profile_manifest_key(self.agent_uuid), ContentFile(manifest.to_json().encode("utf-8")))
+
+        target = self._profile_dir("target")
+        with self.assertRaises(BrowserProfileStoreError):
+            restore_browser_profile(self.agent_uuid, target, cache=self.cache)
+        self.assertEqual(os.listdir(target), [])
+
+
+    def test_superseded_manifest_keeps_its_chunks_during_grace_period(self):
+        source = self._profile_dir("source")
+        self._write(source, "Cookies", os.urandom(4096))
+        first, _stats = persist_browser_profile(self.agent_uuid, source, previous=None, cache=self.cache)
+
+        # A second task persisted a different profile from the same starting point.
+        self._write(source, "Cookies", os.urandom(4096))
+        second, stats = persist_browser_profile(self.agent_uuid, source, previous=first, cache=self.cache)
+
+        self.assertEqual(stats.deleted_chunks, 0)
+        self.assertEqual(len(list_manifest_generations(self.agent_uuid)), 2)
+        for digest in first.chunk_digests | second.chunk_digests:
+            self.assertTrue(self.storage.exists(profile_chunk_key(self.agent_uuid, digest)))
+
+        with patch("api.services.browser_profile_store.MANIFEST_GRACE_SECONDS", 0):
+            self.assertEqual(sweep_browser_profile_chunks(self.agent_uuid), len(first.chunk_digests))
+
+        target = self._profile_dir("target")
+        restored, _restore_stats = restore_browser_profile(self.agent_uuid, target, cache=self.cache)
+        self.assertEqual(restored, second)
+
+    def test_persist_reuploads_chunks_removed_by_a_concurrent_sweep(self):
+        source = self._profile_dir("source")
+        self._write(source, "Cookies", os.urandom(4096))
+        first, _stats = persist_browser_profile(self.agent_uuid, source, previous=None, cache=self.cache)
+        _delete_chunks(self.agent_uuid, first.chunk_digests)
+
+        _manifest, stats = persist_browser_profile(self.agent_uuid, source, previous=first, cache=self.cache)
+
+        self.assertEqual(stats.transferred_chunks, len(first.chunk_digests))
+        for digest in first.chunk_digests:
+            self.assertTrue(self.storage.exists(profile_chunk_key(self.agent_uuid, digest)))
+
+    def test_persist_without_deletions_does_not_recheck_known_chunks(self):
+        agent_uuid = str(uuid.uuid4())
+        source = self._profile_dir("source")
+        for index in range(4):
+            self._write(source, f"Cache/{index}", os.urandom(4096))
+        first, _stats = persist_browser_profile(agent_uuid, source, previous=None, cache=self.cache)
+
+        with patch.object(self.storage, "exists", wraps=self.storage.exists) as exists:
+            _manifest, stats = persist_browser_profile(agent_uuid, source, previous=first, cache=self.cache)
+
+        self.assertEqual(stats.transferred_chunks, 0)
+        checked = {call.args[0] for call in exists.call_args_list}
+        self.assertFalse(checked & {profile_chunk_key(agent_uuid, digest) for digest in first.chunk_digests})
+
+    def test_restore_is_skipped_when_chunk_store_disabled(self):
+        source = self._profile_dir("source")
+        self._write(source, "Preferences", b"{}")
+        persist_browser_profile(self.agent_uuid, source, previous=None, cache=self.cache)
+
+        target = self._profile_dir("target")
+        with override_settings(BROWSER_PROFILE_CHUNK_STORE_ENABLED=False):
+            self.assertIsNone(restore_browser_profile(self.agent_uuid, target, cache=self.cache))
+        self.assertEqual(os.listdir(target), [])
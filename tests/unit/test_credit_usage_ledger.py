@@ -0,0 +1,119 @@
+import uuid
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings, tag
+from django.utils import timezone
+
+from api.agent.core.prompt_context import compute_burn_rate
+from api.models import BrowserUseAgent, PersistentAgent, PersistentAgentStep
+from api.services.credit_usage_ledger import (
+    agent_usage_scope,
+    load_agent_credit_usage,
+    load_credit_usage,
+    owner_usage_scope,
+    reconcile_active_credit_usage,
+)
+from config.redis_client import _FakeRedis
+
+
+@tag("batch_event_processing_credits")
+@override_settings(CREDIT_USAGE_LEDGER_ENABLED=True)
+class CreditUsageLedgerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.user = User.objects.create_user(
+            username=f"ledger-user-{uuid.uuid4()}",
+            email=f"ledger-user-{uuid.uuid4()}@example.com",
+            password="pass1234",
+        )
+        cls.agents = []
+        for index in range(2):
+            browser_agent = BrowserUseAgent.objects.create(user=cls.user, name=f"Ledger BA {index}")
+            cls.agents.append(
+                PersistentAgent.objects.create(
+                    user=cls.user,
+                    name=f"Ledger Agent {index}",
+                    charter="Track usage",
+                    browser_use_agent=browser_agent,
+                )
+            )
+        cls.agent = cls.agents[0]
+
+    def setUp(self):
+        self.redis = _FakeRedis()
+        redis_patch = patch("api.services.credit_usage_ledger.get_redis_client", return_value=self.redis)
+        redis_patch.start()
+        self.addCleanup(redis_patch.stop)
+        credit_patch = patch(
+            "tasks.services.TaskCreditService.check_and_consume_credit_for_owner",
+            return_value={"success": True, "credit": None},
+        )
+        credit_patch.start()
+        self.addCleanup(credit_patch.stop)
+
+    def _charge(self, agent, amount: str, *, minutes_ago: int = 0):
+        with self.captureOnCommitCallbacks(execute=True):
+            step = PersistentAgentStep.objects.create(
+                agent=agent,
+                description="Charged step",
+                credits_cost=Decimal(amount),
+            )
+        if minutes_ago:
+            PersistentAgentStep.objects.filter(pk=step.pk).update(
+                created_at=timezone.now() - timezone.timedelta(minutes=minutes_ago)
+            )
+        return step
+
+    def test_first_read_seeds_from_steps_and_later_charges_increment(self):
+        self._charge(self.agent, "3.000", minutes_ago=10)
+
+        metrics = compute_burn_rate(self.agent, window_minutes=60)
+        self.assertEqual(metrics["window_total"], Decimal("3"))
+
+        self._charge(self.agent, "1.250")
+        with patch.object(PersistentAgentStep.objects, "filter", side_effect=AssertionError("aggregated steps")):
+            usage = load_agent_credit_usage(self.agent, since=timezone.now() - timezone.timedelta(hours=1))
+        self.assertEqual(usage.total_since(timezone.now() - timezone.timedelta(hours=1)), Decimal("4.25"))
+        self.assertEqual(usage.total_since(timezone.now() - timezone.timedelta(minutes=5)), Decimal("1.25"))
+
+    def test_owner_scope_sums_every_agent(self):
+        self._charge(self.agents[0], "2.000")
+        self._charge(self.agents[1], "0.500")
+
+        usage = load_credit_usage(owner_usage_scope(self.agent), since=timezone.now() - timezone.timedelta(hours=1))
+
+        self.assertEqual(usage.total_since(timezone.now() - timezone.timedelta(hours=1)), Decimal("2.5"))
+
+    def test_reconcile_repairs_drift_from_direct_updates(self):
+        step = self._charge(self.agent, "2.000")
+        since = timezone.now() - timezone.timedelta(hours=1)
+        self.assertEqual(load_agent_credit_usage(self.agent, since=since).total_since(since), Decimal("2"))
+
+        PersistentAgentStep.objects.filter(pk=step.pk).update(credits_cost=Decimal("5.000"))
+        self.assertEqual(load_agent_credit_usage(self.agent, since=since).total_since(since), Decimal("2"))
+
+        self.assertEqual(reconcile_active_credit_usage(), 2)
+        self.assertEqual(load_agent_credit_usage(self.agent, since=since).total_since(since), Decimal("5"))
+        self.assertEqual(self.agent.get_daily_credit_usage(), Decimal("5"))
+
+    def test_windows_beyond_horizon_fall_back_to_steps(self):
+        self.assertIsNone(
+            load_credit_usage(agent_usage_scope(self.agent), since=timezone.now() - timezone.timedelta(days=3))
+        )
+
+    def test_refunded_step_is_removed_from_the_daily_limit_total(self):
+        from api.agent.core.event_processing import _clear_refunded_step_charge
+
+        self._charge(self.agent, "1.000")
+        step = self._charge(self.agent, "2.000")
+        self.assertEqual(self.agent.get_daily_credit_usage(), Decimal("3"))
+
+        _clear_refunded_step_charge(step)
+
+        with patch.object(PersistentAgentStep.objects, "filter", side_effect=AssertionError("aggregated steps")):
+            usage = load_agent_credit_usage(self.agent, since=timezone.now() - timezone.timedelta(hours=1))
+        self.assertEqual(usage.total_since(timezone.now() - timezone.timedelta(hours=1)), Decimal("1"))
+        self.assertEqual(self.agent.get_daily_credit_usage(), Decimal("1"))
@@ -59,7 +59,7 @@ from api.services.outbound_email_review import (
     update_pending_review_message,
 )
 from api.services.persistent_agents import PersistentAgentProvisioningService
-from api.tasks.outbox import reconcile_approved_outbox_emails
+from api.tasks.outbox import dispatch_approved_outbox_emails, reconcile_approved_outbox_emails
 from console.agent_chat.pending_actions import list_pending_action_requests
 from console.outbox_api_views import serialize_outbox_review
 from config.redis_client import _FakeRedis
@@ -600,6 +600,35 @@ class EmailReviewOutboxTests(TestCase):
             self.assertEqual(reconcile_approved_outbox_emails(), 0)
         delay_mock.assert_not_called()
 
+    @override_flag(EMAIL_REVIEW_OUTBOX, active=True)
+    def test_reconcile_batches_approved_emails_per_sending_account(self):
+        reviews = []
+        for recipient in ("first@example.com", "second@example.com"):
+            message = self._message(recipient)
+            review = queue_message_for_review(message)
+            review.status = OutboundEmailReview.Status.APPROVED
+            review.save(update_fields=["status"])
+            message.latest_status = DeliveryStatus.QUEUED
+            message.save(update_fields=["latest_status"])
+            reviews.append(review)
+
+        with patch("api.tasks.outbox.dispatch_approved_outbox_emails.delay") as batch_delay, patch(
+            "api.tasks.outbox.dispatch_approved_outbox_email.delay"
+        ) as single_delay:
+            self.assertEqual(reconcile_approved_outbox_emails(), 2)
+
+        single_delay.assert_not_called()
+        batch_delay.assert_called_once()
+        review_ids = batch_delay.call_args.args[0]
+        self.assertCountEqual(review_ids, [str(review.id) for review in reviews])
+
+        with patch("api.tasks.outbox.deliver_agent_emails") as deliver_mock:
+            dispatch_approved_outbox_emails(review_ids)
+        self.assertCountEqual(
+            [message.id for message in deliver_mock.call_args.args[0]],
+            [review.message_id for review in reviews],
+        )
+
     @override_flag(EMAIL_REVIEW_OUTBOX, active=True)
     def test_low_level_delivery_denies_contact_revoked_after_approval(self):
         contact = CommsAllowlistEntry.objects.create(
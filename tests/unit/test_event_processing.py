@@ -17,7 +17,6 @@ from django.test import RequestFactory, TestCase, tag, override_settings
 from django.utils import timezone
 from unittest.mock import patch, MagicMock, ANY
 
-import zstandard as zstd
 from allauth.account.models import EmailAddress
 from redis.exceptions import RedisError
 
@@ -149,6 +148,7 @@ from constants.grant_types import GrantTypeChoices
 from constants.plans import PlanNamesChoices
 from api.agent.core.llm_config import AgentLLMTier
 from api.agent.core.burn_control import BurnRateAction
+from api.services.prompt_archives import load_prompt_archive_payload
 from api.services.prompt_settings import get_prompt_settings, invalidate_prompt_settings_cache
 from api.services.tool_settings import (
     DEFAULT_MIN_CRON_SCHEDULE_MINUTES,
@@ -3873,11 +3873,7 @@ class PromptContextBuilderTests(TestCase):
         self.assertEqual(len(files), 1, "Expected a single prompt archive file")
         archive_path = f"{archive_dir}/{files[0]}"
 
-        with self._storage.open(archive_path, "rb") as fh:
-            compressed_bytes = fh.read()
-
-        decompressed = zstd.ZstdDecompressor().decompress(compressed_bytes)
-        payload = json.loads(decompressed.decode("utf-8"))
+        payload = load_prompt_archive_payload(archive_path, storage=self._storage)
 
         self.assertEqual(payload["agent_id"], str(self.agent.id))
         self.assertEqual(payload["token_budget"], get_prompt_token_budget(self.agent))
@@ -3926,8 +3922,7 @@ class PromptContextBuilderTests(TestCase):
             )
 
         archive = PersistentAgentPromptArchive.objects.get(id=prompt_archive_id)
-        with self._storage.open(archive.storage_key, "rb") as fh:
-            payload = json.loads(zstd.ZstdDecompressor().decompress(fh.read()).decode("utf-8"))
+        payload = load_prompt_archive_payload(archive.storage_key, storage=self._storage)
 
         self.assertEqual(context[1]["content"], "focused charter patch request")
         self.assertEqual(payload["user_prompt"], context[1]["content"])
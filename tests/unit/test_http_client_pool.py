@@ -0,0 +1,136 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings, tag
+from requests.exceptions import RequestException
+
+from api.agent.tools.http_request import execute_http_request
+from api.models import BrowserUseAgent, PersistentAgent
+from api.services.http_client_pool import HttpClientBusyError, PooledHttpClient
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_GET(self):
+        body = b"ok"
+        if self.path == "/echo-cookie":
+            body = (self.headers.get("Cookie") or "").encode()
+        self.send_response(200)
+        if self.path == "/set-cookie":
+            self.send_header("Set-Cookie", "sid=agentA-secret; Path=/")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _start_keep_alive_server(test_case):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _KeepAliveHandler)
+    server.connections = 0
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    test_case.addCleanup(server.server_close)
+    test_case.addCleanup(server.shutdown)
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+@tag("http_request_batch")
+class PooledHttpClientTests(SimpleTestCase):
+    def setUp(self):
+        self.server, self.url = _start_keep_alive_server(self)
+        self.client = PooledHttpClient(
+            max_per_host=1,
+            hosts_per_session=4,
+            max_sessions=4,
+            idle_timeout=60,
+            acquire_timeout=0.1,
+        )
+        self.addCleanup(self.client.close_all)
+
+    def test_sequential_requests_reuse_one_connection(self):
+        for _ in range(5):
+            response = self.client.get(self.url, timeout=5)
+            self.assertEqual(response.text, "ok")
+
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(self.client.session_count(), 1)
+
+    def test_streamed_response_holds_host_slot_until_closed(self):
+        response = self.client.get(self.url, timeout=5, stream=True)
+
+        with self.assertRaises(HttpClientBusyError):
+            self.client.get(self.url, timeout=5)
+
+        response.close()
+        self.assertEqual(self.client.get(self.url, timeout=5).status_code, 200)
+
+    def test_proxies_get_separate_sessions(self):
+        self.client.get(self.url, timeout=5)
+        with self.assertRaises(RequestException):
+            self.client.get(self.url, timeout=0.5, proxies={"http": "http://127.0.0.1:9"})
+
+        self.assertEqual(self.client.session_count(), 2)
+
+    def test_response_cookies_are_not_shared_between_callers(self):
+        self.client.get(f"{self.url}set-cookie", timeout=5)
+
+        response = self.client.get(f"{self.url}echo-cookie", timeout=5)
+
+        self.assertEqual(response.text, "")
+        self.assertEqual(
+            self.client.get(f"{self.url}echo-cookie", timeout=5, cookies={"own": "1"}).text,
+            "own=1",
+        )
+
+
+@tag("http_request_batch")
+@override_settings(HTTP_CLIENT_POOL_ENABLED=True)
+class HttpRequestToolPoolingTests(TestCase):
+    """The http_request tool routed through the pooled client."""
+
+    def setUp(self):
+        self.server, self.url = _start_keep_alive_server(self)
+        client = PooledHttpClient(
+            max_per_host=1,
+            hosts_per_session=4,
+            max_sessions=4,
+            idle_timeout=60,
+            acquire_timeout=0.1,
+        )
+        self.addCleanup(client.close_all)
+        client_patcher = patch("api.services.http_client_pool._pooled_client", client)
+        client_patcher.start()
+        self.addCleanup(client_patcher.stop)
+        proxy_patcher = patch("api.agent.tools.http_request.select_proxy_for_persistent_agent", return_value=None)
+        proxy_patcher.start()
+        self.addCleanup(proxy_patcher.stop)
+
+        user = get_user_model().objects.create_user(
+            username="http-pool@example.com",
+            email="http-pool@example.com",
+            password="secret",
+        )
+        self.agent = PersistentAgent.objects.create(
+            user=user,
+            name="HTTP Pool Agent",
+            charter="reuse connections",
+            browser_use_agent=BrowserUseAgent.objects.create(user=user, name="HTTP Pool Browser"),
+        )
+
+    def test_sequential_tool_calls_release_the_host_slot_and_reuse_the_connection(self):
+        for _ in range(3):
+            result = execute_http_request(self.agent, {"method": "GET", "url": self.url})
+            self.assertEqual(result["status"], "ok")
+            self.assertEqual(result["content"], "ok")
+
+        self.assertEqual(self.server.connections, 1)
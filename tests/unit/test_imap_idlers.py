@@ -1,9 +1,15 @@
-from unittest.mock import patch
+import asyncio
+import time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase, tag, override_settings
+from django.test import SimpleTestCase, TestCase, tag, override_settings
 
-from api.management.commands.run_imap_idlers import _eligible_idle_accounts_queryset
+from api.agent.comms import imap_idle
+from api.agent.comms.imap_idle import AsyncImapSession, ImapIdleError
+from api.management.commands import run_imap_idlers
+from api.management.commands.run_imap_idlers import IdleSupervisor, _eligible_idle_accounts_queryset
 from api.models import (
     AgentEmailAccount,
     BrowserUseAgent,
@@ -12,6 +18,7 @@ from api.models import (
     PersistentAgentCommsEndpoint,
     UserQuota,
 )
+from config.redis_client import _FakeRedis
 
 
 @tag("batch_email")
@@ -93,3 +100,322 @@ class ImapIdleRunnerEnvFilterTests(TestCase):
 
         self.assertIn(self.local_account.pk, eligible_ids)
         self.assertNotIn(self.staging_account.pk, eligible_ids)
+
+
+class _FakeImapServer:
+    """Scripted IMAP server: maps a command verb to the untagged lines sent before OK."""
+
+    def __init__(self, script):
+        self.script = script
+        self.received: list[str] = []
+
+    async def handle(self, reader, writer):
+        writer.write(b"* OK ready\r\n")
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            text = line.decode().rstrip("\r\n")
+            self.received.append(text)
+            tag, _, rest = text.partition(" ")
+            verb = rest.split(" ")[0].upper()
+            if rest.upper().startswith("UID "):
+                verb = "UID " + rest.split(" ")[1].upper()
+            if verb == "IDLE":
+                writer.write(b"+ idling\r\n")
+                writer.write(b"* 3 EXISTS\r\n")
+                await writer.drain()
+                done = await reader.readline()
+                self.received.append(done.decode().rstrip("\r\n"))
+                writer.write(f"{tag} OK IDLE terminated\r\n".encode())
+                continue
+            for untagged in self.script.get(verb, []):
+                writer.write(untagged)
+            status = b"NO denied" if verb == "LOGIN" and "bad" in rest else b"OK done"
+            writer.write(tag.encode() + b" " + status + b"\r\n")
+            await writer.drain()
+            if verb == "LOGOUT":
+                break
+        writer.close()
+
+
+@tag("batch_email")
+class AsyncImapSessionTests(SimpleTestCase):
+    def _run(self, script, scenario):
+        server_impl = _FakeImapServer(script)
+
+        async def main():
+            server = await asyncio.start_server(server_impl.handle, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            try:
+                session = await AsyncImapSession.connect("127.0.0.1", port, use_ssl=False, timeout=5)
+                try:
+                    return await scenario(session)
+                finally:
+                    await session.logout()
+            finally:
+                server.close()
+                await server.wait_closed()
+
+        return asyncio.run(main()), server_impl
+
+    def test_idle_signals_new_mail_and_fetches_over_same_session(self):
+        message = b"From: a@example.com\r\nSubject: hi\r\n\r\nbody"
+        script = {
+            "CAPABILITY": [b"* CAPABILITY IMAP4rev1 IDLE\r\n"],
+            "SELECT": [b"* 3 EXISTS\r\n", b"* OK [UIDVALIDITY 77] ok\r\n"],
+            "UID SEARCH": [b"* SEARCH 2 3\r\n"],
+            "UID FETCH": [b"* 3 FETCH (UID 3 BODY[] {%d}\r\n" % len(message), message, b")\r\n"],
+        }
+
+        async def scenario(session):
+            self.assertIn("IDLE", session.capabilities)
+            await session.login("user", 'pa"ss')
+            codes = await session.select("INBOX")
+            session.new_mail_seen = False
+            await session.idle_start()
+            await session.idle_wait(timeout=2)
+            await session.idle_done()
+            return codes, session.new_mail_seen, await session.uid_search("(UNSEEN UID 2:*)"), await session.uid_fetch(3)
+
+        (codes, new_mail, uids, raw), server = self._run(script, scenario)
+
+        self.assertEqual(codes["UIDVALIDITY"], "77")
+        self.assertTrue(new_mail)
+        self.assertEqual(uids, [2, 3])
+        self.assertEqual(raw, message)
+        self.assertIn('G00002 LOGIN "user" "pa\\"ss"', server.received)
+        self.assertIn("DONE", server.received)
+
+    def test_rejected_command_raises(self):
+        async def scenario(session):
+            with self.assertRaises(ImapIdleError):
+                await session.login("bad", "pw")
+            return None
+
+        self._run({"CAPABILITY": [b"* CAPABILITY IMAP4rev1\r\n"]}, scenario)
+
+    def test_oversized_response_line_raises(self):
+        script = {
+            "CAPABILITY": [b"* CAPABILITY IMAP4rev1 IDLE\r\n"],
+            "UID SEARCH": [b"* SEARCH " + b" ".join(str(uid).encode() for uid in range(1, 2000)) + b"\r\n"],
+        }
+
+        async def scenario(session):
+            with self.assertRaises(ImapIdleError):
+                await session.uid_search("ALL")
+            return None
+
+        with patch.object(imap_idle, "_STREAM_LIMIT", 1024):
+            self._run(script, scenario)
+
+
+def _supervisor() -> IdleSupervisor:
+    with patch.object(run_imap_idlers, "get_redis_client", return_value=_FakeRedis()):
+        supervisor = IdleSupervisor(
+            max_watchers=10,
+            scan_interval=30,
+            idle_reissue_sec=1500,
+            debounce_sec=10,
+            lease_ttl=60,
+            connect_concurrency=1,
+        )
+
+    async def call_inline(func, *args):
+        return func(*args)
+
+    supervisor._call = call_inline
+    return supervisor
+
+
+def _idle_session(uids, *, uidvalidity="77"):
+    session = MagicMock()
+    session.select_codes = {"UIDVALIDITY": uidvalidity}
+    session.uid_search = AsyncMock(return_value=uids)
+    session.uid_fetch = AsyncMock(side_effect=lambda uid, item="BODY.PEEK[]": b"message %d" % uid)
+    session.uid_store_seen = AsyncMock()
+    return session
+
+
+@tag("batch_email")
+class ImapIdleFetchNewMailTests(SimpleTestCase):
+    def setUp(self):
+        self.supervisor = _supervisor()
+        self.account = SimpleNamespace(last_seen_uid="v:77:4", endpoint=SimpleNamespace(address="agent@example.org"))
+        self.lock = MagicMock()
+        for target, kwargs in (
+            ("_acquire_poll_lock", {"return_value": self.lock}),
+            ("_enqueue_poll", {}),
+        ):
+            patcher = patch.object(self.supervisor, target, **kwargs)
+            setattr(self, target.lstrip("_"), patcher.start())
+            self.addCleanup(patcher.stop)
+        for target, kwargs in (
+            ("_load_account", {"return_value": self.account}),
+            ("imap_sender_blocked", {"return_value": False}),
+            ("ingest_imap_message_bytes", {"return_value": True}),
+            ("_update_success", {}),
+        ):
+            patcher = patch.object(run_imap_idlers, target, **kwargs)
+            setattr(self, target.lstrip("_"), patcher.start())
+            self.addCleanup(patcher.stop)
+
+    def test_new_uids_are_ingested_marked_seen_and_checkpointed(self):
+        session = _idle_session([3, 5, 6])
+
+        asyncio.run(self.supervisor._fetch_new_mail("acct", session))
+
+        session.uid_search.assert_awaited_once_with("(UNSEEN UID 5:*)")
+        self.assertEqual([c.args[1] for c in self.ingest_imap_message_bytes.call_args_list], ["5", "6"])
+        self.assertEqual([c.args[0] for c in session.uid_store_seen.await_args_list], [5, 6])
+        self.update_success.assert_called_once()
+        self.assertEqual(self.update_success.call_args.args[2:], ("6", "77"))
+        self.lock.release.assert_called_once()
+        self.enqueue_poll.assert_not_called()
+
+    def test_blocked_sender_is_skipped_without_fetching_the_body(self):
+        session = _idle_session([5, 6])
+        self.imap_sender_blocked.side_effect = lambda acct, header: header == b"message 5"
+
+        asyncio.run(self.supervisor._fetch_new_mail("acct", session))
+
+        self.assertEqual(
+            [c.args for c in session.uid_fetch.await_args_list],
+            [(5, "BODY.PEEK[HEADER.FIELDS (FROM)]"), (6, "BODY.PEEK[HEADER.FIELDS (FROM)]"), (6,)],
+        )
+        self.assertEqual([c.args[1] for c in self.ingest_imap_message_bytes.call_args_list], ["6"])
+        self.assertEqual([c.args[0] for c in session.uid_store_seen.await_args_list], [6])
+        self.assertEqual(self.update_success.call_args.args[2], "6")
+
+    def test_unwhitelisted_message_is_checkpointed_but_left_unseen(self):
+        session = _idle_session([5])
+        self.ingest_imap_message_bytes.return_value = False
+
+        asyncio.run(self.supervisor._fetch_new_mail("acct", session))
+
+        session.uid_store_seen.assert_not_awaited()
+        self.assertEqual(self.update_success.call_args.args[2], "5")
+
+    def test_ingest_failure_does_not_advance_past_the_failed_uid(self):
+        session = _idle_session([5])
+        self.ingest_imap_message_bytes.side_effect = RuntimeError("boom")
+
+        asyncio.run(self.supervisor._fetch_new_mail("acct", session))
+
+        session.uid_store_seen.assert_not_awaited()
+        self.update_success.assert_not_called()
+
+    def test_first_run_baseline_is_delegated_to_the_poll_task(self):
+        self.account.last_seen_uid = ""
+        session = _idle_session([1, 2])
+
+        asyncio.run(self.supervisor._fetch_new_mail("acct", session))
+
+        session.uid_search.assert_not_awaited()
+        self.lock.release.assert_called_once()
+        self.enqueue_poll.assert_called_once_with("acct")
+
+    def test_uidvalidity_reset_is_delegated_to_the_poll_task(self):
+        session = _idle_session([1, 2], uidvalidity="78")
+
+        asyncio.run(self.supervisor._fetch_new_mail("acct", session))
+
+        session.uid_search.assert_not_awaited()
+        self.enqueue_poll.assert_called_once_with("acct")
+
+    def test_running_poll_defers_to_an_enqueued_poll(self):
+        self.acquire_poll_lock.return_value = None
+        session = _idle_session([5])
+
+        asyncio.run(self.supervisor._fetch_new_mail("acct", session))
+
+        session.uid_search.assert_not_awaited()
+        self.enqueue_poll.assert_called_once_with("acct")
+
+
+@tag("batch_email")
+class ImapIdleSupervisorReconnectTests(SimpleTestCase):
+    def setUp(self):
+        self.supervisor = _supervisor()
+        self.account = SimpleNamespace(
+            pk="acct",
+            backoff_until=None,
+            imap_folder="INBOX",
+            imap_host="imap.example.org",
+            imap_port=993,
+            imap_security="ssl",
+            imap_auth="password",
+            imap_username="user",
+            endpoint=SimpleNamespace(address="agent@example.org"),
+        )
+        for target, value in (
+            ("_eligible_idle_accounts_queryset", lambda: [self.account]),
+            ("_load_account", lambda account_id: self.account),
+        ):
+            patcher = patch.object(run_imap_idlers, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        for target in ("_acquire_leases", "_release_leases"):
+            patcher = patch.object(self.supervisor, target, side_effect=lambda ids: ids)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_broken_session_is_closed_and_watcher_restarts_after_backoff(self):
+        sessions = []
+
+        async def open_session(acct):
+            session = MagicMock(capabilities={"IDLE"}, logout=AsyncMock())
+            sessions.append(session)
+            return session
+
+        async def broken_idle_loop(w, session):
+            raise ImapIdleError("IMAP connection closed")
+
+        async def main():
+            with patch.object(self.supervisor, "_open_session", side_effect=open_session), patch.object(
+                self.supervisor, "_idle_loop", side_effect=broken_idle_loop
+            ):
+                await self.supervisor._reconcile()
+                first = self.supervisor.watchers["acct"]
+                await first.task
+
+                # The failed watcher is reaped and held back for the backoff window.
+                await self.supervisor._reconcile()
+                self.assertNotIn("acct", self.supervisor.watchers)
+                self.assertEqual(self.supervisor._failures["acct"], 1)
+                self.assertGreater(self.supervisor._retry_at["acct"], time.monotonic())
+
+                self.supervisor._retry_at["acct"] = 0
+                await self.supervisor._reconcile()
+                second = self.supervisor.watchers["acct"]
+                await second.task
+                return first, second
+
+        first, second = asyncio.run(main())
+
+        self.assertIsNot(first, second)
+        self.assertTrue(first.task.done() and first.task.exception() is None)
+        self.assertEqual(len(sessions), 2)
+        for session in sessions:
+            session.logout.assert_awaited_once()
+
+    def test_healthy_exit_clears_the_failure_count(self):
+        async def quiet_idle_loop(w, session):
+            return None
+
+        async def main():
+            with patch.object(
+                self.supervisor,
+                "_open_session",
+                AsyncMock(return_value=MagicMock(capabilities={"IDLE"}, logout=AsyncMock())),
+            ), patch.object(self.supervisor, "_idle_loop", side_effect=quiet_idle_loop):
+                self.supervisor._failures["acct"] = 3
+                await self.supervisor._reconcile()
+                await self.supervisor.watchers["acct"].task
+                await self.supervisor._reconcile()
+                self.supervisor.watchers["acct"].task.cancel()
+
+        asyncio.run(main())
+
+        self.assertNotIn("acct", self.supervisor._failures)
+        self.assertIn("acct", self.supervisor.watchers)
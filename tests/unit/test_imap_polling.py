@@ -1,13 +1,15 @@
 from __future__ import annotations
 
 import email
+from datetime import timedelta
 from email.message import EmailMessage
 from unittest.mock import patch
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase, tag
+from django.test import TestCase, override_settings, tag
+from django.utils import timezone
 
-from api.agent.tasks.email_polling import _poll_account_locked
+from api.agent.tasks.email_polling import POLL_CLAIM_SEC, _poll_account_locked, _update_error_backoff, poll_imap_inboxes
 from api.models import (
     PersistentAgent,
     BrowserUseAgent,
@@ -174,3 +176,70 @@ class ImapPollingTests(TestCase):
         _poll_account_locked(acct)
         acct.refresh_from_db()
         self.assertEqual(acct.last_seen_uid, "2")
+
+
+@tag("batch_email")
+@override_settings(GOBII_RELEASE_ENV="local")
+class ImapPollDispatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.user = User.objects.create_user(username='imap-dispatch@example.com', email='imap-dispatch@example.com', password='pw')
+        quota, _ = UserQuota.objects.get_or_create(user=cls.user)
+        quota.agent_limit = 100
+        quota.save()
+        with patch.object(BrowserUseAgent, 'select_random_proxy', return_value=None):
+            browser_agent = BrowserUseAgent.objects.create(user=cls.user, name="ba-imap-dispatch")
+        cls.agent = PersistentAgent.objects.create(
+            user=cls.user,
+            name="imap-dispatch-agent",
+            charter="Test",
+            schedule="",
+            browser_use_agent=browser_agent,
+            execution_environment="local",
+        )
+
+    def _account(self, address: str, next_poll_at=None) -> AgentEmailAccount:
+        ep = PersistentAgentCommsEndpoint.objects.create(
+            owner_agent=self.agent,
+            channel=CommsChannel.EMAIL,
+            address=address,
+        )
+        acct = AgentEmailAccount.objects.create(
+            endpoint=ep,
+            imap_host="imap.example.org",
+            is_inbound_enabled=True,
+            poll_interval_sec=60,
+        )
+        if next_poll_at is not None:
+            AgentEmailAccount.objects.filter(pk=acct.pk).update(next_poll_at=next_poll_at)
+        return acct
+
+    @patch('api.agent.tasks.email_polling.poll_imap_inbox.delay')
+    def test_dispatch_claims_only_due_accounts_in_schedule_order(self, mock_delay):
+        now = timezone.now()
+        created = self._account("created@example.org")
+        overdue = self._account("overdue@example.org", now - timedelta(minutes=5))
+        future = self._account("future@example.org", now + timedelta(minutes=5))
+
+        poll_imap_inboxes()
+
+        enqueued = [call.args[0] for call in mock_delay.call_args_list]
+        self.assertEqual(enqueued, [str(overdue.pk), str(created.pk)])
+        overdue.refresh_from_db()
+        self.assertGreater(overdue.next_poll_at, now + timedelta(seconds=POLL_CLAIM_SEC - 5))
+
+        # Claimed accounts are not offered again by the next dispatcher run.
+        mock_delay.reset_mock()
+        poll_imap_inboxes()
+        mock_delay.assert_not_called()
+        future.refresh_from_db()
+        self.assertGreater(future.next_poll_at, now)
+
+    def test_error_backoff_schedules_next_poll_at_backoff_end(self):
+        acct = self._account("backoff@example.org")
+
+        _update_error_backoff(acct, RuntimeError("boom"))
+
+        acct.refresh_from_db()
+        self.assertEqual(acct.next_poll_at, acct.backoff_until)
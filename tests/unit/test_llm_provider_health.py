@@ -0,0 +1,254 @@
+import threading
+import time
+from unittest.mock import patch
+
+import litellm
+from django.test import SimpleTestCase, override_settings, tag
+
+from api.agent.core import llm_provider_health
+from api.agent.core.event_processing import _completion_with_failover
+from api.agent.core.llm_provider_health import (
+    STATE_CLOSED,
+    STATE_HALF_OPEN,
+    STATE_OPEN,
+    HedgedRequest,
+    ProviderHealthTracker,
+)
+from config.redis_client import _FakeRedis
+from tests.utils.token_usage import make_completion_response
+
+
+CONFIGS = [
+    ("anthropic", "anthropic/claude", {}),
+    ("openai", "openai/gpt", {}),
+    ("google", "vertex_ai/gemini", {}),
+]
+
+
+@tag("batch_event_llm")
+@override_settings(
+    LLM_PROVIDER_CIRCUIT_FAILURE_THRESHOLD=2,
+    LLM_PROVIDER_CIRCUIT_COOLDOWN_SECONDS=60,
+    LLM_PROVIDER_DEGRADED_ERROR_RATE=0.5,
+)
+class ProviderHealthTrackerTests(SimpleTestCase):
+    def setUp(self):
+        redis = _FakeRedis()
+        self.tracker = ProviderHealthTracker(redis_factory=lambda: redis)
+
+    def test_circuit_opens_after_consecutive_failures_and_moves_endpoint_last(self):
+        self.tracker.record_failure("anthropic", "anthropic/claude")
+        self.assertEqual(self.tracker.get("anthropic", "anthropic/claude").state(time.time()), STATE_CLOSED)
+        self.assertEqual(self.tracker.order(CONFIGS), CONFIGS)
+
+        self.tracker.record_failure("anthropic", "anthropic/claude")
+
+        health = self.tracker.get("anthropic", "anthropic/claude")
+        self.assertEqual(health.state(time.time()), STATE_OPEN)
+        self.assertEqual(self.tracker.order(CONFIGS), CONFIGS[1:] + CONFIGS[:1])
+
+    def test_success_closes_circuit_and_tracks_latency(self):
+        for _ in range(2):
+            self.tracker.record_failure("anthropic", "anthropic/claude")
+
+        self.tracker.record_success("anthropic", "anthropic/claude", latency_ms=800, ttft_ms=200)
+
+        health = self.tracker.get("anthropic", "anthropic/claude")
+        self.assertEqual(health.state(time.time()), STATE_CLOSED)
+        self.assertEqual(health.consecutive_failures, 0)
+        self.assertEqual(health.latency_ms, 800)
+        self.assertEqual(health.ttft_ms, 200)
+        self.assertGreater(health.p95_latency_ms(), 800)
+        self.assertEqual(self.tracker.order(CONFIGS), CONFIGS)
+
+    def test_half_open_endpoint_admits_one_probe(self):
+        for _ in range(2):
+            self.tracker.record_failure("anthropic", "anthropic/claude")
+        health = self.tracker.get("anthropic", "anthropic/claude")
+        self.assertEqual(health.state(health.opened_until + 1), STATE_HALF_OPEN)
+
+        self.assertTrue(self.tracker.claim_probe(health))
+        self.assertFalse(self.tracker.claim_probe(health))
+
+    def test_failures_past_the_threshold_do_not_extend_an_open_circuit(self):
+        for _ in range(2):
+            self.tracker.record_failure("anthropic", "anthropic/claude")
+        opened_until = self.tracker.get("anthropic", "anthropic/claude").opened_until
+
+        self.tracker.record_failure("anthropic", "anthropic/claude")
+
+        health = self.tracker.get("anthropic", "anthropic/claude")
+        self.assertEqual(health.opened_until, opened_until)
+        self.assertEqual(health.consecutive_failures, 3)
+        self.assertEqual(health.samples, 3)
+
+
+@tag("batch_event_llm")
+class HedgedRequestTests(SimpleTestCase):
+    def test_fast_primary_does_not_fire_hedge(self):
+        hedge_called = threading.Event()
+
+        def hedge():
+            hedge_called.set()
+            return "hedge"
+
+        request = HedgedRequest([lambda: "primary", hedge], delay_seconds=1)
+
+        self.assertEqual(request.run(), "primary")
+        self.assertFalse(request.fired)
+        self.assertEqual(request.winner, 0)
+        self.assertFalse(hedge_called.is_set())
+
+    def test_slow_primary_is_hedged_and_both_outcomes_are_reported(self):
+        release_primary = threading.Event()
+        reported = []
+        all_reported = threading.Event()
+        discarded = []
+
+        def primary():
+            release_primary.wait(2)
+            return "primary"
+
+        def on_result(index, result, error):
+            reported.append((index, result, error))
+            if len(reported) == 2:
+                all_reported.set()
+
+        request = HedgedRequest(
+            [primary, lambda: "hedge"],
+            delay_seconds=0.05,
+            on_result=on_result,
+            on_discard=lambda index, result: discarded.append((index, result)),
+        )
+
+        self.assertEqual(request.run(), "hedge")
+        self.assertTrue(request.fired)
+        self.assertEqual(request.winner, 1)
+
+        release_primary.set()
+        self.assertTrue(all_reported.wait(2))
+        self.assertCountEqual(reported, [(0, "primary", None), (1, "hedge", None)])
+        deadline = time.monotonic() + 2
+        while not discarded and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(discarded, [(0, "primary")])
+
+    def test_primary_error_before_delay_is_raised_without_hedging(self):
+        def primary():
+            raise ValueError("boom")
+
+        request = HedgedRequest([primary, lambda: "hedge"], delay_seconds=1)
+
+        with self.assertRaises(ValueError):
+            request.run()
+        self.assertFalse(request.fired)
+
+
+@tag("batch_event_llm")
+@override_settings(
+    LLM_PROVIDER_HEALTH_ENABLED=True,
+    LLM_PROVIDER_CIRCUIT_FAILURE_THRESHOLD=2,
+    LLM_PROVIDER_CIRCUIT_COOLDOWN_SECONDS=60,
+    LLM_HEDGED_REQUESTS_ENABLED=False,
+)
+class CompletionWithFailoverHealthTests(SimpleTestCase):
+    messages = [{"role": "user", "content": "hello"}]
+
+    def setUp(self):
+        redis = _FakeRedis()
+        self.tracker = ProviderHealthTracker(redis_factory=lambda: redis)
+        patcher = patch.object(llm_provider_health, "_tracker", self.tracker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch("api.agent.core.event_processing.run_completion")
+    def test_open_circuit_endpoint_is_tried_after_healthy_ones(self, mock_run_completion):
+        for _ in range(2):
+            self.tracker.record_failure("anthropic", "anthropic/claude")
+        mock_run_completion.return_value = make_completion_response()
+
+        _response, token_usage = _completion_with_failover(self.messages, [], failover_configs=CONFIGS[:2])
+
+        self.assertEqual(mock_run_completion.call_args.kwargs["model"], "openai/gpt")
+        self.assertEqual(token_usage["provider"], "openai")
+        self.assertEqual(self.tracker.get("openai", "openai/gpt").samples, 1)
+
+    @patch("api.agent.core.event_processing.run_completion")
+    def test_provider_faults_are_recorded_while_failing_over(self, mock_run_completion):
+        def completion(*, model, **kwargs):
+            if model == "anthropic/claude":
+                raise litellm.Timeout("timed out", model=model, llm_provider="anthropic")
+            return make_completion_response()
+
+        mock_run_completion.side_effect = completion
+
+        _completion_with_failover(self.messages, [], failover_configs=CONFIGS[:2])
+        _completion_with_failover(self.messages, [], failover_configs=CONFIGS[:2])
+
+        self.assertEqual(self.tracker.get("anthropic", "anthropic/claude").state(time.time()), STATE_OPEN)
+        mock_run_completion.reset_mock()
+        _completion_with_failover(self.messages, [], failover_configs=CONFIGS[:2])
+        self.assertEqual(
+            [c.kwargs["model"] for c in mock_run_completion.call_args_list],
+            ["openai/gpt"],
+        )
+
+    @patch("api.agent.core.event_processing.run_completion")
+    def test_healthy_preferred_endpoint_keeps_priority_but_an_open_one_does_not(self, mock_run_completion):
+        mock_run_completion.return_value = make_completion_response()
+
+        _completion_with_failover(self.messages, [], failover_configs=CONFIGS, preferred_config=("google", "vertex_ai/gemini"))
+        self.assertEqual(mock_run_completion.call_args.kwargs["model"], "vertex_ai/gemini")
+
+        for _ in range(2):
+            self.tracker.record_failure("google", "vertex_ai/gemini")
+        _completion_with_failover(self.messages, [], failover_configs=CONFIGS, preferred_config=("google", "vertex_ai/gemini"))
+        self.assertEqual(mock_run_completion.call_args.kwargs["model"], "anthropic/claude")
+
+    @patch("api.agent.core.event_processing.run_completion")
+    def test_open_circuits_are_still_tried_when_every_endpoint_is_open(self, mock_run_completion):
+        for provider, model, _params in CONFIGS[:2]:
+            for _ in range(2):
+                self.tracker.record_failure(provider, model)
+        mock_run_completion.return_value = make_completion_response()
+
+        _response, token_usage = _completion_with_failover(self.messages, [], failover_configs=CONFIGS[:2])
+
+        self.assertEqual(token_usage["model"], "anthropic/claude")
+
+    @override_settings(
+        LLM_HEDGED_REQUESTS_ENABLED=True,
+        LLM_HEDGE_DEFAULT_DELAY_SECONDS=0.05,
+        LLM_HEDGE_MIN_DELAY_SECONDS=0.01,
+        LLM_HEDGE_MAX_DELAY_SECONDS=0.05,
+    )
+    @patch("api.agent.core.event_processing.record_discarded_hedge_usage")
+    @patch("api.agent.core.event_processing.run_completion")
+    def test_slow_primary_is_hedged_and_its_late_usage_is_metered(self, mock_run_completion, mock_discarded):
+        release_primary = threading.Event()
+        self.addCleanup(release_primary.set)
+        metered = threading.Event()
+        mock_discarded.side_effect = lambda usage: metered.set()
+
+        def completion(*, model, **kwargs):
+            if model == "anthropic/claude":
+                release_primary.wait(2)
+                return make_completion_response(prompt_tokens=40, completion_tokens=7)
+            return make_completion_response()
+
+        mock_run_completion.side_effect = completion
+
+        _response, token_usage = _completion_with_failover(self.messages, [], failover_configs=CONFIGS)
+
+        self.assertEqual(token_usage["provider"], "openai")
+        self.assertEqual(token_usage["model"], "openai/gpt")
+        self.assertEqual(self.tracker.get("openai", "openai/gpt").samples, 1)
+
+        release_primary.set()
+        self.assertTrue(metered.wait(2))
+        discarded_usage = mock_discarded.call_args.args[0]
+        self.assertEqual(discarded_usage["provider"], "anthropic")
+        self.assertEqual(discarded_usage["prompt_tokens"], 40)
+        self.assertEqual(discarded_usage["completion_tokens"], 7)
+        self.assertEqual(self.tracker.get("anthropic", "anthropic/claude").samples, 1)
+        self.assertNotIn("vertex_ai/gemini", [c.kwargs["model"] for c in mock_run_completion.call_args_list])
@@ -5,14 +5,19 @@ from datetime import timedelta
 from django.contrib.auth import get_user_model
 from django.core.files.storage import FileSystemStorage
 from django.core.management import call_command
-from django.test import TestCase, tag
+from django.test import TestCase, override_settings, tag
 from django.utils import timezone
 from unittest.mock import patch
 
 from api.agent.core.prompt_context import get_prompt_token_budget
 from api.models import BrowserUseAgent, PersistentAgent, PersistentAgentPromptArchive
 from api.maintenance.prompt_archives import prune_prompt_archives_for_cutoff
-from api.services.prompt_archives import archive_agent_prompt
+from api.services import prompt_archives
+from api.services.prompt_archives import (
+    archive_agent_prompt,
+    get_prompt_archive_uploader,
+    load_prompt_archive_payload,
+)
 
 User = get_user_model()
 
@@ -85,3 +90,98 @@ class PromptArchivePruningTests(TestCase):
         call_command("prune_prompt_archives", "--days=14")
         self.assertFalse(PersistentAgentPromptArchive.objects.filter(id=archive.id).exists())
         self.assertFalse(self.storage.exists(archive.storage_key))
+
+    def test_archives_share_blocks_and_round_trip(self):
+        """Repeated prompt text should be stored once and reassembled losslessly."""
+        system_prompt = "\n\n".join(f"Stable directive {i}: " + ("x" * 400) for i in range(40))
+        first_key, _, first_bytes, _ = archive_agent_prompt(
+            agent=self.agent,
+            system_prompt=system_prompt,
+            user_prompt="First request",
+            tokens_before=100,
+            tokens_after=80,
+            tokens_saved=20,
+            token_budget=get_prompt_token_budget(self.agent),
+        )
+        second_key, _, second_bytes, _ = archive_agent_prompt(
+            agent=self.agent,
+            system_prompt=system_prompt,
+            user_prompt="Second request",
+            tokens_before=100,
+            tokens_after=80,
+            tokens_saved=20,
+            token_budget=get_prompt_token_budget(self.agent),
+        )
+
+        self.assertLess(second_bytes, first_bytes)
+        first = load_prompt_archive_payload(first_key, storage=self.storage)
+        second = load_prompt_archive_payload(second_key, storage=self.storage)
+        self.assertEqual(first["system_prompt"], system_prompt)
+        self.assertEqual(second["system_prompt"], system_prompt)
+        self.assertEqual(first["user_prompt"], "First request")
+        self.assertEqual(second["user_prompt"], "Second request")
+        self.assertEqual(second["agent_id"], str(self.agent.id))
+
+    @override_settings(PROMPT_ARCHIVE_BACKGROUND_UPLOAD_ENABLED=True)
+    def test_full_upload_queue_falls_back_to_inline_write(self):
+        """When the background queue is full the caller writes the archive itself."""
+        with patch.object(get_prompt_archive_uploader(), "submit", return_value=False) as submit:
+            archive = self._make_archive(days_ago=0)
+
+        submit.assert_called_once()
+        self.assertEqual(load_prompt_archive_payload(archive.storage_key, storage=self.storage)["user_prompt"], "User prompt")
+
+    @override_settings(PROMPT_ARCHIVE_BACKGROUND_UPLOAD_ENABLED=True)
+    def test_background_upload_writes_blocks_and_manifest(self):
+        """With the production setting the uploader thread writes what the row points at."""
+        key, _, _, archive_id = archive_agent_prompt(
+            agent=self.agent,
+            system_prompt="Background system prompt",
+            user_prompt="Background request",
+            tokens_before=100,
+            tokens_after=80,
+            tokens_saved=20,
+            token_budget=get_prompt_token_budget(self.agent),
+        )
+
+        self.assertTrue(get_prompt_archive_uploader().flush(timeout=5))
+        self.assertEqual(PersistentAgentPromptArchive.objects.get(id=archive_id).storage_key, key)
+        payload = load_prompt_archive_payload(key, storage=self.storage)
+        self.assertEqual(payload["system_prompt"], "Background system prompt")
+        self.assertEqual(payload["user_prompt"], "Background request")
+
+    def test_failed_upload_keeps_row_without_payload(self):
+        """The loop already holds the archive id, so a failed upload must not delete the row."""
+        archive = self._make_archive(days_ago=0)
+        upload = prompt_archives._PromptArchiveUpload(
+            agent_id=str(self.agent.id),
+            archive_id=archive.id,
+            archive_key=archive.storage_key,
+            manifest=b"",
+            blocks={},
+        )
+
+        prompt_archives._mark_upload_failed(upload, OSError("storage down"))
+
+        archive.refresh_from_db()
+        self.assertEqual(archive.storage_key, "")
+        found, deleted = prune_prompt_archives_for_cutoff(timezone.now())
+        self.assertEqual((found, deleted), (1, 1))
+
+    def test_prune_keeps_blocks_until_last_archive_of_day_is_gone(self):
+        """Shared blocks survive while any archive from the same day still references them."""
+        old_archive = self._make_archive(days_ago=30)
+        recent_archive = self._make_archive(days_ago=5)
+        day = recent_archive.storage_key.rsplit("/", 1)[-1][:8]
+        block_dir = f"persistent_agents/{self.agent.id}/prompt_blocks/{day}"
+        self.assertTrue(self.storage.listdir(block_dir)[1])
+
+        prune_prompt_archives_for_cutoff(timezone.now() - timedelta(days=14))
+        self.assertEqual(
+            load_prompt_archive_payload(recent_archive.storage_key, storage=self.storage)["system_prompt"],
+            "System prompt",
+        )
+        self.assertFalse(self.storage.exists(old_archive.storage_key))
+
+        prune_prompt_archives_for_cutoff(timezone.now())
+        self.assertEqual(self.storage.listdir(block_dir)[1], [])
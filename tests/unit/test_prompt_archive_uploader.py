@@ -0,0 +1,110 @@
+import shutil
+import tempfile
+import threading
+from unittest.mock import patch
+from uuid import uuid4
+
+from django.core.files.storage import FileSystemStorage
+from django.test import SimpleTestCase, tag
+
+from api.services import prompt_archives
+from api.services.prompt_archives import PromptArchiveUploader, _PromptArchiveUpload
+
+
+def _upload(name: str) -> _PromptArchiveUpload:
+    return _PromptArchiveUpload(
+        agent_id="agent",
+        archive_id=uuid4(),
+        archive_key=f"archives/{name}.json.zst",
+        manifest=b"manifest",
+        blocks={f"blocks/{name}.zst": b"block"},
+    )
+
+
+@tag("batch_event_processing_credits")
+class PromptArchiveUploaderTests(SimpleTestCase):
+    def setUp(self):
+        self.storage_dir = tempfile.mkdtemp()
+        self.addCleanup(lambda: shutil.rmtree(self.storage_dir, ignore_errors=True))
+        self.storage = FileSystemStorage(location=self.storage_dir)
+        for target, value in (
+            ("default_storage", self.storage),
+            ("close_old_connections", lambda: None),
+            ("_UPLOAD_QUEUE_PUT_TIMEOUT_SECONDS", 0.01),
+        ):
+            patcher = patch.object(prompt_archives, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        prompt_archives._known_blocks.clear()
+        self.addCleanup(prompt_archives._known_blocks.clear)
+
+        self.release_worker = threading.Event()
+        self.worker_busy = threading.Event()
+        self.addCleanup(self.release_worker.set)
+
+    def _block_worker_writes(self):
+        """Make writes from the uploader thread hang until ``release_worker`` is set."""
+        write_upload = prompt_archives._write_upload
+
+        def blocking_write(upload):
+            if threading.current_thread().name == "prompt-archive-uploader":
+                self.worker_busy.set()
+                self.release_worker.wait(5)
+            write_upload(upload)
+
+        patcher = patch.object(prompt_archives, "_write_upload", side_effect=blocking_write)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_worker_thread_writes_blocks_and_manifest(self):
+        uploader = PromptArchiveUploader()
+        upload = _upload("one")
+
+        self.assertTrue(uploader.submit(upload))
+        self.assertTrue(uploader.flush(5))
+
+        self.assertTrue(self.storage.exists(upload.archive_key))
+        self.assertTrue(self.storage.exists("blocks/one.zst"))
+        self.assertEqual(uploader.pending(), 0)
+
+    def test_submit_reports_a_full_queue(self):
+        self._block_worker_writes()
+        uploader = PromptArchiveUploader(max_pending=1)
+
+        self.assertTrue(uploader.submit(_upload("in-flight")))
+        self.assertTrue(self.worker_busy.wait(5))
+        self.assertTrue(uploader.submit(_upload("queued")))
+
+        self.assertFalse(uploader.submit(_upload("overflow")))
+        self.assertFalse(uploader.flush(0.01))
+
+    def test_shutdown_writes_queued_uploads_inline_when_worker_is_stuck(self):
+        self._block_worker_writes()
+        uploader = PromptArchiveUploader()
+        uploader.submit(_upload("in-flight"))
+        self.assertTrue(self.worker_busy.wait(5))
+        queued = [_upload("queued-1"), _upload("queued-2")]
+        for upload in queued:
+            uploader.submit(upload)
+
+        uploader.shutdown(timeout=0.2)
+
+        for upload in queued:
+            self.assertTrue(self.storage.exists(upload.archive_key))
+        self.release_worker.set()
+        self.assertTrue(uploader.flush(5))
+
+    def test_shutdown_marks_uploads_it_cannot_write_in_time_as_failed(self):
+        self._block_worker_writes()
+        uploader = PromptArchiveUploader()
+        uploader.submit(_upload("in-flight"))
+        self.assertTrue(self.worker_busy.wait(5))
+        queued = _upload("queued")
+        uploader.submit(queued)
+
+        with patch.object(prompt_archives, "_mark_upload_failed") as mark_failed:
+            uploader.shutdown(timeout=0)
+
+        mark_failed.assert_called_once()
+        self.assertIs(mark_failed.call_args.args[0], queued)
+        self.assertFalse(self.storage.exists(queued.archive_key))
@@ -0,0 +1,96 @@
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, tag
+
+from api.agent.core.prompt_cache_layout import (
+    PREFIX_STABILITY_KEY_PREFIX,
+    apply_prompt_cache_breakpoints,
+    build_prompt_cache_breakpoints,
+    record_prefix_stability,
+    supports_cache_breakpoints,
+)
+from config.redis_client import _FakeRedis
+
+
+SYSTEM_PROMPT = "core rules\n</sqlite_guidance>\n\ncontinuation notice"
+USER_CONTENT = "<important><charter>c</charter>\n<inbox>new</inbox></important>"
+USER_PREFIX = "<important><charter>c</charter>\n"
+
+
+@tag("batch_promptree")
+class PromptCacheLayoutTests(SimpleTestCase):
+    def _breakpoints(self, user_content=USER_CONTENT):
+        return build_prompt_cache_breakpoints(
+            SYSTEM_PROMPT,
+            user_content,
+            system_stable_chars=SYSTEM_PROMPT.index("\n\ncontinuation"),
+            user_stable_prefix=USER_PREFIX,
+        )
+
+    def test_breakpoints_split_messages_into_cached_blocks(self):
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": USER_CONTENT},
+        ]
+
+        marked = apply_prompt_cache_breakpoints(messages, self._breakpoints())
+
+        self.assertEqual(
+            marked[0]["content"],
+            [
+                {"type": "text", "text": "core rules\n</sqlite_guidance>", "cache_control": {"type": "ephemeral"}},
+                {"type": "text", "text": "\n\ncontinuation notice"},
+            ],
+        )
+        self.assertEqual(marked[1]["content"][0]["text"], USER_PREFIX)
+        self.assertEqual("".join(block["text"] for block in marked[1]["content"]), USER_CONTENT)
+        self.assertEqual(messages[1]["content"], USER_CONTENT)
+
+    def test_rewritten_messages_pass_through_unmarked(self):
+        messages = [
+            {"role": "system", "content": "rewritten system"},
+            {"role": "user", "content": [{"type": "text", "text": USER_CONTENT}]},
+        ]
+
+        self.assertEqual(apply_prompt_cache_breakpoints(messages, self._breakpoints()), messages)
+
+    def test_unmatched_user_prefix_is_not_marked(self):
+        breakpoints = self._breakpoints(user_content="<other>x</other>")
+
+        self.assertEqual(breakpoints.user_chars, 0)
+
+    def test_only_explicit_cache_providers_get_breakpoints(self):
+        self.assertTrue(supports_cache_breakpoints("anthropic", "claude-sonnet-4"))
+        self.assertTrue(supports_cache_breakpoints("bedrock", "bedrock/us.anthropic.claude-sonnet-4"))
+        self.assertFalse(supports_cache_breakpoints("openai", "gpt-5"))
+
+    def test_prefix_stability_is_tracked_per_agent(self):
+        fake_redis = _FakeRedis()
+        with patch("api.agent.core.prompt_cache_layout.get_redis_client", return_value=fake_redis):
+            first = record_prefix_stability("agent-1", self._breakpoints())
+            second = record_prefix_stability("agent-1", self._breakpoints())
+            changed = record_prefix_stability(
+                "agent-1",
+                build_prompt_cache_breakpoints(
+                    SYSTEM_PROMPT,
+                    USER_CONTENT,
+                    system_stable_chars=4,
+                    user_stable_prefix=USER_PREFIX,
+                ),
+            )
+
+        self.assertEqual(first, (None, 0.0))
+        self.assertEqual(second, (True, 0.5))
+        self.assertEqual(changed[0], False)
+        self.assertAlmostEqual(changed[1], 1 / 3)
+
+    def test_prefix_stability_keeps_a_bounded_window(self):
+        fake_redis = _FakeRedis()
+        with patch("api.agent.core.prompt_cache_layout.get_redis_client", return_value=fake_redis), patch(
+            "api.agent.core.prompt_cache_layout.PREFIX_STABILITY_WINDOW", 2
+        ):
+            for _ in range(3):
+                stable, ratio = record_prefix_stability("agent-1", self._breakpoints())
+
+        self.assertEqual((stable, ratio), (True, 0.5))
+        self.assertEqual(len(fake_redis.lrange(f"{PREFIX_STABILITY_KEY_PREFIX}:agent-1", 0, -1)), 2)
@@ -2,7 +2,14 @@ import random
 import string
 from django.test import TestCase, tag
 
-from api.agent.core.promptree import Prompt, hmt
+from api.agent.core.promptree import (
+    VOLATILITY_ITERATION,
+    VOLATILITY_SESSION,
+    VOLATILITY_STATIC,
+    Prompt,
+    PromptRenderCache,
+    hmt,
+)
 from api.agent.core.prompt_run_cache import BoundedTokenCountCache
 
 
@@ -282,10 +289,118 @@ class PromptRenderingTests(TestCase):
         self.assertEqual(result.count("</large>"), 1)
 
 
+@tag("batch_promptree")
+class PromptRenderCacheTests(TestCase):
+    def _build(self, cache, sections, estimator):
+        prompt = Prompt(token_estimator=estimator, render_cache=cache, cache_namespace="model")
+        history = prompt.group("history", weight=3)
+        for name, text in sections.items():
+            history.section_text(name, text)
+        prompt.section_text("system", "fixed rules " * 20, non_shrinkable=True)
+        return prompt
+
+    def test_cached_renders_match_uncached_output(self):
+        cache = PromptRenderCache()
+        sections = {"older": _long_random_text(400), "recent": "alpha " * 50}
+        estimator = lambda text: len(text.split())
+
+        for budget, recent in ((200, "alpha " * 50), (200, "beta " * 60), (5000, "beta " * 60)):
+            sections["recent"] = recent
+            cached = self._build(cache, sections, estimator)
+            plain = self._build(None, sections, estimator)
+
+            self.assertEqual(cached.render(budget), plain.render(budget))
+            self.assertEqual(cached.get_tokens_before_fitting(), plain.get_tokens_before_fitting())
+            self.assertEqual(cached.get_tokens_after_fitting(), plain.get_tokens_after_fitting())
+            self.assertEqual(cached.used_fast_path(), plain.used_fast_path())
+            self.assertEqual(cached.report(), plain.report())
+
+    def test_unchanged_sections_reuse_counts_and_whole_render(self):
+        cache = PromptRenderCache()
+        counted = []
+
+        def estimator(text):
+            counted.append(text)
+            return len(text.split())
+
+        sections = {"older": _long_random_text(400), "recent": "alpha " * 50}
+        first = self._build(cache, sections, estimator).render(200)
+        first_calls = len(counted)
+
+        counted.clear()
+        repeat = self._build(cache, sections, estimator)
+        self.assertEqual(repeat.render(200), first)
+        self.assertTrue(repeat.used_render_cache())
+        self.assertEqual(counted, [])
+
+        sections["recent"] = "beta " * 50
+        changed = self._build(cache, sections, estimator)
+        changed.render(200)
+        self.assertFalse(changed.used_render_cache())
+        self.assertLess(len(counted), first_calls)
+        self.assertNotIn(sections["older"], counted)
+
+        stats = cache.stats()
+        self.assertEqual(stats["renders"], 3)
+        self.assertAlmostEqual(stats["render_hit_ratio"], 1 / 3)
+        self.assertGreater(stats["section_hit_ratio"], 0)
+
+    def test_token_counts_are_namespaced(self):
+        cache = PromptRenderCache()
+        first = Prompt(token_estimator=len, render_cache=cache, cache_namespace="model-a")
+        first.section_text("s", "alpha beta")
+        first.render(100)
+        second = Prompt(token_estimator=lambda text: 1, render_cache=cache, cache_namespace="model-b")
+        second.section_text("s", "alpha beta")
+        second.render(100)
+
+        self.assertEqual(first.get_tokens_before_fitting(), len("<s>alpha beta</s>"))
+        self.assertEqual(second.get_tokens_before_fitting(), 1)
+
+
+@tag("batch_promptree")
+class PromptVolatilityLayoutTests(TestCase):
+    def _build(self, *, budget, inbox):
+        prompt = Prompt(token_estimator=lambda text: len(text.split()), order_by_volatility=True)
+        important = prompt.group("important", volatility=VOLATILITY_SESSION)
+        important.section_text("charter", "Help with research.", non_shrinkable=True)
+        important.section_text("inbox", inbox, volatility=VOLATILITY_ITERATION)
+        important.section_text("rules", "Static rules.", volatility=VOLATILITY_STATIC, non_shrinkable=True)
+        prompt.group("history").section_text("step", "tool output " * 40)
+        return prompt, prompt.render(budget)
+
+    def test_siblings_are_ordered_by_volatility_and_prefix_stops_at_volatile_leaf(self):
+        prompt, output = self._build(budget=1000, inbox="new mail")
+
+        self.assertLess(output.index("<rules>"), output.index("<charter>"))
+        self.assertLess(output.index("<charter>"), output.index("<inbox>"))
+        self.assertEqual(
+            prompt.stable_prefix(),
+            "<important><rules>Static rules.</rules>\n<charter>Help with research.</charter>\n",
+        )
+        self.assertTrue(output.startswith(prompt.stable_prefix()))
+
+    def test_stable_prefix_survives_volatile_changes_and_fitting(self):
+        first, _ = self._build(budget=1000, inbox="new mail")
+        second, output = self._build(budget=30, inbox="different mail " * 30)
+
+        self.assertFalse(second.used_fast_path())
+        self.assertEqual(first.stable_prefix(), second.stable_prefix())
+        self.assertTrue(output.startswith(second.stable_prefix()))
+
+    def test_layout_is_unchanged_without_volatility_ordering(self):
+        prompt = Prompt(token_estimator=len)
+        prompt.section_text("volatile", "a", volatility=VOLATILITY_ITERATION)
+        prompt.section_text("static", "b", volatility=VOLATILITY_STATIC)
+
+        self.assertEqual(prompt.render(1000), "<volatile>a</volatile>\n<static>b</static>")
+        self.assertEqual(prompt.stable_prefix(), "")
+
+
 @tag("batch_promptree")
 class BoundedTokenCountCacheTests(TestCase):
     def test_cache_is_model_specific_and_evicts_oldest_entry(self):
-        cache = BoundedTokenCountCache(max_entries=2, max_chars=100)
+        cache = BoundedTokenCountCache(max_entries=2)
         calls = []
 
         def compute(text):
@@ -302,21 +417,50 @@ class BoundedTokenCountCacheTests(TestCase):
         self.assertEqual(cache.misses, 4)
         self.assertEqual(calls, ["one", "one", "two", "one"])
 
-    def test_cache_evicts_to_retained_character_limit(self):
-        cache = BoundedTokenCountCache(max_entries=10, max_chars=5)
-        calls = []
+    def test_cache_keys_do_not_retain_source_text(self):
+        cache = BoundedTokenCountCache(max_entries=10)
+        text = "source " * 1000
 
-        def compute(text):
-            calls.append(text)
-            return len(text)
+        cache.count("model", text, len)
+
+        self.assertEqual(cache.count("model", text, lambda value: 0), len(text))
+        self.assertTrue(all(len(key[1]) < 64 for key in cache._entries))
+
+    def test_count_many_batches_misses_and_deduplicates(self):
+        cache = BoundedTokenCountCache(max_entries=10)
+        batches = []
+
+        def compute_many(texts):
+            batches.append(list(texts))
+            return [len(text) for text in texts]
+
+        cache.count("model", "cached", len)
+        counts = cache.count_many("model", ["cached", "alpha", "beta", "alpha"], compute_many)
+
+        self.assertEqual(counts, [6, 5, 4, 5])
+        self.assertEqual(batches, [["alpha", "beta"]])
+
+    def test_prompt_counts_leaves_through_count_many(self):
+        class BatchEstimator:
+            def __init__(self):
+                self.batches = []
+
+            def __call__(self, text):
+                return len(text.split())
+
+            def count_many(self, texts):
+                self.batches.append(list(texts))
+                return [len(text.split()) for text in texts]
+
+        estimator = BatchEstimator()
+        prompt = Prompt(token_estimator=estimator)
+        group = prompt.group("group")
+        group.section_text("first", "alpha beta")
+        group.section_text("second", "gamma")
 
-        cache.count("model", "abc", compute)
-        cache.count("model", "def", compute)
-        cache.count("model", "abc", compute)
+        prompt.render(100)
 
-        self.assertEqual(cache.hits, 0)
-        self.assertEqual(cache.misses, 3)
-        self.assertEqual(calls, ["abc", "def", "abc"])
+        self.assertEqual(estimator.batches, [["alpha beta", "gamma"]])
 
     def test_context_variable_substitution(self):
         """Test that context variables are properly substituted."""
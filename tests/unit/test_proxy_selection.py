@@ -19,6 +19,7 @@ from api.models import (
     DedicatedProxyAllocation,
     PersistentAgent,
 )
+from api.proxy_pool import ProxyPool, record_proxy_outcome
 from api.proxy_selection import (
     proxy_has_recent_health_pass,
     select_proxy,
@@ -653,3 +654,103 @@ class ProxySelectionIntegrationTests(TestCase):
         DedicatedProxyAllocation.objects.assign_to_owner(dedicated, owner)
 
         self.assertIsNone(BrowserUseAgent.select_random_proxy())
+
+
+@tag("batch_proxy_selection")
+@override_settings(PROXY_POOL_CACHE_ENABLED=True, PROXY_POOL_DEMOTE_AFTER_FAILURES=3)
+class ProxyPoolSelectionTests(TestCase):
+    """Shared-proxy selection served from the in-memory pool snapshot."""
+
+    def setUp(self):
+        pool_patcher = patch("api.proxy_pool._pool", ProxyPool())
+        self.pool = pool_patcher.start()
+        self.addCleanup(pool_patcher.stop)
+
+        self.health_check_spec = ProxyHealthCheckSpec.objects.create(
+            name="Pool Health Check",
+            prompt="Test health check"
+        )
+        self.static_proxy1 = self._create_proxy("pool1.proxy.com", static_ip="10.0.0.1")
+        self.static_proxy2 = self._create_proxy("pool2.proxy.com", static_ip="10.0.0.2")
+        self.unchecked_proxy = self._create_proxy("pool3.proxy.com", healthy=False)
+
+    def _create_proxy(self, host, static_ip=None, healthy=True):
+        proxy = ProxyServer.objects.create(
+            name=host,
+            proxy_type=ProxyServer.ProxyType.HTTP,
+            host=host,
+            port=8080,
+            static_ip=static_ip,
+            is_active=True
+        )
+        if healthy:
+            ProxyHealthCheckResult.objects.create(
+                proxy_server=proxy,
+                health_check_spec=self.health_check_spec,
+                status=ProxyHealthCheckResult.Status.PASSED,
+                checked_at=timezone.now() - timedelta(hours=1)
+            )
+        return proxy
+
+    def test_snapshot_ignores_passes_older_than_the_health_window(self):
+        stale_proxy = self._create_proxy("pool4.proxy.com", healthy=False)
+        ProxyHealthCheckResult.objects.create(
+            proxy_server=stale_proxy,
+            health_check_spec=self.health_check_spec,
+            status=ProxyHealthCheckResult.Status.PASSED,
+            checked_at=timezone.now() - timedelta(days=60),
+        )
+
+        self.assertTrue(proxy_has_recent_health_pass(self.static_proxy1))
+        self.assertNotIn(str(stale_proxy.pk), self.pool._current_snapshot().last_passed_at)
+        self.assertFalse(proxy_has_recent_health_pass(stale_proxy))
+        self.assertTrue(proxy_has_recent_health_pass(stale_proxy, health_check_days=90))
+
+    def test_selection_uses_cached_snapshot(self):
+        self.assertIn(BrowserUseAgent.select_random_proxy(), {self.static_proxy1, self.static_proxy2})
+        with self.assertNumQueries(0):
+            for _ in range(10):
+                self.assertIn(BrowserUseAgent.select_random_proxy(), {self.static_proxy1, self.static_proxy2})
+                self.assertTrue(proxy_has_recent_health_pass(self.static_proxy1))
+                self.assertFalse(proxy_has_recent_health_pass(self.unchecked_proxy))
+
+    def test_live_failures_demote_proxy_until_it_succeeds(self):
+        for _ in range(3):
+            record_proxy_outcome(self.static_proxy1, success=False)
+
+        self.assertFalse(proxy_has_recent_health_pass(self.static_proxy1))
+        for _ in range(20):
+            self.assertEqual(BrowserUseAgent.select_random_proxy(), self.static_proxy2)
+
+        record_proxy_outcome(self.static_proxy1, success=True, latency_seconds=0.2)
+        self.assertTrue(proxy_has_recent_health_pass(self.static_proxy1))
+
+    def test_saved_proxy_changes_invalidate_snapshot(self):
+        BrowserUseAgent.select_random_proxy()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.static_proxy1.is_active = False
+            self.static_proxy1.save(update_fields=["is_active"])
+
+        for _ in range(20):
+            self.assertEqual(BrowserUseAgent.select_random_proxy(), self.static_proxy2)
+
+    def test_pool_skips_allocated_dedicated_proxies(self):
+        dedicated = self._create_proxy("pool-dedicated.proxy.com", static_ip="10.0.0.9")
+        ProxyServer.objects.filter(pk=dedicated.pk).update(is_dedicated=True)
+        owner = User.objects.create_user(
+            username=f"pool-dedicated-owner-{uuid.uuid4()}",
+            email=f"pool-dedicated-owner-{uuid.uuid4()}@example.com",
+            password="testpass123",
+        )
+        DedicatedProxyAllocation.objects.assign_to_owner(ProxyServer.objects.get(pk=dedicated.pk), owner)
+
+        for _ in range(20):
+            self.assertIn(BrowserUseAgent.select_random_proxy(), {self.static_proxy1, self.static_proxy2})
+
+    def test_pool_offers_unallocated_dedicated_proxies(self):
+        ProxyServer.objects.all().delete()
+        dedicated = self._create_proxy("pool-spare.proxy.com", static_ip="10.0.0.10")
+        ProxyServer.objects.filter(pk=dedicated.pk).update(is_dedicated=True)
+
+        self.assertEqual(BrowserUseAgent.select_random_proxy(), dedicated)
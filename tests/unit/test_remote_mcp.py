@@ -1,16 +1,17 @@
 import base64
 import json
+import threading
 import tomllib
 import uuid
 from contextlib import ExitStack
 from decimal import Decimal
 from datetime import timedelta
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import TestCase, tag
+from django.test import TestCase, override_settings, tag
 from django.utils import timezone
 
 from api.agent.core.llm_config import AgentLLMTier
@@ -1378,6 +1379,31 @@ class RemoteMCPViewTests(TestCase):
         self.assertEqual(unsupported_filter_response.status_code, 200)
         self.assertTrue(unsupported_filter_response.json()["result"]["isError"])
 
+    @override_settings(MCP_WAIT_EVENT_HUB_ENABLED=True)
+    def test_wait_blocks_on_the_event_hub_instead_of_polling(self):
+        agent = self._create_agent(self.user, "Event Hub Wait MCP Agent")
+        waiter = MagicMock(subscribed=True)
+        waiter.wait.side_effect = lambda timeout: threading.Event().wait(min(timeout, 0.2))
+        hub = MagicMock()
+        hub.subscribe.return_value = waiter
+
+        with (
+            patch("api.services.remote_mcp.get_agent_timeline_event_hub", return_value=hub),
+            patch("api.services.remote_mcp.time.sleep") as poll_sleep,
+        ):
+            response = self._call_tool(
+                "gobii_wait_for_agent_event",
+                {"agent_id": str(agent.id), "timeout_seconds": 1, "event_types": ["message"]},
+            )
+
+        self.assertEqual(response.status_code, 200)
+        content = self._structured_content(response)
+        self.assertTrue(content["timed_out"])
+        hub.subscribe.assert_called_once_with(agent.id)
+        self.assertGreater(waiter.wait.call_count, 0)
+        waiter.close.assert_called_once_with()
+        poll_sleep.assert_not_called()
+
     def test_wait_after_cursor_is_strict_for_message_id_filter(self):
         agent = self._create_agent(self.user, "Strict Cursor MCP Agent")
 
@@ -1,4 +1,5 @@
 import base64
+import hashlib
 import os
 import shutil
 import signal
@@ -9,6 +10,7 @@ import sys
 import tempfile
 import time
 from datetime import timedelta
+from pathlib import Path
 from types import SimpleNamespace
 from unittest.mock import patch
 
@@ -42,9 +44,15 @@ from api.services.sandbox_internal_paths import (
     custom_tool_sqlite_workspace_path,
     is_sandbox_internal_path,
 )
-from api.services.sandbox_filespace_sync import apply_filespace_push, build_filespace_pull_manifest
+from api.services.sandbox_filespace_sync import (
+    FilespacePushStreamError,
+    apply_filespace_push,
+    build_filespace_pull_manifest,
+    read_filespace_push_stream,
+)
 from api.tasks.sandbox_compute import sync_filespace_after_call
 from sandbox_server.server.internal_paths import CUSTOM_TOOL_SQLITE_FILESPACE_PATH as SANDBOX_CUSTOM_TOOL_SQLITE_FILESPACE_PATH
+from sandbox_server.server.sync import _iter_push_stream
 
 
 class _DummyBackend:
@@ -572,6 +580,71 @@ class SandboxComputeSyncTests(TestCase):
         self.assertFalse(AgentFsNode.objects.filter(path="/.uv-cache/wheels/pkg.whl").exists())
         self.assertTrue(AgentFsNode.objects.filter(path="/visible.txt").exists())
 
+    def test_apply_filespace_push_skips_changes_matching_stored_checksum(self):
+        write_result = write_bytes_to_dir(
+            agent=self.agent,
+            content_bytes=b"unchanged",
+            extension="",
+            mime_type="text/plain",
+            path="/unchanged.txt",
+            overwrite=True,
+        )
+        self.assertEqual(write_result.get("status"), "ok")
+        node = AgentFsNode.objects.get(id=write_result["node_id"])
+
+        result = apply_filespace_push(
+            self.agent,
+            [
+                {
+                    "path": "/unchanged.txt",
+                    "content_b64": base64.b64encode(b"unchanged").decode("ascii"),
+                    "checksum_sha256": node.checksum_sha256,
+                    "mime_type": "text/plain",
+                }
+            ],
+            sync_timestamp=node.updated_at + timedelta(seconds=5),
+        )
+
+        self.assertEqual(result.get("status"), "ok")
+        self.assertEqual(result.get("skipped"), 1)
+        self.assertEqual(result.get("updated"), 0)
+
+    def test_read_filespace_push_stream_round_trips_sandbox_encoding(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            report_path = os.path.join(tmp_dir, "report.txt")
+            with open(report_path, "wb") as handle:
+                handle.write(b"streamed report")
+            encoded = b"".join(
+                _iter_push_stream(
+                    [
+                        (
+                            {
+                                "path": "/report.txt",
+                                "mime_type": "text/plain",
+                                "checksum_sha256": hashlib.sha256(b"streamed report").hexdigest(),
+                                "size_bytes": 15,
+                            },
+                            Path(report_path),
+                        ),
+                        ({"path": "/old.txt", "is_deleted": True}, None),
+                    ],
+                    "2026-01-01T00:00:00+00:00",
+                )
+            )
+
+        chunks = [encoded[index:index + 7] for index in range(0, len(encoded), 7)]
+        header, changes = read_filespace_push_stream(chunks)
+        changes = list(changes)
+
+        self.assertEqual(header, {"status": "ok", "sync_timestamp": "2026-01-01T00:00:00+00:00"})
+        self.assertEqual(changes[0]["path"], "/report.txt")
+        self.assertEqual(changes[0]["content"], b"streamed report")
+        self.assertEqual(changes[1], {"path": "/old.txt", "is_deleted": True})
+
+        header, changes = read_filespace_push_stream([encoded[:-4]])
+        with self.assertRaises(FilespacePushStreamError):
+            list(changes)
+
     def test_is_sandbox_internal_path_matches_reserved_subtrees(self):
         self.assertTrue(is_sandbox_internal_path(CUSTOM_TOOL_SQLITE_FILESPACE_PATH))
         self.assertTrue(is_sandbox_internal_path("/.gobii/internal/tool.log"))
@@ -15,7 +15,7 @@ from api.models import (
     AgentEmailAccount,
     PersistentAgentEmailEndpoint,
 )
-from api.agent.comms.outbound_delivery import deliver_agent_email
+from api.agent.comms.outbound_delivery import deliver_agent_email, deliver_agent_emails
 
 
 User = get_user_model()
@@ -109,6 +109,35 @@ class TestSmtpSelection(TestCase):
         self.assertEqual(sent_message["From"], "Custom SMTP Name <agent@example.com>")
         self.assertEqual(client.send_message.call_args.kwargs["from_addr"], "agent@example.com")
 
+    @override_settings(SMTP_POOL_ENABLED=True)
+    @patch("api.agent.comms.smtp_transport._pool", None)
+    @patch("smtplib.SMTP")
+    def test_batch_delivery_sends_every_message_over_one_pooled_session(self, mock_smtp):
+        self._create_acct()
+        AgentEmailAccount.objects.filter(endpoint=self.from_ep).update(is_outbound_enabled=True)
+        client = MagicMock()
+        client.noop.return_value = (250, b"2.0.0 OK")
+        mock_smtp.return_value = client
+        messages = [
+            PersistentAgentMessage.objects.create(
+                owner_agent=self.agent,
+                from_endpoint=self.from_ep,
+                to_endpoint=self.to_ep,
+                is_outbound=True,
+                body=f"<p>Hello {index}</p>",
+                raw_payload={"subject": f"Batch {index}"},
+            )
+            for index in range(3)
+        ]
+
+        deliver_agent_emails(messages)
+
+        self.assertEqual(mock_smtp.call_count, 1)
+        self.assertEqual(client.send_message.call_count, 3)
+        for msg in messages:
+            msg.refresh_from_db()
+            self.assertEqual(msg.latest_status, DeliveryStatus.SENT)
+
     @override_settings(GOBII_RELEASE_ENV="test")
     @patch.dict(os.environ, {"POSTMARK_SERVER_TOKEN": ""}, clear=False)
     def test_selection_simulates_when_no_account(self):
@@ -1,6 +1,7 @@
+import smtplib
 from unittest.mock import patch, MagicMock
 
-from django.test import TestCase, tag
+from django.test import TestCase, override_settings, tag
 from django.contrib.auth import get_user_model
 
 from api.models import (
@@ -11,7 +12,7 @@ from api.models import (
     AgentEmailAccount,
     AgentEmailOAuthCredential,
 )
-from api.agent.comms.smtp_transport import EmailAttachmentPayload, SmtpTransport
+from api.agent.comms.smtp_transport import EmailAttachmentPayload, SmtpTransport, get_smtp_connection_pool
 
 
 User = get_user_model()
@@ -256,3 +257,108 @@ class TestSmtpTransport(TestCase):
             {"photo.png", "chart.png"},
         )
         self.assertEqual(sent_message.get_body(preferencelist=("html",)).get_content_type(), "text/html")
+
+
+@tag("smtp")
+@override_settings(SMTP_POOL_ENABLED=True, SMTP_POOL_MAX_MESSAGES_PER_CONNECTION=2)
+class TestSmtpConnectionPool(TestCase):
+    _base_setup = TestSmtpTransport.setUp
+    _create_acct = TestSmtpTransport._create_acct
+
+    def setUp(self):
+        self._base_setup()
+        pool_patch = patch("api.agent.comms.smtp_transport._pool", None)
+        pool_patch.start()
+        self.addCleanup(pool_patch.stop)
+
+    def _send(self, acct, attempt_id):
+        SmtpTransport.send(
+            account=acct,
+            from_addr=self.from_ep.address,
+            to_addrs=[self.to_addr],
+            subject="Pooled",
+            plaintext_body="Hi",
+            html_body="<p>Hi</p>",
+            attempt_id=attempt_id,
+        )
+
+    @staticmethod
+    def _client():
+        client = MagicMock()
+        client.noop.return_value = (250, b"2.0.0 OK")
+        return client
+
+    @patch("smtplib.SMTP")
+    def test_pool_reuses_session_until_message_limit(self, mock_smtp):
+        acct = self._create_acct()
+        first, second = self._client(), self._client()
+        mock_smtp.side_effect = [first, second]
+
+        for attempt in ("a1", "a2", "a3"):
+            self._send(acct, attempt)
+
+        self.assertEqual(mock_smtp.call_count, 2)
+        self.assertEqual(first.send_message.call_count, 2)
+        first.login.assert_called_once()
+        first.quit.assert_called_once()
+        self.assertEqual(second.send_message.call_count, 1)
+        second.quit.assert_not_called()
+
+        get_smtp_connection_pool().close_all()
+        second.quit.assert_called_once()
+
+    @patch("smtplib.SMTP")
+    def test_pool_reconnects_when_reused_session_is_stale(self, mock_smtp):
+        acct = self._create_acct()
+        stale, fresh = self._client(), self._client()
+        mock_smtp.side_effect = [stale, fresh]
+        self._send(acct, "a1")
+        stale.noop.side_effect = smtplib.SMTPServerDisconnected("gone")
+
+        self._send(acct, "a2")
+
+        self.assertEqual(mock_smtp.call_count, 2)
+        stale.send_message.assert_called_once()
+        fresh.send_message.assert_called_once()
+
+    @patch("smtplib.SMTP")
+    def test_send_failure_on_a_live_session_is_not_retried(self, mock_smtp):
+        acct = self._create_acct()
+        client = self._client()
+        mock_smtp.side_effect = [client, self._client()]
+        self._send(acct, "a1")
+        client.send_message.side_effect = smtplib.SMTPServerDisconnected("dropped after DATA")
+
+        with self.assertRaises(smtplib.SMTPServerDisconnected):
+            self._send(acct, "a2")
+
+        mock_smtp.assert_called_once()
+        self.assertEqual(client.send_message.call_count, 2)
+
+    @patch("smtplib.SMTP")
+    def test_password_change_opens_new_session(self, mock_smtp):
+        acct = self._create_acct()
+        mock_smtp.side_effect = [MagicMock(), MagicMock()]
+        self._send(acct, "a1")
+        acct.set_smtp_password("rotated")
+        acct.save()
+
+        self._send(acct, "a2")
+
+        self.assertEqual(mock_smtp.call_count, 2)
+
+    @override_settings(SMTP_POOL_ENABLED=False, SMTP_POOL_MAX_MESSAGES_PER_CONNECTION=10)
+    @patch("smtplib.SMTP")
+    def test_session_batches_sends_without_pool(self, mock_smtp):
+        acct = self._create_acct()
+        client = self._client()
+        mock_smtp.return_value = client
+
+        with SmtpTransport.session(acct):
+            self._send(acct, "a1")
+            self._send(acct, "a2")
+            client.quit.assert_not_called()
+
+        mock_smtp.assert_called_once()
+        self.assertEqual(client.send_message.call_count, 2)
+        client.quit.assert_called_once()
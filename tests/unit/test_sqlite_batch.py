@@ -11,6 +11,9 @@ from django.utils import timezone
 
 from api.agent.tools.sqlite_batch import (
     MAX_RESULT_BYTES,
+    MAX_RESULT_ROWS,
+    RESULT_COUNT_MAX_ROWS,
+    RESULT_FETCH_BATCH_ROWS,
     execute_sqlite_batch,
     get_sqlite_batch_tool,
     _apply_resource_limits,
@@ -38,8 +41,10 @@ from api.agent.tools.sqlite_batch import (
     _SqliteBatchLimits,
     _should_skip_memory_limits_for_virtualapple_emulation,
     _strip_markdown_fences,
+    _stream_result_rows,
     _strip_trailing_tool_params,
 )
+from api.agent.tools.sqlite_batch_pool import SqliteBatchWorkerTimeout, get_sqlite_batch_worker_pool
 from api.agent.tools.sqlite_query_quality import (
     build_tool_result_query_advisories,
     named_model_read_tables,
@@ -1035,6 +1040,39 @@ class SqliteBatchCoreTests(SqliteBatchTestCase):
             )
             self.assertEqual(one_result_ctas[0].code, "tool_result_ctas")
 
+    def test_tool_results_table_is_read_only(self):
+        with self._with_temp_db() as (db_path, _token, _tmp):
+            conn = sqlite3.connect(db_path)
+            try:
+                conn.execute("CREATE TABLE __tool_results (result_id TEXT PRIMARY KEY, result_text TEXT)")
+                conn.execute("INSERT INTO __tool_results (result_id, result_text) VALUES ('r1', 'original')")
+                conn.commit()
+            finally:
+                conn.close()
+
+            for sql in (
+                "UPDATE __tool_results SET result_text = 'edited'",
+                "DELETE FROM __tool_results",
+                "INSERT INTO __tool_results (result_id, result_text) VALUES ('r2', 'forged')",
+                "DROP TABLE __tool_results",
+                "ALTER TABLE __tool_results ADD COLUMN note TEXT",
+            ):
+                out = execute_sqlite_batch(self.agent, {"sql": sql})
+                self.assertEqual(out.get("status"), "error", sql)
+                self.assertIn("__tool_results is read-only", out.get("message", ""))
+
+            out = execute_sqlite_batch(
+                self.agent,
+                {"queries": ["CREATE TABLE notes AS SELECT result_id, result_text FROM __tool_results", "UPDATE notes SET result_text = 'edited'"]},
+            )
+            self.assertEqual(out.get("status"), "ok")
+
+            conn = sqlite3.connect(db_path)
+            try:
+                self.assertEqual(conn.execute("SELECT result_id, result_text FROM __tool_results").fetchall(), [("r1", "original")])
+            finally:
+                conn.close()
+
     def test_single_tool_result_blob_fetch_returns_efficiency_advisory(self):
         with self._with_temp_db() as (db_path, _token, _tmp):
             conn = sqlite3.connect(db_path)
@@ -2297,6 +2335,68 @@ class SqliteBatchQualityTests(SqliteBatchTestCase):
         self.assertIn("targeted substr/grep_context_all", warning)
         self.assertIn("never read_file", warning)
 
+    def test_streaming_stops_keeping_rows_at_the_byte_budget(self):
+        conn = sqlite3.connect(":memory:")
+        try:
+            conn.execute("CREATE TABLE docs (id INTEGER PRIMARY KEY, body TEXT, blob BLOB)")
+            conn.executemany(
+                "INSERT INTO docs (id, body, blob) VALUES (?, ?, ?)",
+                [
+                    (index, f"head-{index}" + ("é" * 40_000) + f"tail-{index}", b"\x00" * 20_000)
+                    for index in range(500)
+                ],
+            )
+            streamed, total_rows = _stream_result_rows(conn.execute("SELECT * FROM docs"))
+        finally:
+            conn.close()
+
+        self.assertEqual(total_rows, 500)
+        self.assertLess(len(streamed), MAX_RESULT_ROWS)
+        self.assertLess(len(streamed[0]["body"].encode("utf-8")), 3 * MAX_RESULT_BYTES)
+        limited, warning = _enforce_result_limits(streamed, "SELECT * FROM docs", total_rows=total_rows)
+        self.assertLessEqual(len(json.dumps(limited).encode("utf-8")), MAX_RESULT_BYTES)
+        self.assertIn("500 rows ->", warning)
+
+    def test_huge_result_is_counted_only_up_to_the_cap(self):
+        conn = sqlite3.connect(":memory:")
+        calls = []
+        conn.create_function("seen", 1, lambda value: calls.append(value) or value)
+        try:
+            conn.execute("CREATE TABLE many (id INTEGER PRIMARY KEY)")
+            conn.executemany(
+                "INSERT INTO many (id) VALUES (?)",
+                [(index,) for index in range(RESULT_COUNT_MAX_ROWS * 3)],
+            )
+            rows, total_rows = _stream_result_rows(conn.execute("SELECT seen(id) AS id FROM many"))
+        finally:
+            conn.close()
+
+        self.assertEqual(total_rows, RESULT_COUNT_MAX_ROWS + 1)
+        self.assertEqual(len(rows), MAX_RESULT_ROWS)
+        self.assertEqual(rows[0], {"id": 0})
+        self.assertLess(len(calls), RESULT_COUNT_MAX_ROWS + 2 * RESULT_FETCH_BATCH_ROWS)
+        _limited, warning = _enforce_result_limits(rows, "SELECT id FROM many", total_rows=total_rows)
+        self.assertIn(f"more than {RESULT_COUNT_MAX_ROWS} rows -> {MAX_RESULT_ROWS}", warning)
+
+    def test_large_select_reports_exact_row_count(self):
+        with self._with_temp_db():
+            execute_sqlite_batch(
+                self.agent,
+                {
+                    "queries": [
+                        "CREATE TABLE many (id INTEGER PRIMARY KEY)",
+                        "WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n WHERE x < 5000) "
+                        "INSERT INTO many (id) SELECT x FROM n",
+                    ]
+                },
+            )
+            out = execute_sqlite_batch(self.agent, {"queries": "SELECT id FROM many"})
+
+        result = out["results"][0]
+        self.assertIn("returned 5000 rows", result["message"])
+        self.assertIn("5000 rows -> 100", result["message"])
+        self.assertEqual(len(result["result"]), MAX_RESULT_ROWS)
+
     def test_result_with_limit_not_warned(self):
         """Queries with explicit LIMIT don't trigger warnings."""
         with self._with_temp_db():
@@ -2321,6 +2421,56 @@ class SqliteBatchQualityTests(SqliteBatchTestCase):
             self.assertEqual(out.get("status"), "error")
             self.assertIn("timed out", out.get("message", "").lower())
 
+    @override_settings(SQLITE_BATCH_WORKER_POOL_SIZE=1)
+    def test_pooled_worker_is_reused_across_batches(self):
+        pool = get_sqlite_batch_worker_pool()
+        with self._with_temp_db():
+            execute_sqlite_batch(self.agent, {"queries": "CREATE TABLE pooled (id INTEGER PRIMARY KEY)"})
+            reused_before = pool.reused
+            out = execute_sqlite_batch(self.agent, {"queries": "SELECT COUNT(*) AS n FROM pooled"})
+
+        self.assertEqual(out.get("status"), "ok")
+        self.assertEqual(out["results"][0]["result"], [{"n": 0}])
+        self.assertEqual(pool.reused, reused_before + 1)
+
+    @override_settings(SQLITE_BATCH_WORKER_POOL_SIZE=1)
+    def test_timed_out_pooled_worker_is_not_reused(self):
+        pool = get_sqlite_batch_worker_pool()
+        with self._with_temp_db():
+            execute_sqlite_batch(self.agent, {"queries": "SELECT 1"})
+            with patch(
+                "api.agent.tools.sqlite_batch_pool.SqliteBatchWorker.request",
+                side_effect=SqliteBatchWorkerTimeout("SQLite batch worker timed out."),
+            ), patch.object(pool, "discard", wraps=pool.discard) as discard:
+                out = execute_sqlite_batch(self.agent, {"queries": "SELECT 1"})
+
+        self.assertIn("timed out", out.get("message", "").lower())
+        discard.assert_called_once()
+        self.assertIsNotNone(discard.call_args.args[0].returncode)
+
+    @override_settings(SQLITE_BATCH_WORKER_POOL_SIZE=1)
+    def test_pooled_worker_is_retired_after_running_out_of_memory(self):
+        pool = get_sqlite_batch_worker_pool()
+        with self._with_temp_db(), patch.object(pool, "checkin", wraps=pool.checkin) as checkin:
+            out = execute_sqlite_batch(self.agent, {"queries": "SELECT length(randomblob(900000000)) AS n"})
+
+        self.assertEqual(out.get("status"), "error")
+        self.assertIn("out of memory", out.get("message", "").lower())
+        worker = checkin.call_args.args[0]
+        self.assertTrue(worker.retiring)
+        self.assertIsNotNone(worker.returncode)
+        self.assertNotIn(worker, pool._idle)
+
+    @override_settings(SQLITE_BATCH_WORKER_POOL_SIZE=0)
+    def test_pool_can_be_disabled_for_fresh_interpreter_per_batch(self):
+        with self._with_temp_db(), patch(
+            "api.agent.tools.sqlite_batch._run_sqlite_batch_in_pooled_worker"
+        ) as pooled:
+            out = execute_sqlite_batch(self.agent, {"queries": "SELECT 1 AS one"})
+
+        pooled.assert_not_called()
+        self.assertEqual(out.get("status"), "ok")
+
     @patch("api.agent.tools.sqlite_batch.platform.machine", return_value="x86_64")
     @patch("builtins.open", new_callable=mock_open, read_data="vendor_id\t: VirtualApple\n")
     def test_detects_virtualapple_emulation_for_memory_limit_skip(self, _mock_file, _mock_machine):
@@ -0,0 +1,131 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from unittest.mock import patch
+
+from django.core.files.storage import FileSystemStorage
+from django.test import SimpleTestCase, override_settings, tag
+
+from api.agent.tools import sqlite_state_cache
+from api.agent.tools.sqlite_state import _agent_sqlite_db_uncoordinated, sqlite_storage_key
+
+
+def _write_rows(db_path: str, *values: str) -> None:
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("CREATE TABLE IF NOT EXISTS durable_state (value TEXT NOT NULL);")
+        conn.executemany(
+            "INSERT INTO durable_state (value) VALUES (?);",
+            [(value,) for value in values],
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _read_rows(db_path: str) -> list[str]:
+    conn = sqlite3.connect(db_path)
+    try:
+        return [row[0] for row in conn.execute("SELECT value FROM durable_state ORDER BY rowid;")]
+    finally:
+        conn.close()
+
+
+@tag("batch_sqlite")
+class SQLiteStateCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.storage_dir = tempfile.mkdtemp()
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(lambda: shutil.rmtree(self.storage_dir, ignore_errors=True))
+        self.addCleanup(lambda: shutil.rmtree(self.cache_dir, ignore_errors=True))
+        self.storage = FileSystemStorage(location=self.storage_dir)
+        self.agent_uuid = "0f5c8e7a-3b1d-4c7e-9a51-2d6f0b8e4c11"
+        self.storage_key = sqlite_storage_key(self.agent_uuid)
+
+        settings_override = override_settings(
+            AGENT_SQLITE_STATE_CACHE_ENABLED=True,
+            AGENT_SQLITE_STATE_CACHE_DIR=self.cache_dir,
+            AGENT_SQLITE_STATE_CACHE_MAX_BYTES=64 * 1024 * 1024,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        storage_patch = patch("api.agent.tools.sqlite_state.default_storage", self.storage)
+        storage_patch.start()
+        self.addCleanup(storage_patch.stop)
+
+    def test_matching_generation_restores_from_worker_cache_without_download(self):
+        with _agent_sqlite_db_uncoordinated(self.agent_uuid) as db_path:
+            _write_rows(db_path, "cached")
+
+        with patch.object(self.storage, "open", side_effect=AssertionError("download attempted")):
+            with _agent_sqlite_db_uncoordinated(self.agent_uuid) as db_path:
+                self.assertEqual(_read_rows(db_path), ["cached"])
+
+    def test_changed_generation_falls_back_to_storage(self):
+        with _agent_sqlite_db_uncoordinated(self.agent_uuid) as db_path:
+            _write_rows(db_path, "first")
+
+        # Simulate another worker publishing a newer archive.
+        cache_patch = override_settings(AGENT_SQLITE_STATE_CACHE_ENABLED=False)
+        with cache_patch, _agent_sqlite_db_uncoordinated(self.agent_uuid) as db_path:
+            _write_rows(db_path, "second", "x" * 4096)
+        time.sleep(0.01)
+
+        with patch.object(self.storage, "open", wraps=self.storage.open) as storage_open:
+            with _agent_sqlite_db_uncoordinated(self.agent_uuid) as db_path:
+                self.assertEqual(_read_rows(db_path), ["first", "second", "x" * 4096])
+        storage_open.assert_called()
+
+    def test_unchanged_content_skips_upload(self):
+        with patch(
+            "api.agent.tools.sqlite_state.sqlite_file_sha256",
+            return_value="unchanged",
+        ):
+            with _agent_sqlite_db_uncoordinated(self.agent_uuid) as db_path:
+                _write_rows(db_path, "stable")
+
+            with patch("api.agent.tools.sqlite_state._upload_sqlite_archive") as upload:
+                with _agent_sqlite_db_uncoordinated(self.agent_uuid):
+                    pass
+
+        upload.assert_not_called()
+
+    def test_invalid_cached_copy_is_evicted_and_restored_from_storage(self):
+        with _agent_sqlite_db_uncoordinated(self.agent_uuid) as db_path:
+            _write_rows(db_path, "canonical")
+        cached_db_path, _meta_path = sqlite_state_cache._entry_paths(self.agent_uuid)
+        with open(cached_db_path, "r+b") as cached_file:
+            cached_file.write(b"not a sqlite header")
+
+        with _agent_sqlite_db_uncoordinated(self.agent_uuid) as db_path:
+            self.assertEqual(_read_rows(db_path), ["canonical"])
+
+    def test_least_recently_used_entries_are_evicted_over_budget(self):
+        source_path = os.path.join(self.storage_dir, "source.db")
+        _write_rows(source_path, "y" * 8192)
+        entry_bytes = os.path.getsize(source_path)
+
+        with override_settings(AGENT_SQLITE_STATE_CACHE_MAX_BYTES=entry_bytes * 2):
+            for agent_key in ("older", "newer"):
+                sqlite_state_cache.store_cached_sqlite_state(
+                    agent_key,
+                    source_path=source_path,
+                    generation="g1",
+                    sha256="hash",
+                    archive_bytes=10,
+                )
+            older_meta = sqlite_state_cache._entry_paths("older")[1]
+            os.utime(older_meta, (time.time() - 60, time.time() - 60))
+            sqlite_state_cache.store_cached_sqlite_state(
+                "newest",
+                source_path=source_path,
+                generation="g1",
+                sha256="hash",
+                archive_bytes=10,
+            )
+
+            self.assertIsNone(sqlite_state_cache.get_cached_sqlite_state("older", "g1"))
+            self.assertIsNotNone(sqlite_state_cache.get_cached_sqlite_state("newer", "g1"))
+            self.assertIsNotNone(sqlite_state_cache.get_cached_sqlite_state("newest", "g1"))
@@ -0,0 +1,187 @@
+import contextlib
+import os
+import shutil
+import sqlite3
+import tempfile
+from unittest.mock import patch
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.test import SimpleTestCase, override_settings, tag
+
+from api.agent.tools.sqlite_state import (
+    _agent_sqlite_db_uncoordinated,
+    compact_agent_sqlite_state,
+    sqlite_quarantine_storage_key,
+    sqlite_storage_key,
+)
+from api.agent.tools.sqlite_state_delta import (
+    SQLiteDeltaError,
+    SQLiteDeltaManifest,
+    apply_sqlite_page_delta,
+    sqlite_delta_manifest_key,
+    sqlite_delta_quarantine_key,
+    sqlite_page_fingerprint,
+    write_sqlite_page_delta,
+)
+
+
+def _insert(db_path: str, *values: str) -> None:
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("CREATE TABLE IF NOT EXISTS durable_state (value TEXT NOT NULL);")
+        conn.executemany(
+            "INSERT INTO durable_state (value) VALUES (?);",
+            [(value,) for value in values],
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _values(db_path: str) -> list[str]:
+    conn = sqlite3.connect(db_path)
+    try:
+        return [row[0] for row in conn.execute("SELECT value FROM durable_state ORDER BY rowid;")]
+    finally:
+        conn.close()
+
+
+@tag("batch_sqlite")
+class SQLitePageDeltaFormatTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(lambda: shutil.rmtree(self.tmp_dir, ignore_errors=True))
+
+    def test_delta_replays_changed_and_appended_pages(self):
+        base_path = os.path.join(self.tmp_dir, "base.db")
+        head_path = os.path.join(self.tmp_dir, "head.db")
+        delta_path = os.path.join(self.tmp_dir, "head.delta")
+        _insert(base_path, *("row-%d" % index for index in range(200)))
+        shutil.copyfile(base_path, head_path)
+        _insert(head_path, *("new-%d" % index for index in range(200)))
+
+        base = sqlite_page_fingerprint(base_path)
+        head = sqlite_page_fingerprint(head_path)
+        changed = write_sqlite_page_delta(head_path, head, base, delta_path)
+
+        self.assertGreater(changed, 0)
+        self.assertLess(changed, len(head.page_hashes))
+        apply_sqlite_page_delta(base_path, delta_path)
+        self.assertEqual(sqlite_page_fingerprint(base_path).sha256, head.sha256)
+
+    def test_manifest_round_trips_through_json(self):
+        manifest = SQLiteDeltaManifest(base_sha256="a", head_sha256="a", page_size=4096).with_delta(
+            key="agent_state/x.delta/1.zst",
+            sha256="b",
+            archive_bytes=120,
+            pages=3,
+        )
+
+        restored = SQLiteDeltaManifest.from_json(manifest.to_json())
+
+        self.assertEqual(restored, manifest)
+        self.assertEqual(restored.head_sha256, "b")
+
+
+@tag("batch_sqlite")
+@override_settings(AGENT_SQLITE_DELTA_PERSISTENCE_ENABLED=True)
+class SQLiteDeltaPersistenceTests(SimpleTestCase):
+    def setUp(self):
+        self.storage_dir = tempfile.mkdtemp()
+        self.addCleanup(lambda: shutil.rmtree(self.storage_dir, ignore_errors=True))
+        self.storage = FileSystemStorage(location=self.storage_dir)
+        self.agent_uuid = "8c4b1f0e-27d4-4f59-b3a6-5e8d2c9a7f10"
+        self.storage_key = sqlite_storage_key(self.agent_uuid)
+        self.manifest_key = sqlite_delta_manifest_key(self.storage_key)
+        storage_patch = patch("api.agent.tools.sqlite_state.default_storage", self.storage)
+        storage_patch.start()
+        self.addCleanup(storage_patch.stop)
+
+    def _base_bytes(self) -> bytes:
+        with self.storage.open(self.storage_key, "rb") as stored:
+            return stored.read()
+
+    def test_small_change_is_persisted_as_delta_and_restored(self):
+        with _agent_sqlite_db_uncoordinated(self.agent_uuid) as db_path:
+            _insert(db_path, *("x" * 200 for _ in range(500)))
+        base_bytes = self._base_bytes()
+
+        with _agent_sqlite_db_uncoordinated(self.agent_uuid) as db_path:
+            _insert(db_path, "appended")
+
+        self.assertEqual(self._base_bytes(), base_bytes)
+        self.assertTrue(self.storage.exists(self.manifest_key))
+        with _agent_sqlite_db_uncoordinated(self.agent_uuid) as db_path:
+            values = _values(db_path)
+        self.assertEqual(len(values), 501)
+        self.assertEqual(values[-1], "appended")
+
+    def test_compaction_writes_new_base_and_drops_chain(self):
+        with _agent_sqlite_db_uncoordinated(self.agent_uuid) as db_path:
+            _insert(db_path, *("y" * 200 for _ in range(500)))
+        with patch("api.agent.tools.sqlite_state._schedule_sqlite_state_compaction"):
+            for index in range(3):
+                with _agent_sqlite_db_uncoordinated(self.agent_uuid) as db_path:
+                    _insert(db_path, f"delta-{index}")
+        base_bytes = self._base_bytes()
+
+        with patch(
+            "api.services.agent_sqlite_coordination.agent_sqlite_execution",
+            lambda _agent_id: contextlib.nullcontext(),
+        ):
+            self.assertTrue(compact_agent_sqlite_state(self.agent_uuid))
+
+        self.assertNotEqual(self._base_bytes(), base_bytes)
+        self.assertFalse(self.storage.exists(self.manifest_key))
+        with _agent_sqlite_db_uncoordinated(self.agent_uuid) as db_path:
+            self.assertEqual(_values(db_path)[-3:], ["delta-0", "delta-1", "delta-2"])
+
+    def test_stale_manifest_is_ignored_after_full_base_write(self):
+        with _agent_sqlite_db_uncoordinated(self.agent_uuid) as db_path:
+            _insert(db_path, *("z" * 200 for _ in range(500)))
+        with _agent_sqlite_db_uncoordinated(self.agent_uuid) as db_path:
+            _insert(db_path, "delta")
+        with self.storage.open(self.manifest_key, "rb") as manifest_file:
+            stale_manifest = manifest_file.read()
+
+        with override_settings(AGENT_SQLITE_DELTA_PERSISTENCE_ENABLED=False):
+            with _agent_sqlite_db_uncoordinated(self.agent_uuid) as db_path:
+                _insert(db_path, "full")
+        self.storage.save(self.manifest_key, ContentFile(stale_manifest))
+
+        with _agent_sqlite_db_uncoordinated(self.agent_uuid) as db_path:
+            self.assertEqual(_values(db_path)[-2:], ["delta", "full"])
+
+    def test_missing_middle_delta_restores_valid_prefix_and_quarantines_chain(self):
+        with _agent_sqlite_db_uncoordinated(self.agent_uuid) as db_path:
+            _insert(db_path, *("w" * 200 for _ in range(500)))
+        with patch("api.agent.tools.sqlite_state._schedule_sqlite_state_compaction"):
+            for index in range(3):
+                with _agent_sqlite_db_uncoordinated(self.agent_uuid) as db_path:
+                    _insert(db_path, f"delta-{index}")
+        with self.storage.open(self.manifest_key, "rb") as manifest_file:
+            manifest = SQLiteDeltaManifest.from_json(manifest_file.read())
+        self.assertEqual(len(manifest.deltas), 3)
+        self.storage.delete(manifest.delta_keys[1])
+        base_bytes = self._base_bytes()
+
+        with patch("api.agent.tools.sqlite_state._log_sqlite_persistence_error") as log_error:
+            with _agent_sqlite_db_uncoordinated(self.agent_uuid) as db_path:
+                self.assertEqual(_values(db_path)[-1], "delta-0")
+
+        log_error.assert_called_once()
+        self.assertIsInstance(log_error.call_args.args[1], SQLiteDeltaError)
+        self.assertEqual(log_error.call_args.kwargs["error_code"], "sqlite_restore_delta_chain_truncated")
+        self.assertEqual(self._base_bytes(), base_bytes)
+        self.assertFalse(self.storage.exists(sqlite_quarantine_storage_key(self.agent_uuid)))
+        with self.storage.open(sqlite_delta_quarantine_key(self.storage_key), "rb") as quarantined:
+            self.assertEqual(SQLiteDeltaManifest.from_json(quarantined.read()), manifest)
+        self.assertTrue(self.storage.exists(manifest.delta_keys[2]))
+        with self.storage.open(self.manifest_key, "rb") as manifest_file:
+            self.assertEqual(SQLiteDeltaManifest.from_json(manifest_file.read()).delta_keys, manifest.delta_keys[:1])
+
+        with patch("api.agent.tools.sqlite_state._log_sqlite_persistence_error") as log_error:
+            with _agent_sqlite_db_uncoordinated(self.agent_uuid) as db_path:
+                self.assertEqual(_values(db_path)[-1], "delta-0")
+        log_error.assert_not_called()
@@ -0,0 +1,191 @@
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db.models import F
+from django.test import TransactionTestCase, override_settings, tag
+from django.utils import timezone
+
+from api.models import (
+    BrowserUseAgent,
+    Organization,
+    PersistentAgent,
+    PersistentAgentStep,
+    TaskCredit,
+    TaskCreditReservation,
+)
+from config.redis_client import _FakeRedis
+from constants.grant_types import GrantTypeChoices
+from tasks.credit_reservations import settle_expired_reservations
+from tasks.services import TaskCreditService
+
+
+User = get_user_model()
+
+
+@tag("batch_task_credits")
+@override_settings(
+    TASK_CREDIT_RESERVATIONS_ENABLED=True,
+    TASK_CREDIT_RESERVATION_SIZE=Decimal("5"),
+    TASK_CREDIT_RESERVATION_TTL_SECONDS=60,
+)
+class TaskCreditReservationTests(TransactionTestCase):
+    def setUp(self):
+        self.redis = _FakeRedis()
+        redis_patch = patch("tasks.credit_reservations.get_redis_client", return_value=self.redis)
+        redis_patch.start()
+        self.addCleanup(redis_patch.stop)
+
+        owner = User.objects.create(username="reservation_owner")
+        self.org = Organization.objects.create(name="Reservation Org", slug="reservation-org", created_by=owner)
+        now = timezone.now()
+        self.credit = TaskCredit.objects.create(
+            organization=self.org,
+            credits=Decimal("10.000"),
+            credits_used=Decimal("0.000"),
+            granted_date=now - timedelta(days=1),
+            expiration_date=now + timedelta(days=10),
+            grant_type=GrantTypeChoices.COMPENSATION,
+        )
+
+    def _settle_all(self):
+        return settle_expired_reservations(now=timezone.now() + timedelta(minutes=5))
+
+    def test_charges_within_a_lease_do_not_lock_the_credit(self):
+        first = TaskCreditService.consume_credit_for_owner(self.org, amount=Decimal("0.400"))
+        self.assertEqual(first.id, self.credit.id)
+        self.credit.refresh_from_db()
+        self.assertEqual(self.credit.credits_used, Decimal("0.400"))
+
+        with patch.object(TaskCredit.objects, "select_for_update", side_effect=AssertionError("locked credit")):
+            for _ in range(3):
+                consumed = TaskCreditService.consume_credit_for_owner(self.org, amount=Decimal("1.200"))
+                self.assertEqual(consumed.id, self.credit.id)
+                self.assertEqual(consumed.credits_used, self.credit.credits_used + Decimal("1.200"))
+                self.credit = consumed
+
+        self.assertEqual(self._settle_all(), 1)
+        self.credit.refresh_from_db()
+        self.assertEqual(self.credit.credits_used, Decimal("4.000"))
+        reservation = TaskCreditReservation.objects.get()
+        self.assertEqual(reservation.consumed, Decimal("4.000"))
+        self.assertIsNotNone(reservation.settled_at)
+
+    def test_exhausted_lease_is_settled_when_replaced(self):
+        for _ in range(3):
+            TaskCreditService.consume_credit_for_owner(self.org, amount=Decimal("2.000"))
+
+        reservations = list(TaskCreditReservation.objects.order_by("created_at"))
+        self.assertEqual(len(reservations), 2)
+        self.assertEqual(reservations[0].consumed, Decimal("4.000"))
+        self.assertIsNone(reservations[1].settled_at)
+        self.credit.refresh_from_db()
+        self.assertEqual(self.credit.credits_used, Decimal("6.000"))
+
+        self.assertEqual(self._settle_all(), 1)
+        self.credit.refresh_from_db()
+        self.assertEqual(self.credit.credits_used, Decimal("6.000"))
+
+    def test_refund_after_reserved_charge_stays_exact(self):
+        consumed = TaskCreditService.consume_credit_for_owner(self.org, amount=Decimal("1.000"))
+        TaskCreditService.refund_consumed_credit_for_owner(self.org, Decimal("1.000"), preferred_credit=consumed)
+
+        self._settle_all()
+        self.credit.refresh_from_db()
+        self.assertEqual(self.credit.credits_used, Decimal("0.000"))
+
+    def test_charge_larger_than_remaining_block_uses_locked_path(self):
+        TaskCredit.objects.filter(id=self.credit.id).update(credits_used=Decimal("9.500"))
+
+        with self.assertRaises(ValidationError):
+            TaskCreditService.consume_credit_for_owner(self.org, amount=Decimal("1.000"))
+        self.assertFalse(TaskCreditReservation.objects.exists())
+
+    def test_open_lease_only_counts_drawn_credits_as_used(self):
+        TaskCreditService.consume_credit_for_owner(self.org, amount=Decimal("0.400"))
+
+        self.credit.refresh_from_db()
+        self.assertIsNone(TaskCreditReservation.objects.get().settled_at)
+        self.assertEqual(self.credit.credits_used, Decimal("0.400"))
+        self.assertEqual(self.credit.available_credits, Decimal("9.600"))
+        self.assertEqual(TaskCreditService.get_owner_task_credits_used(self.org), Decimal("0.400"))
+
+    def test_draw_falls_back_when_the_block_was_used_up_elsewhere(self):
+        TaskCreditService.consume_credit_for_owner(self.org, amount=Decimal("0.400"))
+        TaskCredit.objects.filter(id=self.credit.id).update(credits=F("credits_used"))
+
+        with self.assertRaises(ValidationError):
+            TaskCreditService.consume_credit_for_owner(self.org, amount=Decimal("1.000"))
+
+        self.credit.refresh_from_db()
+        self.assertEqual(self.credit.credits_used, Decimal("0.400"))
+        reservation = TaskCreditReservation.objects.get()
+        self.assertEqual(reservation.consumed, Decimal("0.400"))
+        self.assertIsNotNone(reservation.settled_at)
+
+    def test_user_charges_check_usage_thresholds_on_every_draw(self):
+        user = User.objects.create(username="reservation_user")
+        TaskCredit.objects.create(
+            user=user,
+            credits=Decimal("10.000"),
+            credits_used=Decimal("0.000"),
+            granted_date=timezone.now() - timedelta(days=1),
+            expiration_date=timezone.now() + timedelta(days=10),
+            grant_type=GrantTypeChoices.COMPENSATION,
+        )
+
+        with patch.object(TaskCreditService, "handle_task_threshold") as handle_threshold:
+            for _ in range(3):
+                TaskCreditService.consume_credit(user, amount=Decimal("1.000"))
+
+        self.assertEqual(handle_threshold.call_count, 3)
+        self.assertEqual(TaskCreditService.get_user_task_credits_used(user), Decimal("3.000"))
+
+    def test_last_credits_of_a_block_are_leased_in_a_smaller_block(self):
+        TaskCredit.objects.filter(id=self.credit.id).update(credits=Decimal("6.000"))
+        for _ in range(2):
+            TaskCreditService.consume_credit_for_owner(self.org, amount=Decimal("2.000"))
+
+        consumed = TaskCreditService.consume_credit_for_owner(self.org, amount=Decimal("2.000"))
+
+        self.assertEqual(consumed.id, self.credit.id)
+        self.credit.refresh_from_db()
+        self.assertEqual(self.credit.credits_used, Decimal("6.000"))
+        first, second = TaskCreditReservation.objects.order_by("created_at")
+        self.assertEqual(first.consumed, Decimal("4.000"))
+        self.assertIsNotNone(first.settled_at)
+        self.assertEqual(second.reserved, Decimal("2.000"))
+
+    def test_charged_agent_steps_draw_from_one_lease(self):
+        user = User.objects.create(username="reservation_agent_owner")
+        # Drop any signup grant so every charge lands on the credit below.
+        TaskCredit.objects.filter(user=user).delete()
+        credit = TaskCredit.objects.create(
+            user=user,
+            credits=Decimal("10.000"),
+            credits_used=Decimal("0.000"),
+            granted_date=timezone.now() - timedelta(days=1),
+            expiration_date=timezone.now() + timedelta(days=10),
+            grant_type=GrantTypeChoices.COMPENSATION,
+        )
+        with patch.object(BrowserUseAgent, "select_random_proxy", return_value=None):
+            browser_agent = BrowserUseAgent.objects.create(user=user, name="Reservation BA")
+        agent = PersistentAgent.objects.create(
+            user=user,
+            name="Reservation Agent",
+            charter="Charge steps",
+            browser_use_agent=browser_agent,
+        )
+
+        with patch.object(TaskCreditService, "handle_task_threshold"):
+            steps = [
+                PersistentAgentStep.objects.create(agent=agent, description=f"Charged {index}", credits_cost=Decimal("0.500"))
+                for index in range(3)
+            ]
+
+        self.assertEqual({step.task_credit_id for step in steps}, {credit.id})
+        self.assertEqual(TaskCreditReservation.objects.filter(task_credit=credit).count(), 1)
+        credit.refresh_from_db()
+        self.assertEqual(credit.credits_used, Decimal("1.500"))
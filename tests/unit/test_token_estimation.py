@@ -0,0 +1,59 @@
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, override_settings, tag
+
+from api.agent.core.token_estimation import TokenEstimationService
+from config.redis_client import _FakeRedis
+
+
+@tag("batch_promptree")
+class TokenEstimationServiceTests(SimpleTestCase):
+    def setUp(self):
+        self.calls = []
+
+        def fake_compute(service, model, texts):
+            self.calls.append((model, list(texts)))
+            return [len(text.split()) for text in texts]
+
+        compute_patch = patch.object(TokenEstimationService, "_compute", fake_compute)
+        compute_patch.start()
+        self.addCleanup(compute_patch.stop)
+
+    def test_counts_are_cached_by_model_and_digest(self):
+        service = TokenEstimationService()
+
+        self.assertEqual(service.count_many("model-a", ["one two", "three", "one two"]), [2, 1, 2])
+        self.assertEqual(service.count("model-a", "one two"), 2)
+        self.assertEqual(service.count("model-b", "one two"), 2)
+
+        self.assertEqual(
+            self.calls,
+            [("model-a", ["one two", "three"]), ("model-b", ["one two"])],
+        )
+        self.assertEqual(service.hits, 1)
+        self.assertEqual(service.misses, 3)
+
+    def test_local_cache_is_bounded_by_entries(self):
+        service = TokenEstimationService(max_entries=2)
+
+        service.count_many("model", ["a", "b", "c"])
+        service.count("model", "a")
+
+        self.assertEqual(self.calls[-1], ("model", ["a"]))
+        self.assertEqual(len(service._entries), 2)
+
+    @override_settings(PROMPT_TOKEN_CACHE_SHARED_ENABLED=True, PROMPT_TOKEN_CACHE_SHARED_MIN_CHARS=10)
+    def test_long_texts_are_shared_across_processes(self):
+        fake_redis = _FakeRedis()
+        long_text = "charter " * 10
+        with patch("api.agent.core.token_estimation.get_redis_client", return_value=fake_redis):
+            TokenEstimationService().count_many("model", [long_text, "short"])
+            other_worker = TokenEstimationService()
+            counts = other_worker.count_many("model", [long_text, "short"])
+
+        self.assertEqual(counts, [10, 1])
+        self.assertEqual(other_worker.shared_hits, 1)
+        self.assertEqual(
+            self.calls,
+            [("model", [long_text, "short"]), ("model", ["short"])],
+        )
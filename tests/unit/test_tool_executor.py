@@ -0,0 +1,74 @@
+import os
+import threading
+from contextvars import ContextVar
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, override_settings, tag
+
+from api.agent.core.tool_executor import (
+    TOOL_CLASS_DEFAULT,
+    TOOL_CLASS_SOURCE,
+    ToolBatchExecutor,
+    ToolClassSlots,
+    tool_concurrency_class,
+)
+
+
+_marker: ContextVar[str] = ContextVar("tool_executor_marker", default="unset")
+
+
+@tag("batch_event_parallel")
+class ToolExecutorTests(SimpleTestCase):
+    def test_source_bearing_tools_share_one_slot(self):
+        slots = ToolClassSlots(max_in_flight=3)
+        self.assertEqual(tool_concurrency_class("http_request"), TOOL_CLASS_SOURCE)
+        self.assertEqual(tool_concurrency_class("mcp_brightdata_search_engine"), TOOL_CLASS_SOURCE)
+        self.assertEqual(tool_concurrency_class("read_file"), TOOL_CLASS_DEFAULT)
+
+        slots.acquire(TOOL_CLASS_SOURCE)
+        self.assertFalse(slots.available(TOOL_CLASS_SOURCE))
+        self.assertTrue(slots.available(TOOL_CLASS_DEFAULT))
+        slots.acquire(TOOL_CLASS_DEFAULT)
+        slots.acquire(TOOL_CLASS_DEFAULT)
+        self.assertFalse(slots.has_capacity())
+        self.assertFalse(slots.available(TOOL_CLASS_DEFAULT))
+
+        slots.release(TOOL_CLASS_SOURCE)
+        self.assertEqual(slots.in_flight, 2)
+        self.assertTrue(slots.available(TOOL_CLASS_SOURCE))
+
+    @override_settings(AGENT_TOOL_EXECUTOR_MAX_WORKERS=2)
+    def test_pool_is_reused_across_batches_and_copies_context(self):
+        executor = ToolBatchExecutor()
+        self.addCleanup(executor.shutdown)
+        thread_names = set()
+
+        def task(value):
+            thread_names.add(threading.current_thread().name)
+            return _marker.get(), value
+
+        token = _marker.set("batch")
+        try:
+            first = [executor.submit(task, index) for index in range(4)]
+            pool = executor._pool
+            second = [executor.submit(task, index) for index in range(4)]
+        finally:
+            _marker.reset(token)
+
+        self.assertEqual([future.result(timeout=2) for future in first + second], [("batch", i) for i in range(4)] * 2)
+        self.assertIs(executor._pool, pool)
+        self.assertEqual(executor.max_workers, 2)
+        self.assertLessEqual(len(thread_names), 2)
+
+    def test_forked_child_starts_a_fresh_pool(self):
+        executor = ToolBatchExecutor()
+        self.addCleanup(executor.shutdown)
+        executor.submit(lambda: None).result(timeout=2)
+        parent_pool = executor._pool
+
+        with patch("api.agent.core.tool_executor.os.getpid", return_value=os.getpid() + 1):
+            executor.submit(lambda: None).result(timeout=2)
+            child_pool = executor._pool
+
+        self.assertIsNot(child_pool, parent_pool)
+        parent_pool.shutdown(wait=False)
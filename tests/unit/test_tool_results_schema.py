@@ -2,7 +2,8 @@ import base64
 import json
 import sqlite3
 import tempfile
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
 
 from django.test import SimpleTestCase, tag
 
@@ -2134,3 +2135,91 @@ class CsvAutoLoadTests(SimpleTestCase):
 
         result = _dedupe_column_names(["id", "name", "value"])
         self.assertEqual(result, ["id", "name", "value"])
+
+
+@tag("batch_tool_results")
+class ToolResultRenderReuseTests(SimpleTestCase):
+    """Repeated prompt renders reuse analyses and only write changed rows."""
+
+    def setUp(self):
+        cache_patch = patch.object(tool_results, "_summary_cache", tool_results.ToolResultSummaryCache())
+        self.cache = cache_patch.start()
+        self.addCleanup(cache_patch.stop)
+        db_file = tempfile.NamedTemporaryFile(suffix=".sqlite3")
+        self.addCleanup(db_file.close)
+        self.db_path = db_file.name
+        token = set_sqlite_db_path(self.db_path)
+        self.addCleanup(reset_sqlite_db_path, token)
+        self.started = datetime(2026, 8, 11, tzinfo=timezone.utc)
+
+    def _record(self, step_id, index, batch_id):
+        return tool_results.ToolCallResultRecord(
+            step_id=step_id,
+            tool_name="http_request",
+            created_at=self.started + timedelta(minutes=index),
+            result_text=json.dumps({"content": {"items": [{"id": step_id, "rank": index}]}}),
+            source_batch_id=batch_id,
+            succeeded=True,
+        )
+
+    def _render(self, records):
+        tool_results.prepare_tool_results_for_prompt(
+            records,
+            recency_positions={record.step_id: index for index, record in enumerate(reversed(records))},
+        )
+        with sqlite3.connect(self.db_path) as conn:
+            return {
+                result_id: (rowid, is_current_batch)
+                for rowid, result_id, is_current_batch in conn.execute(
+                    "SELECT rowid, result_id, is_current_batch FROM __tool_results"
+                )
+            }
+
+    def test_repeated_render_reuses_cached_analysis(self):
+        records = [self._record("first", 0, "batch-a"), self._record("second", 1, "batch-a")]
+        self._render(records)
+
+        with patch.object(tool_results, "analyze_result", wraps=tool_results.analyze_result) as analyze:
+            self._render(records)
+            self._render(records + [self._record("third", 2, "batch-a")])
+
+        self.assertEqual([call.args[1] for call in analyze.call_args_list], ["third"])
+        self.assertEqual(len(self.cache), 3)
+
+    def test_render_diffs_rows_instead_of_rewriting_table(self):
+        first, second = self._record("first", 0, "batch-a"), self._record("second", 1, "batch-a")
+        before = self._render([first, second])
+        self.assertEqual({result_id: current for result_id, (_rowid, current) in before.items()}, {"first": 1, "second": 1})
+
+        third = self._record("third", 2, "batch-b")
+        after = self._render([second, third])
+
+        self.assertNotIn("first", after)
+        self.assertEqual(after["second"], (before["second"][0], 0))
+        self.assertEqual(after["third"][1], 1)
+
+    def test_tampered_row_without_digest_is_rewritten(self):
+        record = self._record("first", 0, "batch-a")
+        self._render([record])
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("UPDATE __tool_results SET result_text = 'stale', row_digest = NULL")
+
+        self._render([record])
+
+        with sqlite3.connect(self.db_path) as conn:
+            stored = conn.execute("SELECT result_text, row_digest FROM __tool_results").fetchone()
+        self.assertNotEqual(stored[0], "stale")
+        self.assertIsNotNone(stored[1])
+
+    def test_summary_cache_evicts_least_recently_used_within_budget(self):
+        cache = tool_results.ToolResultSummaryCache(max_bytes=2000)
+        first = cache.summarize("a" * 50, "one")
+        cache.summarize("b" * 50, "two")
+        self.assertIs(cache.summarize("a" * 50, "one"), first)
+
+        cache.summarize("c" * 50, "three")
+
+        self.assertEqual(len(cache), 2)
+        self.assertIs(cache.summarize("a" * 50, "one"), first)
+        self.assertIsNot(cache.summarize("a" * 50, "other-id"), first)
+
@@ -0,0 +1,127 @@
+from unittest.mock import MagicMock, patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings, tag
+
+from api.agent.tools.search_tools import _search_with_llm
+from api.agent.tools.tool_search_index import (
+    IndexDocument,
+    ToolSearchIndex,
+    clear_tool_search_indexes,
+    get_tool_search_index,
+    tokenize,
+)
+from api.models import BrowserUseAgent, PersistentAgent
+from tests.utils.token_usage import make_completion_response
+
+
+def _documents():
+    return [
+        IndexDocument("mcp_brightdata_web_data_linkedin_person_profile", "mcp_brightdata_web_data_linkedin_person_profile", "Quickly read structured LinkedIn people profile data url"),
+        IndexDocument("mcp_brightdata_web_data_crunchbase_company", "mcp_brightdata_web_data_crunchbase_company", "Structured Crunchbase company data url"),
+        IndexDocument("pipedream_slack_send_message", "pipedream_slack_send_message", "Send a message to a Slack channel channel text"),
+        IndexDocument("create_image", "create_image", "Generate an image from a prompt prompt size"),
+    ]
+
+
+@tag("batch_mcp_tools")
+class ToolSearchIndexTests(SimpleTestCase):
+    def setUp(self):
+        clear_tool_search_indexes()
+        self.addCleanup(clear_tool_search_indexes)
+
+    def test_tokenize_splits_names_and_folds_plurals(self):
+        self.assertEqual(tokenize("Send Slack_messages to the channels"), ["send", "slack", "message", "channel"])
+
+    def test_search_ranks_name_and_description_matches(self):
+        index = ToolSearchIndex(_documents())
+
+        ranked = index.search("post a message in slack", limit=2)
+
+        self.assertEqual(ranked[0][0], "pipedream_slack_send_message")
+        self.assertEqual(len(ranked), 1)
+        self.assertEqual(index.search("linkedin profiles", limit=5)[0][0], "mcp_brightdata_web_data_linkedin_person_profile")
+
+    def test_search_without_matches_returns_nothing(self):
+        self.assertEqual(ToolSearchIndex(_documents()).search("weather forecast", limit=5), [])
+
+    def test_index_is_reused_until_catalog_changes(self):
+        documents = _documents()
+        index = get_tool_search_index(documents)
+
+        self.assertIs(get_tool_search_index(list(documents)), index)
+
+        changed = documents[:-1] + [IndexDocument("create_image", "create_image", "Render pictures")]
+        rebuilt = get_tool_search_index(changed)
+        self.assertIsNot(rebuilt, index)
+        self.assertEqual(rebuilt.search("render picture", limit=1)[0][0], "create_image")
+
+
+@tag("batch_mcp_tools")
+@override_settings(
+    SEARCH_TOOLS_PRERANK_ENABLED=True,
+    SEARCH_TOOLS_PRERANK_THRESHOLD=80,
+    SEARCH_TOOLS_PRERANK_LIMIT=40,
+    SEARCH_TOOLS_SELECTION_CACHE_SECONDS=600,
+)
+class SearchToolsPrerankTests(TestCase):
+    """search_tools with catalog pre-ranking and the selection cache on."""
+
+    def setUp(self):
+        clear_tool_search_indexes()
+        self.addCleanup(clear_tool_search_indexes)
+        cache.clear()
+        self.addCleanup(cache.clear)
+        user = get_user_model().objects.create_user(
+            username="prerank@example.com",
+            email="prerank@example.com",
+            password="secret",
+        )
+        self.agent = PersistentAgent.objects.create(
+            user=user,
+            name="Prerank Agent",
+            charter="find tools",
+            browser_use_agent=BrowserUseAgent.objects.create(user=user, name="Prerank Browser"),
+        )
+        self.catalog = [
+            {"full_name": f"custom_widget_{index}", "description": f"Rotate widget {index}", "parameters": {}}
+            for index in range(100)
+        ] + [
+            {"full_name": "pipedream_slack_send_message", "description": "Send a message to a Slack channel", "parameters": {}},
+        ]
+        self.enable = MagicMock(
+            return_value={"status": "success", "enabled": ["pipedream_slack_send_message"], "already_enabled": [], "evicted": [], "invalid": []}
+        )
+
+    def _search(self):
+        return _search_with_llm(
+            agent=self.agent,
+            query="post a message in slack",
+            provider_name="test",
+            catalog=self.catalog,
+            enable_callback=self.enable,
+            empty_message="",
+        )
+
+    @patch("api.agent.tools.search_tools.run_completion")
+    @patch("api.agent.tools.search_tools.get_llm_config_with_failover")
+    def test_large_catalog_is_shortlisted_and_selection_is_reused(self, mock_failover, mock_run_completion):
+        mock_failover.return_value = [("provider-key", "search-model", {})]
+        mock_run_completion.return_value = make_completion_response(
+            content="Enabled",
+            tool_names=["pipedream_slack_send_message"],
+            model="search-model",
+        )
+
+        first = self._search()
+        second = self._search()
+
+        self.assertEqual(mock_run_completion.call_count, 1)
+        user_prompt = mock_run_completion.call_args.kwargs["messages"][1]["content"]
+        self.assertIn("pipedream_slack_send_message", user_prompt)
+        self.assertNotIn("custom_widget_7", user_prompt)
+        self.assertEqual(first["status"], "success")
+        self.assertEqual(second["status"], "success")
+        self.assertEqual(self.enable.call_count, 2)
+        self.assertEqual(self.enable.call_args.args[1], ["pipedream_slack_send_message"])
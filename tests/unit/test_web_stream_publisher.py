@@ -0,0 +1,67 @@
+import asyncio
+import threading
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, tag
+
+from api.agent.core.web_stream_publisher import WebStreamPublisher
+
+
+@tag("batch_event_processing")
+class WebStreamPublisherTests(SimpleTestCase):
+    def setUp(self):
+        self.sent: list[dict] = []
+        self.release = threading.Event()
+        self.first_send_started = threading.Event()
+
+        async def fake_send(agent_id, user_id, payload):
+            self.first_send_started.set()
+            while not self.release.is_set():
+                await asyncio.sleep(0.005)
+            self.sent.append(payload)
+
+        patcher = patch("console.agent_chat.realtime.send_stream_event_async", side_effect=fake_send)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.release.set)
+
+    def test_deltas_queued_behind_slow_send_are_coalesced_in_order(self):
+        publisher = WebStreamPublisher()
+        publisher.publish("agent", 1, {"stream_id": "s", "status": "start"})
+        self.assertTrue(self.first_send_started.wait(timeout=2))
+
+        publisher.publish("agent", 1, {"stream_id": "s", "status": "delta", "reasoning_delta": "th"})
+        publisher.publish("agent", 1, {"stream_id": "s", "status": "delta", "content_delta": "He"})
+        publisher.publish("agent", 1, {"stream_id": "s", "status": "delta", "content_delta": "llo"})
+        publisher.publish("agent", 1, {"stream_id": "s", "status": "done"})
+        self.assertEqual(publisher.pending_frames(), 2)
+
+        self.release.set()
+        self.assertTrue(publisher.wait_for_stream("agent", 1, "s", timeout=2))
+        self.assertEqual(
+            self.sent,
+            [
+                {"stream_id": "s", "status": "start"},
+                {"stream_id": "s", "status": "delta", "reasoning_delta": "th", "content_delta": "Hello"},
+                {"stream_id": "s", "status": "done"},
+            ],
+        )
+
+    def test_cancel_drops_unsent_deltas(self):
+        publisher = WebStreamPublisher()
+        publisher.publish("agent", 1, {"stream_id": "s", "status": "start"})
+        self.assertTrue(self.first_send_started.wait(timeout=2))
+        publisher.publish("agent", 1, {"stream_id": "s", "status": "delta", "content_delta": "stale"})
+        publisher.publish("agent", 1, {"stream_id": "s", "status": "canceled"})
+
+        self.release.set()
+        self.assertTrue(publisher.wait_for_stream("agent", 1, "s", timeout=2))
+        self.assertEqual([payload["status"] for payload in self.sent], ["start", "canceled"])
+
+    def test_publish_does_not_wait_for_channel_layer(self):
+        publisher = WebStreamPublisher()
+        publisher.publish("agent", 1, {"stream_id": "s", "status": "start"})
+        publisher.publish("agent", 1, {"stream_id": "s", "status": "delta", "content_delta": "x"})
+
+        self.assertFalse(publisher.wait_for_stream("agent", 1, "s", timeout=0.05))
+        self.assertEqual(self.sent, [])
@@ -1,5 +1,7 @@
+from unittest.mock import patch
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase, tag
+from django.test import SimpleTestCase, TestCase, override_settings, tag
 
 from api.agent.core.web_streaming import WebStreamBroadcaster, WebStreamTarget, resolve_web_stream_target
 from api.models import (
@@ -170,3 +172,35 @@ class WebStreamBroadcasterFlushTests(TestCase):
         deltas = [p for p in sent if p["status"] == "delta"]
         self.assertEqual(len(deltas), 2)
         self.assertEqual(deltas[1]["content_delta"], " there friend")
+
+
+@tag("batch_event_processing")
+@override_settings(WEB_STREAM_BACKGROUND_PUBLISH_ENABLED=True)
+class WebStreamBackgroundPublishTests(SimpleTestCase):
+    """Production path: frames go through the process-wide background publisher."""
+
+    def test_finish_delivers_every_frame_in_order_off_the_caller_thread(self):
+        sent: list[dict] = []
+
+        async def fake_send(agent_id, user_id, payload):
+            sent.append(payload)
+
+        broadcaster = WebStreamBroadcaster(
+            target=WebStreamTarget(agent_id="bg-agent", user_id=7, address="web://user/7/agent/bg-agent"),
+            min_flush_interval=0.0,
+            terminal_flush_timeout=2.0,
+        )
+        with patch("console.agent_chat.realtime.send_stream_event_async", side_effect=fake_send), patch(
+            "console.agent_chat.realtime.send_stream_event"
+        ) as inline_send:
+            broadcaster.push_delta(None, "Hel")
+            broadcaster.push_delta("checking", "lo")
+            broadcaster.push_delta(None, " there")
+            broadcaster.finish()
+
+        inline_send.assert_not_called()
+        self.assertEqual(sent[0]["status"], "start")
+        self.assertEqual(sent[-1]["status"], "done")
+        self.assertTrue(all(payload["stream_id"] == broadcaster.stream_id for payload in sent))
+        self.assertEqual("".join(payload.get("content_delta", "") for payload in sent), "Hello there")
+        self.assertEqual("".join(payload.get("reasoning_delta", "") for payload in sent), "checking")